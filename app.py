@@ -1,6 +1,8 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, has_request_context
+from flask.cli import AppGroup, ScriptInfo
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import func
+from sqlalchemy import func, event
+from sqlalchemy.orm.attributes import flag_modified
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_bcrypt import Bcrypt
 from flask_limiter import Limiter
@@ -9,13 +11,34 @@ from flask_wtf.csrf import CSRFProtect, CSRFError
 from wtforms import StringField, PasswordField, TextAreaField, SelectField, HiddenField, DecimalField, validators
 from flask_wtf import FlaskForm as Form
 from dotenv import load_dotenv
+import click
 import traceback
 import os
 import time
 import threading
+import gc
+from contextlib import contextmanager
 import requests
-import phonenumbers
-from phonenumbers import carrier, geocoder, timezone
+import json
+from phone_utils import normalize_phone, format_phone, phone_digits
+from phone_index import PhoneNgramIndex, join_phone_digits
+from lead_dedupe import find_duplicate_clusters, cluster_fingerprint
+from single_flight import SingleFlight
+from sync_scheduler import SyncBudget, PollPolicy, plan_sync_batch
+from hubspot_quota import HubSpotQuota, HubSpotQuotaExceeded
+from hubspot_transport import guarded_api_factory, GuardedSession, is_hubspot_failure, is_hubspot_failed_response
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from hubspot_cache import HubSpotResponseCache
+from job_events import JobEventLog, DONE_EVENT, format_sse
+from sync_archive import SyncArchive
+from sync_pipeline import SyncPipeline
+from import_memory import ImportMemoryMonitor, MemoryCeilingExceeded
+from deal_mapping import DealMapper, AgentDirectory, DEFAULT_BUDGET, STAGE_LABELS, STAGE_STATUS, deal_status
+from hubspot_export import HubSpotCrmExport, exported_objects
+from hubspot_associations import HubSpotAssociations
+from hubspot_notes import HubSpotNotes
+from hubspot_fingerprint import property_fingerprint, fingerprint_matches, with_fingerprint
+from maintenance_runner import MaintenanceRunner, BatchResult, each_item
 import boto3
 from botocore.exceptions import ClientError
 import io
@@ -346,9 +369,71 @@ def delete_file_locally(filename):
 
 # ===== HUBSPOT API =====
 HUBSPOT_API_KEY = os.getenv('HUBSPOT_API_KEY')
+
+# Спільна квота HubSpot API: запити з HTTP запитів користувачів - смуга interactive,
+# фонові потоки - polling, повні імпорти/експорти явно переходять у смугу bulk
+# Квота рахується в кожному процесі окремо: ліміти акаунта діляться на кількість процесів
+# (gunicorn_config.py передає кількість workers у HUBSPOT_QUOTA_PROCESSES)
+HUBSPOT_QUOTA_PROCESSES = max(1, int(os.getenv('HUBSPOT_QUOTA_PROCESSES', '1')))
+hubspot_quota = HubSpotQuota(
+    burst_limit=max(1, int(os.getenv('HUBSPOT_BURST_LIMIT', '100')) // HUBSPOT_QUOTA_PROCESSES),
+    daily_limit=max(1, int(os.getenv('HUBSPOT_DAILY_LIMIT', '250000')) // HUBSPOT_QUOTA_PROCESSES),
+    default_lane=lambda: 'interactive' if has_request_context() else 'polling'
+)
+# Що бачить користувач, коли інтерактивний запит не дочекався місця в квоті (HubSpotQuotaExceeded)
+HUBSPOT_QUOTA_MESSAGE = 'Ліміт запитів до HubSpot вичерпано, спробуйте пізніше'
+# Circuit breaker: коли HubSpot недоступний або відповідає повільно, запити одразу
+# отримують CircuitOpenError замість очікування timeout (не блокуємо workers)
+hubspot_breaker = CircuitBreaker(
+    'HubSpot',
+    failure_threshold=int(os.getenv('HUBSPOT_CIRCUIT_FAILURES', '5')),
+    reset_timeout=float(os.getenv('HUBSPOT_CIRCUIT_RESET_SECONDS', '30')),
+    slow_call_seconds=float(os.getenv('HUBSPOT_SLOW_CALL_SECONDS', '8')),
+    is_failure=is_hubspot_failure,
+    is_failed_result=is_hubspot_failed_response
+)
+HUBSPOT_REQUEST_TIMEOUT = float(os.getenv('HUBSPOT_REQUEST_TIMEOUT', '15'))
+# Кеш повторних читань (pipelines/owners - година, картки контактів/угод - хвилина);
+# записи через SDK або hubspot_http інвалідовують закешовані об'єкти автоматично
+hubspot_cache = HubSpotResponseCache() if os.getenv('HUBSPOT_CACHE_ENABLED', 'true').lower() == 'true' else None
+
+# Порядок guards: відкритий breaker відхиляє запит до квоти (запит не витрачає квоту),
+# квота, і облік breaker найближче до запиту (час очікування квоти не рахується як повільний запит)
+HUBSPOT_GUARDS = (hubspot_breaker.fail_fast, hubspot_quota.guard, hubspot_breaker.guard)
+
+# Прямі запити до api.hubapi.com (v4 асоціації, нотатки) - через ту саму квоту і breaker
+hubspot_http = GuardedSession(*HUBSPOT_GUARDS, timeout=HUBSPOT_REQUEST_TIMEOUT, cache=hubspot_cache)
+# Запитів одночасно в польоті в асинхронного клієнта (пакетні фонові задачі)
+HUBSPOT_ASYNC_CONCURRENCY = int(os.getenv('HUBSPOT_ASYNC_CONCURRENCY', '20'))
+
+
+def run_hubspot_async(scenario, lane=None):
+    """Виконує scenario(client) з HubSpotAsyncClient у власному event loop і повертає результат
+
+    Для фонових задач і скриптів (не для обробників запитів). Клієнт ділить квоту
+    і circuit breaker з синхронним кодом; смуга за замовчуванням - смуга поточного потоку.
+    """
+    import asyncio
+    from hubspot_async import HubSpotAsyncClient
+    
+    lane = lane or hubspot_quota.current_lane()
+    
+    async def main():
+        async with HubSpotAsyncClient(
+            HUBSPOT_API_KEY, max_concurrency=HUBSPOT_ASYNC_CONCURRENCY, rate_limit=None,
+            quota=hubspot_quota, lane=lane, breaker=hubspot_breaker, timeout=HUBSPOT_REQUEST_TIMEOUT
+        ) as client:
+            return await scenario(client)
+    
+    return asyncio.run(main())
+
 if HUBSPOT_API_KEY:
     try:
-        hubspot_client = HubSpot(access_token=HUBSPOT_API_KEY)
+        hubspot_client = HubSpot(
+            access_token=HUBSPOT_API_KEY,
+            api_factory=guarded_api_factory(*HUBSPOT_GUARDS,
+                                            request_timeout=HUBSPOT_REQUEST_TIMEOUT, cache=hubspot_cache)
+        )
         app.logger.info("HubSpot API успішно підключено!")
         print("HubSpot API успішно підключено!")
     except Exception as e:
@@ -360,6 +445,65 @@ else:
     print("HUBSPOT_API_KEY не знайдено в змінних середовища")
     hubspot_client = None
 
+# Дорогі обходи HubSpot (всі deals, контакти, pipelines) виконуються один раз,
+# одночасні виклики з інших потоків/workers чекають і отримують той самий результат
+hubspot_single_flight = SingleFlight(os.path.join(basedir, 'instance', 'locks'))
+
+# Журнал подій фонових задач для SSE (/api/jobs/<id>/events), спільний для всіх workers
+job_event_log = JobEventLog(os.path.join(basedir, 'instance', 'job_events'))
+# SSE потік тримає worker на весь час з'єднання: на sync workers gunicorn кілька відкритих
+# сторінок займають всі workers. Вмикати тільки з GUNICORN_WORKER_CLASS=gevent (або eventlet),
+# інакше сторінки опитують /api/jobs/<id>
+JOB_EVENTS_SSE_ENABLED = os.getenv('JOB_EVENTS_SSE_ENABLED', 'false').lower() == 'true'
+
+
+@app.context_processor
+def inject_job_events_sse():
+    return {'job_events_sse': JOB_EVENTS_SSE_ENABLED}
+
+# Архів сирих даних синхронізації (gzip JSONL на кожен запуск) для повторного маппінгу без API
+SYNC_ARCHIVE_ENABLED = os.getenv('SYNC_ARCHIVE_ENABLED', 'true').lower() == 'true'
+sync_archive = SyncArchive(
+    os.getenv('SYNC_ARCHIVE_DIR', os.path.join(basedir, 'instance', 'sync_archive')),
+    retention_days=int(os.getenv('SYNC_ARCHIVE_RETENTION_DAYS', '180'))
+)
+
+
+# Імпорти комітять і звільняють сесію пакетами по IMPORT_BATCH_SIZE записів;
+# приріст RSS процесу за запуск обмежений стелею, tracemalloc - тільки для звіту (IMPORT_MEMORY_TRACE)
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+IMPORT_MEMORY_CEILING_MB = float(os.getenv('IMPORT_MEMORY_CEILING_MB', '512')) or None
+IMPORT_MEMORY_TRACE = os.getenv('IMPORT_MEMORY_TRACE', 'false').lower() == 'true'
+
+
+def import_memory_monitor(name):
+    """ImportMemoryMonitor з налаштуваннями з оточення"""
+    return ImportMemoryMonitor(name, ceiling_mb=IMPORT_MEMORY_CEILING_MB, trace=IMPORT_MEMORY_TRACE)
+
+
+def release_import_batch(memory):
+    """Комітить пакет імпорту і звільняє identity map сесії
+
+    Після виклику ORM об'єкти, завантажені раніше, від'єднані від сесії - їх не можна
+    використовувати далі (зберігайте id, а не об'єкти).
+    """
+    db.session.commit()
+    db.session.expunge_all()
+    if memory.over_ceiling():
+        gc.collect()
+    memory.batch_released()
+
+
+def open_sync_archive_run(source):
+    """Новий запуск архіву або None, якщо архів вимкнено чи недоступний (синхронізація не зупиняється)"""
+    if not SYNC_ARCHIVE_ENABLED:
+        return None
+    try:
+        return sync_archive.open_run(source)
+    except OSError as e:
+        app.logger.warning(f"⚠️ Архів синхронізації недоступний: {e}")
+        return None
+
 # Моделі бази даних
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -504,6 +648,8 @@ class Lead(db.Model):
     # Контактні дані
     company = db.Column(db.String(100))  # Компанія
     second_phone = db.Column(db.String(20))  # Другий телефон
+    phone_digits = db.Column(db.String(20), index=True)  # Тільки цифри phone (для пошуку дублікатів)
+    second_phone_digits = db.Column(db.String(20), index=True)  # Тільки цифри second_phone
     telegram_nickname = db.Column(db.String(50))  # Нік в телеграмі
     messenger = db.Column(db.String(20))  # Месенджер
     birth_date = db.Column(db.Date)  # Дата народження
@@ -512,8 +658,79 @@ class Lead(db.Model):
     hubspot_deal_id = db.Column(db.String(50))
     hubspot_stage_label = db.Column(db.String(100))  # Оригінальна назва стадії з HubSpot
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
-    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
-    last_sync_at = db.Column(db.DateTime)  # Час останньої синхронізації з HubSpot
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp(), index=True)
+    last_sync_at = db.Column(db.DateTime, index=True)  # Час останньої синхронізації з HubSpot (черга планувальника)
+    poll_interval = db.Column(db.Integer)  # Поточний інтервал опитування HubSpot, секунди (PollPolicy)
+    next_poll_at = db.Column(db.DateTime, index=True)  # Коли лід наступний раз опитувати (київський час)
+    activity_at = db.Column(db.DateTime, index=True)  # Остання активність: статус, стадія, агент, контакти, коментар (київський час)
+    hubspot_fingerprints = db.Column(db.JSON)  # Відбитки застосованих властивостей HubSpot за джерелом (hubspot_fingerprint)
+
+
+@event.listens_for(Lead, 'before_insert')
+@event.listens_for(Lead, 'before_update')
+def sync_lead_phone_digits(mapper, connection, target):
+    """Оновлює нормалізовані цифри телефонів перед збереженням ліда
+
+    Масові Lead.query.update() / update(Lead) обходять подію - при зміні phone чи
+    second_phone таким запитом *_digits треба задавати в тому ж запиті.
+    """
+    target.phone_digits = phone_digits(target.phone) or None
+    target.second_phone_digits = phone_digits(target.second_phone) or None
+
+
+# ===== IN-MEMORY ІНДЕКС ТЕЛЕФОНІВ =====
+# Опціональний n-gram індекс для /api/check-phone (кожен worker тримає власну копію)
+PHONE_INDEX_ENABLED = os.getenv('PHONE_INDEX_ENABLED', 'false').lower() == 'true'
+phone_index = PhoneNgramIndex(
+    refresh_interval=int(os.getenv('PHONE_INDEX_REFRESH_SECONDS', '60')),
+    rebuild_interval=int(os.getenv('PHONE_INDEX_REBUILD_SECONDS', '900'))
+)
+
+
+def load_phone_index_rows(since=None):
+    """Потоково читає цифри телефонів лідів для індексу (since - тільки змінені після цього часу)"""
+    from datetime import timedelta
+    with app.app_context():
+        query = db.session.query(Lead.id, Lead.phone_digits, Lead.second_phone_digits, Lead.updated_at)
+        if since is not None:
+            # Перекриття на випадок транзакцій, що закомітились із затримкою
+            query = query.filter(Lead.updated_at >= since - timedelta(minutes=5))
+        for row in query.yield_per(5000):
+            yield tuple(row)
+
+
+def warm_phone_index():
+    """Запускає фонову побудову індексу телефонів в поточному процесі (worker)"""
+    if PHONE_INDEX_ENABLED and not phone_index.started:
+        app.logger.info("📇 Побудова in-memory індексу телефонів...")
+        phone_index.start(load_phone_index_rows)
+
+
+@event.listens_for(db.session, 'after_flush')
+def collect_lead_phone_changes(session, flush_context):
+    """Запам'ятовує змінені телефони лідів до коміту транзакції"""
+    if not PHONE_INDEX_ENABLED:
+        return
+    changes = session.info.setdefault('phone_index_changes', {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Lead) and obj.id is not None:
+            changes[obj.id] = join_phone_digits(obj.phone_digits, obj.second_phone_digits)
+    for obj in session.deleted:
+        if isinstance(obj, Lead) and obj.id is not None:
+            changes[obj.id] = None
+
+
+@event.listens_for(db.session, 'after_commit')
+def apply_lead_phone_changes(session):
+    """Оновлює індекс телефонів після успішного коміту"""
+    changes = session.info.pop('phone_index_changes', None)
+    if changes and phone_index.ready:
+        phone_index.apply(changes)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_lead_phone_changes(session):
+    session.info.pop('phone_index_changes', None)
 
 
 class Comment(db.Model):
@@ -549,6 +766,185 @@ class Comment(db.Model):
         }
 
 
+# ===== АДАПТИВНЕ ОПИТУВАННЯ ЛІДІВ =====
+# Активні ліди опитуються кожні LEAD_POLL_MIN_SECONDS, неактивні - все рідше (до LEAD_POLL_MAX_SECONDS)
+lead_poll_policy = PollPolicy.from_env()
+
+# Зміна цих полів (локально або з HubSpot) вважається активністю по ліду
+LEAD_ACTIVITY_FIELDS = ('status', 'hubspot_stage_label', 'agent_id', 'deal_name', 'phone', 'second_phone', 'email', 'budget')
+
+
+def lead_poll_now():
+    """Поточний час у форматі next_poll_at / last_sync_at / activity_at (київський, без tzinfo)
+
+    Єдиний годинник для цих колонок: значення з tzinfo на naive DateTime колонках
+    зберігаються по-різному залежно від БД, а в Python їх не можна порівнювати з naive.
+    """
+    return get_ukraine_time().replace(tzinfo=None)
+
+
+def schedule_next_lead_poll(lead, active=False):
+    """Переносить наступне опитування ліда: скидає інтервал при активності, інакше збільшує"""
+    from datetime import timedelta
+    lead.poll_interval = lead_poll_policy.next_interval(lead.poll_interval, active=active)
+    lead.next_poll_at = lead_poll_now() + timedelta(seconds=lead.poll_interval)
+
+
+def lead_due_for_poll():
+    """Фільтр лідів, яких час опитувати"""
+    return db.or_(Lead.next_poll_at.is_(None), Lead.next_poll_at <= lead_poll_now())
+
+
+def mark_lead_synced(lead):
+    """Відмічає синхронізацію ліда (last_sync_at) і переносить його наступне опитування"""
+    lead.last_sync_at = lead_poll_now()
+    schedule_next_lead_poll(lead)
+
+
+@event.listens_for(Lead, 'before_update')
+def reset_lead_poll_on_activity(mapper, connection, target):
+    """Скидає інтервал опитування і відмічає activity_at, якщо змінились статус, стадія, агент або контакти ліда
+
+    Службові записи синхронізації (last_sync_at, next_poll_at, відбитки) активністю не є.
+    """
+    state = db.inspect(target)
+    for field in LEAD_ACTIVITY_FIELDS:
+        history = state.attrs[field].history
+        if history.added and list(history.added) != list(history.deleted):
+            schedule_next_lead_poll(target, active=True)
+            target.activity_at = lead_poll_now()
+            return
+
+
+@event.listens_for(Comment, 'after_insert')
+def reset_lead_poll_on_comment(mapper, connection, target):
+    """Новий коментар (локальний або нотатка з HubSpot) - лід активний"""
+    from datetime import timedelta
+    connection.execute(
+        Lead.__table__.update().where(Lead.__table__.c.id == target.lead_id).values(
+            poll_interval=lead_poll_policy.min_interval,
+            next_poll_at=lead_poll_now() + timedelta(seconds=lead_poll_policy.min_interval),
+            activity_at=lead_poll_now()
+        )
+    )
+
+
+class DuplicateCluster(db.Model):
+    """Група лідів-дублікатів, знайдена пакетним пошуком (lead_dedupe.py)"""
+    __tablename__ = 'duplicate_cluster'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fingerprint = db.Column(db.String(40), index=True)  # Хеш складу кластера (id учасників)
+    match_keys = db.Column(db.String(50))  # За чим знайдено збіг: phone, email
+    size = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='open', index=True)  # open, resolved, ignored
+    reviewed_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    reviewed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    
+    # Зв'язки
+    members = db.relationship('DuplicateClusterMember', backref='cluster', cascade='all, delete-orphan')
+    reviewer = db.relationship('User', foreign_keys=[reviewed_by])
+
+
+class DuplicateClusterMember(db.Model):
+    """Лід, що входить до кластера дублікатів"""
+    __tablename__ = 'duplicate_cluster_member'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cluster_id = db.Column(db.Integer, db.ForeignKey('duplicate_cluster.id'), nullable=False, index=True)
+    lead_id = db.Column(db.Integer, db.ForeignKey('lead.id'), nullable=False, index=True)
+    
+    # Зв'язок з лідом
+    lead = db.relationship('Lead')
+
+
+class HubSpotContact(db.Model):
+    """Локальна копія контактів HubSpot (оновлюється інкрементально за lastmodifieddate)"""
+    __tablename__ = 'hubspot_contact'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    hubspot_id = db.Column(db.String(50), unique=True, nullable=False, index=True)
+    first_name = db.Column(db.String(100))
+    last_name = db.Column(db.String(100))
+    email = db.Column(db.String(255), index=True)
+    phones = db.Column(db.String(255))  # Всі номери контакту через кому
+    phone_digits = db.Column(db.String(255), index=True)  # Цифри всіх номерів через пробіл (для пошуку)
+    hubspot_updated_at = db.Column(db.DateTime, index=True)  # lastmodifieddate з HubSpot (UTC)
+    synced_at = db.Column(db.DateTime)  # Коли запис востаннє отримано з HubSpot (UTC)
+    
+    @property
+    def name(self):
+        return f"{self.first_name or ''} {self.last_name or ''}".strip() or 'Без імені'
+
+
+class BackgroundJob(db.Model):
+    """Фонова задача (експорт, синхронізація) з курсором для відновлення після перезапуску"""
+    __tablename__ = 'background_job'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, index=True)  # hubspot_contacts_export, ...
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, running, completed, failed
+    cursor = db.Column(db.String(255))  # Курсор HubSpot (after), з якого продовжувати
+    file_path = db.Column(db.String(500))  # Файл результату (instance/exports)
+    file_offset = db.Column(db.BigInteger, default=0)  # Скільки байт файлу вже підтверджено
+    pages_processed = db.Column(db.Integer, default=0)
+    rows_processed = db.Column(db.Integer, default=0)
+    total_rows = db.Column(db.Integer)  # Очікувана кількість записів (для ETA), якщо відома
+    created_count = db.Column(db.Integer, default=0)
+    updated_count = db.Column(db.Integer, default=0)
+    errors_count = db.Column(db.Integer, default=0)
+    stage = db.Column(db.String(255))  # Поточний етап (pipeline/stage, сторінка тощо)
+    result = db.Column(db.Text)  # Результат задачі (JSON)
+    error = db.Column(db.Text)
+    started_ts = db.Column(db.Float)  # time.time() старту
+    heartbeat = db.Column(db.Float)  # time.time() останнього прогресу (для виявлення "завислих" задач)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    finished_at = db.Column(db.DateTime)
+    
+    # Зв'язки
+    creator = db.relationship('User', foreign_keys=[created_by])
+    
+    def is_stale(self, timeout=300):
+        """Задача в статусі running, але без прогресу довше timeout секунд (процес перезапущено)"""
+        return self.status == 'running' and (self.heartbeat is None or time.time() - self.heartbeat > timeout)
+    
+    def to_dict(self, progress=None):
+        """Конвертує задачу в словник для JSON (progress - свіжіші значення з пам'яті процесу)"""
+        data = {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'stage': self.stage,
+            'pages_processed': self.pages_processed or 0,
+            'rows_processed': self.rows_processed or 0,
+            'total_rows': self.total_rows,
+            'created': self.created_count or 0,
+            'updated': self.updated_count or 0,
+            'errors': self.errors_count or 0,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if progress and self.status == 'running':
+            data.update(progress)
+        
+        # ETA - за середньою швидкістю обробки записів
+        data['elapsed_seconds'] = None
+        data['eta_seconds'] = None
+        if self.started_ts:
+            end_ts = self.heartbeat if self.status != 'running' and self.heartbeat else time.time()
+            elapsed = max(end_ts - self.started_ts, 0)
+            data['elapsed_seconds'] = int(elapsed)
+            rows, total = data['rows_processed'], data['total_rows']
+            if self.status == 'running' and rows and total and total > rows:
+                data['eta_seconds'] = int(elapsed * (total - rows) / rows)
+        return data
+
+
 # Форми
 class LoginForm(Form):
     username = StringField('Ім\'я користувача', [validators.Length(min=4, max=25)])
@@ -1087,7 +1483,7 @@ def fetch_notes_from_hubspot(lead, after_timestamp=None):
                 "Content-Type": "application/json"
             }
             
-            response = requests.get(url, headers=headers)
+            response = hubspot_http.get(url, headers=headers)
             response.raise_for_status()
             
             data = response.json()
@@ -1257,8 +1653,101 @@ def fetch_notes_from_hubspot(lead, after_timestamp=None):
         app.logger.error(f"Помилка отримання нотаток з HubSpot для ліда {lead.id}: {e}")
         return []
 
-def sync_notes_from_hubspot(lead, only_new=True):
-    """Синхронізує нотатки з HubSpot в коментарі"""
+def apply_hubspot_note(lead, note_data, resolve_owner_email):
+    """Створює коментар ліда з нотатки HubSpot, якщо його ще немає
+
+    resolve_owner_email(owner_id) - email власника нотатки (запит до HubSpot або значення з архіву).
+    Повертає True, якщо коментар створено.
+    """
+    # Перевіряємо, чи існує вже такий коментар (за hubspot_note_id)
+    existing_comment = Comment.query.filter_by(
+        hubspot_note_id=note_data['id'],
+        lead_id=lead.id
+    ).first()
+    
+    if existing_comment:
+        app.logger.info(f"   ⏭️ Нотатка {note_data['id']} вже синхронізована (коментар {existing_comment.id})")
+        return False
+    
+    if not existing_comment:
+        # Перевіряємо, чи нотатка не створена нашою системою
+        # Наші нотатки мають формат "[username]: content" або "Відповідь на коментар..."
+        note_body = note_data['body'].strip()
+        
+        # Пропускаємо нотатки, які явно створені нашою системою
+        # (мають формат "[username]: ..." або "Відповідь на коментар...")
+        is_our_note = (
+            note_body.startswith('[') and ']:' in note_body[:50] or
+            'Відповідь на коментар' in note_body or
+            'Відповідь на нотатку HubSpot' in note_body
+        )
+        
+        if is_our_note:
+            app.logger.info(f"   ⏭️ Пропускаємо нотатку {note_data['id']} - створена нашою системою")
+        elif not is_our_note:
+            # Створюємо коментар з нотатки HubSpot
+            # Шукаємо користувача на основі HubSpot owner_id
+            comment_user = None
+            hubspot_owner_id = note_data.get('owner_id')
+            
+            if hubspot_owner_id:
+                owner_email = resolve_owner_email(hubspot_owner_id)
+                
+                if owner_email:
+                    # Шукаємо користувача в нашій системі по email
+                    comment_user = User.query.filter_by(email=owner_email.lower()).first()
+                    
+                    if comment_user:
+                        app.logger.info(f"   ✅ Знайдено користувача {comment_user.username} для нотатки (email: {owner_email})")
+                    else:
+                        app.logger.info(f"   ⚠️ Користувач з email {owner_email} не знайдено в системі, використовуємо admin")
+            
+            # Якщо не знайшли користувача, використовуємо admin
+            if not comment_user:
+                comment_user = User.query.filter_by(role='admin').first()
+                if not comment_user:
+                    comment_user = User.query.first()
+            
+            if comment_user:
+                # Парсимо дату створення
+                created_at = None
+                if note_data.get('createdate'):
+                    try:
+                        timestamp_ms = int(note_data['createdate'])
+                        created_at = parse_hubspot_timestamp(timestamp_ms)
+                    except (ValueError, TypeError):
+                        pass
+                
+                if not created_at and note_data.get('timestamp'):
+                    try:
+                        # hs_timestamp може бути в форматі ISO8601
+                        from datetime import datetime
+                        created_at = datetime.fromisoformat(note_data['timestamp'].replace('Z', '+00:00'))
+                    except (ValueError, TypeError):
+                        pass
+                
+                new_comment = Comment(
+                    lead_id=lead.id,
+                    user_id=comment_user.id,
+                    parent_id=None,  # Нотатки з HubSpot - це завжди кореневі коментарі
+                    content=note_body,
+                    hubspot_note_id=note_data['id']
+                )
+                
+                if created_at:
+                    new_comment.created_at = created_at
+                
+                db.session.add(new_comment)
+                app.logger.info(f"✅ Синхронізовано нотатку HubSpot {note_data['id']} в коментар для ліда {lead.id}")
+                return True
+    
+    return False
+
+def sync_notes_from_hubspot(lead, only_new=True, archive_run=None):
+    """Синхронізує нотатки з HubSpot в коментарі
+
+    archive_run - запуск sync_archive (джерело 'notes'), куди пишуться отримані нотатки
+    """
     if not hubspot_client or not lead.hubspot_deal_id:
         app.logger.warning(f"⚠️ Немає HubSpot клієнта або deal_id для синхронізації нотаток ліда {lead.id}")
         return False
@@ -1291,92 +1780,23 @@ def sync_notes_from_hubspot(lead, only_new=True):
         synced_count = 0
         for note_data in hubspot_notes:
             app.logger.info(f"   Обробка нотатки HubSpot {note_data.get('id')}: {note_data.get('body', '')[:50]}...")
+            record = {'lead_id': lead.id, 'deal_id': lead.hubspot_deal_id, 'note': note_data, 'owner_email': None}
             
-            # Перевіряємо, чи існує вже такий коментар (за hubspot_note_id)
-            existing_comment = Comment.query.filter_by(
-                hubspot_note_id=note_data['id'],
-                lead_id=lead.id
-            ).first()
-            
-            if existing_comment:
-                app.logger.info(f"   ⏭️ Нотатка {note_data['id']} вже синхронізована (коментар {existing_comment.id})")
-                continue
+            def resolve_owner_email(owner_id):
+                try:
+                    # Отримуємо інформацію про owner з HubSpot
+                    owner = hubspot_client.crm.owners.owners_api.get_by_id(owner_id=owner_id)
+                    if owner and owner.email:
+                        record['owner_email'] = owner.email
+                        return owner.email
+                except Exception as owner_error:
+                    app.logger.warning(f"   ⚠️ Помилка отримання owner з HubSpot: {owner_error}")
+                return None
             
-            if not existing_comment:
-                # Перевіряємо, чи нотатка не створена нашою системою
-                # Наші нотатки мають формат "[username]: content" або "Відповідь на коментар..."
-                note_body = note_data['body'].strip()
-                
-                # Пропускаємо нотатки, які явно створені нашою системою
-                # (мають формат "[username]: ..." або "Відповідь на коментар...")
-                is_our_note = (
-                    note_body.startswith('[') and ']:' in note_body[:50] or
-                    'Відповідь на коментар' in note_body or
-                    'Відповідь на нотатку HubSpot' in note_body
-                )
-                
-                if is_our_note:
-                    app.logger.info(f"   ⏭️ Пропускаємо нотатку {note_data['id']} - створена нашою системою")
-                elif not is_our_note:
-                    # Створюємо коментар з нотатки HubSpot
-                    # Шукаємо користувача на основі HubSpot owner_id
-                    comment_user = None
-                    hubspot_owner_id = note_data.get('owner_id')
-                    
-                    if hubspot_owner_id:
-                        try:
-                            # Отримуємо інформацію про owner з HubSpot
-                            owner = hubspot_client.crm.owners.owners_api.get_by_id(owner_id=hubspot_owner_id)
-                            
-                            if owner and owner.email:
-                                # Шукаємо користувача в нашій системі по email
-                                comment_user = User.query.filter_by(email=owner.email.lower()).first()
-                                
-                                if comment_user:
-                                    app.logger.info(f"   ✅ Знайдено користувача {comment_user.username} для нотатки (email: {owner.email})")
-                                else:
-                                    app.logger.info(f"   ⚠️ Користувач з email {owner.email} не знайдено в системі, використовуємо admin")
-                        except Exception as owner_error:
-                            app.logger.warning(f"   ⚠️ Помилка отримання owner з HubSpot: {owner_error}")
-                    
-                    # Якщо не знайшли користувача, використовуємо admin
-                    if not comment_user:
-                        comment_user = User.query.filter_by(role='admin').first()
-                        if not comment_user:
-                            comment_user = User.query.first()
-                    
-                    if comment_user:
-                        # Парсимо дату створення
-                        created_at = None
-                        if note_data.get('createdate'):
-                            try:
-                                timestamp_ms = int(note_data['createdate'])
-                                created_at = parse_hubspot_timestamp(timestamp_ms)
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        if not created_at and note_data.get('timestamp'):
-                            try:
-                                # hs_timestamp може бути в форматі ISO8601
-                                from datetime import datetime
-                                created_at = datetime.fromisoformat(note_data['timestamp'].replace('Z', '+00:00'))
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        new_comment = Comment(
-                            lead_id=lead.id,
-                            user_id=comment_user.id,
-                            parent_id=None,  # Нотатки з HubSpot - це завжди кореневі коментарі
-                            content=note_body,
-                            hubspot_note_id=note_data['id']
-                        )
-                        
-                        if created_at:
-                            new_comment.created_at = created_at
-                        
-                        db.session.add(new_comment)
-                        synced_count += 1
-                        app.logger.info(f"✅ Синхронізовано нотатку HubSpot {note_data['id']} в коментар для ліда {lead.id}")
+            if apply_hubspot_note(lead, note_data, resolve_owner_email):
+                synced_count += 1
+            if archive_run:
+                archive_run.append(record)
         
         if synced_count > 0:
             db.session.commit()
@@ -1440,6 +1860,138 @@ def sync_activities_from_hubspot(lead):
         db.session.rollback()
         return False
 
+# Створення угоди в HubSpot при додаванні ліда (вимкнено за замовчуванням)
+HUBSPOT_CREATE_DEALS = os.getenv('HUBSPOT_CREATE_DEALS', 'false').lower() == 'true'
+# Pipeline "default", стадія для нових лідів
+NEW_DEAL_PIPELINE = 'default'
+NEW_DEAL_STAGE = 'appointmentscheduled'
+# Pipeline "Лиды" і його стадії за локальним статусом ліда (зворотній маппінг STAGE_STATUS)
+LEAD_DEAL_PIPELINE = '2341107958'
+STATUS_STAGES = {
+    'new': '3204738258',        # Новая заявка
+    'contacted': '3204738259',  # Отправлены варианты/Передан на партнеров
+    'qualified': '3204738261',  # Назначена встреча/тур
+    'closed': '3204738267',     # Сделка закрыта
+}
+# HubSpot-defined тип асоціації deal -> contact
+DEAL_TO_CONTACT_ASSOCIATION_TYPE = 3
+# HubSpot-defined тип асоціації note -> deal
+NOTE_TO_DEAL_ASSOCIATION_TYPE = 214
+
+def find_hubspot_owner_id(email):
+    """ID HubSpot owner за email або None (відповідь owners кешується на годину)"""
+    if not email:
+        return None
+    owners = hubspot_client.crm.owners.owners_api.get_page(email=email, limit=1)
+    for owner in owners.results or []:
+        if owner.email and owner.email.lower() == email.lower():
+            return str(owner.id)
+    return None
+
+def hubspot_json_headers():
+    return {
+        "Authorization": f"Bearer {HUBSPOT_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+def upsert_hubspot_contact_for_lead(lead):
+    """ID контакту HubSpot для email ліда (існуючий або щойно створений); None - лід без email
+
+    batch upsert за email (один запит замість пошуку і створення) несе тільки email, тому
+    існуючий контакт клієнта не змінюється, а ім'я і телефон пишуться окремим запитом
+    тільки в щойно створений контакт. При помилці HTTP upsert кидає requests.HTTPError.
+    """
+    email = (lead.email or '').strip()
+    if not email:
+        return None
+    headers = hubspot_json_headers()
+    contact_response = hubspot_http.post(
+        "https://api.hubapi.com/crm/v3/objects/contacts/batch/upsert",
+        headers=headers,
+        json={'inputs': [{
+            'idProperty': 'email',
+            'id': email,
+            'properties': {'email': email}
+        }]}
+    )
+    contact_response.raise_for_status()
+    results = contact_response.json().get('results') or []
+    if not results:
+        return None
+    hubspot_contact_id = str(results[0]['id'])
+    if results[0].get('new'):
+        contact_update = hubspot_http.patch(
+            f"https://api.hubapi.com/crm/v3/objects/contacts/{hubspot_contact_id}",
+            headers=headers,
+            json={'properties': {'firstname': lead.deal_name, 'phone': lead.phone}}
+        )
+        if not contact_update.ok:
+            # Контакт і угода все одно пов'язуються - ім'я і телефон є в угоді
+            app.logger.warning(f"⚠️ Ім'я і телефон не записано в новий контакт {hubspot_contact_id}: {contact_update.status_code}")
+    return hubspot_contact_id
+
+def create_hubspot_deal_for_lead(lead, agent, hubspot_contact_id=None, pipeline=NEW_DEAL_PIPELINE, stage=NEW_DEAL_STAGE,
+                                 keep_status=False):
+    """Створює контакт і угоду в HubSpot для нового ліда за мінімум запитів
+
+    1. upsert контакту за email (upsert_hubspot_contact_for_lead)
+    2. створення угоди з owner і асоціацією з контактом в одному payload
+
+    Стадія береться з відповіді створення, без повторного читання угоди. Owner - з
+    кешованої відповіді owners. Ліди без email - тільки угода (один запит).
+    Якщо hubspot_contact_id передано (лід вже має контакт), upsert пропускається.
+    keep_status - не змінювати статус і назву стадії ліда (угода для існуючого ліда).
+    Повертає (hubspot_contact_id, hubspot_deal_id); при помилці HTTP кидає requests.HTTPError.
+    """
+    headers = hubspot_json_headers()
+    email = (lead.email or '').strip()
+    
+    if email and not hubspot_contact_id:
+        hubspot_contact_id = upsert_hubspot_contact_for_lead(lead)
+    
+    deal_properties = {
+        "dealname": lead.deal_name,
+        "amount": get_budget_value(lead.budget),
+        "dealtype": "newbusiness",
+        "pipeline": pipeline,
+        "dealstage": stage,
+        "phone_number": lead.phone,  # Номер телефону зберігається в угоді
+        "from_agent_portal__name_": agent.username,  # Ім'я агента (обробника), який відповідає за лід
+    }
+    if email:
+        deal_properties["email"] = email
+    try:
+        hubspot_owner_id = find_hubspot_owner_id(agent.email)
+    except Exception as owner_error:
+        hubspot_owner_id = None
+        app.logger.warning(f"⚠️ Помилка пошуку HubSpot owner для {agent.email}: {owner_error}")
+    if hubspot_owner_id:
+        deal_properties["hubspot_owner_id"] = hubspot_owner_id
+    
+    deal_payload = {'properties': deal_properties}
+    if hubspot_contact_id:
+        deal_payload['associations'] = [{
+            'to': {'id': hubspot_contact_id},
+            'types': [{'associationCategory': 'HUBSPOT_DEFINED', 'associationTypeId': DEAL_TO_CONTACT_ASSOCIATION_TYPE}]
+        }]
+    deal_response = hubspot_http.post(
+        "https://api.hubapi.com/crm/v3/objects/deals", headers=headers, json=deal_payload
+    )
+    deal_response.raise_for_status()
+    created_deal = deal_response.json()
+    hubspot_deal_id = str(created_deal['id'])
+    
+    lead.hubspot_contact_id = hubspot_contact_id
+    lead.hubspot_deal_id = hubspot_deal_id
+    if not keep_status:
+        status, stage_label = deal_status((created_deal.get('properties') or {}).get('dealstage') or stage)
+        lead.status = status
+        if stage_label:
+            lead.hubspot_stage_label = stage_label
+    
+    app.logger.info(f"✅ HubSpot угоду {hubspot_deal_id} створено для ліда {lead.id} (контакт {hubspot_contact_id}, owner {hubspot_owner_id or 'не встановлено'})")
+    return hubspot_contact_id, hubspot_deal_id
+
 def update_hubspot_owner(lead, new_agent_id):
     """Оновлює hubspot_owner_id та responisble_agent в HubSpot угоді при зміні агента"""
     if not hubspot_client or not lead.hubspot_deal_id:
@@ -1489,6 +2041,8 @@ def update_hubspot_owner(lead, new_agent_id):
         app.logger.info(f"✅ Оновлено HubSpot поля для ліда {lead.id}: responisble_agent={new_agent.username}, hubspot_owner_id={hubspot_owner_id or 'не встановлено'}")
         return True
         
+    except HubSpotQuotaExceeded:
+        raise
     except Exception as e:
         print(f"❌ Помилка оновлення HubSpot owner: {e}")
         app.logger.error(f"❌ Помилка оновлення HubSpot owner для ліда {lead.id}: {e}")
@@ -1501,18 +2055,11 @@ def update_hubspot_dealstage(lead, new_status):
     
     try:
         # Зворотній маппінг: локальний статус → HubSpot dealstage ID
-        reverse_stage_mapping = {
-            'new': '3204738258',        # Новая заявка (оновлено)
-            'contacted': '3204738259',  # Контакт встановлено (оновлено)
-            'qualified': '3204738261',  # Кваліфіковано
-            'closed': '3204738267'      # Сделка закрыта
-        }
-        
-        if new_status not in reverse_stage_mapping:
+        if new_status not in STATUS_STAGES:
             print(f"⚠️ Немає маппінгу для статусу '{new_status}', dealstage не оновлено")
             return False
         
-        hubspot_dealstage = reverse_stage_mapping[new_status]
+        hubspot_dealstage = STATUS_STAGES[new_status]
         
         # Оновлюємо dealstage в HubSpot
         hubspot_client.crm.deals.basic_api.update(
@@ -1528,6 +2075,9 @@ def update_hubspot_dealstage(lead, new_status):
         app.logger.info(f"✅ Оновлено HubSpot dealstage для ліда {lead.id}: {new_status} → {hubspot_dealstage}")
         return True
         
+    except HubSpotQuotaExceeded:
+        # Обробник запиту показує користувачу окреме повідомлення
+        raise
     except Exception as e:
         print(f"❌ Помилка оновлення HubSpot dealstage для ліда {lead.id}: {e}")
         app.logger.error(f"Помилка оновлення HubSpot dealstage: {e}")
@@ -1553,8 +2103,30 @@ def sync_lead_from_hubspot(lead):
         )
         print(f"Отримано контакт з HubSpot: {contact.properties}")
         
+        # Отримуємо угоду з HubSpot
+        deal = None
+        if lead.hubspot_deal_id:
+            print(f"Отримуємо угоду з HubSpot: {lead.hubspot_deal_id}")
+            deal = hubspot_client.crm.deals.basic_api.get_by_id(
+                deal_id=lead.hubspot_deal_id,
+                properties=[
+                    "dealname", "dealstage", "amount", "closedate", "budget", "language", 
+                    "source_channel", "deal_closed", "decline_reason", "purchase_reason__cloned_",
+                    "property_type__cloned_", "property_status__cloned_", "purchase_reason",
+                    "hubspot_owner_id", "purchase_country", "telegram", "messenger", "birthdate",
+                    "responisble_agent", "from_agent_portal__name_"
+                ]
+            )
+            print(f"Отримано угоду з HubSpot: {deal.properties}")
+        
+        # Якщо властивості контакту і угоди не змінились з минулої синхронізації - поля ліда не перезаписуємо
+        fingerprint = property_fingerprint(contact.properties, deal.properties if deal else None)
+        properties_changed = not fingerprint_matches(lead.hubspot_fingerprints, 'sync', fingerprint)
+        if not properties_changed:
+            print(f"ℹ️ Властивості HubSpot ліда {lead.id} не змінились - поля не оновлюються")
+        
         # Оновлюємо дані ліда
-        if contact.properties:
+        if properties_changed and contact.properties:
             # Оновлюємо основні дані
             if contact.properties.get('firstname') and contact.properties.get('lastname'):
                 lead.deal_name = f"{contact.properties['firstname']} {contact.properties['lastname']}"
@@ -1649,52 +2221,16 @@ def sync_lead_from_hubspot(lead):
                 if not lead.notes or contact.properties['notes_last_contacted'] not in lead.notes:
                     lead.notes = (lead.notes or '') + '\n' + contact.properties['notes_last_contacted']
         
-        # Отримуємо угоду з HubSpot
-        if lead.hubspot_deal_id:
-            print(f"Отримуємо угоду з HubSpot: {lead.hubspot_deal_id}")
-            deal = hubspot_client.crm.deals.basic_api.get_by_id(
-                deal_id=lead.hubspot_deal_id,
-                properties=[
-                    "dealname", "dealstage", "amount", "closedate", "budget", "language", 
-                    "source_channel", "deal_closed", "decline_reason", "purchase_reason__cloned_",
-                    "property_type__cloned_", "property_status__cloned_", "purchase_reason",
-                    "hubspot_owner_id", "purchase_country", "telegram", "messenger", "birthdate",
-                    "responisble_agent", "from_agent_portal__name_"
-                ]
-            )
-            print(f"Отримано угоду з HubSpot: {deal.properties}")
-            
+        # Оновлюємо дані ліда з угоди
+        if properties_changed and deal is not None:
             if deal.properties:
                 # Оновлюємо статус угоди з HubSpot dealstage
                 if deal.properties.get('dealstage'):
                     # Мапимо всі стадії HubSpot (dealstage ID) на наші статуси
-                    stage_mapping = {
-                        # Нові заявки (валідний ID)
-                        '3204738258': 'new',        # Новая заявка
-                        
-                        # Контакт встановлено (валідний ID)
-                        '3204738259': 'contacted',  # Контакт встановлено
-                        
-                        # Кваліфіковані ліди (валідні ID)
-                        '3204738261': 'qualified',  # Кваліфіковано
-                        '3204738262': 'qualified',  # Встреча проведена
-                        '3204738265': 'qualified',  # Переговоры
-                        '3204738266': 'qualified',  # Задаток
-                        
-                        # Закриті угоди (валідний ID)
-                        '3204738267': 'closed'      # Сделка закрыта
-                    }
+                    stage_mapping = STAGE_STATUS
                     
                     # Маппінг ID стадій на їх назви з HubSpot (правильні назви з API)
-                    stage_labels = {
-                        '3204738258': 'Новая заявка',
-                        '3204738259': 'Отправлены варианты/Передан на партнеров',
-                        '3204738261': 'Назначена встреча/тур',
-                        '3204738262': 'Встреча/тур проведены',
-                        '3204738265': 'Переговоры',
-                        '3204738266': 'Задаток',
-                        '3204738267': 'Сделка закрыта'
-                    }
+                    stage_labels = STAGE_LABELS
                     
                     # Маппінг назв стадій (якщо HubSpot повертає назви замість ID)
                     stage_name_to_id = {
@@ -1949,8 +2485,15 @@ def sync_lead_from_hubspot(lead):
         # Синхронізуємо нотатки з HubSpot в коментарі
         sync_notes_from_hubspot(lead)
         
-        # Оновлюємо час останньої синхронізації
-        lead.last_sync_at = get_ukraine_time()
+        # Оновлюємо час останньої синхронізації; інтервал опитування збільшується,
+        # якщо з HubSpot прийшли зміни, його скине reset_lead_poll_on_activity
+        mark_lead_synced(lead)
+        
+        if properties_changed:
+            lead.hubspot_fingerprints = with_fingerprint(lead.hubspot_fingerprints, 'sync', fingerprint)
+        else:
+            # Службові last_sync_at/next_poll_at не зсувають updated_at: колонка в SET, тому onupdate не спрацьовує
+            flag_modified(lead, 'updated_at')
         
         db.session.commit()
         print(f"Лід {lead.id} синхронізовано з HubSpot")
@@ -1960,42 +2503,101 @@ def sync_lead_from_hubspot(lead):
         print(f"Помилка синхронізації ліда {lead.id}: {e}")
         return False
 
-def sync_all_leads_from_hubspot():
-    """Синхронізує всі ліді з HubSpot"""
+def sync_all_leads_from_hubspot(progress=None):
+    """Синхронізує всі ліді з HubSpot (progress - callback прогресу фонової задачі)
+
+    Повертає {'total', 'synced'}; нуль синхронізованих лідів - не помилка.
+    """
     if not hubspot_client:
-        return False
+        raise RuntimeError('HubSpot API не налаштований')
     
     leads = Lead.query.filter(Lead.hubspot_contact_id.isnot(None)).all()
     synced_count = 0
+    if progress:
+        progress(expected=len(leads), stage='Синхронізація лідів')
     
     for lead in leads:
         if sync_lead_from_hubspot(lead):
             synced_count += 1
+        if progress:
+            progress(rows=1, updated=synced_count)
     
     print(f"Синхронізовано {synced_count} з {len(leads)} лідів")
-    return synced_count > 0
+    return {'total': len(leads), 'synced': synced_count}
+
+def select_leads_for_sync(budget):
+    """ID лідів для циклу синхронізації в межах бюджету (див. sync_scheduler)
+    
+    Активні - мали активність (activity_at) за останні hot_window_hours і не синхронізувались
+    hot_resync_minutes, застарілі - спочатку без last_sync_at, далі за зростанням last_sync_at (індекс).
+    """
+    from datetime import timedelta
+    
+    budget_leads = budget.leads
+    if budget_leads <= 0:
+        return []
+    
+    # Тільки ліди, яких час опитувати (адаптивний інтервал, див. schedule_next_lead_poll)
+    synced = Lead.query.with_entities(Lead.id).filter(Lead.hubspot_contact_id.isnot(None), lead_due_for_poll())
+    
+    # Не updated_at: його зсуває кожна синхронізація, і всі щойно синхронізовані ліди знову
+    # ставали б активними. activity_at і last_sync_at - обидва київським часом
+    now = lead_poll_now()
+    hot_ids = [row.id for row in synced.filter(
+        Lead.activity_at >= now - timedelta(hours=budget.hot_window_hours),
+        db.or_(
+            Lead.last_sync_at.is_(None),
+            Lead.last_sync_at < now - timedelta(minutes=budget.hot_resync_minutes)
+        )
+    ).order_by(Lead.activity_at.desc()).limit(budget.hot_leads).all()]
+    
+    stale_ids = [row.id for row in synced.filter(Lead.last_sync_at.is_(None)).order_by(Lead.id).limit(budget_leads).all()]
+    if len(stale_ids) < budget_leads:
+        stale_ids += [row.id for row in synced.filter(Lead.last_sync_at.isnot(None)).order_by(
+            Lead.last_sync_at.asc()
+        ).limit(budget_leads - len(stale_ids)).all()]
+    
+    return plan_sync_batch(hot_ids, stale_ids, budget_leads, budget.hot_leads)
+
+def sync_scheduled_leads(budget=None, progress=None):
+    """Синхронізує з HubSpot ліди, вибрані планувальником (фіксований бюджет викликів API за цикл)"""
+    if not hubspot_client:
+        return False
+    
+    budget = budget or SyncBudget.from_env()
+    lead_ids = select_leads_for_sync(budget)
+    if progress:
+        progress(expected=len(lead_ids), stage='Синхронізація застарілих лідів')
+    
+    synced_count = 0
+    for lead_id in lead_ids:
+        lead = db.session.get(Lead, lead_id)
+        if lead and sync_lead_from_hubspot(lead):
+            synced_count += 1
+        if progress:
+            progress(rows=1, updated=synced_count)
+    
+    print(f"Синхронізовано {synced_count} з {len(lead_ids)} запланованих лідів (бюджет {budget.api_calls} викликів API)")
+    app.logger.info(f"🔄 Планувальник: синхронізовано {synced_count}/{len(lead_ids)} лідів")
+    return {'planned': len(lead_ids), 'synced': synced_count}
 
-def update_hubspot_stage_labels_for_leads(limit=100, force_update=False):
+def update_hubspot_stage_labels_for_leads(limit=100, force_update=False, progress=None):
     """Оновлює hubspot_stage_label для лідів, які мають hubspot_deal_id
     Обмежуємо кількість лідів для оновлення за один раз, щоб не перевантажувати API
     
     Args:
         limit: Максимальна кількість лідів для оновлення за один раз
         force_update: Якщо True, оновлює всі ліди з hubspot_deal_id, навіть якщо вони вже мають label
+        progress: Callback прогресу фонової задачі
+    
+    Повертає {'total', 'updated', 'errors'}; якщо стадії не отримано з HubSpot або
+    зміни не збережено - кидає виняток.
     """
     if not hubspot_client:
-        return False
+        raise RuntimeError('HubSpot API не налаштований')
     
     # Маппінг ID стадій на їх назви з HubSpot (правильні назви з API)
-    stage_labels = {
-        '3204738258': 'Новая заявка',
-        '3204738259': 'Отправлены варианты/Передан на партнеров',
-        '3204738261': 'Назначена встреча/тур',
-        '3204738262': 'Встреча/тур проведены',
-        '3204738265': 'Переговоры',
-        '3204738266': 'Задаток',
-        '3204738267': 'Сделка закрыта'
-    }
+    stage_labels = STAGE_LABELS
     
     # Отримуємо ліди з hubspot_deal_id
     if force_update:
@@ -2020,18 +2622,32 @@ def update_hubspot_stage_labels_for_leads(limit=100, force_update=False):
         ).limit(limit).all()
     
     if not leads:
-        return False
+        return {'total': 0, 'updated': 0, 'errors': 0}
+    
+    if progress:
+        progress(expected=len(leads), stage='Оновлення назв стадій')
+    
+    # Стадії всіх deals - пакетами по 100 паралельно замість запиту на кожен лід
+    try:
+        deal_ids = [lead.hubspot_deal_id for lead in leads]
+        deals = run_hubspot_async(lambda client: client.batch_read('deals', deal_ids, properties=['dealstage']))
+    except Exception as e:
+        app.logger.error(f"Помилка отримання стадій deals з HubSpot: {e}")
+        raise
     
     updated_count = 0
+    errors_count = 0
     for lead in leads:
+        if progress:
+            progress(rows=1, updated=updated_count, errors=errors_count)
         try:
-            deal = hubspot_client.crm.deals.basic_api.get_by_id(
-                deal_id=lead.hubspot_deal_id,
-                properties=["dealstage"]
-            )
+            deal = deals.get(str(lead.hubspot_deal_id))
+            if deal is None:
+                raise LookupError(f"deal {lead.hubspot_deal_id} не знайдено в HubSpot")
             
-            if deal.properties and deal.properties.get('dealstage'):
-                hubspot_stage = deal.properties['dealstage']
+            properties = deal.get('properties') or {}
+            if properties.get('dealstage'):
+                hubspot_stage = properties['dealstage']
                 if hubspot_stage in stage_labels:
                     new_label = stage_labels[hubspot_stage]
                     # Оновлюємо тільки якщо label змінився або його немає
@@ -2041,6 +2657,7 @@ def update_hubspot_stage_labels_for_leads(limit=100, force_update=False):
                         app.logger.debug(f"✅ Оновлено hubspot_stage_label для ліда {lead.id}: {new_label}")
         except Exception as e:
             app.logger.error(f"Помилка оновлення hubspot_stage_label для ліда {lead.id}: {e}")
+            errors_count += 1
             continue
     
     # Зберігаємо всі зміни одним commit
@@ -2051,634 +2668,872 @@ def update_hubspot_stage_labels_for_leads(limit=100, force_update=False):
         except Exception as e:
             db.session.rollback()
             app.logger.error(f"Помилка збереження hubspot_stage_label: {e}")
+            raise
     
-    return updated_count
+    return {'total': len(leads), 'updated': updated_count, 'errors': errors_count}
 
-def fetch_all_deals_from_hubspot():
-    """Завантажує всі deals з HubSpot та створює/оновлює ліди в локальній БД"""
+def build_deal_mapper():
+    """DealMapper з довідником користувачів (один запит до БД на запуск імпорту)"""
+    users = db.session.query(User.id, User.username, User.email, User.role).order_by(User.id).all()
+    return DealMapper(AgentDirectory(users))
+
+def apply_lead_record(lead_record):
+    """Записує LeadRecord в БД: оновлює лід з цим deal_id, дублікат за телефоном або створює новий
+
+    Повертає 'created', 'updated' або 'unchanged' (deal не змінився з останнього імпорту).
+    """
+    deal_id = lead_record.deal_id
+    fingerprint = lead_record.fingerprint()
+    
+    # Перевіряємо, чи існує лід з цим deal_id
+    existing_lead = Lead.query.filter_by(hubspot_deal_id=deal_id).first()
+    
+    if existing_lead:
+        # Ті самі значення, що й минулого разу - лід не чіпаємо (без UPDATE і зсуву updated_at)
+        if fingerprint_matches(existing_lead.hubspot_fingerprints, 'deal', fingerprint):
+            return 'unchanged'
+        
+        # Оновлюємо існуючий лід
+        existing_lead.deal_name = lead_record.deal_name
+        existing_lead.email = lead_record.email
+        existing_lead.phone = lead_record.phone
+        if lead_record.budget:
+            existing_lead.budget = lead_record.budget
+        existing_lead.status = lead_record.status
+        if lead_record.stage_label:
+            existing_lead.hubspot_stage_label = lead_record.stage_label
+        if lead_record.contact_id:
+            existing_lead.hubspot_contact_id = lead_record.contact_id
+        existing_lead.agent_id = lead_record.agent_id
+        existing_lead.hubspot_fingerprints = with_fingerprint(existing_lead.hubspot_fingerprints, 'deal', fingerprint)
+        
+        print(f"✅ Оновлено лід {existing_lead.id} з HubSpot deal {deal_id}")
+        return 'updated'
+    
+    # Перевіряємо, чи не існує лід з таким телефоном
+    duplicate_lead = Lead.query.filter(
+        Lead.phone == lead_record.phone
+    ).first()
+    
+    if duplicate_lead:
+        # Якщо знайдено дублікат, оновлюємо його
+        duplicate_lead.hubspot_deal_id = deal_id
+        if lead_record.contact_id:
+            duplicate_lead.hubspot_contact_id = lead_record.contact_id
+        duplicate_lead.agent_id = lead_record.agent_id
+        if lead_record.budget:
+            duplicate_lead.budget = lead_record.budget
+        duplicate_lead.status = lead_record.status
+        if lead_record.stage_label:
+            duplicate_lead.hubspot_stage_label = lead_record.stage_label
+        duplicate_lead.hubspot_fingerprints = with_fingerprint(duplicate_lead.hubspot_fingerprints, 'deal', fingerprint)
+        print(f"✅ Оновлено дублікат ліда {duplicate_lead.id} з HubSpot deal {deal_id}")
+        return 'updated'
+    
+    # Створюємо новий лід
+    new_lead = Lead(
+        agent_id=lead_record.agent_id,
+        deal_name=lead_record.deal_name,
+        email=lead_record.email,
+        phone=lead_record.phone,
+        budget=lead_record.budget or DEFAULT_BUDGET,
+        status=lead_record.status,
+        hubspot_contact_id=lead_record.contact_id,
+        hubspot_deal_id=deal_id,
+        hubspot_stage_label=lead_record.stage_label,
+        hubspot_fingerprints={'deal': fingerprint}
+    )
+    
+    db.session.add(new_lead)
+    print(f"✅ Створено новий лід з HubSpot deal {deal_id} (phone: {lead_record.phone})")
+    return 'created'
+
+def fetch_hubspot_deal_record(deal):
+    """Сирий запис deal для маппінгу та архіву: властивості deal, пов'язаний контакт і owner"""
+    # Використовуємо hs_object_id як deal_id
+    deal_id = str(deal.properties.get('hs_object_id') or deal.id)
+    deal_properties = deal.properties
+    record = {'id': deal_id, 'properties': dict(deal_properties), 'contact': None, 'owner': None}
+    
+    # Deal без телефону маппінг пропускає - контакт і owner не потрібні
+    if not deal_properties.get('phone_number'):
+        return record
+    
+    try:
+        # Отримуємо асоціації контакту з deal
+        # Використовуємо правильний API шлях (без v4)
+        associations = hubspot_client.crm.associations.basic_api.get_page(
+            from_object_type='deals',
+            from_object_id=deal_id,
+            to_object_type='contacts'
+        )
+        if associations.results:
+            # Отримуємо перший контакт з асоціацій
+            contact_id = str(associations.results[0].to_object_id)
+            record['contact'] = {'id': contact_id, 'properties': {}}
+            
+            # Отримуємо дані контакту для email та імені
+            try:
+                contact = hubspot_client.crm.contacts.basic_api.get_by_id(
+                    contact_id=contact_id,
+                    properties=['email', 'firstname', 'lastname']
+                )
+                if contact.properties:
+                    record['contact']['properties'] = dict(contact.properties)
+            except Exception as contact_error:
+                print(f"⚠️ Помилка отримання контакту {contact_id}: {contact_error}")
+    except Exception as assoc_error:
+        # Помилка з асоціаціями не критична - продовжуємо без контакту
+        app.logger.debug(f"⚠️ Помилка отримання асоціацій для deal {deal_id}: {assoc_error}")
+        # Не виводимо в консоль, щоб не засмічувати логи
+    
+    if deal_properties.get('hubspot_owner_id'):
+        try:
+            owner = hubspot_client.crm.owners.owners_api.get_by_id(
+                owner_id=deal_properties['hubspot_owner_id']
+            )
+            if owner and owner.email:
+                record['owner'] = {'id': str(deal_properties['hubspot_owner_id']), 'email': owner.email}
+        except Exception as owner_error:
+            app.logger.debug(f"⚠️ Помилка отримання owner: {owner_error}")
+    
+    return record
+
+# Pipeline IDs та stages, deals яких імпортуються в ліди
+HUBSPOT_IMPORT_PIPELINES = {
+    'default': {
+        'stages': ['appointmentscheduled', '3204738245', '3204738246', '3523602653', '3523660994']
+    },
+    '2341107958': {
+        'stages': ['3204738258', '3204738259', '3204738261', '3204738262', '3204738265', '3204738266', '3204738267']
+    },
+    '2346002665': {
+        'stages': ['3206386874', '3206386875', '3206386876', '3206386877', '3206386878', '3206386879', '3206344915']
+    }
+}
+
+# Властивості, які потрібні для deals
+# phone_number - це поле в deal, а не в контакті!
+HUBSPOT_DEAL_IMPORT_PROPERTIES = [
+    'dealname', 'dealstage', 'amount', 'closedate', 'createdate',
+    'hubspot_owner_id', 'responisble_agent', 'from_agent_portal__name_',
+    'birthdate', 'pipeline', 'phone_number', 'hs_object_id'
+]
+
+# Властивості, які потрібні для контактів
+HUBSPOT_CONTACT_IMPORT_PROPERTIES = [
+    'phone', 'phone_number', 'mobilephone', 'hs_phone_number',
+    'phone_number_1', 'email', 'firstname', 'lastname',
+    'company', 'telegram', 'telegram__cloned_', 'messenger',
+    'messenger__cloned_', 'birthdate', 'birthdate__cloned_'
+]
+
+def fetch_all_deals_from_hubspot(progress=None):
+    """Завантажує всі deals з HubSpot та створює/оновлює ліди в локальній БД
+    
+    progress - callback прогресу фонової задачі (сторінки, записи, поточний pipeline/stage)
+    Сирі deals кожного запуску пишуться в sync_archive (джерело 'deals').
+    
+    Імпорт - конвеєр SyncPipeline: потоки fetch читають сторінки пошуку по pipeline/stage,
+    потоки transform отримують контакт і owner для кожного deal, а поточний потік
+    (з сесією БД) застосовує маппінг і комітить пакетами.
+    """
     if not hubspot_client:
         print("⚠️ HubSpot API не налаштований")
         app.logger.warning("HubSpot API не налаштований для завантаження deals")
         return {'created': 0, 'updated': 0, 'errors': 0}
     
+    archive_run = open_sync_archive_run('deals')
     try:
         print("🔄 Початок завантаження всіх deals з HubSpot...")
         app.logger.info("🔄 Початок завантаження всіх deals з HubSpot...")
         
-        created_count = 0
-        updated_count = 0
-        errors_count = 0
+        counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': 0, 'pages': 0, 'pending': 0}
+        memory = import_memory_monitor('fetch_all_deals')
         
-        # Pipeline IDs та stages для фільтрації
-        pipeline_configs = {
-            'default': {
-                'stages': ['appointmentscheduled', '3204738245', '3204738246', '3523602653', '3523660994']
-            },
-            '2341107958': {
-                'stages': ['3204738258', '3204738259', '3204738261', '3204738262', '3204738265', '3204738266', '3204738267']
-            },
-            '2346002665': {
-                'stages': ['3206386874', '3206386875', '3206386876', '3206386877', '3206386878', '3206386879', '3206344915']
-            }
-        }
+        # Таблиці маппінгу та довідник агентів - один раз на запуск
+        deal_mapper = build_deal_mapper()
+        
+        properties = HUBSPOT_DEAL_IMPORT_PROPERTIES
+        
+        # Кожен stage кожного pipeline - окрема задача для потоків fetch
+        tasks = [(pipeline_id, stage_id) for pipeline_id, config in HUBSPOT_IMPORT_PIPELINES.items() for stage_id in config['stages']]
         
-        # Отримуємо deals з кожного pipeline та stage окремо
-        for pipeline_id, config in pipeline_configs.items():
-            stages = config['stages']
-            print(f"🔄 Завантаження deals з pipeline {pipeline_id} (stages: {len(stages)})...")
-            app.logger.info(f"🔄 Завантаження deals з pipeline {pipeline_id} (stages: {len(stages)})...")
+        def fetch_stage_pages(task):
+            """Сторінки пошуку deals для одного pipeline/stage"""
+            from hubspot.crm.deals import PublicObjectSearchRequest
+            from hubspot.crm.deals import Filter, FilterGroup
             
-            # Обробляємо кожен stage окремо
-            for stage_id in stages:
-                after = None
-                page = 0
-                max_pages = 1000  # До 100,000 deals на stage
-                
-                while page < max_pages:
-                    try:
-                        # Властивості, які потрібні для deals
-                        # phone_number - це поле в deal, а не в контакті!
-                        properties = [
-                            'dealname', 'dealstage', 'amount', 'closedate', 'createdate',
-                            'hubspot_owner_id', 'responisble_agent', 'from_agent_portal__name_',
-                            'birthdate', 'pipeline', 'phone_number', 'hs_object_id'
-                        ]
-                        
-                        # Використовуємо search API для фільтрації по pipeline та stage
-                        from hubspot.crm.deals import PublicObjectSearchRequest
-                        from hubspot.crm.deals import Filter, FilterGroup
-                        
-                        # Створюємо фільтр по pipeline та dealstage
-                        filters = []
-                        
-                        # Фільтр по pipeline
-                        if pipeline_id == 'default':
-                            # Для default pipeline використовуємо фільтр, що pipeline порожній або default
-                            filters.append(
-                                Filter(
-                                    property_name='pipeline',
-                                    operator='EQ',
-                                    value='default'
-                                )
-                            )
-                        else:
-                            filters.append(
-                                Filter(
-                                    property_name='pipeline',
-                                    operator='EQ',
-                                    value=pipeline_id
-                                )
-                            )
-                        
-                        # Фільтр по dealstage
-                        filters.append(
-                            Filter(
-                                property_name='dealstage',
-                                operator='EQ',
-                                value=stage_id
-                            )
-                        )
-                        
-                        search_request = PublicObjectSearchRequest(
-                            filter_groups=[FilterGroup(filters=filters)],
-                            properties=properties,
-                            limit=100,
-                            after=after
-                        )
-                        
-                        # Виконуємо пошук
-                        deals_response = hubspot_client.crm.deals.search_api.do_search(
-                            public_object_search_request=search_request
-                        )
-                        
-                        if not deals_response.results:
-                            break
-                        
-                        print(f"📄 Pipeline {pipeline_id}, stage {stage_id}, сторінка {page + 1}: отримано {len(deals_response.results)} deals")
-                        app.logger.info(f"📄 Pipeline {pipeline_id}, stage {stage_id}, сторінка {page + 1}: отримано {len(deals_response.results)} deals")
-                        
-                        # Обробляємо кожен deal
-                        for deal in deals_response.results:
-                            try:
-                                # Використовуємо hs_object_id як deal_id
-                                deal_id = str(deal.properties.get('hs_object_id') or deal.id)
-                                deal_properties = deal.properties
-                                
-                                # Отримуємо phone_number прямо з deal properties
-                                phone = deal_properties.get('phone_number')
-                                
-                                if not phone:
-                                    print(f"⚠️ Deal {deal_id} не має phone_number, пропускаємо")
-                                    continue
-                                
-                                # Форматуємо телефон
-                                try:
-                                    parsed_phone = phonenumbers.parse(phone, None)
-                                    formatted_phone = phonenumbers.format_number(
-                                        parsed_phone, 
-                                        phonenumbers.PhoneNumberFormat.INTERNATIONAL
-                                    )
-                                except:
-                                    formatted_phone = phone
-                                
-                                # Отримуємо контакт, пов'язаний з deal (для email та імені)
-                                contact_id = None
-                                email = ''
-                                deal_name = deal_properties.get('dealname', '')
-                                
-                                try:
-                                    # Отримуємо асоціації контакту з deal
-                                    # Використовуємо правильний API шлях (без v4)
-                                    associations = hubspot_client.crm.associations.basic_api.get_page(
-                                        from_object_type='deals',
-                                        from_object_id=deal_id,
-                                        to_object_type='contacts'
-                                    )
-                                    if associations.results:
-                                        # Отримуємо перший контакт з асоціацій
-                                        contact_id = str(associations.results[0].to_object_id)
-                                        
-                                        # Отримуємо дані контакту для email та імені
-                                        try:
-                                            contact = hubspot_client.crm.contacts.basic_api.get_by_id(
-                                                contact_id=contact_id,
-                                                properties=['email', 'firstname', 'lastname']
-                                            )
-                                            if contact.properties:
-                                                email = contact.properties.get('email', '')
-                                                firstname = contact.properties.get('firstname', '')
-                                                lastname = contact.properties.get('lastname', '')
-                                                
-                                                # Якщо немає dealname, використовуємо ім'я з контакту
-                                                if not deal_name:
-                                                    if firstname and lastname:
-                                                        deal_name = f"{firstname} {lastname}"
-                                                    elif firstname:
-                                                        deal_name = firstname
-                                                    elif lastname:
-                                                        deal_name = lastname
-                                        except Exception as contact_error:
-                                            print(f"⚠️ Помилка отримання контакту {contact_id}: {contact_error}")
-                                except Exception as assoc_error:
-                                    # Помилка з асоціаціями не критична - продовжуємо без контакту
-                                    app.logger.debug(f"⚠️ Помилка отримання асоціацій для deal {deal_id}: {assoc_error}")
-                                    # Не виводимо в консоль, щоб не засмічувати логи
-                                
-                                # Якщо немає email, використовуємо phone як унікальний ідентифікатор
-                                if not email:
-                                    email = f"no-email-{deal_id}@hubspot.local"
-                                
-                                # Якщо немає deal_name, використовуємо phone
-                                if not deal_name:
-                                    deal_name = f"Deal {deal_id}"
-                                
-                                # Визначаємо агента (за замовчуванням перший адмін або перший агент)
-                                default_agent = User.query.filter(
-                                    (User.role == 'admin') | (User.role == 'agent')
-                                ).first()
-                                
-                                # Визначаємо агента з пріоритетами:
-                                # ПРІОРИТЕТ 0: hubspot_owner_id (найвищий - використовуємо email для точного пошуку)
-                                # ПРІОРИТЕТ 1: responisble_agent
-                                # ПРІОРИТЕТ 2: from_agent_portal__name_
-                                agent_id = None
-                                
-                                # ПРІОРИТЕТ 0: hubspot_owner_id (найвищий пріоритет)
-                                if deal_properties.get('hubspot_owner_id'):
-                                    try:
-                                        owner = hubspot_client.crm.owners.owners_api.get_by_id(
-                                            owner_id=deal_properties['hubspot_owner_id']
-                                        )
-                                        if owner and owner.email:
-                                            agent_user = User.query.filter_by(email=owner.email.lower()).first()
-                                            if agent_user:
-                                                agent_id = agent_user.id
-                                                print(f"✅ Знайдено агента за hubspot_owner_id ({owner.email}) → {agent_user.username} (ID: {agent_id}) для deal {deal_id}")
-                                    except Exception as owner_error:
-                                        app.logger.debug(f"⚠️ Помилка отримання owner: {owner_error}")
-                                
-                                # ПРІОРИТЕТ 1: responisble_agent
-                                if not agent_id and deal_properties.get('responisble_agent'):
-                                    responsible_agent_value = deal_properties['responisble_agent'].strip()
-                                    if responsible_agent_value:
-                                        # Спочатку шукаємо по username
-                                        agent_user = User.query.filter_by(username=responsible_agent_value).first()
-                                        
-                                        # Якщо не знайдено, шукаємо по email
-                                        if not agent_user:
-                                            agent_user = User.query.filter_by(email=responsible_agent_value.lower()).first()
-                                        
-                                        # Якщо не знайдено, спробуємо знайти по частині імені (якщо це "Ім'я Прізвище")
-                                        if not agent_user and ' ' in responsible_agent_value:
-                                            name_parts = responsible_agent_value.split(' ', 1)
-                                            if len(name_parts) == 2:
-                                                agent_user = User.query.filter(User.username.ilike(f"%{name_parts[0]}%")).first()
-                                        
-                                        if agent_user:
-                                            agent_id = agent_user.id
-                                            print(f"✅ Знайдено агента за responisble_agent ({responsible_agent_value}) → {agent_user.username} (ID: {agent_id}) для deal {deal_id}")
-                                        
-                                # ПРІОРИТЕТ 2: from_agent_portal__name_
-                                if not agent_id and deal_properties.get('from_agent_portal__name_'):
-                                    agent_name = deal_properties['from_agent_portal__name_'].strip()
-                                    if agent_name:
-                                        agent_user = User.query.filter_by(username=agent_name).first()
-                                        if agent_user:
-                                            agent_id = agent_user.id
-                                            print(f"✅ Знайдено агента за from_agent_portal__name_ ({agent_name}) для deal {deal_id}")
-                                    try:
-                                        owner = hubspot_client.crm.owners.owners_api.get_by_id(
-                                            owner_id=deal_properties['hubspot_owner_id']
-                                        )
-                                        if owner and owner.email:
-                                            owner_user = User.query.filter_by(email=owner.email).first()
-                                            if owner_user:
-                                                agent_id = owner_user.id
-                                                print(f"✅ Знайдено агента за hubspot_owner_id email ({owner.email}) для deal {deal_id}")
-                                    except Exception as owner_error:
-                                        app.logger.debug(f"⚠️ Помилка отримання owner: {owner_error}")
-                                
-                                # Якщо агент не знайдено, використовуємо default_agent
-                                if not agent_id:
-                                    if default_agent:
-                                        agent_id = default_agent.id
-                                        print(f"ℹ️ Використано агента за замовчуванням ({default_agent.username}) для deal {deal_id}")
-                                    else:
-                                        # Якщо взагалі немає агентів в системі - пропускаємо
-                                        print(f"⚠️ Немає агентів в системі для deal {deal_id}, пропускаємо")
-                                        continue
-                                
-                                # Визначаємо статус з deal stage
-                                status = 'new'
-                                deal_stage = deal_properties.get('dealstage', '')
-                                hubspot_stage_label = None
-                                
-                                # Маппінг ID стадій на їх назви з HubSpot (правильні назви з API)
-                                stage_labels = {
-                                    '3204738258': 'Новая заявка',
-                                    '3204738259': 'Отправлены варианты/Передан на партнеров',
-                                    '3204738261': 'Назначена встреча/тур',
-                                    '3204738262': 'Встреча/тур проведены',
-                                    '3204738265': 'Переговоры',
-                                    '3204738266': 'Задаток',
-                                    '3204738267': 'Сделка закрыта'
-                                }
-                                
-                                # Мапінг стадій HubSpot на статуси системи
-                                stage_mapping = {
-                                    '3204738258': 'new',
-                                    '3204738259': 'contacted',
-                                    '3204738261': 'qualified',
-                                    '3204738262': 'qualified',
-                                    '3204738265': 'qualified',
-                                    '3204738266': 'qualified',
-                                    '3204738267': 'closed'
-                                }
-                                
-                                if deal_stage:
-                                    # Отримуємо label з маппінгу
-                                    if deal_stage in stage_labels:
-                                        hubspot_stage_label = stage_labels[deal_stage]
-                                    
-                                    # Мапимо на статус
-                                    if deal_stage in stage_mapping:
-                                        status = stage_mapping[deal_stage]
-                                    elif 'closedwon' in deal_stage.lower() or 'closed won' in deal_stage.lower():
-                                        status = 'closed'
-                                    elif 'qualified' in deal_stage.lower():
-                                        status = 'qualified'
-                                    elif 'contacted' in deal_stage.lower():
-                                        status = 'contacted'
-                                
-                                # Визначаємо budget (з amount)
-                                budget = None
-                                if deal_properties.get('amount'):
-                                    try:
-                                        amount = float(deal_properties['amount'])
-                                        if amount < 200000:
-                                            budget = 'до 200к'
-                                        elif amount < 500000:
-                                            budget = '200к–500к'
-                                        elif amount < 1000000:
-                                            budget = '500к–1млн'
-                                        else:
-                                            budget = '1млн+'
-                                    except:
-                                        pass
-                                
-                                # Перевіряємо, чи існує лід з цим deal_id
-                                existing_lead = Lead.query.filter_by(hubspot_deal_id=deal_id).first()
-                                
-                                if existing_lead:
-                                    # Оновлюємо існуючий лід
-                                    existing_lead.deal_name = deal_name
-                                    existing_lead.email = email
-                                    existing_lead.phone = formatted_phone
-                                    if budget:
-                                        existing_lead.budget = budget
-                                    existing_lead.status = status
-                                    if hubspot_stage_label:
-                                        existing_lead.hubspot_stage_label = hubspot_stage_label
-                                    if contact_id:
-                                        existing_lead.hubspot_contact_id = contact_id
-                                    existing_lead.hubspot_deal_id = deal_id
-                                    existing_lead.agent_id = agent_id
-                                    
-                                    updated_count += 1
-                                    print(f"✅ Оновлено лід {existing_lead.id} з HubSpot deal {deal_id}")
-                                else:
-                                    # Перевіряємо, чи не існує лід з таким телефоном
-                                    duplicate_lead = Lead.query.filter(
-                                        Lead.phone == formatted_phone
-                                    ).first()
-                                    
-                                    if duplicate_lead:
-                                        # Якщо знайдено дублікат, оновлюємо його
-                                        duplicate_lead.hubspot_deal_id = deal_id
-                                        if contact_id:
-                                            duplicate_lead.hubspot_contact_id = contact_id
-                                        duplicate_lead.agent_id = agent_id
-                                        if budget:
-                                            duplicate_lead.budget = budget
-                                        duplicate_lead.status = status
-                                        if hubspot_stage_label:
-                                            duplicate_lead.hubspot_stage_label = hubspot_stage_label
-                                        updated_count += 1
-                                        print(f"✅ Оновлено дублікат ліда {duplicate_lead.id} з HubSpot deal {deal_id}")
-                                    else:
-                                        # Створюємо новий лід
-                                        new_lead = Lead(
-                                            agent_id=agent_id,
-                                            deal_name=deal_name,
-                                            email=email,
-                                            phone=formatted_phone,
-                                            budget=budget or 'до 200к',
-                                            status=status,
-                                            hubspot_contact_id=contact_id,
-                                            hubspot_deal_id=deal_id,
-                                            hubspot_stage_label=hubspot_stage_label
-                                        )
-                                        
-                                        db.session.add(new_lead)
-                                        created_count += 1
-                                        print(f"✅ Створено новий лід з HubSpot deal {deal_id} (phone: {formatted_phone})")
-                            
-                            except Exception as deal_error:
-                                print(f"❌ Помилка обробки deal {deal.id}: {deal_error}")
-                                app.logger.error(f"❌ Помилка обробки deal {deal.id}: {deal_error}")
-                                errors_count += 1
-                                traceback.print_exc()
+            pipeline_id, stage_id = task
+            after = None
+            page = 0
+            max_pages = 1000  # До 100,000 deals на stage
+            
+            while page < max_pages:
+                try:
+                    # Фільтр по pipeline (для default pipeline - значення 'default') та dealstage
+                    filters = [
+                        Filter(property_name='pipeline', operator='EQ', value=pipeline_id),
+                        Filter(property_name='dealstage', operator='EQ', value=stage_id)
+                    ]
                     
-                        # Перевіряємо, чи є ще сторінки
-                        if not deals_response.paging or not deals_response.paging.next:
-                            break
-                        
-                        after = deals_response.paging.next.after
-                        page += 1
-                        
-                        # Додаємо затримку між сторінками для rate limiting
-                        time.sleep(0.5)
-                        
-                        # Комітимо кожні 10 сторінок для зменшення навантаження на БД
-                        if page % 10 == 0:
-                            db.session.commit()
-                            print(f"💾 Збережено прогрес pipeline {pipeline_id}, stage {stage_id}: сторінка {page}")
+                    search_request = PublicObjectSearchRequest(
+                        filter_groups=[FilterGroup(filters=filters)],
+                        properties=properties,
+                        limit=100,
+                        after=after
+                    )
                     
-                    except Exception as page_error:
-                        print(f"❌ Помилка отримання сторінки {page + 1} pipeline {pipeline_id}, stage {stage_id}: {page_error}")
-                        app.logger.error(f"❌ Помилка отримання сторінки {page + 1} pipeline {pipeline_id}, stage {stage_id}: {page_error}")
-                        errors_count += 1
-                        break
-        
-        db.session.commit()
+                    # Виконуємо пошук
+                    deals_response = call_hubspot_with_backoff(
+                        hubspot_client.crm.deals.search_api.do_search,
+                        public_object_search_request=search_request,
+                        on_backoff=progress.backoff if progress else None
+                    )
+                except Exception as page_error:
+                    print(f"❌ Помилка отримання сторінки {page + 1} pipeline {pipeline_id}, stage {stage_id}: {page_error}")
+                    app.logger.error(f"❌ Помилка отримання сторінки {page + 1} pipeline {pipeline_id}, stage {stage_id}: {page_error}")
+                    raise
+                
+                if not deals_response.results:
+                    return
+                
+                print(f"📄 Pipeline {pipeline_id}, stage {stage_id}, сторінка {page + 1}: отримано {len(deals_response.results)} deals")
+                app.logger.info(f"📄 Pipeline {pipeline_id}, stage {stage_id}, сторінка {page + 1}: отримано {len(deals_response.results)} deals")
+                yield {
+                    'label': f"Pipeline {pipeline_id}, stage {stage_id}, сторінка {page + 1}",
+                    'expected': (getattr(deals_response, 'total', 0) or 0) if page == 0 else 0,
+                    'deals': deals_response.results
+                }
+                
+                # Перевіряємо, чи є ще сторінки
+                if not deals_response.paging or not deals_response.paging.next:
+                    return
+                
+                after = deals_response.paging.next.after
+                page += 1
+                
+                # Додаємо затримку між сторінками для rate limiting
+                time.sleep(0.5)
         
+        def build_page_records(page):
+            """LeadRecord для deals сторінки (контакт і owner - запити до HubSpot, маппінг - без БД)"""
+            records = []
+            errors = 0
+            for deal in page['deals']:
+                try:
+                    record = fetch_hubspot_deal_record(deal)
+                    if archive_run:
+                        archive_run.append(record)
+                    lead_record = deal_mapper.map(record)
+                    if lead_record is None:
+                        print(f"⚠️ Deal {record['id']} без phone_number або без агента, пропускаємо")
+                        continue
+                    records.append(lead_record)
+                except Exception as deal_error:
+                    print(f"❌ Помилка обробки deal {deal.id}: {deal_error}")
+                    app.logger.error(f"❌ Помилка обробки deal {deal.id}: {deal_error}")
+                    errors += 1
+            return dict(page, deals=None, records=records, errors=errors, rows=len(page['deals']))
+        
+        def write_page(batch):
+            """Застосовує маппінг до записів сторінки в сесії поточного потоку"""
+            counts['errors'] += batch['errors']
+            for lead_record in batch['records']:
+                try:
+                    # Savepoint на запис: помилка flush (IntegrityError, DataError) відкочує
+                    # тільки цей deal і не лишає сесію в зламаній транзакції для решти імпорту
+                    with db.session.begin_nested():
+                        outcome = apply_lead_record(lead_record)
+                    counts[outcome] += 1
+                except Exception:
+                    app.logger.exception(f"❌ Помилка обробки deal {lead_record.deal_id}")
+                    counts['errors'] += 1
+            
+            counts['pages'] += 1
+            counts['pending'] += len(batch['records'])
+            if progress:
+                progress(
+                    pages=1, rows=batch['rows'], expected=batch['expected'], stage=batch['label'],
+                    created=counts['created'], updated=counts['updated'], errors=counts['errors']
+                )
+            
+            # Комітимо і звільняємо сесію пакетами (або раніше, якщо пам'ять вище стелі)
+            if counts['pending'] >= IMPORT_BATCH_SIZE or memory.over_ceiling():
+                release_import_batch(memory)
+                counts['pending'] = 0
+                print(f"💾 Збережено прогрес: {counts['pages']} сторінок ({batch['label']})")
+        
+        # Потоки fetch/transform працюють у тій самій смузі квоти, що й задача
+        lane = hubspot_quota.current_lane()
+        
+        @contextmanager
+        def import_worker_context():
+            with app.app_context(), hubspot_quota.lane(lane):
+                yield
+        
+        pipeline = SyncPipeline(
+            fetch_stage_pages, build_page_records, write_page,
+            fetchers=int(os.getenv('DEAL_IMPORT_FETCHERS', '2')),
+            transformers=int(os.getenv('DEAL_IMPORT_MAPPERS', '4')),
+            worker_context=import_worker_context
+        )
+        with memory:
+            pipeline_stats = pipeline.run(tasks)
+            release_import_batch(memory)
+        # Помилка сторінки завершує тільки свій pipeline/stage, як і раніше
+        counts['errors'] += pipeline_stats['fetch']['errors'] + pipeline_stats['transform']['errors']
+        
+        created_count = counts['created']
+        updated_count = counts['updated']
+        errors_count = counts['errors']
         result = {
             'created': created_count,
             'updated': updated_count,
+            'unchanged': counts['unchanged'],
             'errors': errors_count,
-            'total_processed': created_count + updated_count
+            'total_processed': created_count + updated_count,
+            'pipeline': pipeline_stats,
+            'memory': memory.report()
         }
         
-        print(f"✅ Завантаження завершено: створено {created_count}, оновлено {updated_count}, помилок {errors_count}")
-        app.logger.info(f"✅ Завантаження HubSpot завершено: створено {created_count}, оновлено {updated_count}, помилок {errors_count}")
+        print(f"✅ Завантаження завершено: створено {created_count}, оновлено {updated_count}, без змін {counts['unchanged']}, помилок {errors_count}")
+        app.logger.info(f"✅ Завантаження HubSpot завершено: створено {created_count}, оновлено {updated_count}, без змін {counts['unchanged']}, помилок {errors_count}")
+        app.logger.info(f"📊 Пропускна здатність імпорту deals: {pipeline_stats}")
+        app.logger.info(f"📊 Пам'ять імпорту deals: {result['memory']}")
         
         return result
         
+    except MemoryCeilingExceeded as e:
+        db.session.rollback()
+        app.logger.error(f"❌ Імпорт deals зупинено: {e}; {memory.report()}")
+        raise
     except Exception as e:
         print(f"❌ Критична помилка при завантаженні deals з HubSpot: {e}")
         app.logger.error(f"❌ Критична помилка при завантаженні deals з HubSpot: {e}")
         traceback.print_exc()
         db.session.rollback()
         return {'created': 0, 'updated': 0, 'errors': 1, 'total_processed': 0}
+    finally:
+        if archive_run:
+            archive_run.close()
+
+def apply_hubspot_contact_record(record, default_agent_id):
+    """Застосовує маппінг контакт -> лід до сирого запису контакту (без запитів до HubSpot)
+
+    record - запис архіву: {'id', 'properties'}. Повертає 'created', 'updated', 'unchanged'
+    (контакт не змінився з останнього імпорту) або None (пропущено).
+    """
+    contact_id = record['id']
+    contact_properties = record['properties']
+    
+    # Визначаємо основний телефон
+    phone = None
+    if contact_properties.get('phone_number'):
+        phone = contact_properties['phone_number']
+    elif contact_properties.get('mobilephone'):
+        phone = contact_properties['mobilephone']
+    elif contact_properties.get('hs_phone_number'):
+        phone = contact_properties['hs_phone_number']
+    elif contact_properties.get('phone'):
+        phone = contact_properties['phone']
+    
+    # Пропускаємо контакти без телефону
+    if not phone:
+        return None
+    
+    # Форматуємо телефон (з кешу, якщо номер вже зустрічався)
+    formatted_phone = format_phone(phone)
+    
+    # Визначаємо email
+    email = contact_properties.get('email', '')
+    if not email:
+        # Якщо немає email, використовуємо phone як унікальний ідентифікатор
+        email = f"no-email-{contact_id}@hubspot.local"
+    
+    # Визначаємо ім'я
+    firstname = contact_properties.get('firstname', '')
+    lastname = contact_properties.get('lastname', '')
+    if firstname and lastname:
+        deal_name = f"{firstname} {lastname}"
+    elif firstname:
+        deal_name = firstname
+    elif lastname:
+        deal_name = lastname
+    else:
+        deal_name = email.split('@')[0] if email else f"Contact {contact_id}"
+    
+    agent_id = default_agent_id
+    second_phone = contact_properties.get('phone_number_1')
+    telegram = contact_properties.get('telegram') or contact_properties.get('telegram__cloned_')
+    messenger = contact_properties.get('messenger') or contact_properties.get('messenger__cloned_')
+    company = contact_properties.get('company')
+    fingerprint = property_fingerprint({
+        'deal_name': deal_name, 'email': email, 'phone': formatted_phone, 'agent_id': agent_id,
+        'second_phone': second_phone, 'telegram': telegram, 'messenger': messenger, 'company': company
+    })
+    
+    # Перевіряємо, чи існує лід з цим contact_id
+    existing_lead = Lead.query.filter_by(hubspot_contact_id=contact_id).first()
+    
+    if existing_lead:
+        # Ті самі значення, що й минулого разу - лід не чіпаємо
+        if fingerprint_matches(existing_lead.hubspot_fingerprints, 'contact', fingerprint):
+            return 'unchanged'
+        
+        # Оновлюємо існуючий лід
+        existing_lead.deal_name = deal_name
+        existing_lead.email = email
+        existing_lead.phone = formatted_phone
+        existing_lead.hubspot_contact_id = contact_id
+        if agent_id:
+            existing_lead.agent_id = agent_id
+        
+        # Оновлюємо додаткові поля
+        if second_phone:
+            existing_lead.second_phone = second_phone
+        if telegram:
+            existing_lead.telegram_nickname = telegram
+        if messenger:
+            existing_lead.messenger = messenger
+        if company:
+            existing_lead.company = company
+        existing_lead.hubspot_fingerprints = with_fingerprint(existing_lead.hubspot_fingerprints, 'contact', fingerprint)
+        
+        print(f"✅ Оновлено лід {existing_lead.id} з HubSpot контакту {contact_id}")
+        return 'updated'
+    else:
+        # Перевіряємо, чи не існує лід з таким телефоном або email
+        duplicate_lead = Lead.query.filter(
+            (Lead.phone == formatted_phone) | (Lead.email == email)
+        ).first()
+        
+        if duplicate_lead:
+            # Якщо знайдено дублікат, оновлюємо його
+            duplicate_lead.hubspot_contact_id = contact_id
+            if agent_id:
+                duplicate_lead.agent_id = agent_id
+            print(f"✅ Оновлено дублікат ліда {duplicate_lead.id} з HubSpot контакту {contact_id}")
+            return 'updated'
+        else:
+            # Створюємо новий лід
+            new_lead = Lead(
+                agent_id=agent_id,
+                deal_name=deal_name,
+                email=email,
+                phone=formatted_phone,
+                budget='до 200к',
+                status='new',
+                hubspot_contact_id=contact_id,
+                second_phone=second_phone,
+                telegram_nickname=telegram,
+                messenger=messenger,
+                company=company,
+                hubspot_fingerprints={'contact': fingerprint}
+            )
+            
+            db.session.add(new_lead)
+            print(f"✅ Створено новий лід з HubSpot контакту {contact_id}")
+            return 'created'
 
-def fetch_all_contacts_from_hubspot():
-    """Завантажує всі контакти з HubSpot CRM та створює/оновлює ліди в локальній БД"""
+def fetch_all_contacts_from_hubspot(progress=None):
+    """Завантажує всі контакти з HubSpot CRM та створює/оновлює ліди в локальній БД
+    
+    progress - callback прогресу фонової задачі (сторінки, записи)
+    Сирі контакти кожного запуску пишуться в sync_archive (джерело 'contacts').
+    """
     if not hubspot_client:
         print("⚠️ HubSpot API не налаштований")
         app.logger.warning("HubSpot API не налаштований для завантаження контактів")
         return {'created': 0, 'updated': 0, 'errors': 0}
     
+    archive_run = open_sync_archive_run('contacts')
     try:
         print("🔄 Початок завантаження всіх контактів з HubSpot CRM...")
         app.logger.info("🔄 Початок завантаження всіх контактів з HubSpot CRM...")
         
         created_count = 0
         updated_count = 0
+        unchanged_count = 0
         errors_count = 0
         
+        # Агент за замовчуванням (перший адмін або перший агент) - один раз на запуск
+        default_agent = User.query.filter(
+            (User.role == 'admin') | (User.role == 'agent')
+        ).first()
+        # Після звільнення сесії об'єкт User від'єднаний - зберігаємо тільки id
+        default_agent_id = default_agent.id if default_agent else None
+        memory = import_memory_monitor('fetch_all_contacts')
+        pending = 0
+        
         # Отримуємо всі контакти з HubSpot (посторінково)
         after = None
         page = 0
         max_pages = 1000  # До 100,000 контактів
         
-        while page < max_pages:
-            try:
-                # Властивості, які потрібні для контактів
-                properties = [
-                    'phone', 'phone_number', 'mobilephone', 'hs_phone_number',
-                    'phone_number_1', 'email', 'firstname', 'lastname',
-                    'company', 'telegram', 'telegram__cloned_', 'messenger',
-                    'messenger__cloned_', 'birthdate', 'birthdate__cloned_'
-                ]
-                
-                # Отримуємо сторінку контактів
-                if after:
-                    contacts_response = hubspot_client.crm.contacts.basic_api.get_page(
-                        limit=100,
-                        after=after,
-                        properties=properties
-                    )
-                else:
-                    contacts_response = hubspot_client.crm.contacts.basic_api.get_page(
-                        limit=100,
-                        properties=properties
+        if progress:
+            # Кількість контактів у дзеркальній таблиці - оцінка для ETA
+            progress(expected=HubSpotContact.query.count(), stage='Завантаження контактів')
+        
+        with memory:
+            while page < max_pages:
+                try:
+                    # Отримуємо сторінку контактів
+                    page_params = {'limit': 100, 'properties': HUBSPOT_CONTACT_IMPORT_PROPERTIES}
+                    if after:
+                        page_params['after'] = after
+                    contacts_response = call_hubspot_with_backoff(
+                        hubspot_client.crm.contacts.basic_api.get_page,
+                        on_backoff=progress.backoff if progress else None,
+                        **page_params
                     )
                 
-                if not contacts_response.results:
-                    break
+                    if not contacts_response.results:
+                        break
                 
-                print(f"📄 Сторінка {page + 1}: отримано {len(contacts_response.results)} контактів")
-                app.logger.info(f"📄 Сторінка {page + 1}: отримано {len(contacts_response.results)} контактів")
+                    print(f"📄 Сторінка {page + 1}: отримано {len(contacts_response.results)} контактів")
+                    app.logger.info(f"📄 Сторінка {page + 1}: отримано {len(contacts_response.results)} контактів")
                 
-                # Обробляємо кожен контакт
-                for contact in contacts_response.results:
-                    try:
-                        contact_id = str(contact.id)
-                        contact_properties = contact.properties
-                        
-                        # Визначаємо основний телефон
-                        phone = None
-                        if contact_properties.get('phone_number'):
-                            phone = contact_properties['phone_number']
-                        elif contact_properties.get('mobilephone'):
-                            phone = contact_properties['mobilephone']
-                        elif contact_properties.get('hs_phone_number'):
-                            phone = contact_properties['hs_phone_number']
-                        elif contact_properties.get('phone'):
-                            phone = contact_properties['phone']
-                        
-                        # Пропускаємо контакти без телефону
-                        if not phone:
-                            continue
-                        
-                        # Форматуємо телефон
+                    # Обробляємо кожен контакт
+                    for contact in contacts_response.results:
                         try:
-                            parsed_phone = phonenumbers.parse(phone, None)
-                            formatted_phone = phonenumbers.format_number(
-                                parsed_phone, 
-                                phonenumbers.PhoneNumberFormat.INTERNATIONAL
-                            )
-                        except:
-                            formatted_phone = phone
-                        
-                        # Визначаємо email
-                        email = contact_properties.get('email', '')
-                        if not email:
-                            # Якщо немає email, використовуємо phone як унікальний ідентифікатор
-                            email = f"no-email-{contact_id}@hubspot.local"
-                        
-                        # Визначаємо ім'я
-                        firstname = contact_properties.get('firstname', '')
-                        lastname = contact_properties.get('lastname', '')
-                        if firstname and lastname:
-                            deal_name = f"{firstname} {lastname}"
-                        elif firstname:
-                            deal_name = firstname
-                        elif lastname:
-                            deal_name = lastname
-                        else:
-                            deal_name = email.split('@')[0] if email else f"Contact {contact_id}"
-                        
-                        # Визначаємо агента (за замовчуванням перший адмін або перший агент)
-                        default_agent = User.query.filter(
-                            (User.role == 'admin') | (User.role == 'agent')
-                        ).first()
-                        agent_id = default_agent.id if default_agent else None
-                        
-                        # Перевіряємо, чи існує лід з цим contact_id
-                        existing_lead = Lead.query.filter_by(hubspot_contact_id=contact_id).first()
-                        
-                        if existing_lead:
-                            # Оновлюємо існуючий лід
-                            existing_lead.deal_name = deal_name
-                            existing_lead.email = email
-                            existing_lead.phone = formatted_phone
-                            existing_lead.hubspot_contact_id = contact_id
-                            if agent_id:
-                                existing_lead.agent_id = agent_id
-                            
-                            # Оновлюємо додаткові поля
-                            if contact_properties.get('phone_number_1'):
-                                existing_lead.second_phone = contact_properties['phone_number_1']
-                            if contact_properties.get('telegram') or contact_properties.get('telegram__cloned_'):
-                                existing_lead.telegram_nickname = contact_properties.get('telegram') or contact_properties.get('telegram__cloned_')
-                            if contact_properties.get('messenger') or contact_properties.get('messenger__cloned_'):
-                                existing_lead.messenger = contact_properties.get('messenger') or contact_properties.get('messenger__cloned_')
-                            if contact_properties.get('company'):
-                                existing_lead.company = contact_properties['company']
-                            
-                            updated_count += 1
-                            print(f"✅ Оновлено лід {existing_lead.id} з HubSpot контакту {contact_id}")
-                        else:
-                            # Перевіряємо, чи не існує лід з таким телефоном або email
-                            duplicate_lead = Lead.query.filter(
-                                (Lead.phone == formatted_phone) | (Lead.email == email)
-                            ).first()
-                            
-                            if duplicate_lead:
-                                # Якщо знайдено дублікат, оновлюємо його
-                                duplicate_lead.hubspot_contact_id = contact_id
-                                if agent_id:
-                                    duplicate_lead.agent_id = agent_id
-                                updated_count += 1
-                                print(f"✅ Оновлено дублікат ліда {duplicate_lead.id} з HubSpot контакту {contact_id}")
-                            else:
-                                # Створюємо новий лід
-                                new_lead = Lead(
-                                    agent_id=agent_id,
-                                    deal_name=deal_name,
-                                    email=email,
-                                    phone=formatted_phone,
-                                    budget='до 200к',
-                                    status='new',
-                                    hubspot_contact_id=contact_id,
-                                    second_phone=contact_properties.get('phone_number_1'),
-                                    telegram_nickname=contact_properties.get('telegram') or contact_properties.get('telegram__cloned_'),
-                                    messenger=contact_properties.get('messenger') or contact_properties.get('messenger__cloned_'),
-                                    company=contact_properties.get('company')
-                                )
-                                
-                                db.session.add(new_lead)
+                            record = {'id': str(contact.id), 'properties': dict(contact.properties)}
+                            if archive_run:
+                                archive_run.append(record)
+                            outcome = apply_hubspot_contact_record(record, default_agent_id)
+                            if outcome == 'created':
                                 created_count += 1
-                                print(f"✅ Створено новий лід з HubSpot контакту {contact_id}")
+                            elif outcome == 'updated':
+                                updated_count += 1
+                            elif outcome == 'unchanged':
+                                unchanged_count += 1
                         
-                    except Exception as contact_error:
-                        print(f"❌ Помилка обробки контакту {contact.id}: {contact_error}")
-                        app.logger.error(f"❌ Помилка обробки контакту {contact.id}: {contact_error}")
-                        errors_count += 1
-                        traceback.print_exc()
+                        except Exception as contact_error:
+                            print(f"❌ Помилка обробки контакту {contact.id}: {contact_error}")
+                            app.logger.error(f"❌ Помилка обробки контакту {contact.id}: {contact_error}")
+                            errors_count += 1
+                            traceback.print_exc()
                 
-                # Перевіряємо, чи є ще сторінки
-                if not contacts_response.paging or not contacts_response.paging.next:
-                    break
+                    if progress:
+                        progress(
+                            pages=1, rows=len(contacts_response.results), stage=f"Сторінка {page + 1}",
+                            created=created_count, updated=updated_count, errors=errors_count
+                        )
                 
-                after = contacts_response.paging.next.after
-                page += 1
+                    # Перевіряємо, чи є ще сторінки
+                    if not contacts_response.paging or not contacts_response.paging.next:
+                        break
                 
-                # Додаємо затримку між сторінками для rate limiting
-                time.sleep(0.5)
+                    after = contacts_response.paging.next.after
+                    page += 1
                 
-                # Комітимо кожні 100 контактів для зменшення навантаження на БД
-                if page % 10 == 0:
-                    db.session.commit()
-                    print(f"💾 Збережено прогрес: сторінка {page}")
+                    # Додаємо затримку між сторінками для rate limiting
+                    time.sleep(0.5)
                 
-            except Exception as page_error:
-                print(f"❌ Помилка отримання сторінки {page + 1}: {page_error}")
-                app.logger.error(f"❌ Помилка отримання сторінки {page + 1}: {page_error}")
-                errors_count += 1
-                break
-        
-        db.session.commit()
+                    # Комітимо і звільняємо сесію пакетами (або раніше, якщо пам'ять вище стелі)
+                    pending += len(contacts_response.results)
+                    if pending >= IMPORT_BATCH_SIZE or memory.over_ceiling():
+                        release_import_batch(memory)
+                        pending = 0
+                        print(f"💾 Збережено прогрес: сторінка {page}")
+                
+                except Exception as page_error:
+                    print(f"❌ Помилка отримання сторінки {page + 1}: {page_error}")
+                    app.logger.error(f"❌ Помилка отримання сторінки {page + 1}: {page_error}")
+                    errors_count += 1
+                    break
+            
+            release_import_batch(memory)
         
         result = {
             'created': created_count,
             'updated': updated_count,
+            'unchanged': unchanged_count,
             'errors': errors_count,
-            'total_processed': created_count + updated_count
+            'total_processed': created_count + updated_count,
+            'memory': memory.report()
         }
         
-        print(f"✅ Завантаження контактів завершено: створено {created_count}, оновлено {updated_count}, помилок {errors_count}")
-        app.logger.info(f"✅ Завантаження HubSpot контактів завершено: створено {created_count}, оновлено {updated_count}, помилок {errors_count}")
+        print(f"✅ Завантаження контактів завершено: створено {created_count}, оновлено {updated_count}, без змін {unchanged_count}, помилок {errors_count}")
+        app.logger.info(f"✅ Завантаження HubSpot контактів завершено: створено {created_count}, оновлено {updated_count}, без змін {unchanged_count}, помилок {errors_count}")
+        app.logger.info(f"📊 Пам'ять імпорту контактів: {result['memory']}")
         
         return result
         
+    except MemoryCeilingExceeded as e:
+        db.session.rollback()
+        app.logger.error(f"❌ Імпорт контактів зупинено: {e}; {memory.report()}")
+        raise
     except Exception as e:
         print(f"❌ Критична помилка при завантаженні контактів з HubSpot: {e}")
         app.logger.error(f"❌ Критична помилка при завантаженні контактів з HubSpot: {e}")
         traceback.print_exc()
         db.session.rollback()
         return {'created': 0, 'updated': 0, 'errors': 1, 'total_processed': 0}
+    finally:
+        if archive_run:
+            archive_run.close()
+
+def replay_sync_archive(source, run_ids=None, since=None, dry_run=False, commit_every=None):
+    """Повторно застосовує маппінг до архіву сирих даних без запитів до HubSpot
+
+    source - 'deals', 'contacts' або 'notes'; run_ids - конкретні запуски (за замовчуванням
+    всі, починаючи з since), від старішого до новішого. dry_run - відкат замість commit.
+    Сесія звільняється кожні commit_every записів (за замовчуванням IMPORT_BATCH_SIZE).
+    """
+    commit_every = commit_every or IMPORT_BATCH_SIZE
+    run_ids = run_ids or sync_archive.runs(source, since=since)
+    result = {'runs': len(run_ids), 'records': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0}
+    default_agent = User.query.filter(
+        (User.role == 'admin') | (User.role == 'agent')
+    ).first()
+    default_agent_id = default_agent.id if default_agent else None
+    deal_mapper = build_deal_mapper()
+    memory = import_memory_monitor(f'replay_{source}')
+    
+    with memory:
+        for run_id in run_ids:
+            print(f"🔁 Повторна обробка {source}/{run_id}...")
+            app.logger.info(f"🔁 Повторна обробка архіву {source}/{run_id}")
+            for record in sync_archive.read(source, run_id):
+                result['records'] += 1
+                try:
+                    # Savepoint на запис: помилка відкочує тільки цей запис, а не весь
+                    # незбережений пакет, який вже пораховано в created/updated
+                    with db.session.begin_nested():
+                        if source == 'deals':
+                            lead_record = deal_mapper.map(record)
+                            outcome = apply_lead_record(lead_record) if lead_record else None
+                        elif source == 'contacts':
+                            outcome = apply_hubspot_contact_record(record, default_agent_id)
+                        else:
+                            lead = db.session.get(Lead, record['lead_id'])
+                            if not lead or lead.hubspot_deal_id != record.get('deal_id'):
+                                outcome = None
+                            else:
+                                owner_email = record.get('owner_email')
+                                outcome = 'created' if apply_hubspot_note(lead, record['note'], lambda owner_id: owner_email) else None
+                    result[outcome or 'skipped'] += 1
+                except Exception as record_error:
+                    result['errors'] += 1
+                    app.logger.error(f"❌ Помилка повторної обробки запису {source}/{run_id}: {record_error}")
+                
+                if result['records'] % commit_every == 0:
+                    if dry_run:
+                        # Зміни лишаються в транзакції (відкат в кінці), але об'єкти звільняються
+                        db.session.flush()
+                        db.session.expunge_all()
+                        memory.batch_released()
+                    else:
+                        release_import_batch(memory)
+        
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    
+    result['memory'] = memory.report()
+    print(f"✅ Повторна обробка {source} завершена: {result}")
+    app.logger.info(f"✅ Повторна обробка архіву {source} завершена: {result}")
+    return result
+
+def load_hubspot_owner_emails():
+    """{owner_id: email} всіх owners HubSpot (кілька запитів замість запиту на кожен deal)"""
+    owner_emails = {}
+    after = None
+    while True:
+        params = {'limit': 100}
+        if after:
+            params['after'] = after
+        response = call_hubspot_with_backoff(hubspot_client.crm.owners.owners_api.get_page, **params)
+        for owner in response.results or []:
+            if owner.email:
+                owner_emails[str(owner.id)] = owner.email
+        if not response.paging or not response.paging.next:
+            return owner_emails
+        after = response.paging.next.after
+
+def hubspot_associations():
+    """Пакетні запити v4 associations API через hubspot_http (спільна квота і circuit breaker)"""
+    return HubSpotAssociations(
+        hubspot_http,
+        {"Authorization": f"Bearer {HUBSPOT_API_KEY}", "Content-Type": "application/json"}
+    )
+
+def hubspot_notes():
+    """Пакетне створення нотаток з асоціацією note -> deal через hubspot_http"""
+    return HubSpotNotes(
+        hubspot_http,
+        {"Authorization": f"Bearer {HUBSPOT_API_KEY}", "Content-Type": "application/json"},
+        NOTE_TO_DEAL_ASSOCIATION_TYPE
+    )
+
+def hubspot_note_input(comment):
+    """(ключ, текст, hs_timestamp, deal_id) нотатки HubSpot для коментаря"""
+    from datetime import datetime, timezone
+    
+    created_at = comment.created_at.replace(tzinfo=timezone.utc) if comment.created_at else datetime.now(timezone.utc)
+    return comment.id, comment.content, created_at.strftime('%Y-%m-%dT%H:%M:%SZ'), comment.lead.hubspot_deal_id
+
+def hubspot_crm_export():
+    """Клієнт CRM export API через hubspot_http (квота bulk і circuit breaker)"""
+    return HubSpotCrmExport(
+        hubspot_http,
+        {"Authorization": f"Bearer {HUBSPOT_API_KEY}", "Content-Type": "application/json"},
+        poll_interval=float(os.getenv('HUBSPOT_EXPORT_POLL_SECONDS', '5')),
+        timeout=float(os.getenv('HUBSPOT_EXPORT_TIMEOUT_SECONDS', '3600'))
+    )
+
+def bootstrap_from_hubspot_exports(progress=None, objects=('contacts', 'deals')):
+    """Початкове завантаження контактів і deals через CRM export API HubSpot
+
+    HubSpot готує CSV з усіма записами, файл читається потоком і пакетами по
+    IMPORT_BATCH_SIZE записів проходить тими самими шляхами запису, що й звичайний імпорт:
+    контакти - дзеркало hubspot_contact і apply_hubspot_contact_record, deals - DealMapper
+    і apply_lead_record. Контакти завантажуються першими: email та ім'я контакту deal
+    беруться з дзеркала, owners - одним списком, тому на запис не витрачається жодного запиту.
+    Сирі записи пишуться в sync_archive, як і при звичайному імпорті.
+    """
+    from datetime import datetime
+    
+    if not hubspot_client:
+        print("⚠️ HubSpot API не налаштований")
+        app.logger.warning("HubSpot API не налаштований для початкового завантаження")
+        return {'contacts': None, 'deals': None}
+    
+    export = hubspot_crm_export()
+    result = {'contacts': None, 'deals': None}
+    
+    def on_poll(label):
+        def report(status, waited):
+            app.logger.info(f"⏳ Експорт {label}: {status}, {waited:.0f} с")
+            if progress:
+                progress(stage=f'Експорт {label}: {status}')
+        return report
+    
+    if 'contacts' in objects:
+        counts = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0}
+        default_agent = User.query.filter(
+            (User.role == 'admin') | (User.role == 'agent')
+        ).first()
+        default_agent_id = default_agent.id if default_agent else None
+        synced_at = datetime.utcnow()
+        memory = import_memory_monitor('bootstrap_contacts')
+        archive_run = open_sync_archive_run('contacts')
+        
+        def write_contacts(batch):
+            upsert_hubspot_contacts(batch, synced_at)
+            for contact in batch:
+                record = {'id': contact.id, 'properties': contact.properties}
+                if archive_run:
+                    archive_run.append(record)
+                try:
+                    counts[apply_hubspot_contact_record(record, default_agent_id) or 'skipped'] += 1
+                except Exception as contact_error:
+                    app.logger.error(f"❌ Помилка обробки контакту {contact.id}: {contact_error}")
+                    counts['errors'] += 1
+            release_import_batch(memory)
+            if progress:
+                progress(rows=len(batch), stage='Запис контактів', created=counts['created'],
+                         updated=counts['updated'], errors=counts['errors'])
+        
+        properties = list(dict.fromkeys(HUBSPOT_CONTACT_IMPORT_PROPERTIES + HUBSPOT_MIRROR_PROPERTIES + ['hs_object_id']))
+        try:
+            with memory:
+                batch = []
+                rows = export.export('CONTACT', properties, on_poll=on_poll('контактів'))
+                for contact in exported_objects(rows):
+                    counts['rows'] += 1
+                    batch.append(contact)
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        write_contacts(batch)
+                        batch = []
+                if batch:
+                    write_contacts(batch)
+        finally:
+            if archive_run:
+                archive_run.close()
+        
+        counts['memory'] = memory.report()
+        result['contacts'] = counts
+        print(f"✅ Початкове завантаження контактів: {counts}")
+        app.logger.info(f"✅ Початкове завантаження контактів: {counts}")
+    
+    if 'deals' in objects:
+        counts = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0}
+        deal_mapper = build_deal_mapper()
+        owner_emails = load_hubspot_owner_emails()
+        imported_stages = {
+            (pipeline_id, stage_id)
+            for pipeline_id, config in HUBSPOT_IMPORT_PIPELINES.items() for stage_id in config['stages']
+        }
+        memory = import_memory_monitor('bootstrap_deals')
+        archive_run = open_sync_archive_run('deals')
+        
+        def write_deals(batch):
+            # Email та ім'я пов'язаних контактів - одним запитом до дзеркала на пакет
+            contact_ids = {deal.associations[0] for deal in batch if deal.associations}
+            mirror = {
+                row.hubspot_id: row
+                for row in HubSpotContact.query.filter(HubSpotContact.hubspot_id.in_(contact_ids))
+            } if contact_ids else {}
+            for deal in batch:
+                contact = None
+                if deal.associations:
+                    contact_row = mirror.get(deal.associations[0])
+                    contact = {'id': deal.associations[0], 'properties': {
+                        'email': contact_row.email, 'firstname': contact_row.first_name,
+                        'lastname': contact_row.last_name
+                    } if contact_row else {}}
+                owner_id = deal.properties.get('hubspot_owner_id')
+                owner = {'id': owner_id, 'email': owner_emails[owner_id]} if owner_id in owner_emails else None
+                record = {'id': deal.id, 'properties': deal.properties, 'contact': contact, 'owner': owner}
+                if archive_run:
+                    archive_run.append(record)
+                try:
+                    lead_record = deal_mapper.map(record)
+                    counts[apply_lead_record(lead_record) if lead_record else 'skipped'] += 1
+                except Exception as deal_error:
+                    app.logger.error(f"❌ Помилка обробки deal {deal.id}: {deal_error}")
+                    counts['errors'] += 1
+            release_import_batch(memory)
+            if progress:
+                progress(rows=len(batch), stage='Запис deals', created=counts['created'],
+                         updated=counts['updated'], errors=counts['errors'])
+        
+        try:
+            with memory:
+                batch = []
+                rows = export.export('DEAL', HUBSPOT_DEAL_IMPORT_PROPERTIES, associated_object_type='CONTACT',
+                                     on_poll=on_poll('deals'))
+                for deal in exported_objects(rows):
+                    counts['rows'] += 1
+                    # Тільки pipelines/stages, які імпортує fetch_all_deals_from_hubspot
+                    if (deal.properties.get('pipeline'), deal.properties.get('dealstage')) not in imported_stages:
+                        counts['skipped'] += 1
+                        continue
+                    batch.append(deal)
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        write_deals(batch)
+                        batch = []
+                if batch:
+                    write_deals(batch)
+        finally:
+            if archive_run:
+                archive_run.close()
+        
+        counts['memory'] = memory.report()
+        result['deals'] = counts
+        print(f"✅ Початкове завантаження deals: {counts}")
+        app.logger.info(f"✅ Початкове завантаження deals: {counts}")
+    
+    return result
+
+def run_hubspot_bootstrap_job(progress=None):
+    """Фонова задача початкового завантаження через CRM export API (через single-flight)"""
+    return hubspot_single_flight.do(
+        'hubspot_bootstrap', bootstrap_from_hubspot_exports, progress=progress, wait_timeout=None
+    )
 
 def sync_notes_polling():
     """Періодична перевірка нових нотаток з HubSpot для всіх лідов"""
@@ -2686,23 +3541,34 @@ def sync_notes_polling():
         return
     
     try:
-        # Отримуємо всі ліді з hubspot_deal_id
+        # Отримуємо ліді з hubspot_deal_id, яких час опитувати (адаптивний інтервал)
         leads_with_deals = Lead.query.filter(
-            Lead.hubspot_deal_id.isnot(None)
+            Lead.hubspot_deal_id.isnot(None),
+            lead_due_for_poll()
         ).all()
         
         synced_count = 0
-        for lead in leads_with_deals:
-            try:
-                # Синхронізуємо тільки нові нотатки
-                if sync_notes_from_hubspot(lead, only_new=True):
-                    synced_count += 1
-            except Exception as lead_error:
-                app.logger.warning(f"⚠️ Помилка синхронізації нотаток для ліда {lead.id}: {lead_error}")
-                continue
+        archive_run = open_sync_archive_run('notes')
+        try:
+            for lead in leads_with_deals:
+                try:
+                    # Спочатку збільшуємо інтервал - нові нотатки скинуть його через reset_lead_poll_on_comment
+                    schedule_next_lead_poll(lead)
+                    # Синхронізуємо тільки нові нотатки
+                    if sync_notes_from_hubspot(lead, only_new=True, archive_run=archive_run):
+                        synced_count += 1
+                    db.session.commit()
+                except Exception as lead_error:
+                    db.session.rollback()
+                    app.logger.warning(f"⚠️ Помилка синхронізації нотаток для ліда {lead.id}: {lead_error}")
+                    continue
+        finally:
+            if archive_run:
+                archive_run.close()
         
         if synced_count > 0:
             app.logger.info(f"📝 Синхронізовано нотатки для {synced_count} лідов")
+        app.logger.info(f"📝 Опитано {len(leads_with_deals)} лідів, яких час опитувати")
         
     except Exception as e:
         app.logger.error(f"❌ Помилка polling нотаток: {e}")
@@ -2730,7 +3596,8 @@ def background_sync_task():
                         app.logger.info("⏰ Початок повної синхронізації з HubSpot (завантаження всіх deals)...")
                         
                         # Завантажуємо всі deals з HubSpot (з deals береться інформація про номери для звірки)
-                        deals_result = fetch_all_deals_from_hubspot()
+                        with hubspot_quota.lane('bulk'):
+                            deals_result = hubspot_single_flight.do('fetch_all_deals', fetch_all_deals_with_stage_labels, wait_timeout=None)
                         print(f"✅ Deals завантажено: створено {deals_result.get('created', 0)}, оновлено {deals_result.get('updated', 0)}, помилок {deals_result.get('errors', 0)}")
                         app.logger.info(f"✅ Повна синхронізація завершена: створено {deals_result.get('created', 0)}, оновлено {deals_result.get('updated', 0)}")
                         last_full_sync = current_time
@@ -2746,7 +3613,8 @@ def background_sync_task():
                 if hubspot_client:
                     print("⏰ Початок автоматичної синхронізації існуючих лідів (періодична, кожні 2 години)...")
                     app.logger.info("⏰ Початок автоматичної синхронізації існуючих лідів (періодична, кожні 2 години)")
-                    sync_all_leads_from_hubspot()
+                    # Тільки найбільш застарілі та активні ліди в межах бюджету API, а не всі ліди
+                    sync_scheduled_leads()
                     print("✅ Автоматична синхронізація завершена")
                     app.logger.info("✅ Автоматична синхронізація завершена")
                     
@@ -2754,6 +3622,13 @@ def background_sync_task():
                     print("📝 Перевірка нових нотаток з HubSpot...")
                     sync_notes_polling()
                     print("✅ Перевірка нотаток завершена")
+                    
+                    # Інкрементальне оновлення дзеркала контактів (тільки змінені контакти)
+                    with hubspot_quota.lane('bulk'):
+                        hubspot_single_flight.do(
+                            SingleFlight.make_key('hubspot_contacts_refresh', full=False),
+                            refresh_hubspot_contacts_mirror, wait_timeout=None
+                        )
                 else:
                     print("⚠️ HubSpot API не налаштований, синхронізація пропущена")
         except Exception as e:
@@ -2767,6 +3642,262 @@ def start_background_sync():
     sync_thread.start()
     print("✅ Фонова синхронізація запущена")
 
+# ===== ФОНОВІ ЗАДАЧІ =====
+# Прогрес задач, що виконуються в цьому процесі (job_id -> JobProgress), для швидкого /api/jobs/<id>
+job_progress_registry = {}
+
+class JobProgress:
+    """Callback прогресу фонової задачі
+    
+    progress(pages=1, rows=100, expected=..., stage=..., created=..., updated=..., errors=...)
+    pages/rows/expected - прирости, created/updated/errors - поточні значення лічильників.
+    Прогрес записується в БД окремим з'єднанням не частіше ніж раз на interval секунд,
+    щоб не комітити транзакцію самої синхронізації. Події для SSE глядачів пишуться
+    в job_event_log не частіше ніж раз на event_interval секунд (або при зміні етапу).
+    """
+    
+    def __init__(self, job_id, interval=2.0, event_interval=0.5):
+        self.job_id = job_id
+        self.interval = interval
+        self.event_interval = event_interval
+        self.values = {'pages_processed': 0, 'rows_processed': 0}
+        self._last_flush = 0
+        self._last_event = 0
+        # SQLite не дозволяє писати з іншого з'єднання, поки синхронізація тримає транзакцію
+        self._persist = not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite')
+        job_progress_registry[job_id] = self
+    
+    def __call__(self, pages=0, rows=0, expected=0, stage=None, created=None, updated=None, errors=None):
+        values = self.values
+        values['pages_processed'] += pages
+        values['rows_processed'] += rows
+        if expected:
+            values['total_rows'] = (values.get('total_rows') or 0) + expected
+        stage_changed = stage is not None and str(stage)[:255] != values.get('stage')
+        if stage is not None:
+            values['stage'] = str(stage)[:255]
+        for key, value in (('created_count', created), ('updated_count', updated), ('errors_count', errors)):
+            if value is not None:
+                values[key] = value
+        now = time.time()
+        if stage_changed or now - self._last_event >= self.event_interval:
+            self._last_event = now
+            self.publish('progress', self.snapshot())
+        if now - self._last_flush >= self.interval:
+            self.flush()
+    
+    def backoff(self, retry_after, attempt):
+        """Повідомляє глядачів, що HubSpot повернув 429 і задача чекає"""
+        self.publish('backoff', {'retry_after': retry_after, 'attempt': attempt, 'stage': self.values.get('stage')})
+    
+    def publish(self, event_name, data):
+        try:
+            job_event_log.publish(self.job_id, event_name, data)
+        except OSError as e:
+            app.logger.warning(f"⚠️ Не вдалося записати подію задачі #{self.job_id}: {e}")
+    
+    def flush(self):
+        """Записує поточний прогрес в таблицю background_job"""
+        self._last_flush = time.time()
+        if not self._persist:
+            return
+        try:
+            table = BackgroundJob.__table__
+            with db.engine.begin() as connection:
+                connection.execute(
+                    table.update().where(table.c.id == self.job_id).values(heartbeat=time.time(), **self.values)
+                )
+        except Exception as e:
+            app.logger.warning(f"⚠️ Не вдалося зберегти прогрес задачі #{self.job_id}: {e}")
+    
+    def snapshot(self):
+        """Прогрес у форматі BackgroundJob.to_dict()"""
+        values = dict(self.values)
+        for key, name in (('created_count', 'created'), ('updated_count', 'updated'), ('errors_count', 'errors')):
+            if key in values:
+                values[name] = values.pop(key)
+        return values
+
+# Смуга квоти HubSpot для фонових задач (за замовчуванням bulk)
+BACKGROUND_JOB_LANES = {'update_stage_labels': 'polling'}
+
+def mark_background_job_failed(job_id, values, error):
+    """Записує status='failed' і прогрес задачі; повертає job.to_dict() для події done
+
+    Якщо запис через сесію не вдається (та сама помилка БД, через яку впала задача),
+    статус пишеться окремим UPDATE на новому з'єднанні - інакше задача лишилась би
+    running до застарілого heartbeat.
+    """
+    try:
+        job = db.session.get(BackgroundJob, job_id)
+        for key, value in values.items():
+            setattr(job, key, value)
+        job.status = 'failed'
+        job.error = str(error)
+        job.heartbeat = time.time()
+        job.finished_at = get_ukraine_time()
+        db.session.commit()
+        return job.to_dict()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"❌ Не вдалося записати помилку задачі #{job_id} через сесію: {e}")
+    
+    try:
+        from sqlalchemy import update
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(BackgroundJob.__table__).where(BackgroundJob.__table__.c.id == job_id).values(
+                    status='failed', error=str(error), heartbeat=time.time(), finished_at=get_ukraine_time()
+                )
+            )
+    except Exception as e:
+        app.logger.error(f"❌ Не вдалося позначити задачу #{job_id} як failed: {e}")
+    return {'id': job_id, 'status': 'failed', 'error': str(error)}
+
+def run_background_job(job_id, target, kwargs, lane='bulk'):
+    """Виконує target(progress=..., **kwargs) і записує результат в BackgroundJob
+
+    Результат target (серіалізується в JSON) - задача completed, виняток - failed.
+    """
+    with app.app_context(), hubspot_quota.lane(lane):
+        progress = JobProgress(job_id)
+        try:
+            result = target(progress=progress, **kwargs)
+            progress.flush()
+            job = db.session.get(BackgroundJob, job_id)
+            for key, value in progress.values.items():
+                setattr(job, key, value)
+            job.status = 'completed'
+            job.result = json.dumps(result, default=str)
+            job.heartbeat = time.time()
+            job.finished_at = get_ukraine_time()
+            db.session.commit()
+            done = job.to_dict()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"❌ Помилка фонової задачі #{job_id}: {e}")
+            traceback.print_exc()
+            done = mark_background_job_failed(job_id, progress.values, e)
+        finally:
+            job_progress_registry.pop(job_id, None)
+        progress.publish(DONE_EVENT, done)
+        print(f"✅ Фонова задача #{job_id} завершена зі статусом {done['status']}")
+
+def enqueue_background_job(job_type, target, **kwargs):
+    """Запускає фонову задачу і повертає (job, created)
+    
+    Якщо задача такого типу вже виконується, нова не створюється - повертається існуюча.
+    """
+    active_job = BackgroundJob.query.filter_by(job_type=job_type, status='running').order_by(
+        BackgroundJob.id.desc()
+    ).first()
+    if active_job and not active_job.is_stale():
+        return active_job, False
+    
+    now = time.time()
+    job = BackgroundJob(
+        job_type=job_type,
+        status='running',
+        created_by=current_user.id if current_user and current_user.is_authenticated else None,
+        started_ts=now,
+        heartbeat=now
+    )
+    db.session.add(job)
+    db.session.commit()
+    job_event_log.prune()
+    
+    lane = BACKGROUND_JOB_LANES.get(job_type, 'bulk')
+    threading.Thread(target=run_background_job, args=(job.id, target, kwargs, lane), daemon=True).start()
+    app.logger.info(f"🚀 Запущено фонову задачу #{job.id} ({job_type})")
+    return job, True
+
+def background_job_response(job, created, message):
+    """JSON відповідь для ендпоінтів, що запускають фонові задачі"""
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': url_for('get_job_status', job_id=job.id),
+        'message': message if created else 'Задача вже виконується',
+        'job': job.to_dict()
+    }), 202
+
+@app.route('/api/jobs/<int:job_id>')
+@login_required
+def get_job_status(job_id):
+    """Статус і прогрес фонової задачі (сторінки, записи, помилки, ETA)"""
+    job = db.session.get(BackgroundJob, job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Задачу не знайдено'}), 404
+    if current_user.role != 'admin' and job.created_by != current_user.id:
+        return jsonify({'success': False, 'message': 'Доступ заборонено'}), 403
+    
+    progress = job_progress_registry.get(job_id)
+    return jsonify({'success': True, 'job': job.to_dict(progress=progress.snapshot() if progress else None)})
+
+@app.route('/api/jobs/<int:job_id>/events')
+@login_required
+def get_job_events(job_id):
+    """Потік подій фонової задачі (text/event-stream): прогрес, 429 backoff, завершення
+    
+    БД читається один раз при підключенні, далі події йдуть з job_event_log.
+    Потік закривається раніше за timeout gunicorn, EventSource перепідключається
+    з Last-Event-ID і продовжує з того ж місця. Без JOB_EVENTS_SSE_ENABLED - 204:
+    EventSource закривається без перепідключення і сторінка переходить на опитування.
+    """
+    from flask import Response, stream_with_context
+    
+    if not JOB_EVENTS_SSE_ENABLED:
+        return Response(status=204)
+    
+    job = db.session.get(BackgroundJob, job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Задачу не знайдено'}), 404
+    if current_user.role != 'admin' and job.created_by != current_user.id:
+        return jsonify({'success': False, 'message': 'Доступ заборонено'}), 403
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        last_event_id = int(last_event_id)
+    except ValueError:
+        last_event_id = 0
+    
+    if job.status != 'running' and not job_event_log.exists(job_id):
+        # Задача завершилась до появи журналу подій (або журнал вже видалено)
+        stream = iter([format_sse(DONE_EVENT, job.to_dict())])
+    else:
+        stream = job_event_log.stream(job_id, last_event_id)
+    # З'єднання з БД не тримаємо, поки відкритий потік
+    db.session.remove()
+    
+    response = Response(stream_with_context(stream), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Вимикаємо буферизацію nginx, щоб події доходили одразу
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def call_hubspot_with_backoff(api_method, *args, on_backoff=None, max_retries=3, **kwargs):
+    """Виклик HubSpot API з повтором після 429 (Too Many Requests)
+    
+    Чекає Retry-After (або експоненційну затримку) і повідомляє on_backoff(retry_after, attempt).
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return api_method(*args, **kwargs)
+        except Exception as e:
+            if getattr(e, 'status', None) != 429 or attempt >= max_retries:
+                raise
+            retry_after = 2 ** (attempt + 1)
+            headers = getattr(e, 'headers', None)
+            if headers and headers.get('Retry-After'):
+                try:
+                    retry_after = float(headers.get('Retry-After'))
+                except (TypeError, ValueError):
+                    pass
+            app.logger.warning(f"⚠️ HubSpot 429, повтор через {retry_after}с (спроба {attempt + 1}/{max_retries})")
+            if on_backoff:
+                on_backoff(retry_after, attempt + 1)
+            time.sleep(retry_after)
+
 # Маршрути
 @app.route('/')
 def index():
@@ -3189,6 +4320,7 @@ def delete_lead(lead_id):
     try:
         # Видаляємо пов'язані записи
         Activity.query.filter_by(lead_id=lead_id).delete()
+        DuplicateClusterMember.query.filter_by(lead_id=lead_id).delete()
         
         # Видаляємо лід
         lead_name = lead.deal_name
@@ -3620,18 +4752,17 @@ def add_lead():
             # Валідація та форматування телефону
             phone_number = form.phone.data
             app.logger.info(f"📞 Валідація номера телефону: {phone_number[:5]}...")
-            try:
-                parsed_number = phonenumbers.parse(phone_number, None)
-                if not phonenumbers.is_valid_number(parsed_number):
-                    app.logger.error(f"❌ Невірний формат номера телефону: {phone_number}")
-                    flash('Невірний формат номера телефону', 'error')
-                    return redirect(url_for('add_lead'))
-                formatted_phone = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
-                app.logger.info(f"✅ Телефон відформатовано: {formatted_phone}")
-            except phonenumbers.NumberParseException as e:
-                app.logger.error(f"❌ Помилка парсингу номера: {e}")
+            normalized_phone = normalize_phone(phone_number)
+            if not normalized_phone or not normalized_phone.e164:
+                app.logger.error(f"❌ Помилка парсингу номера: {phone_number}")
                 flash('Невірний формат номера телефону', 'error')
                 return redirect(url_for('add_lead'))
+            if not normalized_phone.is_valid:
+                app.logger.error(f"❌ Невірний формат номера телефону: {phone_number}")
+                flash('Невірний формат номера телефону', 'error')
+                return redirect(url_for('add_lead'))
+            formatted_phone = normalized_phone.international
+            app.logger.info(f"✅ Телефон відформатовано: {formatted_phone}")
             
             # ⚡ ОПТИМІЗАЦІЯ: Спочатку зберігаємо лід в локальній БД для швидкості
             # Потім асинхронно синхронізуємо з HubSpot
@@ -3698,258 +4829,51 @@ def add_lead():
             hubspot_contact_id = None
             hubspot_deal_id = None
             hubspot_sync_success = False
+            hubspot_quota_exceeded = False
             
             # Тепер пробуємо синхронізувати з HubSpot (не блокує відповідь при помилці)
             app.logger.info(f"🔍 Перевірка HubSpot клієнта: hubspot_client = {hubspot_client is not None}, HUBSPOT_API_KEY = {'встановлено' if HUBSPOT_API_KEY else 'НЕ встановлено'}")
             
             if hubspot_client:
                 app.logger.info(f"✅ HubSpot клієнт доступний, починаємо синхронізацію...")
-                print(f"=== СТВОРЕННЯ УГОДИ В HUBSPOT (БЕЗ КОНТАКТІВ) ===")
+                print(f"=== СТВОРЕННЯ УГОДИ В HUBSPOT ===")
                 print(f"Email: {form.email.data}")
                 print(f"Deal name: {form.deal_name.data}")
                 print(f"Phone: {formatted_phone}")
                 print(f"Budget: {form.budget.data}")
                 print(f"HubSpot client: {hubspot_client}")
                 
-                # ВИМКНЕНО: Створення контактів, deals та асоціацій відключено
-                # Контакти та deals більше не створюються
-                hubspot_contact_id = None
-                hubspot_deal_id = None
-                
-                # ВИМКНЕНО: Створення deals відключено
-                # Симулюємо помилку синхронізації для користувача
-                print(f"=== СТВОРЕННЯ УГОДИ В HUBSPOT ВИМКНЕНО ===")
-                print(f"⚠️ Створення угод в HubSpot тимчасово відключено")
-                app.logger.warning(f"⚠️ Створення HubSpot угоди для ліда {lead.id} відключено")
-                
-                # Встановлюємо помилку синхронізації
-                hubspot_sync_success = False
-                
-                # Старий код створення deals (закоментовано):
-                """
-                try:
-                    # Створюємо deal в HubSpot (без контактів)
-                        print(f"=== СТВОРЕННЯ УГОДИ В HUBSPOT ===")
-                        print(f"Створюємо угоду в HubSpot: {form.deal_name.data}")
-                        print(f"Контакт ID: {hubspot_contact_id}")
-                        try:
-                            from hubspot.crm.deals import SimplePublicObjectInput as DealInput
-                            
-                            # Отримуємо HubSpot owner ID для агента
-                            hubspot_owner_id = None
-                            agent = User.query.get(form.agent_id.data) if form.agent_id.data else current_user
-                            if agent and hubspot_client:
-                                try:
-                                    # Шукаємо owner в HubSpot по email агента
-                                    print(f"🔍 Пошук HubSpot owner для агента: {agent.email}")
-                                    owners = hubspot_client.crm.owners.owners_api.get_page()
-                                    for owner in owners.results:
-                                        if owner.email and owner.email.lower() == agent.email.lower():
-                                            hubspot_owner_id = str(owner.id)
-                                            print(f"✅ Знайдено HubSpot owner ID: {hubspot_owner_id} для {agent.email}")
-                                            break
-                                    if not hubspot_owner_id:
-                                        print(f"⚠️ HubSpot owner не знайдено для {agent.email}")
-                                except Exception as owner_error:
-                                    print(f"⚠️ Помилка пошуку HubSpot owner: {owner_error}")
-                                    app.logger.warning(f"⚠️ Помилка пошуку HubSpot owner для {agent.email}: {owner_error}")
-                            
-                            # Отримуємо username вибраного агента (може бути інший агент, якщо адмін вибрав)
-                            selected_agent = User.query.get(selected_agent_id) if selected_agent_id else current_user
-                            agent_username = selected_agent.username if selected_agent else current_user.username
-                            
-                            # Використовуємо pipeline "default" з stage "appointmentscheduled"
-                            deal_properties = {
-                                "dealname": form.deal_name.data,
-                                "amount": get_budget_value(form.budget.data),
-                                "dealtype": "newbusiness",
-                                "pipeline": "default",  # Pipeline ID для "default"
-                                "dealstage": "appointmentscheduled",  # Стадія для "default" pipeline
-                                "phone_number": formatted_phone,  # Додаємо номер телефону в угоду
-                                "from_agent_portal__name_": agent_username,  # Ім'я агента (обробника), який відповідає за лід
-                                # "responisble_agent": agent_username,  # Поле не існує в HubSpot, видалено
-                            }
-                            
-                            # Додаємо email як окреме поле в угоді (internal name: "email")
-                            if form.email.data and form.email.data.strip():
-                                deal_properties["email"] = form.email.data.strip()
-                                print(f"✅ Додано email до угоди: {form.email.data.strip()}")
-                            
-                            print(f"✅ Використовуємо pipeline: default, stage: appointmentscheduled")
-                            
-                            # Додаємо hubspot_owner_id якщо знайдено
-                            if hubspot_owner_id:
-                                deal_properties["hubspot_owner_id"] = hubspot_owner_id
-                                print(f"✅ Додано hubspot_owner_id: {hubspot_owner_id} до угоди")
-                            else:
-                                print(f"⚠️ hubspot_owner_id не встановлено (owner не знайдено або не налаштовано)")
-                            
-                            print(f"📋 Властивості угоди для HubSpot: {deal_properties}")
-                            deal_input = DealInput(properties=deal_properties)
-                            print(f"Створюємо угоду з вхідними даними: {deal_input}")
-                            app.logger.info(f"📤 Створюємо HubSpot угоду з властивостями: {deal_properties}")
-                            hubspot_deal = hubspot_client.crm.deals.basic_api.create(deal_input)
-                            hubspot_deal_id = str(hubspot_deal.id)
-                            app.logger.info(f"✅ HubSpot угода створено успішно: {hubspot_deal_id}")
-                            print(f"HubSpot угода створено успішно: {hubspot_deal_id}")
-                            
-                            # ВАЖЛИВО: Зберігаємо deal_id одразу після створення, навіть якщо далі буде помилка
-                            lead.hubspot_deal_id = hubspot_deal_id
-                            db.session.commit()
-                            app.logger.info(f"💾 HubSpot deal_id збережено в БД для ліда {lead.id}: {hubspot_deal_id}")
-                            
-                            # ВАЖЛИВО: Явно встановлюємо стадію після створення deal, щоб гарантувати правильну стадію
-                            # Іноді HubSpot може ігнорувати dealstage при створенні, тому оновлюємо окремо
-                            try:
-                                from hubspot.crm.deals import SimplePublicObjectInput
-                                update_input = SimplePublicObjectInput(
-                                    properties={
-                                        "pipeline": "default",  # Pipeline ID для "default"
-                                        "dealstage": "appointmentscheduled"  # Стадія для "default" pipeline
-                                    }
-                                )
-                                hubspot_client.crm.deals.basic_api.update(
-                                    deal_id=hubspot_deal_id,
-                                    simple_public_object_input=update_input
-                                )
-                                app.logger.info(f"✅ Явно встановлено pipeline та dealstage для угоди {hubspot_deal_id}")
-                                print(f"✅ Явно встановлено pipeline та dealstage для угоди {hubspot_deal_id}")
-                            except Exception as update_stage_error:
-                                app.logger.warning(f"⚠️ Помилка явного встановлення стадії для угоди {hubspot_deal_id}: {update_stage_error}")
-                                print(f"⚠️ Помилка явного встановлення стадії: {update_stage_error}")
-                            
-                            # Отримуємо створений deal з HubSpot, щоб встановити правильний статус та hubspot_stage_label
-                            try:
-                                created_deal_full = hubspot_client.crm.deals.basic_api.get_by_id(
-                                    deal_id=hubspot_deal_id,
-                                    properties=["dealstage", "pipeline"]
-                                )
-                                
-                                if created_deal_full.properties:
-                                    dealstage_id = created_deal_full.properties.get('dealstage')
-                                    pipeline_id = created_deal_full.properties.get('pipeline')
-                                    
-                                    app.logger.info(f"📊 Отримано з HubSpot для угоди {hubspot_deal_id}: pipeline={pipeline_id}, dealstage={dealstage_id}")
-                                    print(f"📊 Отримано з HubSpot: pipeline={pipeline_id}, dealstage={dealstage_id}")
-                                    
-                                    if dealstage_id:
-                                        # Маппінг стадій HubSpot на наші статуси (для default pipeline та інших)
-                                    stage_mapping = {
-                                            'appointmentscheduled': 'new',  # Стадія для default pipeline
-                                            '3204738245': 'contacted',      # Стадії для default pipeline
-                                            '3204738246': 'qualified',
-                                            '3523602653': 'qualified',
-                                            '3523660994': 'closed',
-                                            # Стадії для pipeline "Лиды" (2341107958)
-                                            '3204738258': 'new',
-                                            '3204738259': 'contacted',
-                                            '3204738261': 'qualified',
-                                            '3204738262': 'qualified',
-                                            '3204738265': 'qualified',
-                                            '3204738266': 'qualified',
-                                            '3204738267': 'closed'
-                                    }
-                                    
-                                    stage_labels = {
-                                            'appointmentscheduled': 'appointmentscheduled',  # Стадія для default pipeline
-                                            '3204738245': '3204738245',
-                                            '3204738246': '3204738246',
-                                            '3523602653': '3523602653',
-                                            '3523660994': '3523660994',
-                                            # Стадії для pipeline "Лиды"
-                                        '3204738258': 'Запрос получен',
-                                        '3204738259': 'Отправлены варианты/Передан на партнеров',
-                                        '3204738261': 'Назначена встреча/тур',
-                                        '3204738262': 'Встреча/тур проведены',
-                                        '3204738265': 'Переговоры',
-                                        '3204738266': 'Задаток',
-                                        '3204738267': 'Сделка закрыта'
-                                    }
-                                    
-                                    # Встановлюємо статус та label
-                                    if dealstage_id in stage_mapping:
-                                        lead.status = stage_mapping[dealstage_id]
-                                        print(f"✅ Встановлено статус з HubSpot: {lead.status}")
-                                        
-                                        if dealstage_id in stage_labels:
-                                            lead.hubspot_stage_label = stage_labels[dealstage_id]
-                                            print(f"✅ Встановлено hubspot_stage_label: {lead.hubspot_stage_label}")
-                                        
-                                        # Перевіряємо, чи стадія правильна для default pipeline
-                                        if pipeline_id == 'default' and dealstage_id != 'appointmentscheduled':
-                                            app.logger.warning(f"⚠️ Увага: Стадія угоди {hubspot_deal_id} = {dealstage_id}, очікувалось appointmentscheduled")
-                                            print(f"⚠️ Увага: Стадія угоди = {dealstage_id}, очікувалось appointmentscheduled")
-                                        
-                                        # Зберігаємо зміни
-                                        db.session.commit()
-                                    
-                                    if dealstage_id in stage_labels:
-                                        lead.hubspot_stage_label = stage_labels[dealstage_id]
-                                        print(f"✅ Встановлено hubspot_stage_label: {lead.hubspot_stage_label}")
-                                    
-                                    # Зберігаємо зміни
-                                    db.session.commit()
-                            except Exception as stage_error:
-                                print(f"⚠️ Помилка отримання dealstage з HubSpot: {stage_error}")
-                                app.logger.warning(f"⚠️ Помилка отримання dealstage для нового ліда {lead.id}: {stage_error}")
-                            
-                            # Перевіряємо, чи email передався в угоду, якщо ні - оновлюємо окремо
-                            if form.email.data and form.email.data.strip() and hubspot_deal_id:
-                                try:
-                                    # Перевіряємо, чи email є в створеній угоді
-                                    created_deal = hubspot_client.crm.deals.basic_api.get_by_id(
-                                        deal_id=hubspot_deal_id,
-                                        properties=["email"]
-                                    )
-                                    deal_email = created_deal.properties.get('email') if created_deal.properties else None
-                                    
-                                    # Якщо email не передався при створенні, оновлюємо окремо
-                                    if not deal_email or deal_email != form.email.data.strip():
-                                        print(f"⚠️ Email не передався при створенні, оновлюємо окремо...")
-                                        update_deal_properties = {"email": form.email.data.strip()}
-                                        update_deal_input = DealInput(properties=update_deal_properties)
-                                        hubspot_client.crm.deals.basic_api.update(
-                                            deal_id=hubspot_deal_id,
-                                            simple_public_object_input=update_deal_input
-                                        )
-                                        print(f"✅ Email успішно оновлено в угоді: {form.email.data.strip()}")
-                                        app.logger.info(f"✅ Email оновлено в HubSpot угоді {hubspot_deal_id}: {form.email.data.strip()}")
-                                    else:
-                                        print(f"✅ Email вже є в угоді: {deal_email}")
-                                except Exception as email_update_error:
-                                    print(f"⚠️ Помилка перевірки/оновлення email в угоді: {email_update_error}")
-                                    app.logger.warning(f"⚠️ Помилка перевірки/оновлення email в угоді {hubspot_deal_id}: {email_update_error}")
-                            
-                            # ВИМКНЕНО: Створення асоціацій між контактами та угодами відключено
-                            # print(f"=== СТВОРЕННЯ ЗВ'ЯЗКУ КОНТАКТ-УГОДА ===")
-                            # Асоціації більше не створюються
-                        except Exception as deal_error:
-                            error_type = type(deal_error).__name__
-                            error_msg = str(deal_error)
-                            print(f"=== ПОМИЛКА СТВОРЕННЯ УГОДИ ===")
-                            print(f"Помилка створення угоди: {deal_error}")
-                            app.logger.error(f"❌ Помилка створення HubSpot угоди для ліда {lead.id}: {error_type}: {error_msg}")
-                            # Перевіряємо, чи це проблема з мережею
-                            if "NameResolutionError" in error_type or "Failed to resolve" in error_msg:
-                                app.logger.error(f"   ⚠️ ПРОБЛЕМА З МЕРЕЖЕЮ/DNS: Не вдається вирішити 'api.hubapi.com'")
-                            # Не критична помилка - продовжуємо
+                if HUBSPOT_CREATE_DEALS:
+                    try:
+                        # Контакт (upsert за email) і угода з owner та асоціацією - 1-2 запити
+                        hubspot_contact_id, hubspot_deal_id = create_hubspot_deal_for_lead(lead, selected_agent)
+                        db.session.commit()
                         hubspot_sync_success = True
-                        print(f"✅ HubSpot синхронізація успішна! Contact: {hubspot_contact_id}, Deal: {hubspot_deal_id if hubspot_deal_id else 'не створено'}")
-                    else:
-                        hubspot_sync_success = False
-                        print("⚠️ HubSpot синхронізація не виконана (контакт не створений)")
-                """
+                        print(f"✅ HubSpot синхронізація успішна! Contact: {hubspot_contact_id}, Deal: {hubspot_deal_id}")
+                    except Exception as deal_error:
+                        db.session.rollback()
+                        error_type = type(deal_error).__name__
+                        error_msg = str(deal_error)
+                        print(f"=== ПОМИЛКА СТВОРЕННЯ УГОДИ ===")
+                        print(f"Помилка створення угоди: {deal_error}")
+                        app.logger.error(f"❌ Помилка створення HubSpot угоди для ліда {lead.id}: {error_type}: {error_msg}")
+                        hubspot_quota_exceeded = isinstance(deal_error, HubSpotQuotaExceeded)
+                        # Перевіряємо, чи це проблема з мережею
+                        if "NameResolutionError" in error_type or "Failed to resolve" in error_msg:
+                            app.logger.error(f"   ⚠️ ПРОБЛЕМА З МЕРЕЖЕЮ/DNS: Не вдається вирішити 'api.hubapi.com'")
+                        hubspot_contact_id = None
+                        hubspot_deal_id = None
+                else:
+                    # Створення угод вимкнено (HUBSPOT_CREATE_DEALS=false)
+                    print(f"=== СТВОРЕННЯ УГОДИ В HUBSPOT ВИМКНЕНО ===")
+                    print(f"⚠️ Створення угод в HubSpot тимчасово відключено")
+                    app.logger.warning(f"⚠️ Створення HubSpot угоди для ліда {lead.id} відключено")
                     
             else:
                 app.logger.warning(f"⚠️ HubSpot клієнт не доступний! hubspot_client = {hubspot_client}, HUBSPOT_API_KEY = {'встановлено' if HUBSPOT_API_KEY else 'НЕ встановлено'}")
                 print("⚠️ HubSpot клієнт не налаштований, пропускаємо синхронізацію")
             
-            # ⚡ ОПТИМІЗАЦІЯ: Оновлюємо лід з HubSpot ID, якщо синхронізація успішна
-            # ВИМКНЕНО: hubspot_contact_id більше не зберігається
             if hubspot_deal_id:
-                # lead.hubspot_contact_id = hubspot_contact_id  # ВИМКНЕНО
-                lead.hubspot_deal_id = hubspot_deal_id
-                db.session.commit()
                 print(f"Лід #{lead.id} оновлено з HubSpot Deal ID: {hubspot_deal_id}")
             
             # Повертаємо відповідь користувачу
@@ -3957,6 +4881,8 @@ def add_lead():
                 app.logger.info(f"🎉 УСПІХ! Лід #{lead.id} додано локально та синхронізовано з HubSpot!")
                 app.logger.info(f"   HubSpot Deal ID: {hubspot_deal_id}")
                 flash('Лід успішно додано та синхронізовано з HubSpot!', 'success')
+            elif hubspot_quota_exceeded:
+                flash(f'Лід успішно додано локально! {HUBSPOT_QUOTA_MESSAGE}.', 'warning')
             else:
                 app.logger.info(f"🎉 УСПІХ! Лід #{lead.id} додано локально!")
                 app.logger.warning(f"⚠️ HubSpot синхронізація не виконана")
@@ -4122,155 +5048,28 @@ def create_lead_comment(lead_id):
             app.logger.warning(f"⚠️ HUBSPOT_API_KEY не встановлено, синхронізація з HubSpot пропущена")
             print(f"⚠️ HUBSPOT_API_KEY не встановлено, синхронізація з HubSpot пропущена")
         
+        message = 'Коментар успішно створено'
         # Спробуємо синхронізувати, якщо всі умови виконані
+        # ВАЖЛИВО: HubSpot не підтримує тредовані нотатки, тому кожен коментар = окрема нотатка
         if lead.hubspot_deal_id and hubspot_client and hubspot_api_key:
             try:
-                from hubspot.crm.objects.notes import SimplePublicObjectInput
-                from datetime import datetime, timezone
-                
-                # Формуємо текст нотатки (без email в тексті)
-                # ВАЖЛИВО: HubSpot не підтримує тредовані нотатки, тому кожен коментар = окрема нотатка
-                note_body = content
-                app.logger.info(f"📝 Створюється нотатка в HubSpot для коментаря (deal_id: {lead.hubspot_deal_id})")
-                
-                # HubSpot вимагає hs_timestamp в форматі ISO8601
-                current_timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-                
-                # Використовуємо правильну назву поля: hsnotebody (без підкреслення)
-                # Спробуємо створити нотатку через прямий HTTP запит для кращого контролю
-                import requests
-                
-                # Використовуємо hubspot_api_key, який вже перевірено вище
-                if not hubspot_api_key:
-                    app.logger.error(f"❌ HUBSPOT_API_KEY не знайдено!")
-                    print(f"❌ HUBSPOT_API_KEY не знайдено!")
-                    raise ValueError("HUBSPOT_API_KEY не встановлено")
-                
-                # Створюємо нотатку через v3 API
-                url = "https://api.hubapi.com/crm/v3/objects/notes"
-                headers = {
-                    "Authorization": f"Bearer {hubspot_api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # Створюємо нотатку БЕЗ асоціації в одному запиті (v3 API не підтримує асоціації при створенні)
-                note_data = {
-                    "properties": {
-                        "hs_note_body": note_body,
-                        "hs_timestamp": current_timestamp
-                    }
-                }
-                
                 app.logger.info(f"📝 Створення нотатки в HubSpot для deal {lead.hubspot_deal_id}")
-                app.logger.info(f"   Тіло запиту: {note_data}")
-                
-                response = requests.post(url, headers=headers, json=note_data)
-                
-                app.logger.info(f"📥 Відповідь HubSpot API: {response.status_code}")
-                app.logger.info(f"   Response headers: {dict(response.headers)}")
-                app.logger.info(f"   Response body: {response.text[:1000] if response.text else 'Empty'}")
-                
-                if response.status_code in [200, 201]:
-                    try:
-                        response_data = response.json()
-                        hubspot_note_id = response_data.get('id')
-                        if hubspot_note_id:
-                            comment.hubspot_note_id = str(hubspot_note_id)
-                            app.logger.info(f"✅ Нотатка створена в HubSpot: {hubspot_note_id}")
-                            print(f"✅ Нотатка створена в HubSpot: {hubspot_note_id}")
-                            
-                            # Тепер створюємо асоціацію через окремий запит (v3 API)
-                            try:
-                                # Правильний формат для HubSpot v3 API associations
-                                # PUT /crm/v3/objects/notes/{noteId}/associations/deal/{dealId}/214
-                                # 214 - це тип асоціації для NOTE_TO_DEAL
-                                assoc_url = f"https://api.hubapi.com/crm/v3/objects/notes/{hubspot_note_id}/associations/deal/{lead.hubspot_deal_id}/214"
-                                
-                                app.logger.info(f"📝 Створення асоціації note {hubspot_note_id} з deal {lead.hubspot_deal_id}")
-                                app.logger.info(f"   URL: {assoc_url}")
-                                
-                                # PUT запит без body (v3 API)
-                                assoc_response = requests.put(assoc_url, headers=headers, timeout=10)
-                                
-                                app.logger.info(f"📥 Відповідь HubSpot API (асоціація): {assoc_response.status_code}")
-                                app.logger.info(f"   Response body: {assoc_response.text[:500] if assoc_response.text else 'Empty'}")
-                                
-                                if assoc_response.status_code in [200, 201, 204]:
-                                    app.logger.info(f"✅ Нотатка асоційована з deal в HubSpot: {hubspot_note_id}")
-                                    print(f"✅ Нотатка створена та асоційована з deal в HubSpot: {hubspot_note_id}")
-                                else:
-                                    app.logger.error(f"❌ Асоціація не вдалася: {assoc_response.status_code}")
-                                    app.logger.error(f"   Response: {assoc_response.text}")
-                                    print(f"❌ Нотатка створена, але асоціація не вдалася: {assoc_response.status_code} - {assoc_response.text[:200]}")
-                                    # Коментар все одно зберігається з hubspot_note_id
-                            except Exception as assoc_error:
-                                app.logger.error(f"❌ Помилка створення асоціації: {assoc_error}")
-                                app.logger.error(f"   Traceback: {traceback.format_exc()}")
-                                print(f"❌ Помилка створення асоціації: {assoc_error}")
-                                # Коментар все одно зберігається з hubspot_note_id
-                        else:
-                            app.logger.error(f"❌ Нотатка створена, але ID не отримано в response_data: {response_data}")
-                            print(f"❌ Нотатка створена, але ID не отримано")
-                    except Exception as json_error:
-                        app.logger.error(f"❌ Помилка парсингу JSON відповіді: {json_error}")
-                        app.logger.error(f"   Response text: {response.text[:500]}")
-                        print(f"❌ Помилка парсингу JSON відповіді: {json_error}")
+                # Нотатка і асоціація з deal - одним запитом
+                created, errors = hubspot_notes().create([hubspot_note_input(comment)])
+                hubspot_note_id = created.get(str(comment.id))
+                if hubspot_note_id:
+                    comment.hubspot_note_id = hubspot_note_id
+                    app.logger.info(f"✅ Нотатка створена та асоційована з deal в HubSpot: {hubspot_note_id}")
+                    print(f"✅ Нотатка створена та асоційована з deal в HubSpot: {hubspot_note_id}")
                 else:
-                    # Якщо HTTP запит не працює, спробуємо через SDK як fallback
-                    app.logger.error(f"❌ HTTP запит не вдався ({response.status_code})")
-                    app.logger.error(f"   Response: {response.text[:1000]}")
-                    print(f"❌ HTTP запит не вдався ({response.status_code}): {response.text[:200]}")
-                    
-                    try:
-                        # Fallback через SDK
-                        note_properties = {
-                            "hs_note_body": note_body,
-                            "hs_timestamp": current_timestamp
-                        }
-                        note_input = SimplePublicObjectInput(properties=note_properties)
-                        hubspot_note = hubspot_client.crm.objects.notes.basic_api.create(
-                            simple_public_object_input=note_input
-                        )
-                        
-                        if hubspot_note.id:
-                            comment.hubspot_note_id = str(hubspot_note.id)
-                            
-                            # Асоціюємо через окремий запит (v3 API)
-                            try:
-                                # Правильний формат для HubSpot v3 API associations
-                                # PUT /crm/v3/objects/notes/{noteId}/associations/deal/{dealId}/214
-                                # 214 - це тип асоціації для NOTE_TO_DEAL
-                                assoc_url = f"https://api.hubapi.com/crm/v3/objects/notes/{hubspot_note.id}/associations/deal/{lead.hubspot_deal_id}/214"
-                                assoc_headers = {
-                                    "Authorization": f"Bearer {hubspot_api_key}",
-                                    "Content-Type": "application/json"
-                                }
-                                
-                                app.logger.info(f"📝 Створення асоціації note {hubspot_note.id} з deal {lead.hubspot_deal_id} (fallback)")
-                                
-                                assoc_response = requests.put(assoc_url, headers=assoc_headers, timeout=10)
-                                
-                                app.logger.info(f"📥 Відповідь HubSpot API (асоціація fallback): {assoc_response.status_code}")
-                                app.logger.info(f"   Response body: {assoc_response.text[:500] if assoc_response.text else 'Empty'}")
-                                
-                                if assoc_response.status_code in [200, 201, 204]:
-                                    app.logger.info(f"✅ Нотатка створена та асоційована з deal (fallback) в HubSpot: {hubspot_note.id}")
-                                    print(f"✅ Нотатка створена та асоційована з deal (fallback) в HubSpot: {hubspot_note.id}")
-                                else:
-                                    app.logger.warning(f"⚠️ Асоціація не вдалася: {assoc_response.status_code} - {assoc_response.text}")
-                                    print(f"⚠️ Нотатка створена, але асоціація не вдалася: {assoc_response.status_code}")
-                            except Exception as assoc_error:
-                                app.logger.error(f"❌ Помилка асоціації: {assoc_error}")
-                                app.logger.error(f"   Traceback: {traceback.format_exc()}")
-                                print(f"⚠️ Помилка асоціації: {assoc_error}")
-                    except Exception as sdk_error:
-                        app.logger.error(f"❌ Помилка створення нотатки через SDK: {sdk_error}")
-                        print(f"❌ Помилка створення нотатки через SDK: {sdk_error}")
-                    
+                    app.logger.error(f"❌ Нотатку не створено в HubSpot: {errors.get(str(comment.id))}")
+                    print(f"❌ Нотатку не створено в HubSpot: {errors.get(str(comment.id))}")
+            except HubSpotQuotaExceeded:
+                # Нотатку створить flask maintenance fix-unsynced-comments
+                app.logger.warning(f"⚠️ Нотатку для коментаря {comment.id} не створено: квоту HubSpot вичерпано")
+                message = f'Коментар збережено, але не синхронізовано з HubSpot: {HUBSPOT_QUOTA_MESSAGE}'
             except Exception as hubspot_error:
                 app.logger.error(f"❌ Помилка створення нотатки в HubSpot: {hubspot_error}")
-                app.logger.error(f"   Тип помилки: {type(hubspot_error).__name__}")
-                import traceback
                 app.logger.error(f"   Traceback: {traceback.format_exc()}")
                 print(f"❌ Помилка створення нотатки в HubSpot: {hubspot_error}")
                 # Продовжуємо - коментар все одно зберігається локально
@@ -4280,7 +5079,7 @@ def create_lead_comment(lead_id):
         return jsonify({
             'success': True,
             'comment': comment.to_dict(),
-            'message': 'Коментар успішно створено'
+            'message': message
         }), 201
         
     except Exception as e:
@@ -4459,6 +5258,9 @@ def edit_lead(lead_id):
                 )
                 print(f"✅ Email оновлено в HubSpot угоді {lead.hubspot_deal_id}: {form.email.data.strip()}")
                 app.logger.info(f"✅ Email оновлено в HubSpot угоді {lead.hubspot_deal_id}: {form.email.data.strip()}")
+            except HubSpotQuotaExceeded:
+                app.logger.warning(f"⚠️ Email не оновлено в HubSpot угоді {lead.hubspot_deal_id}: квоту вичерпано")
+                flash(f'Email не оновлено в HubSpot: {HUBSPOT_QUOTA_MESSAGE}.', 'warning')
             except Exception as email_update_error:
                 print(f"⚠️ Помилка оновлення email в HubSpot угоді: {email_update_error}")
                 app.logger.warning(f"⚠️ Помилка оновлення email в HubSpot угоді {lead.hubspot_deal_id}: {email_update_error}")
@@ -4468,10 +5270,13 @@ def edit_lead(lead_id):
             print(f"🔄 Статус змінився з '{old_status}' на '{lead.status}', оновлюємо HubSpot...")
             app.logger.info(f"🔄 Статус ліда {lead.id} змінився з '{old_status}' на '{lead.status}', оновлюємо HubSpot...")
             
-            if update_hubspot_dealstage(lead, lead.status):
-                flash(f'Лід успішно оновлено! Статус синхронізовано з HubSpot.', 'success')
-            else:
-                flash(f'Лід оновлено локально, але статус не було синхронізовано з HubSpot.', 'warning')
+            try:
+                if update_hubspot_dealstage(lead, lead.status):
+                    flash(f'Лід успішно оновлено! Статус синхронізовано з HubSpot.', 'success')
+                else:
+                    flash(f'Лід оновлено локально, але статус не було синхронізовано з HubSpot.', 'warning')
+            except HubSpotQuotaExceeded:
+                flash(f'Лід оновлено локально, статус не синхронізовано: {HUBSPOT_QUOTA_MESSAGE}.', 'warning')
         else:
             flash('Лід успішно оновлено!', 'success')
         
@@ -4510,11 +5315,9 @@ def sync_all_leads():
         return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
     
     try:
-        success = sync_all_leads_from_hubspot()
-        if success:
-            return jsonify({'success': True, 'message': 'Всі ліди успішно синхронізовано з HubSpot'})
-        else:
-            return jsonify({'success': False, 'message': 'Помилка синхронізації з HubSpot'})
+        # Синхронізація триває хвилини - виконуємо у фоні, прогрес через /api/jobs/<id>
+        job, created = enqueue_background_job('sync_all_leads', sync_all_leads_from_hubspot)
+        return background_job_response(job, created, 'Синхронізацію всіх лідів запущено')
     except Exception as e:
         return jsonify({'success': False, 'message': f'Помилка: {str(e)}'})
 
@@ -4554,9 +5357,12 @@ def change_lead_agent(lead_id):
         
         # Оновлюємо HubSpot, якщо є deal_id
         hubspot_updated = False
+        hubspot_message = None
         if lead.hubspot_deal_id:
             try:
                 hubspot_updated = update_hubspot_owner(lead, new_agent_id)
+            except HubSpotQuotaExceeded:
+                hubspot_message = HUBSPOT_QUOTA_MESSAGE
             except Exception as e:
                 app.logger.error(f"❌ Помилка оновлення HubSpot для ліда {lead.id}: {e}")
         
@@ -4582,7 +5388,8 @@ def change_lead_agent(lead_id):
                 'username': new_agent.username,
                 'role': new_agent.role
             },
-            'hubspot_updated': hubspot_updated
+            'hubspot_updated': hubspot_updated,
+            'hubspot_message': hubspot_message
         })
         
     except Exception as e:
@@ -4590,6 +5397,29 @@ def change_lead_agent(lead_id):
         app.logger.error(f"❌ Помилка зміни агента для ліда {lead_id}: {e}")
         return jsonify({'success': False, 'message': f'Помилка: {str(e)}'}), 500
 
+def run_fetch_all_deals_job(progress=None):
+    """Фонова задача /fetch_all_deals (через single-flight разом з періодичною синхронізацією)
+
+    Імпорт триває годинами, тому друга задача чекає на лідера без обмеження часу.
+    """
+    return hubspot_single_flight.do(
+        'fetch_all_deals', fetch_all_deals_with_stage_labels, progress=progress, wait_timeout=None
+    )
+
+def fetch_all_deals_with_stage_labels(progress=None):
+    """Завантажує всі deals з HubSpot і оновлює hubspot_stage_label для лідів"""
+    result = fetch_all_deals_from_hubspot(progress=progress)
+    
+    # Після завантаження deals оновлюємо hubspot_stage_label для всіх лідів
+    try:
+        if progress:
+            progress(stage='Оновлення назв стадій')
+        update_hubspot_stage_labels_for_leads(limit=500, force_update=True)
+    except Exception as e:
+        app.logger.error(f"Помилка оновлення hubspot_stage_label після завантаження deals: {e}")
+    
+    return result
+
 @app.route('/fetch_all_deals', methods=['POST'])
 @login_required
 def fetch_all_deals():
@@ -4601,22 +5431,9 @@ def fetch_all_deals():
         return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
     
     try:
-        result = fetch_all_deals_from_hubspot()
-        
-        # Після завантаження deals оновлюємо hubspot_stage_label для всіх лідів
-        try:
-            update_hubspot_stage_labels_for_leads(limit=500, force_update=True)
-        except Exception as e:
-            app.logger.error(f"Помилка оновлення hubspot_stage_label після завантаження deals: {e}")
-        
-        return jsonify({
-            'success': True,
-            'message': f'Завантажено: створено {result.get("created", 0)}, оновлено {result.get("updated", 0)}, помилок {result.get("errors", 0)}',
-            'created': result.get('created', 0),
-            'updated': result.get('updated', 0),
-            'errors': result.get('errors', 0),
-            'total_processed': result.get('total_processed', 0)
-        })
+        # Завантаження триває хвилини - виконуємо у фоні, прогрес через /api/jobs/<id>
+        job, created = enqueue_background_job('fetch_all_deals', run_fetch_all_deals_job)
+        return background_job_response(job, created, 'Завантаження всіх deals з HubSpot запущено')
     except Exception as e:
         app.logger.error(f"Помилка завантаження deals: {e}")
         traceback.print_exc()
@@ -4633,12 +5450,11 @@ def update_stage_labels():
         return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
     
     try:
-        # Оновлюємо всі ліди з hubspot_deal_id
-        updated = update_hubspot_stage_labels_for_leads(limit=1000, force_update=True)
-        return jsonify({
-            'success': True,
-            'message': 'Статуси успішно оновлено'
-        })
+        # Оновлюємо всі ліди з hubspot_deal_id (у фоні, прогрес через /api/jobs/<id>)
+        job, created = enqueue_background_job(
+            'update_stage_labels', update_hubspot_stage_labels_for_leads, limit=1000, force_update=True
+        )
+        return background_job_response(job, created, 'Оновлення статусів запущено')
     except Exception as e:
         app.logger.error(f"Помилка оновлення статусів: {e}")
         traceback.print_exc()
@@ -4655,20 +5471,33 @@ def fetch_all_contacts():
         return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
     
     try:
-        result = fetch_all_contacts_from_hubspot()
-        return jsonify({
-            'success': True,
-            'message': f'Завантажено: створено {result.get("created", 0)}, оновлено {result.get("updated", 0)}, помилок {result.get("errors", 0)}',
-            'created': result.get('created', 0),
-            'updated': result.get('updated', 0),
-            'errors': result.get('errors', 0),
-            'total_processed': result.get('total_processed', 0)
-        })
+        # Завантаження триває хвилини - виконуємо у фоні, прогрес через /api/jobs/<id>
+        job, created = enqueue_background_job('fetch_all_contacts', fetch_all_contacts_from_hubspot)
+        return background_job_response(job, created, 'Завантаження всіх контактів з HubSpot запущено')
     except Exception as e:
         app.logger.error(f"Помилка завантаження контактів: {e}")
         traceback.print_exc()
         return jsonify({'success': False, 'message': f'Помилка: {str(e)}'})
 
+@app.route('/admin/hubspot/bootstrap', methods=['POST'])
+@login_required
+def admin_hubspot_bootstrap():
+    """Початкове завантаження контактів і deals через CRM export API HubSpot (нове середовище, відновлення)"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Тільки адміністратор може запускати початкове завантаження'})
+    
+    if not hubspot_client:
+        return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
+    
+    try:
+        # Експорт готується на стороні HubSpot хвилини - виконуємо у фоні, прогрес через /api/jobs/<id>
+        job, created = enqueue_background_job('hubspot_bootstrap', run_hubspot_bootstrap_job)
+        return background_job_response(job, created, 'Початкове завантаження з експорту HubSpot запущено')
+    except Exception as e:
+        app.logger.error(f"Помилка запуску початкового завантаження: {e}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'message': f'Помилка: {str(e)}'})
+
 @app.route('/sync_lead/<int:lead_id>', methods=['POST'])
 @login_required
 def sync_single_lead(lead_id):
@@ -4680,38 +5509,302 @@ def sync_single_lead(lead_id):
         return jsonify({'success': False, 'message': 'У вас немає прав для синхронізації цього ліда'})
     
     if not hubspot_client:
-        return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
+        return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
+    
+    try:
+        success = sync_lead_from_hubspot(lead)
+        if success:
+            from datetime import datetime
+            # Форматуємо час останньої синхронізації
+            if lead.last_sync_at:
+                last_sync = lead.last_sync_at.strftime('%d.%m.%Y %H:%M')
+            else:
+                last_sync = 'Невідомо'
+            
+            return jsonify({
+                'success': True, 
+                'message': 'Лід успішно синхронізовано з HubSpot',
+                'last_sync_at': last_sync
+            })
+        else:
+            return jsonify({'success': False, 'message': 'Помилка синхронізації з HubSpot'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Помилка: {str(e)}'})
+
+@app.route('/knowledge-base')
+@login_required
+def knowledge_base():
+    """Сторінка Knowledge Base - показує модалку 'to be soon'"""
+    return render_template('knowledge_base.html')
+
+@app.route('/admin/hubspot-contacts')
+@login_required
+def admin_hubspot_contacts():
+    """Сторінка з усіма номерами телефонів з HubSpot CRM (з локальної таблиці hubspot_contact)"""
+    if current_user.role != 'admin':
+        flash('Доступ заборонено')
+        return redirect(url_for('dashboard'))
+    
+    search = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    
+    query = HubSpotContact.query
+    if search:
+        search_digits = phone_digits(search)
+        conditions = [
+            HubSpotContact.email.ilike(f'%{search}%'),
+            HubSpotContact.first_name.ilike(f'%{search}%'),
+            HubSpotContact.last_name.ilike(f'%{search}%'),
+            HubSpotContact.hubspot_id == search
+        ]
+        if len(search_digits) >= 3:
+            conditions.append(HubSpotContact.phone_digits.like(f'%{search_digits}%'))
+        query = query.filter(db.or_(*conditions))
+    
+    pagination = query.filter(HubSpotContact.phones.isnot(None)).order_by(
+        HubSpotContact.hubspot_updated_at.desc()
+    ).paginate(page=page, per_page=50, error_out=False)
+    
+    last_synced_at = db.session.query(func.max(HubSpotContact.synced_at)).scalar()
+    
+    return render_template(
+        'admin_hubspot_contacts.html',
+        contacts=pagination.items,
+        pagination=pagination,
+        search=search,
+        last_synced_at=last_synced_at,
+        hubspot_enabled=hubspot_client is not None
+    )
+
+# ===== ЕКСПОРТ КОНТАКТІВ HUBSPOT =====
+HUBSPOT_CONTACT_PHONE_FIELDS = ['phone', 'phone_number', 'mobilephone', 'hs_phone_number', 'phone_number_1']
+HUBSPOT_CONTACT_EXPORT_PROPERTIES = HUBSPOT_CONTACT_PHONE_FIELDS + ['email', 'firstname', 'lastname']
+HUBSPOT_CONTACTS_CSV_HEADER = ['ID', 'Номер телефону', 'Email', 'Ім\'я']
+HUBSPOT_MIRROR_PROPERTIES = HUBSPOT_CONTACT_EXPORT_PROPERTIES + ['lastmodifieddate']
+# Search API HubSpot віддає не більше 10 000 результатів на один запит (усі сторінки разом)
+HUBSPOT_SEARCH_RESULT_LIMIT = 10000
+# Експорти містять персональні дані, тому зберігаються поза static/ і S3 (public-read)
+EXPORTS_DIR = os.path.join(basedir, 'instance', 'exports')
+
+def iter_hubspot_contact_pages(after=None, max_pages=1000, properties=None, on_backoff=None):
+    """Посторінково віддає контакти з HubSpot: (results, next_after)
+    
+    next_after = None означає, що це остання сторінка: обхід дійшов до кінця тоді й
+    тільки тоді, коли останній next_after - None. Після max_pages сторінок обхід
+    зупиняється з непорожнім next_after (max_pages=None - без обмеження).
+    """
+    page = 0
+    while max_pages is None or page < max_pages:
+        params = {'limit': 100, 'properties': properties or HUBSPOT_CONTACT_EXPORT_PROPERTIES}
+        if after:
+            params['after'] = after
+        contacts_response = call_hubspot_with_backoff(
+            hubspot_client.crm.contacts.basic_api.get_page, on_backoff=on_backoff, **params
+        )
+        
+        if not contacts_response.results:
+            # Порожня сторінка за курсором - теж кінець
+            yield [], None
+            return
+        
+        after = None
+        if contacts_response.paging and contacts_response.paging.next:
+            after = contacts_response.paging.next.after
+        
+        yield contacts_response.results, after
+        
+        if not after:
+            return
+        page += 1
+        
+        # Додаємо затримку між сторінками для rate limiting
+        time.sleep(0.5)
+
+def hubspot_contact_csv_rows(contact):
+    """Рядки CSV для контакту - окремий рядок для кожного номера телефону"""
+    properties = contact.properties
+    name = f"{properties.get('firstname') or ''} {properties.get('lastname') or ''}".strip() or 'Без імені'
+    return [
+        [str(contact.id), properties.get(phone_field), properties.get('email') or '', name]
+        for phone_field in HUBSPOT_CONTACT_PHONE_FIELDS
+        if properties.get(phone_field)
+    ]
+
+def csv_chunk(rows):
+    """Серіалізує рядки в CSV текст"""
+    import csv
+    from io import StringIO
+    
+    output = StringIO()
+    csv.writer(output).writerows(rows)
+    return output.getvalue()
+
+def iter_hubspot_contacts_modified_since(since, result_limit=None):
+    """Посторінково віддає контакти, змінені після since (UTC), через search API
+    
+    Search API віддає не більше result_limit (HUBSPOT_SEARCH_RESULT_LIMIT) результатів на
+    запит, тому діапазон lastmodifieddate від since до поточного часу читається вікнами:
+    вікно, в якому total більший за ліміт, ділиться навпіл ще до читання сторінок.
+    Вікна йдуть від старіших змін до новіших.
+    """
+    from datetime import timezone
+    from hubspot.crm.contacts import PublicObjectSearchRequest, Filter, FilterGroup
+    
+    result_limit = result_limit or HUBSPOT_SEARCH_RESULT_LIMIT
+    
+    def search(window_start, window_end, after=None):
+        search_request = PublicObjectSearchRequest(
+            filter_groups=[FilterGroup(filters=[
+                Filter(property_name='lastmodifieddate', operator='GTE', value=str(window_start)),
+                Filter(property_name='lastmodifieddate', operator='LT', value=str(window_end))
+            ])],
+            sorts=[{'propertyName': 'lastmodifieddate', 'direction': 'ASCENDING'}],
+            properties=HUBSPOT_MIRROR_PROPERTIES,
+            limit=100,
+            after=after
+        )
+        return call_hubspot_with_backoff(
+            hubspot_client.crm.contacts.search_api.do_search, public_object_search_request=search_request
+        )
+    
+    since_ms = int(since.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    # Вікна - [початок, кінець) в мілісекундах; стек, тому старша половина кладеться останньою
+    windows = [(since_ms, int(time.time() * 1000) + 1)]
+    while windows:
+        window_start, window_end = windows.pop()
+        response = search(window_start, window_end)
+        total = getattr(response, 'total', 0) or 0
+        if total > result_limit and window_end - window_start > 1:
+            middle = (window_start + window_end) // 2
+            windows.append((middle, window_end))
+            windows.append((window_start, middle))
+            continue
+        if total > result_limit:
+            app.logger.warning(f"⚠️ {total} контактів з lastmodifieddate {window_start}: search API віддасть тільки {result_limit}")
+        
+        read = 0
+        while response.results:
+            yield response.results
+            read += len(response.results)
+            if not response.paging or not response.paging.next or read >= result_limit:
+                break
+            time.sleep(0.2)
+            response = search(window_start, window_end, after=response.paging.next.after)
+
+def upsert_hubspot_contacts(contacts, synced_at):
+    """Записує сторінку контактів в таблицю hubspot_contact (один SELECT на сторінку)"""
+    from datetime import timezone
+    
+    hubspot_ids = [str(contact.id) for contact in contacts]
+    existing = {
+        row.hubspot_id: row
+        for row in HubSpotContact.query.filter(HubSpotContact.hubspot_id.in_(hubspot_ids))
+    }
+    
+    created = 0
+    for contact in contacts:
+        properties = contact.properties
+        phones = [properties.get(field) for field in HUBSPOT_CONTACT_PHONE_FIELDS if properties.get(field)]
+        updated_at = contact.updated_at.astimezone(timezone.utc).replace(tzinfo=None) if contact.updated_at else None
+        
+        mirror = existing.get(str(contact.id))
+        if mirror is None:
+            mirror = HubSpotContact(hubspot_id=str(contact.id))
+            db.session.add(mirror)
+            created += 1
+        mirror.first_name = (properties.get('firstname') or '')[:100] or None
+        mirror.last_name = (properties.get('lastname') or '')[:100] or None
+        mirror.email = (properties.get('email') or '')[:255] or None
+        mirror.phones = ', '.join(phones)[:255] or None
+        mirror.phone_digits = ' '.join(phone_digits(phone) for phone in phones)[:255] or None
+        mirror.hubspot_updated_at = updated_at
+        mirror.synced_at = synced_at
+    
+    return created, len(contacts) - created
+
+def refresh_hubspot_contacts_mirror(full=False):
+    """Оновлює таблицю hubspot_contact
+    
+    Інкрементально - тільки контакти, змінені після останнього lastmodifieddate в таблиці.
+    Повне оновлення (full=True або порожня таблиця) - всі контакти, а записи, яких
+    більше немає в HubSpot, видаляються.
+    """
+    from datetime import datetime
+    
+    if not hubspot_client:
+        return {'created': 0, 'updated': 0, 'deleted': 0, 'full': full}
+    
+    synced_at = datetime.utcnow()
+    watermark = db.session.query(func.max(HubSpotContact.hubspot_updated_at)).scalar()
+    full = full or watermark is None
+    
+    print(f"🔄 Оновлення дзеркала контактів HubSpot ({'повне' if full else f'зміни після {watermark}'})...")
+    app.logger.info(f"🔄 Оновлення дзеркала контактів HubSpot, full={full}, watermark={watermark}")
+    
+    if full:
+        pages = iter_hubspot_contact_pages(properties=HUBSPOT_MIRROR_PROPERTIES, max_pages=None)
+    else:
+        pages = ((results, None) for results in iter_hubspot_contacts_modified_since(watermark))
+    
+    created = updated = 0
+    next_after = None
+    memory = import_memory_monitor('hubspot_contacts_mirror')
+    with memory:
+        for results, next_after in pages:
+            page_created, page_updated = upsert_hubspot_contacts(results, synced_at)
+            created += page_created
+            updated += page_updated
+            release_import_batch(memory)
+    
+    deleted = 0
+    if full and next_after is not None:
+        # Обхід не дійшов до кінця - не видаляємо контакти, до яких він не дістався
+        app.logger.warning(f"⚠️ Повне оновлення дзеркала зупинилось на курсорі {next_after}, видалення пропущено")
+    elif full:
+        deleted = HubSpotContact.query.filter(
+            (HubSpotContact.synced_at < synced_at) | (HubSpotContact.synced_at.is_(None))
+        ).delete(synchronize_session=False)
+        db.session.commit()
     
+    result = {'created': created, 'updated': updated, 'deleted': deleted, 'full': full, 'memory': memory.report()}
+    print(f"✅ Дзеркало контактів оновлено: {result}")
+    app.logger.info(f"✅ Дзеркало контактів оновлено: {result}")
+    return result
+
+def hubspot_contacts_refresh_task(full=False):
+    """Фонове оновлення дзеркала контактів"""
     try:
-        success = sync_lead_from_hubspot(lead)
-        if success:
-            from datetime import datetime
-            # Форматуємо час останньої синхронізації
-            if lead.last_sync_at:
-                last_sync = lead.last_sync_at.strftime('%d.%m.%Y %H:%M')
-            else:
-                last_sync = 'Невідомо'
-            
-            return jsonify({
-                'success': True, 
-                'message': 'Лід успішно синхронізовано з HubSpot',
-                'last_sync_at': last_sync
-            })
-        else:
-            return jsonify({'success': False, 'message': 'Помилка синхронізації з HubSpot'})
+        with app.app_context(), hubspot_quota.lane('bulk'):
+            hubspot_single_flight.do(
+                SingleFlight.make_key('hubspot_contacts_refresh', full=full),
+                refresh_hubspot_contacts_mirror, full=full, wait_timeout=None
+            )
     except Exception as e:
-        return jsonify({'success': False, 'message': f'Помилка: {str(e)}'})
+        app.logger.error(f"❌ Помилка оновлення дзеркала контактів: {e}")
+        traceback.print_exc()
 
-@app.route('/knowledge-base')
+@app.route('/admin/hubspot-contacts/refresh', methods=['POST'])
 @login_required
-def knowledge_base():
-    """Сторінка Knowledge Base - показує модалку 'to be soon'"""
-    return render_template('knowledge_base.html')
+def admin_hubspot_contacts_refresh():
+    """Запуск оновлення дзеркала контактів HubSpot у фоні"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Доступ заборонено'})
+    
+    if not hubspot_client:
+        return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
+    
+    full = bool((request.get_json(silent=True) or {}).get('full'))
+    threading.Thread(target=hubspot_contacts_refresh_task, args=(full,), daemon=True).start()
+    return jsonify({'success': True, 'message': 'Оновлення контактів запущено'})
 
-@app.route('/admin/hubspot-contacts')
+@app.route('/admin/hubspot-contacts/export-csv')
 @login_required
-def admin_hubspot_contacts():
-    """Сторінка з усіма номерами телефонів з HubSpot CRM"""
+def admin_hubspot_contacts_export_csv():
+    """Експорт всіх номерів телефонів з HubSpot CRM в CSV файл (потоково, сторінка за сторінкою)
+    
+    Перші байти відправляються одразу, але весь експорт все одно обмежений timeout gunicorn -
+    для повної бази використовуйте фоновий експорт (admin_hubspot_contacts_export_job).
+    """
     if current_user.role != 'admin':
         flash('Доступ заборонено')
         return redirect(url_for('dashboard'))
@@ -4720,221 +5813,305 @@ def admin_hubspot_contacts():
         flash('HubSpot API не налаштований', 'error')
         return redirect(url_for('dashboard'))
     
-    contacts_data = []
+    from flask import Response, stream_with_context
+    from datetime import datetime
     
-    try:
-        print("🔄 Завантаження всіх контактів з HubSpot...")
-        app.logger.info("🔄 Завантаження всіх контактів з HubSpot...")
+    def generate():
+        yield csv_chunk([HUBSPOT_CONTACTS_CSV_HEADER])
         
-        # Отримуємо всі контакти з HubSpot (посторінково)
-        after = None
+        print("🔄 Потоковий експорт контактів з HubSpot...")
+        app.logger.info("🔄 Потоковий експорт контактів з HubSpot...")
+        rows_count = 0
         page = 0
-        max_pages = 1000  # Збільшено для завантаження всіх контактів
+        try:
+            # Обхід всіх контактів - смуга bulk, хоч і виконується в запиті користувача
+            with hubspot_quota.lane('bulk'):
+                for results, _ in iter_hubspot_contact_pages():
+                    page += 1
+                    rows = [row for contact in results for row in hubspot_contact_csv_rows(contact)]
+                    rows_count += len(rows)
+                    yield csv_chunk(rows)
+        except GeneratorExit:
+            # Клієнт перервав завантаження - наступні сторінки не читаються
+            app.logger.info(f"⏹️ Потоковий експорт перервано клієнтом після {page} сторінок ({rows_count} номерів)")
+            raise
+        except Exception as e:
+            print(f"❌ Помилка отримання сторінки {page + 1}: {e}")
+            app.logger.error(f"❌ Помилка потокового експорту на сторінці {page + 1}: {e}")
         
-        while page < max_pages:
-            try:
-                # Властивості, які потрібні для контактів
-                properties = [
-                    'phone', 'phone_number', 'mobilephone', 'hs_phone_number',
-                    'phone_number_1', 'email', 'firstname', 'lastname'
-                ]
-                
-                # Отримуємо сторінку контактів
-                if after:
-                    contacts_response = hubspot_client.crm.contacts.basic_api.get_page(
-                        limit=100,
-                        after=after,
-                        properties=properties
-                    )
+        print(f"✅ Експортовано {rows_count} номерів телефонів")
+        app.logger.info(f"✅ Експортовано {rows_count} номерів телефонів")
+    
+    filename = f"hubspot_contacts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx не буферизує відповідь
+    return response
+
+def run_hubspot_contacts_export_job(job_id):
+    """Фоновий експорт контактів у файл з відновленням з останньої підтвердженої сторінки"""
+    with app.app_context(), hubspot_quota.lane('bulk'):
+        job = db.session.get(BackgroundJob, job_id)
+        try:
+            os.makedirs(EXPORTS_DIR, exist_ok=True)
+            if not job.file_path:
+                job.file_path = os.path.join(EXPORTS_DIR, f'hubspot_contacts_{job.id}.csv')
+            job.status = 'running'
+            job.error = None
+            job.heartbeat = time.time()
+            db.session.commit()
+            # Журнал подій попереднього (перерваного) запуску вже містить done
+            job_event_log.clear(job.id)
+            
+            resume = bool(job.file_offset) and os.path.exists(job.file_path)
+            print(f"🔄 Фоновий експорт контактів #{job.id} ({'відновлення' if resume else 'старт'})...")
+            app.logger.info(f"🔄 Фоновий експорт контактів #{job.id}, курсор: {job.cursor}")
+            
+            with open(job.file_path, 'r+b' if resume else 'wb') as export_file:
+                if resume:
+                    # Відкидаємо частково записану сторінку після останнього коміту
+                    export_file.truncate(job.file_offset)
+                    export_file.seek(job.file_offset)
                 else:
-                    contacts_response = hubspot_client.crm.contacts.basic_api.get_page(
-                        limit=100,
-                        properties=properties
-                    )
-                
-                if not contacts_response.results:
-                    break
-                
-                print(f"📄 Сторінка {page + 1}: отримано {len(contacts_response.results)} контактів")
+                    export_file.write(csv_chunk([HUBSPOT_CONTACTS_CSV_HEADER]).encode('utf-8'))
                 
-                # Обробляємо кожен контакт
-                for contact in contacts_response.results:
-                    contact_id = str(contact.id)
-                    
-                    # Отримуємо всі номери телефонів з контакту
-                    phone_numbers = []
-                    
-                    # Перевіряємо всі можливі поля телефонів
-                    for phone_field in ['phone', 'phone_number', 'mobilephone', 'hs_phone_number', 'phone_number_1']:
-                        phone_value = contact.properties.get(phone_field)
-                        if phone_value:
-                            phone_numbers.append(phone_value)
+                on_backoff = lambda retry_after, attempt: job_event_log.publish(
+                    job.id, 'backoff', {'retry_after': retry_after, 'attempt': attempt}
+                )
+                # Сторінки не накопичуються (запис у файл + commit курсора), монітор стежить за стелею
+                memory = import_memory_monitor(f'hubspot_contacts_export_{job.id}')
+                with memory:
+                    # Без обмеження сторінок: файл має містити всі контакти
+                    pages = iter_hubspot_contact_pages(after=job.cursor, max_pages=None, on_backoff=on_backoff)
+                    for results, next_after in pages:
+                        rows = [row for contact in results for row in hubspot_contact_csv_rows(contact)]
+                        export_file.write(csv_chunk(rows).encode('utf-8'))
+                        export_file.flush()
                     
-                    # Якщо є номери, додаємо контакт до списку
-                    if phone_numbers:
-                        # Об'єднуємо всі номери в один рядок
-                        phones_str = ', '.join(phone_numbers)
-                        
-                        contacts_data.append({
-                            'id': contact_id,
-                            'phone': phones_str,
-                            'email': contact.properties.get('email', ''),
-                            'name': f"{contact.properties.get('firstname', '')} {contact.properties.get('lastname', '')}".strip() or 'Без імені'
-                        })
-                
-                # Перевіряємо, чи є ще сторінки
-                if not contacts_response.paging or not contacts_response.paging.next:
-                    break
-                
-                after = contacts_response.paging.next.after
-                page += 1
-                
-                # Додаємо затримку між сторінками для rate limiting
-                time.sleep(0.5)
-                
-            except Exception as page_error:
-                print(f"❌ Помилка отримання сторінки {page + 1}: {page_error}")
-                app.logger.error(f"❌ Помилка отримання сторінки {page + 1}: {page_error}")
-                break
-        
-        print(f"✅ Завантажено {len(contacts_data)} контактів з номерами телефонів")
-        app.logger.info(f"✅ Завантажено {len(contacts_data)} контактів з номерами телефонів")
-        
-    except Exception as e:
-        print(f"❌ Критична помилка при завантаженні контактів з HubSpot: {e}")
-        app.logger.error(f"❌ Критична помилка при завантаженні контактів з HubSpot: {e}")
-        traceback.print_exc()
-        flash(f'Помилка завантаження контактів: {str(e)}', 'error')
+                        job.file_offset = export_file.tell()
+                        job.cursor = next_after
+                        job.pages_processed = (job.pages_processed or 0) + 1
+                        job.rows_processed = (job.rows_processed or 0) + len(rows)
+                        job.heartbeat = time.time()
+                        if not next_after:
+                            job.status = 'completed'
+                            job.finished_at = get_ukraine_time()
+                        db.session.commit()
+                        job_event_log.publish(job.id, 'progress', job.to_dict())
+                        if memory.over_ceiling():
+                            raise MemoryCeilingExceeded(f"Експорт #{job.id}: {memory.report()}")
+            
+            if job.status != 'completed':
+                # Обхід зупинився з курсором - файл неповний, job лишається відновлюваним з job.cursor
+                raise RuntimeError(f"Експорт #{job.id} зупинився до кінця контактів (курсор {job.cursor})")
+            job_event_log.publish(job.id, DONE_EVENT, job.to_dict())
+            
+            print(f"✅ Фоновий експорт #{job.id} завершено: {job.rows_processed} номерів")
+            app.logger.info(f"✅ Фоновий експорт #{job.id} завершено: {job.rows_processed} номерів, пам'ять: {memory.report()}")
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(e)
+            db.session.commit()
+            job_event_log.publish(job.id, DONE_EVENT, job.to_dict())
+            app.logger.error(f"❌ Помилка фонового експорту #{job.id}: {e}")
+            traceback.print_exc()
+
+@app.route('/admin/hubspot-contacts/export-job', methods=['POST'])
+@login_required
+def admin_hubspot_contacts_export_job():
+    """Запускає фоновий експорт контактів або відновлює незавершений"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Доступ заборонено'})
     
-    return render_template('admin_hubspot_contacts.html', contacts=contacts_data)
+    if not hubspot_client:
+        return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
+    
+    job = BackgroundJob.query.filter(
+        BackgroundJob.job_type == 'hubspot_contacts_export',
+        BackgroundJob.status.in_(['pending', 'running', 'failed'])
+    ).order_by(BackgroundJob.id.desc()).first()
+    
+    if job and job.status == 'running' and not job.is_stale():
+        return jsonify({'success': True, 'job': job.to_dict(), 'message': 'Експорт вже виконується'})
+    
+    if job:
+        message = 'Експорт відновлено з останньої сторінки'
+    else:
+        job = BackgroundJob(job_type='hubspot_contacts_export', created_by=current_user.id)
+        db.session.add(job)
+        message = 'Експорт запущено'
+    job.status = 'running'
+    job.heartbeat = time.time()
+    db.session.commit()
+    
+    threading.Thread(target=run_hubspot_contacts_export_job, args=(job.id,), daemon=True).start()
+    return jsonify({'success': True, 'job': job.to_dict(), 'message': message})
 
-@app.route('/admin/hubspot-contacts/export-csv')
+@app.route('/admin/hubspot-contacts/export-job/<int:job_id>')
 @login_required
-def admin_hubspot_contacts_export_csv():
-    """Експорт всіх номерів телефонів з HubSpot CRM в CSV файл"""
+def admin_hubspot_contacts_export_job_status(job_id):
+    """Статус фонового експорту"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Доступ заборонено'})
+    
+    job = BackgroundJob.query.filter_by(id=job_id, job_type='hubspot_contacts_export').first()
+    if not job:
+        return jsonify({'success': False, 'message': 'Задачу не знайдено'})
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@app.route('/admin/hubspot-contacts/export-job/<int:job_id>/download')
+@login_required
+def admin_hubspot_contacts_export_download(job_id):
+    """Завантаження готового файлу фонового експорту"""
     if current_user.role != 'admin':
         flash('Доступ заборонено')
         return redirect(url_for('dashboard'))
     
-    if not hubspot_client:
-        flash('HubSpot API не налаштований', 'error')
+    job = BackgroundJob.query.filter_by(id=job_id, job_type='hubspot_contacts_export').first()
+    if not job or job.status != 'completed' or not job.file_path or not os.path.exists(job.file_path):
+        flash('Файл експорту не знайдено', 'error')
+        return redirect(url_for('admin_hubspot_contacts'))
+    
+    from flask import send_file
+    created = job.created_at.strftime('%Y%m%d_%H%M%S') if job.created_at else str(job.id)
+    return send_file(
+        job.file_path,
+        mimetype='text/csv',
+        as_attachment=True,
+        download_name=f'hubspot_contacts_{created}.csv'
+    )
+
+# ===== ПОШУК ДУБЛІКАТІВ ЛІДІВ =====
+duplicate_scan_state = {'running': False, 'started_at': None, 'finished_at': None, 'result': None, 'error': None}
+
+def run_duplicate_scan():
+    """Пакетний пошук дублікатів по всіх лідах (phone, second_phone, email)
+    
+    Відкриті кластери замінюються новим результатом; кластери, які адмін вже
+    переглянув (resolved/ignored), з тим самим складом не створюються повторно.
+    """
+    def read_rows():
+        return db.session.query(
+            Lead.id, Lead.phone_digits, Lead.second_phone_digits, Lead.email
+        ).order_by(Lead.id).yield_per(5000)
+    
+    total_leads = Lead.query.count()
+    print(f"🔍 Пошук дублікатів серед {total_leads} лідів...")
+    app.logger.info(f"🔍 Пошук дублікатів серед {total_leads} лідів...")
+    
+    clusters, partitions = find_duplicate_clusters(read_rows, total_rows=total_leads)
+    
+    reviewed = {
+        fingerprint for (fingerprint,) in db.session.query(DuplicateCluster.fingerprint).filter(
+            DuplicateCluster.status != 'open'
+        )
+    }
+    
+    open_cluster_ids = db.session.query(DuplicateCluster.id).filter(DuplicateCluster.status == 'open')
+    DuplicateClusterMember.query.filter(
+        DuplicateClusterMember.cluster_id.in_(open_cluster_ids.scalar_subquery())
+    ).delete(synchronize_session=False)
+    DuplicateCluster.query.filter_by(status='open').delete(synchronize_session=False)
+    
+    created = 0
+    for member_ids, reasons in clusters:
+        fingerprint = cluster_fingerprint(member_ids)
+        if fingerprint in reviewed:
+            continue
+        cluster = DuplicateCluster(fingerprint=fingerprint, match_keys=','.join(reasons), size=len(member_ids))
+        cluster.members = [DuplicateClusterMember(lead_id=lead_id) for lead_id in member_ids]
+        db.session.add(cluster)
+        created += 1
+        if created % 500 == 0:
+            db.session.flush()
+    db.session.commit()
+    
+    result = {'leads': total_leads, 'clusters': created, 'partitions': partitions}
+    print(f"✅ Пошук дублікатів завершено: {created} кластерів")
+    app.logger.info(f"✅ Пошук дублікатів завершено: {result}")
+    return result
+
+def duplicate_scan_task():
+    """Фонова задача пошуку дублікатів"""
+    try:
+        with app.app_context():
+            duplicate_scan_state['result'] = run_duplicate_scan()
+    except Exception as e:
+        duplicate_scan_state['error'] = str(e)
+        app.logger.error(f"❌ Помилка пошуку дублікатів: {e}")
+        traceback.print_exc()
+    finally:
+        duplicate_scan_state['running'] = False
+        duplicate_scan_state['finished_at'] = get_ukraine_time()
+
+@app.route('/admin/duplicates')
+@login_required
+def admin_duplicates():
+    """Сторінка перегляду кластерів дублікатів лідів"""
+    if current_user.role != 'admin':
+        flash('Доступ заборонено')
         return redirect(url_for('dashboard'))
     
-    import csv
-    from io import StringIO
+    from sqlalchemy.orm import selectinload
+    
+    status = request.args.get('status', 'open')
+    page = request.args.get('page', 1, type=int)
+    
+    pagination = DuplicateCluster.query.filter_by(status=status).options(
+        selectinload(DuplicateCluster.members).joinedload(DuplicateClusterMember.lead).joinedload(Lead.agent)
+    ).order_by(DuplicateCluster.size.desc(), DuplicateCluster.id).paginate(page=page, per_page=50, error_out=False)
+    
+    return render_template(
+        'admin_duplicates.html',
+        clusters=pagination.items,
+        pagination=pagination,
+        status=status,
+        scan_state=duplicate_scan_state
+    )
+
+@app.route('/admin/duplicates/scan', methods=['POST'])
+@login_required
+def admin_duplicates_scan():
+    """Запуск пакетного пошуку дублікатів у фоні"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Доступ заборонено'})
+    
+    if duplicate_scan_state['running']:
+        return jsonify({'success': False, 'message': 'Пошук дублікатів вже виконується'})
+    
+    duplicate_scan_state.update({
+        'running': True, 'started_at': get_ukraine_time(), 'finished_at': None, 'result': None, 'error': None
+    })
+    threading.Thread(target=duplicate_scan_task, daemon=True).start()
+    return jsonify({'success': True, 'message': 'Пошук дублікатів запущено'})
+
+@app.route('/admin/duplicates/<int:cluster_id>/status', methods=['POST'])
+@login_required
+def admin_duplicate_cluster_status(cluster_id):
+    """Позначає кластер дублікатів як оброблений або проігнорований"""
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Доступ заборонено'})
     
-    contacts_data = []
+    data = request.get_json() or {}
+    status = data.get('status')
+    if status not in ('open', 'resolved', 'ignored'):
+        return jsonify({'success': False, 'message': 'Невірний статус'})
     
     try:
-        print("🔄 Завантаження всіх контактів з HubSpot для експорту...")
-        app.logger.info("🔄 Завантаження всіх контактів з HubSpot для експорту...")
-        
-        # Отримуємо всі контакти з HubSpot (посторінково)
-        after = None
-        page = 0
-        max_pages = 1000  # Збільшено для завантаження всіх контактів
-        
-        while page < max_pages:
-            try:
-                # Властивості, які потрібні для контактів
-                properties = [
-                    'phone', 'phone_number', 'mobilephone', 'hs_phone_number',
-                    'phone_number_1', 'email', 'firstname', 'lastname'
-                ]
-                
-                # Отримуємо сторінку контактів
-                if after:
-                    contacts_response = hubspot_client.crm.contacts.basic_api.get_page(
-                        limit=100,
-                        after=after,
-                        properties=properties
-                    )
-                else:
-                    contacts_response = hubspot_client.crm.contacts.basic_api.get_page(
-                        limit=100,
-                        properties=properties
-                    )
-                
-                if not contacts_response.results:
-                    break
-                
-                print(f"📄 Сторінка {page + 1}: отримано {len(contacts_response.results)} контактів")
-                
-                # Обробляємо кожен контакт
-                for contact in contacts_response.results:
-                    contact_id = str(contact.id)
-                    
-                    # Отримуємо всі номери телефонів з контакту
-                    phone_numbers = []
-                    
-                    # Перевіряємо всі можливі поля телефонів
-                    for phone_field in ['phone', 'phone_number', 'mobilephone', 'hs_phone_number', 'phone_number_1']:
-                        phone_value = contact.properties.get(phone_field)
-                        if phone_value:
-                            phone_numbers.append(phone_value)
-                    
-                    # Якщо є номери, додаємо контакт до списку
-                    # Але також додаємо контакти БЕЗ номерів, якщо потрібно показати всі
-                    if phone_numbers:
-                        # Для кожного номера створюємо окремий рядок
-                        for phone in phone_numbers:
-                            contacts_data.append({
-                                'id': contact_id,
-                                'phone': phone,
-                                'email': contact.properties.get('email', ''),
-                                'name': f"{contact.properties.get('firstname', '')} {contact.properties.get('lastname', '')}".strip() or 'Без імені'
-                            })
-                
-                # Перевіряємо, чи є ще сторінки
-                if not contacts_response.paging or not contacts_response.paging.next:
-                    break
-                
-                after = contacts_response.paging.next.after
-                page += 1
-                
-                # Додаємо затримку між сторінками для rate limiting
-                time.sleep(0.5)
-                
-            except Exception as page_error:
-                print(f"❌ Помилка отримання сторінки {page + 1}: {page_error}")
-                app.logger.error(f"❌ Помилка отримання сторінки {page + 1}: {page_error}")
-                break
-        
-        print(f"✅ Завантажено {len(contacts_data)} номерів телефонів для експорту")
-        app.logger.info(f"✅ Завантажено {len(contacts_data)} номерів телефонів для експорту")
-        
-        # Створюємо CSV файл
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Заголовки
-        writer.writerow(['ID', 'Номер телефону', 'Email', 'Ім\'я'])
-        
-        # Дані
-        for contact in contacts_data:
-            writer.writerow([
-                contact['id'],
-                contact['phone'],
-                contact['email'],
-                contact['name']
-            ])
-        
-        # Створюємо відповідь з CSV файлом
-        from datetime import datetime
-        filename = f"hubspot_contacts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        cluster = DuplicateCluster.query.get(cluster_id)
+        if not cluster:
+            return jsonify({'success': False, 'message': 'Кластер не знайдено'})
         
+        cluster.status = status
+        cluster.reviewed_by = current_user.id if status != 'open' else None
+        cluster.reviewed_at = get_ukraine_time() if status != 'open' else None
+        db.session.commit()
+        return jsonify({'success': True, 'message': 'Статус кластера оновлено'})
     except Exception as e:
-        print(f"❌ Критична помилка при експорті контактів з HubSpot: {e}")
-        app.logger.error(f"❌ Критична помилка при експорті контактів з HubSpot: {e}")
-        traceback.print_exc()
-        flash(f'Помилка експорту контактів: {str(e)}', 'error')
-        return redirect(url_for('admin_hubspot_contacts'))
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Помилка: {str(e)}'})
 
 @app.route('/admin/users')
 @login_required
@@ -5260,7 +6437,7 @@ def check_phone_number():
             })
         
         # Очищаємо номер від спец символів для пошуку
-        clean_phone = ''.join(filter(str.isdigit, phone_input))
+        clean_phone = phone_digits(phone_input)
         
         # Перевіряємо, чи є мінімум 4 цифри для пошуку
         if len(clean_phone) < 4:
@@ -5274,31 +6451,22 @@ def check_phone_number():
         app.logger.info(f"   Очищений номер: '{clean_phone}'")
         
         # Шукаємо ліди з схожими номерами (перевіряємо phone та second_phone)
-        # Різна логіка для PostgreSQL та SQLite
-        database_uri = app.config['SQLALCHEMY_DATABASE_URI']
-        
-        if database_uri.startswith('postgresql'):
-            # PostgreSQL підтримує regexp_replace - перевіряємо обидва поля телефонів
-            matching_leads = Lead.query.filter(
-                (func.regexp_replace(Lead.phone, '[^0-9]', '', 'g').like(f'%{clean_phone}%')) |
-                (func.regexp_replace(Lead.second_phone, '[^0-9]', '', 'g').like(f'%{clean_phone}%'))
-            ).limit(10).all()
+        # Пошук йде по нормалізованих колонках *_digits (на PostgreSQL - через trigram індекс,
+        # див. migrate_add_phone_digits.py), тому не потрібен regexp_replace по всій таблиці
+        lead_ids = None
+        if PHONE_INDEX_ENABLED:
+            warm_phone_index()
+            phone_index.maybe_refresh()
+            lead_ids = phone_index.search(clean_phone, limit=10)
+        
+        if lead_ids is not None:
+            # Індекс "теплий" - дублікати знайдено в пам'яті, з БД читаємо тільки знайдені ліди по id
+            matching_leads = Lead.query.filter(Lead.id.in_(lead_ids)).all() if lead_ids else []
         else:
-            # Для SQLite використовуємо простий LIKE (номери вже відформатовані)
-            # Шукаємо по частковому співпадінню в обох полях
             matching_leads = Lead.query.filter(
-                (Lead.phone.like(f'%{clean_phone}%')) |
-                (Lead.second_phone.like(f'%{clean_phone}%'))
-            ).limit(20).all()  # Більше ліміт, бо потім фільтруємо
-            
-            # Додаткова фільтрація в Python для SQLite
-            filtered_leads = []
-            for lead in matching_leads:
-                lead_phone_clean = ''.join(filter(str.isdigit, lead.phone or ''))
-                lead_second_phone_clean = ''.join(filter(str.isdigit, lead.second_phone or ''))
-                if clean_phone in lead_phone_clean or clean_phone in lead_second_phone_clean:
-                    filtered_leads.append(lead)
-            matching_leads = filtered_leads[:10]
+                (Lead.phone_digits.like(f'%{clean_phone}%')) |
+                (Lead.second_phone_digits.like(f'%{clean_phone}%'))
+            ).limit(10).all()
         
         app.logger.info(f"   Знайдено збігів: {len(matching_leads)}")
         
@@ -5425,6 +6593,321 @@ def download_document(doc_id):
         flash('Помилка при завантаженні документу з S3', 'error')
         return redirect(url_for('profile'))
 
+# ===== СЕРВІСНІ КОМАНДИ (flask maintenance ...) =====
+# Замість окремих скриптів: flask --app app maintenance <команда> [--dry-run] [--batch-size N]
+# [--concurrency N] [--restart] [--json]. Пакети виконуються паралельно, кожен у власному
+# контексті застосунку (окрема сесія БД) і в смузі квоти bulk; прогрес зберігається в
+# instance/maintenance, перерваний запуск продовжується з місця зупинки.
+MAINTENANCE_STATE_DIR = os.path.join(basedir, 'instance', 'maintenance')
+maintenance_cli = AppGroup('maintenance', help='Сервісні команди: пакетна обробка лідів, коментарів і deals HubSpot')
+app.cli.add_command(maintenance_cli)
+
+# Назви стадій pipeline "default", які HubSpot повертає замість ID
+HUBSPOT_STAGE_NAME_IDS = {
+    'appointmentscheduled': '3204738258',
+    'qualifiedtobuy': '3204738261',
+    'presentationscheduled': '3204738262',
+    'decisionmakerboughtin': '3204738265',
+    'contractsent': '3204738266',
+    'closedwon': '3204738267',
+}
+
+
+def maintenance_options(batch_size=100, concurrency=4):
+    """Спільні опції сервісних команд (значення за замовчуванням - свої для кожної команди)"""
+    options = (
+        click.option('--dry-run', is_flag=True, help='Нічого не змінювати в HubSpot і БД, тільки порахувати'),
+        click.option('--batch-size', default=batch_size, show_default=True, type=click.IntRange(1), help='Записів у пакеті'),
+        click.option('--concurrency', default=concurrency, show_default=True, type=click.IntRange(1), help='Пакетів одночасно'),
+        click.option('--restart', is_flag=True, help='Почати з початку, ігноруючи збережений прогрес'),
+        click.option('--json', 'as_json', is_flag=True, help='Результат як JSON (прогрес - в stderr)'),
+    )
+    
+    def decorate(command):
+        for option in reversed(options):
+            command = option(command)
+        return command
+    return decorate
+
+
+@contextmanager
+def maintenance_batch_context(dry_run):
+    """Пакет сервісної команди: власна сесія БД, смуга квоти bulk, commit (rollback для --dry-run)"""
+    with app.app_context(), hubspot_quota.lane('bulk'):
+        try:
+            yield
+        except Exception:
+            db.session.rollback()
+            raise
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+
+
+def run_maintenance(name, keys, handler, dry_run, batch_size, concurrency, restart, as_json, report=None):
+    """Виконує handler над keys через MaintenanceRunner і виводить результат
+
+    report(result) - додаткові поля результату команди (після обробки всіх пакетів).
+    Код виходу 1, якщо були помилки.
+    """
+    def on_batch(result):
+        click.echo(f"⏳ [{name}] оброблено {result['processed']}: {result['counts']}", err=as_json)
+    
+    runner = MaintenanceRunner(
+        name, handler, batch_size=batch_size, concurrency=concurrency, dry_run=dry_run,
+        state_dir=MAINTENANCE_STATE_DIR, worker_context=lambda: maintenance_batch_context(dry_run),
+        on_batch=on_batch
+    )
+    state = None if restart else runner.load_state()
+    if state:
+        click.echo(f"↪️ [{name}] продовження після {state['cursor']} (вже оброблено {state['processed']})", err=as_json)
+    
+    result = runner.run(keys, resume=not restart)
+    if report:
+        result.update(report(result))
+    app.logger.info(f"🛠️ Сервісна команда {name}: {result['counts']} за {result['elapsed_seconds']} с (dry-run: {dry_run})")
+    
+    if as_json:
+        click.echo(json.dumps(result, ensure_ascii=False, default=str))
+    else:
+        click.echo("=" * 80)
+        click.echo(f"{'🔍' if dry_run else '✅'} {name}{' (dry-run)' if dry_run else ''}: {result['counts']}")
+        click.echo(f"   Записів: {result['total']}, пакетів: {result['batches']}, час: {result['elapsed_seconds']} с")
+        for error in result['errors']:
+            click.echo(f"   ❌ {error}")
+        if not result['complete']:
+            click.echo(f"   ↪️ Не всі пакети завершились - повторний запуск продовжить після {result['cursor']}")
+        click.echo("=" * 80)
+    if result['counts'].get('errors'):
+        raise click.exceptions.Exit(1)
+    return result
+
+
+def run_maintenance_command(name, args, standalone_mode=True):
+    """Запускає flask maintenance <name> з аргументами (для скриптів-обгорток у корені репозиторію)
+
+    standalone_mode=False - повертає код виходу замість виходу з процесу (кілька команд поспіль).
+    """
+    try:
+        result = maintenance_cli.main(args=[name, *args], prog_name='flask maintenance',
+                                      obj=ScriptInfo(create_app=lambda: app), standalone_mode=standalone_mode)
+    except click.ClickException as e:
+        e.show()
+        return e.exit_code
+    return result if isinstance(result, int) else 0
+
+
+@maintenance_cli.command('sync-stage-labels')
+@maintenance_options(batch_size=100, concurrency=4)
+def maintenance_sync_stage_labels(dry_run, batch_size, concurrency, restart, as_json):
+    """Статус і назва стадії лідів за стадією deal в HubSpot (раніше sync_all_leads_status.py)"""
+    lead_ids = [lead_id for lead_id, in db.session.query(Lead.id).filter(Lead.hubspot_deal_id.isnot(None)).order_by(Lead.id)]
+    
+    def handle(keys, dry_run):
+        result = BatchResult()
+        leads = Lead.query.filter(Lead.id.in_(keys)).all()
+        # Один batch/read на пакет (до 100 deals)
+        deal_ids = [lead.hubspot_deal_id for lead in leads]
+        deals = run_hubspot_async(lambda client: client.batch_read('deals', deal_ids, properties=['dealstage']))
+        for lead in leads:
+            deal = deals.get(str(lead.hubspot_deal_id))
+            if deal is None:
+                result['not_found'] += 1
+                continue
+            stage = (deal.get('properties') or {}).get('dealstage')
+            if not stage:
+                result['no_stage'] += 1
+                continue
+            stage = HUBSPOT_STAGE_NAME_IDS.get(stage, stage)
+            changed = False
+            if STAGE_STATUS.get(stage) and lead.status != STAGE_STATUS[stage]:
+                lead.status = STAGE_STATUS[stage]
+                changed = True
+            if STAGE_LABELS.get(stage) and lead.hubspot_stage_label != STAGE_LABELS[stage]:
+                lead.hubspot_stage_label = STAGE_LABELS[stage]
+                changed = True
+            result['updated' if changed else 'unchanged'] += 1
+        return result
+    
+    run_maintenance('sync-stage-labels', lead_ids, handle, dry_run, batch_size, concurrency, restart, as_json)
+
+
+@maintenance_cli.command('create-missing-deals')
+@maintenance_options(batch_size=20, concurrency=4)
+@click.option('--only-with-contact', is_flag=True, help='Тільки ліди, які вже мають контакт в HubSpot')
+@click.option('--pipeline', help='Pipeline угод (разом з --stage)')
+@click.option('--stage', help='Стадія угод (разом з --pipeline); без неї - стадія "Лиды" за статусом ліда')
+def maintenance_create_missing_deals(dry_run, batch_size, concurrency, restart, as_json, only_with_contact, pipeline, stage):
+    """Угоди в HubSpot для лідів без hubspot_deal_id (раніше sync_missing_deals.py і sync_unsynced_leads_to_hubspot.py)
+
+    Статус ліда не змінюється: угода створюється в стадії pipeline "Лиды", яка відповідає
+    статусу (STATUS_STAGES), або в явно заданих --pipeline/--stage.
+    """
+    if not HUBSPOT_CREATE_DEALS and not dry_run:
+        raise click.UsageError('Створення угод в HubSpot вимкнено (HUBSPOT_CREATE_DEALS=false); перевірте обсяг з --dry-run')
+    if bool(pipeline) != bool(stage):
+        raise click.UsageError('--pipeline і --stage задаються разом')
+    
+    query = db.session.query(Lead.id).filter(Lead.hubspot_deal_id.is_(None))
+    if only_with_contact:
+        query = query.filter(Lead.hubspot_contact_id.isnot(None))
+    lead_ids = [lead_id for lead_id, in query.order_by(Lead.id)]
+    
+    def create_deal(lead_id, dry_run):
+        lead = db.session.get(Lead, lead_id)
+        if lead is None or lead.hubspot_deal_id:
+            return 'skipped'
+        if dry_run:
+            return 'would_create'
+        create_hubspot_deal_for_lead(lead, lead.agent, hubspot_contact_id=lead.hubspot_contact_id,
+                                     pipeline=pipeline or LEAD_DEAL_PIPELINE,
+                                     stage=stage or STATUS_STAGES.get(lead.status, STATUS_STAGES['new']),
+                                     keep_status=True)
+        # Угода вже є в HubSpot - зберігаємо її ID одразу, щоб повторний запуск не створив дубль
+        db.session.commit()
+        return 'created'
+    
+    run_maintenance('create-missing-deals', lead_ids, each_item(create_deal), dry_run, batch_size, concurrency, restart, as_json)
+
+
+@maintenance_cli.command('create-missing-contacts')
+@maintenance_options(batch_size=20, concurrency=4)
+def maintenance_create_missing_contacts(dry_run, batch_size, concurrency, restart, as_json):
+    """Контакти в HubSpot для лідів з угодою, але без hubspot_contact_id (раніше sync_unsynced_leads_to_hubspot.py)
+
+    Контакт шукається або створюється upsert за email ліда і асоціюється з угодою ліда.
+    Ліди без контакту і без угоди отримують обидва через create-missing-deals.
+    """
+    if not HUBSPOT_CREATE_DEALS and not dry_run:
+        raise click.UsageError('Створення контактів в HubSpot вимкнено (HUBSPOT_CREATE_DEALS=false); перевірте обсяг з --dry-run')
+    
+    lead_ids = [lead_id for lead_id, in db.session.query(Lead.id).filter(
+        Lead.hubspot_contact_id.is_(None),
+        Lead.hubspot_deal_id.isnot(None)
+    ).order_by(Lead.id)]
+    
+    def create_contact(lead_id, dry_run):
+        lead = db.session.get(Lead, lead_id)
+        if lead is None or lead.hubspot_contact_id:
+            return 'skipped'
+        if not (lead.email or '').strip():
+            return 'no_email'
+        if dry_run:
+            return 'would_create'
+        hubspot_contact_id = upsert_hubspot_contact_for_lead(lead)
+        if not hubspot_contact_id:
+            raise RuntimeError(f'HubSpot не повернув контакт для ліда {lead.id}')
+        hubspot_associations().associate('deals', 'contacts', [(lead.hubspot_deal_id, hubspot_contact_id)])
+        lead.hubspot_contact_id = hubspot_contact_id
+        db.session.commit()
+        return 'created'
+    
+    run_maintenance('create-missing-contacts', lead_ids, each_item(create_contact), dry_run, batch_size, concurrency, restart, as_json)
+
+
+@maintenance_cli.command('fix-unsynced-comments')
+@maintenance_options(batch_size=100, concurrency=4)
+def maintenance_fix_unsynced_comments(dry_run, batch_size, concurrency, restart, as_json):
+    """Нотатки HubSpot для коментарів без hubspot_note_id (раніше fix_unsynced_comments.py)
+
+    На пакет - один batch/create нотаток з асоціаціями і один bulk UPDATE hubspot_note_id.
+    """
+    comment_ids = [comment_id for comment_id, in db.session.query(Comment.id).join(Lead).filter(
+        Comment.hubspot_note_id.is_(None),
+        Lead.hubspot_deal_id.isnot(None)
+    ).order_by(Comment.id)]
+    
+    def push_comments(keys, dry_run):
+        result = BatchResult()
+        comments = Comment.query.filter(Comment.id.in_(keys), Comment.hubspot_note_id.is_(None)).all()
+        result['skipped'] += len(keys) - len(comments)
+        if dry_run:
+            result['would_create'] += len(comments)
+            return result
+        created, errors = hubspot_notes().create([hubspot_note_input(comment) for comment in comments])
+        if created:
+            # executemany UPDATE за первинним ключем (працює і на SQLAlchemy 1.4, і на 2.x)
+            db.session.bulk_update_mappings(Comment, [
+                {'id': int(comment_id), 'hubspot_note_id': note_id} for comment_id, note_id in created.items()
+            ])
+        result['created'] += len(created)
+        for comment_id, error in errors.items():
+            result.error(comment_id, error)
+        return result
+    
+    run_maintenance('fix-unsynced-comments', comment_ids, push_comments, dry_run, batch_size, concurrency, restart, as_json)
+
+
+@maintenance_cli.command('unlink-contacts-from-deals')
+@maintenance_options(batch_size=100, concurrency=4)
+@click.option('--yes', is_flag=True, help='Не питати підтвердження')
+def maintenance_unlink_contacts_from_deals(dry_run, batch_size, concurrency, restart, as_json, yes):
+    """Видаляє всі асоціації контакт-deal в HubSpot; контакти і deals лишаються (раніше unlink_all_contacts_from_deals.py)
+
+    На пакет deals - один batch/read асоціацій і batch/archive по 100 пар.
+    """
+    if not dry_run and not yes:
+        click.confirm('Видалити ВСІ асоціації між контактами та deals в HubSpot?', abort=True)
+    
+    async def all_deal_ids(client):
+        return sorted({int(deal['id']) async for deal in client.paginate('/crm/v3/objects/deals')})
+    
+    with hubspot_quota.lane('bulk'):
+        deal_ids = run_hubspot_async(all_deal_ids)
+    associations_api = hubspot_associations()
+    
+    def unlink_batch(keys, dry_run):
+        result = BatchResult()
+        contacts_by_deal = associations_api.read('deals', 'contacts', keys)
+        pairs = [(deal_id, contact_id) for deal_id, contact_ids in contacts_by_deal.items() for contact_id in contact_ids]
+        result['deals_without_contacts'] = len(keys) - len(contacts_by_deal)
+        if dry_run:
+            result['would_unlink'] = len(pairs)
+        else:
+            result['unlinked'] = associations_api.archive('deals', 'contacts', pairs)
+        return result
+    
+    run_maintenance('unlink-contacts-from-deals', deal_ids, unlink_batch, dry_run, batch_size, concurrency, restart, as_json)
+
+
+@maintenance_cli.command('compare-agents')
+@maintenance_options(batch_size=100, concurrency=1)
+def maintenance_compare_agents(dry_run, batch_size, concurrency, restart, as_json):
+    """Порівняння owners HubSpot з агентами та адмінами системи за email (раніше compare_agents_hubspot_vs_system.py)"""
+    owner_emails = load_hubspot_owner_emails()
+    users = {
+        user.email.lower(): user.username
+        for user in User.query.filter(User.role.in_(['agent', 'admin'])).order_by(User.username)
+        if user.email
+    }
+    matches = []
+    hubspot_only = []
+    
+    def compare_owner(owner_id, dry_run):
+        email = owner_emails[str(owner_id)].lower()
+        if email in users:
+            matches.append({'owner_id': str(owner_id), 'email': email, 'username': users[email]})
+            return 'matched'
+        hubspot_only.append({'owner_id': str(owner_id), 'email': email})
+        return 'hubspot_only'
+    
+    def report(result):
+        owner_set = {email.lower() for email in owner_emails.values()}
+        system_only = [{'email': email, 'username': username} for email, username in users.items() if email not in owner_set]
+        if not as_json:
+            for title, rows in (('✅ Є і в HubSpot, і в системі', matches), ('⚠️ Тільки в HubSpot', hubspot_only),
+                                ('⚠️ Тільки в системі', system_only)):
+                click.echo(f"{title}: {len(rows)}")
+                for row in rows:
+                    click.echo(f"   {row.get('owner_id', '-'):<15} {row.get('username', '-'):<25} {row['email']}")
+        return {'matches': matches, 'hubspot_only': hubspot_only, 'system_only': system_only}
+    
+    # Тільки читання - прогрес не зберігається
+    owner_ids = sorted(int(owner_id) for owner_id in owner_emails)
+    run_maintenance('compare-agents', owner_ids, each_item(compare_owner), True, batch_size, concurrency, True, as_json, report=report)
+
+
 # ===== ERROR HANDLERS =====
 @app.errorhandler(Exception)
 def handle_exception(error):
@@ -5531,6 +7014,39 @@ def get_hubspot_stages():
         app.logger.error(traceback.format_exc())
         return jsonify({'success': False, 'message': f'Помилка: {str(e)}'})
 
+def load_hubspot_pipelines():
+    """Завантажує всі pipelines deals з HubSpot (дати - в ISO форматі)"""
+    # Отримуємо всі pipelines для deals
+    pipelines = hubspot_client.crm.pipelines.pipelines_api.get_all(object_type='deals')
+    
+    pipelines_list = []
+    for pipeline in pipelines.results:
+        stages_list = []
+        if pipeline.stages:
+            for stage in pipeline.stages:
+                stages_list.append({
+                    'id': stage.id,
+                    'label': stage.label,
+                    'display_order': stage.display_order
+                })
+        
+        created_at = getattr(pipeline, 'created_at', None)
+        updated_at = getattr(pipeline, 'updated_at', None)
+        pipelines_list.append({
+            'id': pipeline.id,
+            'label': pipeline.label,
+            'display_order': pipeline.display_order,
+            'archived': getattr(pipeline, 'archived', False),
+            'created_at': created_at.isoformat() if created_at else None,
+            'updated_at': updated_at.isoformat() if updated_at else None,
+            'stages': stages_list,
+            'stages_count': len(stages_list)
+        })
+    
+    # Сортуємо за display_order
+    pipelines_list.sort(key=lambda x: x.get('display_order', 999))
+    return pipelines_list
+
 @app.route('/api/hubspot/pipelines', methods=['GET'])
 @login_required
 def get_all_hubspot_pipelines():
@@ -5542,33 +7058,7 @@ def get_all_hubspot_pipelines():
         return jsonify({'success': False, 'message': 'HubSpot API не налаштований'})
     
     try:
-        # Отримуємо всі pipelines для deals
-        pipelines = hubspot_client.crm.pipelines.pipelines_api.get_all(object_type='deals')
-        
-        pipelines_list = []
-        for pipeline in pipelines.results:
-            stages_list = []
-            if pipeline.stages:
-                for stage in pipeline.stages:
-                    stages_list.append({
-                        'id': stage.id,
-                        'label': stage.label,
-                        'display_order': stage.display_order
-                    })
-            
-            pipelines_list.append({
-                'id': pipeline.id,
-                'label': pipeline.label,
-                'display_order': pipeline.display_order,
-                'archived': getattr(pipeline, 'archived', False),
-                'created_at': getattr(pipeline, 'created_at', None),
-                'updated_at': getattr(pipeline, 'updated_at', None),
-                'stages': stages_list,
-                'stages_count': len(stages_list)
-            })
-        
-        # Сортуємо за display_order
-        pipelines_list.sort(key=lambda x: x.get('display_order', 999))
+        pipelines_list = hubspot_single_flight.do('hubspot_pipelines', load_hubspot_pipelines)
         
         return jsonify({
             'success': True,
@@ -6077,7 +7567,11 @@ def diagnostic():
             'hubspot': {
                 'api_key_set': bool(HUBSPOT_API_KEY),
                 'client_configured': hubspot_client is not None,
-                'connection_test': None
+                'connection_test': None,
+                'quota': hubspot_quota.stats(),
+                'circuit_breaker': hubspot_breaker.stats(),
+                'response_cache': hubspot_cache.stats() if hubspot_cache else None,
+                'sync_archive': sync_archive.stats() if SYNC_ARCHIVE_ENABLED else None
             },
             's3': {
                 'access_key_set': bool(app.config.get('AWS_ACCESS_KEY_ID')),
@@ -6109,7 +7603,9 @@ def diagnostic():
             error_str = str(e)
             diagnostic_info['environment']['hubspot']['connection_test'] = f'error: {error_str[:200]}'
             # Додаємо інформацію про тип помилки
-            if '401' in error_str or 'Unauthorized' in error_str:
+            if isinstance(e, CircuitOpenError):
+                diagnostic_info['environment']['hubspot']['connection_test'] += ' (circuit breaker відкритий, запит не виконувався)'
+            elif '401' in error_str or 'Unauthorized' in error_str:
                 diagnostic_info['environment']['hubspot']['connection_test'] += ' (недійсний API ключ)'
             elif '403' in error_str or 'Forbidden' in error_str:
                 diagnostic_info['environment']['hubspot']['connection_test'] += ' (немає прав доступу)'
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Початкове завантаження контактів і deals з HubSpot через CRM export API
+
+Для нового середовища або відновлення після аварії: HubSpot готує CSV з усіма
+записами, файл читається потоком і записується пакетами (хвилини замість годин
+посторінкового імпорту). Контакти завантажуються перед deals - з них беруться
+email та ім'я контактів для лідів.
+
+Приклади:
+    python bootstrap_hubspot_export.py
+    python bootstrap_hubspot_export.py --only contacts
+"""
+
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from app import app, hubspot_quota, bootstrap_from_hubspot_exports
+
+OBJECTS = ('contacts', 'deals')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Початкове завантаження з CRM export API HubSpot')
+    parser.add_argument('--only', choices=OBJECTS, help='Тільки контакти або тільки deals')
+    args = parser.parse_args()
+
+    objects = (args.only,) if args.only else OBJECTS
+    with app.app_context(), hubspot_quota.lane('bulk'):
+        result = bootstrap_from_hubspot_exports(objects=objects)
+
+    errors = sum((result[name] or {}).get('errors', 0) for name in objects)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Circuit breaker для зовнішніх сервісів (HubSpot)
+
+- closed - запити проходять; після failure_threshold невдач поспіль (помилки або
+  запити, довші за slow_call_seconds) breaker відкривається
+- open - запити одразу отримують CircuitOpenError, не чекаючи timeout сервісу
+- half_open - після reset_timeout секунд пропускається один пробний запит:
+  успіх закриває breaker, невдача знову відкриває його
+
+Стан зберігається в межах процесу (кожен gunicorn worker має свій breaker).
+"""
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Сервіс недоступний - запит не виконувався (breaker відкритий)"""
+
+
+class CircuitBreaker:
+    """Потокобезпечний circuit breaker"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, slow_call_seconds=None,
+                 is_failure=None, is_failed_result=None):
+        """
+        Args:
+            name: Назва сервісу (для повідомлень)
+            failure_threshold: Кількість невдач поспіль, після якої breaker відкривається
+            reset_timeout: Скільки секунд breaker відкритий до пробного запиту
+            slow_call_seconds: Успішний запит, довший за це значення, рахується як невдача
+            is_failure: is_failure(exception) - чи вважати виняток невдачею сервісу
+            is_failed_result: is_failed_result(result) - чи вважати відповідь невдачею (напр. HTTP 5xx)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self.is_failure = is_failure or (lambda e: True)
+        self.is_failed_result = is_failed_result or (lambda result: False)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._probe_in_flight = False
+        self._last_error = None
+        self._stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.time())
+
+    def _current_state(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def _reject_if_open(self, state):
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probe_in_flight):
+            self._stats['rejected'] += 1
+            raise CircuitOpenError(f'{self.name} тимчасово недоступний: {self._last_error}')
+
+    def _before_call(self):
+        with self._lock:
+            state = self._current_state(time.time())
+            self._reject_if_open(state)
+            if state == self.HALF_OPEN:
+                self._probe_in_flight = True
+            self._stats['calls'] += 1
+            return state
+
+    def _record(self, failed, error=None):
+        with self._lock:
+            self._probe_in_flight = False
+            if not failed:
+                self._failures = 0
+                self._state = self.CLOSED
+                return
+            self._failures += 1
+            self._stats['failures'] += 1
+            self._last_error = error
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats['opened'] += 1
+                self._state = self.OPEN
+                self._opened_at = time.time()
+
+    def reject_if_open(self):
+        """Кидає CircuitOpenError, якщо запит зараз буде відхилено; виклик не рахується"""
+        with self._lock:
+            self._reject_if_open(self._current_state(time.time()))
+
+    def fail_fast(self, call):
+        """Guard, що тільки відхиляє запити при відкритому breaker (без обліку і заміру часу)
+
+        Ставиться перед квотою: відхилений запит не займає місце у квоті, а облік
+        результату і повільних запитів лишається за guard() без часу очікування квоти.
+        """
+        self.reject_if_open()
+        return call()
+
+    def guard(self, call):
+        """Виконує call() через breaker (сумісно з hubspot_transport guards)"""
+        self._before_call()
+        started = time.time()
+        try:
+            result = call()
+        except Exception as e:
+            if self.is_failure(e):
+                self._record(True, f'{type(e).__name__}: {str(e)[:200]}')
+            else:
+                self._record(False)
+            raise
+        self._record_result(result, time.time() - started)
+        return result
+
+    async def guard_async(self, call):
+        """Те саме для асинхронного клієнта: call() повертає awaitable"""
+        self._before_call()
+        started = time.time()
+        try:
+            result = await call()
+        except Exception as e:
+            if self.is_failure(e):
+                self._record(True, f'{type(e).__name__}: {str(e)[:200]}')
+            else:
+                self._record(False)
+            raise
+        self._record_result(result, time.time() - started)
+        return result
+
+    def _record_result(self, result, elapsed):
+        if self.is_failed_result(result):
+            self._record(True, f'невдала відповідь: {getattr(result, "status_code", None) or getattr(result, "status", result)}')
+        elif self.slow_call_seconds and elapsed > self.slow_call_seconds:
+            self._record(True, f'повільна відповідь ({elapsed:.1f}с)')
+        else:
+            self._record(False)
+
+    def stats(self):
+        """Стан breaker для /api/diagnostic"""
+        with self._lock:
+            now = time.time()
+            state = self._current_state(now)
+            return dict(
+                self._stats,
+                state=state,
+                consecutive_failures=self._failures,
+                last_error=self._last_error,
+                retry_in_seconds=round(max(self._opened_at + self.reset_timeout - now, 0), 1) if state == self.OPEN else 0,
+            )
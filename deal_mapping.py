@@ -0,0 +1,213 @@
+"""
+Маппінг HubSpot deal -> лід без ORM і мережі
+
+Вхід - сирі записи deal (як у sync_archive: {'id', 'properties', 'contact', 'owner'}),
+вихід - компактні LeadRecord. Таблиці стадій, бюджетів і довідник агентів будуються
+один раз на запуск, тому маппінг однаковий і дешевий для живого імпорту,
+повторної обробки архіву та тестів.
+
+Пріоритет агента: owner (hubspot_owner_id, за email) -> responisble_agent
+(username, email, частина імені) -> from_agent_portal__name_ -> агент за замовчуванням.
+"""
+from hubspot_fingerprint import property_fingerprint
+from phone_utils import format_phone
+
+# Назви стадій HubSpot (правильні назви з API)
+STAGE_LABELS = {
+    '3204738258': 'Новая заявка',
+    '3204738259': 'Отправлены варианты/Передан на партнеров',
+    '3204738261': 'Назначена встреча/тур',
+    '3204738262': 'Встреча/тур проведены',
+    '3204738265': 'Переговоры',
+    '3204738266': 'Задаток',
+    '3204738267': 'Сделка закрыта',
+}
+
+# Стадії HubSpot -> статуси системи
+STAGE_STATUS = {
+    '3204738258': 'new',
+    '3204738259': 'contacted',
+    '3204738261': 'qualified',
+    '3204738262': 'qualified',
+    '3204738265': 'qualified',
+    '3204738266': 'qualified',
+    '3204738267': 'closed',
+}
+
+# Верхні межі amount для категорій бюджету; більше за останню - '1млн+'
+BUDGET_BANDS = ((200000, 'до 200к'), (500000, '200к–500к'), (1000000, '500к–1млн'))
+DEFAULT_BUDGET = 'до 200к'
+
+
+class LeadRecord:
+    """Результат маппінгу одного deal (поля ліда, які заповнює імпорт)"""
+
+    __slots__ = ('deal_id', 'contact_id', 'deal_name', 'email', 'phone', 'budget',
+                 'status', 'stage_label', 'agent_id', 'agent_source')
+
+    def __init__(self, deal_id, contact_id, deal_name, email, phone, budget, status,
+                 stage_label, agent_id, agent_source):
+        self.deal_id = deal_id
+        self.contact_id = contact_id
+        self.deal_name = deal_name
+        self.email = email
+        self.phone = phone
+        self.budget = budget
+        self.status = status
+        self.stage_label = stage_label
+        self.agent_id = agent_id
+        self.agent_source = agent_source
+
+    def fingerprint(self):
+        """Відбиток полів, які імпорт записує в лід (agent_source не записується)"""
+        return property_fingerprint({name: getattr(self, name) for name in self.__slots__ if name != 'agent_source'})
+
+    def __repr__(self):
+        return f'<LeadRecord deal={self.deal_id} status={self.status} agent={self.agent_id}>'
+
+
+class AgentDirectory:
+    """Довідник користувачів для призначення агента (будується один раз з БД)"""
+
+    def __init__(self, users):
+        """
+        Args:
+            users: Послідовність (id, username, email, role) у порядку id
+        """
+        self._by_username = {}
+        self._by_email = {}
+        self._usernames = []
+        self.default_agent_id = None
+        for user_id, username, email, role in users:
+            if username:
+                self._by_username.setdefault(username, user_id)
+                self._usernames.append((username.lower(), user_id))
+            if email:
+                self._by_email.setdefault(email, user_id)
+            if self.default_agent_id is None and role in ('admin', 'agent'):
+                self.default_agent_id = user_id
+
+    def _by_name_part(self, value):
+        part = value.split(' ', 1)[0].lower()
+        for username, user_id in self._usernames:
+            if part in username:
+                return user_id
+        return None
+
+    def resolve(self, properties, owner_email=None):
+        """(agent_id, джерело) за пріоритетами; (None, None) - в системі немає агентів"""
+        if owner_email:
+            agent_id = self._by_email.get(owner_email.lower())
+            if agent_id:
+                return agent_id, 'hubspot_owner_id'
+
+        responsible = (properties.get('responisble_agent') or '').strip()
+        if responsible:
+            agent_id = (self._by_username.get(responsible) or self._by_email.get(responsible.lower())
+                        or (self._by_name_part(responsible) if ' ' in responsible else None))
+            if agent_id:
+                return agent_id, 'responisble_agent'
+
+        portal_name = properties.get('from_agent_portal__name_')
+        if portal_name:
+            agent_id = self._by_username.get(portal_name.strip())
+            # Owner з точним збігом email має перевагу над іменем з порталу
+            if owner_email and self._by_email.get(owner_email):
+                agent_id = self._by_email[owner_email]
+            if agent_id:
+                return agent_id, 'from_agent_portal__name_'
+
+        if self.default_agent_id:
+            return self.default_agent_id, 'default'
+        return None, None
+
+
+def deal_status(deal_stage):
+    """(статус, назва стадії) для dealstage"""
+    if not deal_stage:
+        return 'new', None
+    status = STAGE_STATUS.get(deal_stage)
+    if status is None:
+        stage = deal_stage.lower()
+        if 'closedwon' in stage or 'closed won' in stage:
+            status = 'closed'
+        elif 'qualified' in stage:
+            status = 'qualified'
+        elif 'contacted' in stage:
+            status = 'contacted'
+        else:
+            status = 'new'
+    return status, STAGE_LABELS.get(deal_stage)
+
+
+def deal_budget(amount):
+    """Категорія бюджету з amount або None"""
+    if not amount:
+        return None
+    try:
+        value = float(amount)
+    except (TypeError, ValueError):
+        return None
+    for upper, label in BUDGET_BANDS:
+        if value < upper:
+            return label
+    return '1млн+'
+
+
+class DealMapper:
+    """Перетворює сирі записи deals на LeadRecord"""
+
+    def __init__(self, agents):
+        """
+        Args:
+            agents: AgentDirectory
+        """
+        self.agents = agents
+
+    def map(self, record):
+        """LeadRecord або None (deal без телефону або в системі немає агентів)"""
+        properties = record['properties']
+        phone = properties.get('phone_number')
+        if not phone:
+            return None
+
+        deal_id = record['id']
+        contact = record.get('contact')
+        owner = record.get('owner')
+        contact_properties = (contact or {}).get('properties') or {}
+
+        deal_name = properties.get('dealname') or ''
+        if not deal_name:
+            firstname = contact_properties.get('firstname') or ''
+            lastname = contact_properties.get('lastname') or ''
+            deal_name = f'{firstname} {lastname}'.strip()
+
+        agent_id, agent_source = self.agents.resolve(properties, owner.get('email') if owner else None)
+        if agent_id is None:
+            return None
+
+        status, stage_label = deal_status(properties.get('dealstage'))
+        return LeadRecord(
+            deal_id=deal_id,
+            contact_id=contact['id'] if contact else None,
+            deal_name=deal_name or f'Deal {deal_id}',
+            email=contact_properties.get('email') or f'no-email-{deal_id}@hubspot.local',
+            phone=format_phone(phone),
+            budget=deal_budget(properties.get('amount')),
+            status=status,
+            stage_label=stage_label,
+            agent_id=agent_id,
+            agent_source=agent_source,
+        )
+
+    def map_batch(self, records):
+        """Маппінг пакета: (список LeadRecord, кількість пропущених записів)"""
+        mapped = []
+        skipped = 0
+        for record in records:
+            lead_record = self.map(record)
+            if lead_record is None:
+                skipped += 1
+            else:
+                mapped.append(lead_record)
+        return mapped, skipped
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Скрипт для пакетного пошуку дублікатів лідів (телефон, другий телефон, email)
+Результат записується в таблиці duplicate_cluster / duplicate_cluster_member
+і доступний на сторінці /admin/duplicates
+"""
+
+import sys
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, run_duplicate_scan
+
+def main():
+    with app.app_context():
+        # Створюємо таблиці кластерів, якщо їх ще немає
+        db.create_all()
+        
+        print("=" * 80)
+        print("🔍 ПОШУК ДУБЛІКАТІВ ЛІДІВ")
+        print("=" * 80)
+        
+        result = run_duplicate_scan()
+        
+        print("\n" + "=" * 80)
+        print(f"📊 Перевірено лідів: {result['leads']}")
+        print(f"📊 Знайдено кластерів: {result['clusters']}")
+        print(f"📊 Проходів по таблиці: {result['partitions']}")
+        print("=" * 80)
+
+if __name__ == '__main__':
+    main()
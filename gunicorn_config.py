@@ -19,7 +19,9 @@ elif cpu_count <= 4:
 else:
     workers = cpu_count * 2 + 1  # Для більших серверів: стандартна формула
 
-worker_class = "sync"
+# sync за замовчуванням; gevent/eventlet (pip install gevent) - для SSE потоків
+# фонових задач (JOB_EVENTS_SSE_ENABLED=true), які на sync займають worker на весь потік
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 50
@@ -59,5 +61,13 @@ graceful_timeout = 30
 # Environment
 raw_env = [
     'FLASK_ENV=production',
+    # Квота HubSpot рахується в кожному worker - ліміти акаунта діляться на workers
+    f'HUBSPOT_QUOTA_PROCESSES={workers}',
 ]
 
+
+
+def post_fork(server, worker):
+    """Запускає побудову in-memory індексу телефонів в кожному worker (якщо PHONE_INDEX_ENABLED=true)"""
+    from app import warm_phone_index
+    warm_phone_index()
@@ -0,0 +1,86 @@
+"""
+Пакетні запити v4 associations API HubSpot
+
+Замість запиту на кожен об'єкт (читання) і на кожну пару (видалення):
+    POST /crm/v4/associations/<from>/<to>/batch/read     - асоціації до 100 об'єктів
+    POST /crm/v4/associations/<from>/<to>/batch/archive  - видалення до 100 пар
+    POST /crm/v4/associations/<from>/<to>/batch/associate/default - асоціації типу за замовчуванням для до 100 пар
+
+Читання дочитує асоціації понад одну сторінку (paging.next.after) наступними
+пакетами; видалення групує пари одного об'єкта в один input.
+"""
+from hubspot_batch import BATCH_LIMIT, chunked
+
+ASSOCIATIONS_URL = 'https://api.hubapi.com/crm/v4/associations'
+
+
+class HubSpotAssociations:
+    """Читання і видалення асоціацій пакетами через v4 API"""
+
+    def __init__(self, session, headers, batch_limit=BATCH_LIMIT):
+        """
+        Args:
+            session: Сесія requests (GuardedSession з квотою і breaker)
+            headers: Заголовки з Authorization
+            batch_limit: Об'єктів (читання) або пар (видалення) в одному запиті
+        """
+        self.session = session
+        self.headers = headers
+        self.batch_limit = batch_limit
+
+    def _post(self, from_type, to_type, action, inputs):
+        response = self.session.post(
+            f'{ASSOCIATIONS_URL}/{from_type}/{to_type}/batch/{action}',
+            headers=self.headers,
+            json={'inputs': inputs}
+        )
+        response.raise_for_status()
+        return response
+
+    def read(self, from_type, to_type, ids):
+        """{from_id: [to_id, ...]} для ids; об'єкти без асоціацій відсутні
+
+        207 (частина id без асоціацій або не знайдена) - не помилка. Об'єкти з понад
+        однією сторінкою асоціацій дочитуються наступними пакетами за paging.next.after.
+        """
+        associations = {}
+        pending = [{'id': str(object_id)} for object_id in ids]
+        while pending:
+            next_pending = []
+            for inputs in chunked(pending, self.batch_limit):
+                data = self._post(from_type, to_type, 'read', inputs).json()
+                for result in data.get('results') or []:
+                    from_id = str(result['from']['id'])
+                    to_ids = associations.setdefault(from_id, [])
+                    to_ids.extend(str(target['toObjectId']) for target in result.get('to') or [])
+                    after = ((result.get('paging') or {}).get('next') or {}).get('after')
+                    if after:
+                        next_pending.append({'id': from_id, 'after': after})
+            pending = next_pending
+        return {from_id: to_ids for from_id, to_ids in associations.items() if to_ids}
+
+    def archive(self, from_type, to_type, pairs):
+        """Видаляє асоціації (всіх типів) для пар (from_id, to_id); повертає кількість пар
+
+        Пари одного from_id в межах пакета йдуть одним input.
+        """
+        archived = 0
+        for chunk in chunked(pairs, self.batch_limit):
+            inputs = {}
+            for from_id, to_id in chunk:
+                inputs.setdefault(str(from_id), []).append({'id': str(to_id)})
+            self._post(from_type, to_type, 'archive', [
+                {'from': {'id': from_id}, 'to': targets} for from_id, targets in inputs.items()
+            ])
+            archived += len(chunk)
+        return archived
+
+    def associate(self, from_type, to_type, pairs):
+        """Створює асоціації типу за замовчуванням для пар (from_id, to_id); повертає кількість пар"""
+        associated = 0
+        for chunk in chunked(pairs, self.batch_limit):
+            self._post(from_type, to_type, 'associate/default', [
+                {'from': {'id': str(from_id)}, 'to': {'id': str(to_id)}} for from_id, to_id in chunk
+            ])
+            associated += len(chunk)
+        return associated
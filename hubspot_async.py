@@ -0,0 +1,232 @@
+"""
+Асинхронний клієнт HubSpot API для пакетних і фонових задач (aiohttp)
+
+Один процес тримає в польоті десятки запитів, а не один, як блокуючий SDK:
+- пул з'єднань aiohttp (keep-alive) на весь запуск
+- max_concurrency - скільки запитів одночасно в польоті
+- rate_limit/rate_period - локальне обмеження швидкості (ковзне вікно)
+- quota/lane - та сама HubSpotQuota, що й у синхронному коді (спільний бюджет
+  і заголовки X-HubSpot-RateLimit-*), breaker - той самий CircuitBreaker
+- 429 і 5xx повторюються з паузою з Retry-After (або експоненційною)
+- paginate() - сторінки як async iterator, batch_read() - пакети по 100 паралельно
+
+Використання:
+    async with HubSpotAsyncClient(token, quota=hubspot_quota, lane='bulk') as client:
+        async for deal in client.paginate('/crm/v3/objects/deals', params={'properties': 'dealstage'}):
+            ...
+"""
+import asyncio
+import time
+from collections import deque
+
+import aiohttp
+
+from hubspot_batch import BATCH_LIMIT, chunked
+
+API_BASE = 'https://api.hubapi.com'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HubSpotAsyncError(Exception):
+    """Відповідь HubSpot з помилкою (після всіх повторів)"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(f'HTTP {status}: {message}')
+        self.status = status
+        self.headers = headers or {}
+
+
+class AsyncRateLimiter:
+    """Не більше rate запитів за period секунд (ковзне вікно) для корутин одного event loop"""
+
+    def __init__(self, rate, period=10.0):
+        """
+        Args:
+            rate: Кількість запитів у вікні
+            period: Довжина вікна (секунди)
+        """
+        self.rate = rate
+        self.period = period
+        self._calls = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._calls and self._calls[0] <= now - self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.rate:
+                    self._calls.append(now)
+                    return
+                await asyncio.sleep(self._calls[0] + self.period - now)
+
+
+def retry_delay(headers, attempt, backoff=1.0, max_delay=60.0):
+    """Пауза перед повтором: Retry-After (секунди) або backoff * 2^attempt"""
+    retry_after = (headers or {}).get('Retry-After')
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), max_delay)
+        except ValueError:
+            pass
+    return min(backoff * (2 ** attempt), max_delay)
+
+
+class HubSpotAsyncClient:
+    """Асинхронний клієнт HubSpot REST API з пулом з'єднань, лімітами і повторами"""
+
+    def __init__(self, access_token, max_concurrency=20, rate_limit=90, rate_period=10.0,
+                 quota=None, lane='bulk', breaker=None, max_retries=4, backoff=1.0,
+                 timeout=30, base_url=API_BASE):
+        """
+        Args:
+            access_token: Токен private app HubSpot
+            max_concurrency: Скільки запитів одночасно в польоті (і розмір пулу з'єднань)
+            rate_limit: Запитів за rate_period секунд з цього клієнта (None - без обмеження)
+            rate_period: Вікно rate_limit (секунди)
+            quota: HubSpotQuota - спільний бюджет з синхронним кодом (None - не використовувати)
+            lane: Смуга квоти для всіх запитів клієнта
+            breaker: CircuitBreaker для HubSpot (None - без breaker)
+            max_retries: Скільки разів повторювати 429/5xx і мережеві помилки
+            backoff: Базова пауза експоненційного повтору (секунди)
+            timeout: Timeout одного запиту (секунди)
+            base_url: Адреса API
+        """
+        self.access_token = access_token
+        self.max_concurrency = max_concurrency
+        self.quota = quota
+        self.lane = lane
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.base_url = base_url
+        self._rate_limit = rate_limit
+        self._rate_period = rate_period
+        self._limiter = None
+        self._semaphore = None
+        self._session = None
+        self._stats = {'requests': 0, 'retries': 0, 'errors': 0}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        # Семафор, lock і сесія прив'язані до event loop, тому створюються тут, а не в __init__
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._limiter = AsyncRateLimiter(self._rate_limit, self._rate_period) if self._rate_limit else None
+        self._session = aiohttp.ClientSession(
+            base_url=self.base_url,
+            headers={'Authorization': f'Bearer {self.access_token}', 'Content-Type': 'application/json'},
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _send(self, method, path, params, json):
+        """Один HTTP запит; JSON відповіді або HubSpotAsyncError для 4xx/5xx"""
+        async with self._session.request(method, path, params=params, json=json) as response:
+            if self.quota is not None:
+                self.quota.observe(response)
+            body = await response.json(content_type=None) if response.status != 204 else None
+            if response.status >= 400:
+                message = body.get('message') if isinstance(body, dict) else body
+                raise HubSpotAsyncError(response.status, message, response.headers.copy())
+            return body
+
+    async def request(self, method, path, params=None, json=None):
+        """JSON відповіді HubSpot (None для 204); кидає HubSpotAsyncError після всіх повторів"""
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                if self._limiter is not None:
+                    await self._limiter.acquire()
+                if self.breaker is not None:
+                    # Відкритий breaker відхиляє запит до того, як він займе місце у квоті
+                    self.breaker.reject_if_open()
+                if self.quota is not None:
+                    # acquire блокує потік (спільний з синхронним кодом) - чекаємо в executor
+                    await asyncio.get_running_loop().run_in_executor(None, self.quota.acquire, self.lane)
+                self._stats['requests'] += 1
+                call = lambda: self._send(method, path, params, json)
+                try:
+                    if self.breaker is not None:
+                        return await self.breaker.guard_async(call)
+                    return await call()
+                except HubSpotAsyncError as e:
+                    retryable = e.status in RETRY_STATUSES
+                    error = e
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    retryable = True
+                    error = e
+
+            if not retryable or attempt >= self.max_retries:
+                self._stats['errors'] += 1
+                raise error
+            # Пауза поза семафором - інші запити тим часом продовжують роботу
+            self._stats['retries'] += 1
+            await asyncio.sleep(retry_delay(getattr(error, 'headers', None), attempt, self.backoff))
+            attempt += 1
+
+    async def get(self, path, params=None):
+        return await self.request('GET', path, params=params)
+
+    async def post(self, path, json=None, params=None):
+        return await self.request('POST', path, params=params, json=json)
+
+    async def paginate(self, path, params=None, json=None, method='GET', page_size=100):
+        """Записи всіх сторінок (paging.next.after) як async iterator
+
+        GET - курсор у query параметрі after; POST (search API) - у тілі запиту.
+        """
+        params = dict(params or {}, limit=page_size) if method == 'GET' else params
+        json = dict(json or {}, limit=page_size) if method == 'POST' else json
+        after = None
+        while True:
+            if after:
+                if method == 'GET':
+                    params['after'] = after
+                else:
+                    json['after'] = after
+            page = await self.request(method, path, params=params, json=json)
+            for result in page.get('results') or []:
+                yield result
+            after = ((page.get('paging') or {}).get('next') or {}).get('after')
+            if not after:
+                return
+
+    async def batch_read(self, object_type, ids, properties=None, id_property=None):
+        """Об'єкти за id: пакети по 100 паралельно (batch/read), {id: object}
+
+        Об'єктів, яких немає в HubSpot, у результаті немає.
+        """
+        ids = list(dict.fromkeys(str(object_id) for object_id in ids))
+        chunks = chunked(ids, BATCH_LIMIT)
+        body = {'properties': list(properties or [])}
+        if id_property:
+            body['idProperty'] = id_property
+
+        async def read_chunk(chunk):
+            response = await self.post(
+                f'/crm/v3/objects/{object_type}/batch/read',
+                json=dict(body, inputs=[{'id': object_id} for object_id in chunk])
+            )
+            return response.get('results') or []
+
+        objects = {}
+        for results in await asyncio.gather(*(read_chunk(chunk) for chunk in chunks)):
+            for result in results:
+                objects[str(result['id'])] = result
+        return objects
+
+    def stats(self):
+        return dict(self._stats, max_concurrency=self.max_concurrency)
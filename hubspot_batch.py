@@ -0,0 +1,13 @@
+"""
+Спільне для пакетних (batch) API HubSpot
+
+Batch endpoints CRM API приймають не більше BATCH_LIMIT inputs в одному запиті,
+тому клієнти пакетних запитів ділять вхідні дані через chunked().
+"""
+BATCH_LIMIT = 100
+
+
+def chunked(items, size):
+    """Список частин items довжиною не більше size"""
+    items = list(items)
+    return [items[start:start + size] for start in range(0, len(items), size)]
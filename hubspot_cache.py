@@ -0,0 +1,175 @@
+"""
+Кеш відповідей HubSpot API для повторних читань (GET)
+
+- ключ - шлях URL + параметри запиту (без заголовків авторизації)
+- TTL задається правилами для endpoint-ів (регулярний вираз шляху -> секунди);
+  endpoint-и без правила не кешуються
+- прострочений запис з ETag перевіряється умовним запитом (If-None-Match, 304)
+- запис через той самий транспорт (PATCH/PUT/DELETE/POST) інвалідовує записи про
+  змінені об'єкти; invalidate_object() - явний hook для інших змін
+- LRU в пам'яті процесу, не більше max_entries записів
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+# Правила TTL за замовчуванням: pipelines і owners змінюються рідко,
+# картки контактів/угод - кешуємо ненадовго (повторні кліки "Синхронізувати")
+DEFAULT_TTL_RULES = (
+    (r'^/crm/v3/pipelines/', 3600),
+    (r'^/crm/v3/owners/', 3600),
+    (r'^/crm/v3/objects/(contacts|deals|companies)/\d+$', 60),
+)
+
+OBJECT_REF = re.compile(r'/objects/([a-z_]+)/(\d+)(?:/associations/([a-z_]+)/(\d+))?')
+
+
+def _object_type(name):
+    """contacts / contact -> contact (v3 і v4 API називають типи по-різному)"""
+    return name.lower().rstrip('s')
+
+
+def object_refs(path):
+    """Об'єкти CRM, яких стосується шлях: {(тип, id)}"""
+    refs = set()
+    for match in OBJECT_REF.finditer(path):
+        refs.add((_object_type(match.group(1)), match.group(2)))
+        if match.group(3):
+            refs.add((_object_type(match.group(3)), match.group(4)))
+    return refs
+
+
+class CachedResponse:
+    """Збережена відповідь SDK (сумісна з RESTResponse для десеріалізації)"""
+
+    def __init__(self, status, reason, data, headers):
+        self.status = status
+        self.reason = reason
+        self.data = data
+        self.headers = headers
+
+    @classmethod
+    def from_response(cls, response):
+        headers = getattr(response, 'headers', None)
+        if headers is None and hasattr(response, 'urllib3_response'):
+            headers = response.urllib3_response.headers
+        return cls(response.status, response.reason, response.data, dict(headers or {}))
+
+    def getheaders(self):
+        return self.headers
+
+    def getheader(self, name, default=None):
+        for key, value in self.headers.items():
+            if key.lower() == name.lower():
+                return value
+        return default
+
+
+class _Entry:
+    __slots__ = ('response', 'expires_at', 'etag', 'refs')
+
+    def __init__(self, response, expires_at, etag, refs):
+        self.response = response
+        self.expires_at = expires_at
+        self.etag = etag
+        self.refs = refs
+
+
+class HubSpotResponseCache:
+    """Потокобезпечний LRU кеш відповідей HubSpot"""
+
+    def __init__(self, ttl_rules=DEFAULT_TTL_RULES, max_entries=2000):
+        """
+        Args:
+            ttl_rules: Послідовність (регулярний вираз шляху, TTL в секундах); перше збігання виграє
+            max_entries: Максимальна кількість відповідей у кеші (найстаріші витісняються)
+        """
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in ttl_rules]
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'invalidated': 0}
+
+    def ttl_for(self, path):
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(path):
+                return ttl
+        return 0
+
+    @staticmethod
+    def _key(path, query_params):
+        if not query_params:
+            return path, ()
+        items = query_params.items() if isinstance(query_params, dict) else query_params
+        return path, tuple(sorted((str(k), str(v)) for k, v in items))
+
+    def fetch(self, method, url, query_params, headers, perform):
+        """Виконує perform() або повертає відповідь з кешу
+
+        headers - dict заголовків запиту (сюди додається If-None-Match для перевірки ETag).
+        """
+        path = urlsplit(url).path
+        if method.upper() != 'GET':
+            response = perform()
+            self.invalidate_path(path)
+            return response
+
+        ttl = self.ttl_for(path)
+        if not ttl:
+            return perform()
+
+        key = self._key(path, query_params)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry.response
+
+        if entry is not None and entry.etag and headers is not None:
+            headers['If-None-Match'] = entry.etag
+        try:
+            response = perform()
+        except Exception as e:
+            if entry is not None and getattr(e, 'status', None) == 304:
+                with self._lock:
+                    entry.expires_at = time.time() + ttl
+                    self._stats['revalidated'] += 1
+                return entry.response
+            raise
+
+        cached = CachedResponse.from_response(response)
+        with self._lock:
+            self._stats['misses'] += 1
+            self._entries[key] = _Entry(cached, time.time() + ttl, cached.getheader('ETag'), object_refs(path))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return response
+
+    def invalidate_path(self, path):
+        """Інвалідовує записи про об'єкти, змінені запитом на цей шлях"""
+        for object_type, object_id in object_refs(path):
+            self.invalidate_object(object_type, object_id)
+
+    def invalidate_object(self, object_type, object_id):
+        """Явний hook: видаляє з кешу всі відповіді про об'єкт CRM (напр. 'deals', 123)"""
+        ref = (_object_type(object_type), str(object_id))
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if ref in entry.refs]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidated'] += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Стан кешу для /api/diagnostic"""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
@@ -0,0 +1,198 @@
+"""
+Початкове завантаження через асинхронний CRM export API HubSpot
+
+Замість тисяч сторінок по 100 записів HubSpot сам готує CSV з усіма записами:
+    POST /crm/v3/exports/export/async                       - запит експорту (objectType, властивості)
+    GET  /crm/v3/exports/export/async/tasks/<id>/status     - статус, після COMPLETE - посилання на файл
+
+Файл (CSV або zip з CSV) завантажується потоком у тимчасовий файл і читається
+рядок за рядком, тому в пам'яті ніколи не лежить весь експорт. Рядки віддаються як
+ExportedObject (id, properties, updated_at) - той самий інтерфейс, що й об'єкти SDK,
+тому їх приймають наявні шляхи запису (дзеркало контактів, маппінг лідів).
+"""
+import csv
+import io
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timezone
+
+import requests
+
+EXPORT_URL = 'https://api.hubapi.com/crm/v3/exports/export/async'
+# Стани задачі експорту, після яких файлу не буде
+FAILED_STATES = ('CANCELED', 'FAILED', 'CONFLICT')
+ID_COLUMNS = ('hs_object_id', 'Record ID')
+
+
+class HubSpotExportError(Exception):
+    """Експорт не створено, скасовано або не готовий за відведений час"""
+
+
+def parse_hubspot_datetime(value):
+    """datetime (UTC) з мілісекунд epoch або ISO рядка експорту; None, якщо не розпізнано"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if value.isdigit():
+            return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc)
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ExportedObject:
+    """Рядок експорту з інтерфейсом об'єкта SDK (SimplePublicObject)"""
+
+    __slots__ = ('id', 'properties', 'updated_at', 'associations')
+
+    def __init__(self, object_id, properties, updated_at=None, associations=None):
+        self.id = object_id
+        self.properties = properties
+        self.updated_at = updated_at
+        self.associations = associations or []
+
+    def __repr__(self):
+        return f'<ExportedObject {self.id}>'
+
+
+def exported_objects(rows, updated_property='lastmodifieddate'):
+    """Перетворює рядки CSV (dict) на ExportedObject
+
+    Колонки "Associated ... IDs" (експорт з associatedObjectType) стають associations -
+    список id пов'язаних записів. Порожні значення стають None, як у відповідях API.
+    """
+    association_column = None
+    for row in rows:
+        if association_column is None:
+            association_column = next(
+                (column for column in row if column and column.lower().startswith('associated')
+                 and column.lower().endswith('ids')),
+                ''
+            )
+        object_id = next((row[column] for column in ID_COLUMNS if row.get(column)), None)
+        if not object_id:
+            continue
+        properties = {
+            name: (value if value != '' else None)
+            for name, value in row.items()
+            if name and name != association_column
+        }
+        associations = []
+        if association_column and row.get(association_column):
+            associations = [
+                part.strip() for part in row[association_column].replace(',', ';').split(';') if part.strip()
+            ]
+        yield ExportedObject(
+            str(object_id).strip(), properties,
+            updated_at=parse_hubspot_datetime(properties.get(updated_property)),
+            associations=associations
+        )
+
+
+class HubSpotCrmExport:
+    """Клієнт CRM export API: запит, очікування і потокове читання файлу"""
+
+    def __init__(self, session, headers, poll_interval=5.0, timeout=3600, download_session=None,
+                 chunk_size=1024 * 1024, sleep=time.sleep):
+        """
+        Args:
+            session: requests.Session для запитів до API (напр. GuardedSession з квотою)
+            headers: Заголовки запитів до API (Authorization)
+            poll_interval: Пауза між перевірками статусу (секунди)
+            timeout: Скільки чекати на готовність файлу (секунди)
+            download_session: Сесія для завантаження файлу (посилання підписане, без квоти API)
+            chunk_size: Розмір шматка при завантаженні (байти)
+            sleep: Функція очікування (для тестів)
+        """
+        self.session = session
+        self.headers = headers
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.download_session = download_session or requests.Session()
+        self.chunk_size = chunk_size
+        self.sleep = sleep
+
+    def start(self, object_type, properties, associated_object_type=None, name=None):
+        """Запитує CSV експорт всіх записів object_type ('CONTACT', 'DEAL'); повертає id задачі"""
+        body = {
+            'exportType': 'VIEW',
+            'exportName': name or f'bootstrap {object_type.lower()} {time.strftime("%Y-%m-%d %H:%M")}',
+            'format': 'CSV',
+            'language': 'EN',
+            'objectType': object_type,
+            'objectProperties': list(properties),
+            # Внутрішні назви колонок і значення (id стадій/owner), а не підписи з інтерфейсу
+            'exportInternalValuesOptions': ['NAMES', 'VALUES'],
+        }
+        if associated_object_type:
+            body['associatedObjectType'] = [associated_object_type]
+        response = self.session.post(EXPORT_URL, headers=self.headers, json=body)
+        if not response.ok:
+            raise HubSpotExportError(f'Експорт {object_type} не створено: HTTP {response.status_code} {response.text[:200]}')
+        task_id = response.json().get('id')
+        if not task_id:
+            raise HubSpotExportError(f'Експорт {object_type}: відповідь без id задачі')
+        return str(task_id)
+
+    def status(self, task_id):
+        """Статус задачі експорту: {'status': ..., 'result': посилання на файл або None}"""
+        response = self.session.get(f'{EXPORT_URL}/tasks/{task_id}/status', headers=self.headers)
+        if not response.ok:
+            raise HubSpotExportError(f'Статус експорту {task_id}: HTTP {response.status_code}')
+        data = response.json()
+        return {'status': (data.get('status') or '').upper(), 'result': data.get('result')}
+
+    def wait(self, task_id, on_poll=None):
+        """Чекає готовності експорту і повертає посилання на файл
+
+        on_poll(status, waited_seconds) викликається після кожної перевірки.
+        """
+        started = time.time()
+        while True:
+            state = self.status(task_id)
+            waited = time.time() - started
+            if on_poll:
+                on_poll(state['status'], waited)
+            if state['status'] == 'COMPLETE' and state['result']:
+                return state['result']
+            if state['status'] in FAILED_STATES:
+                raise HubSpotExportError(f'Експорт {task_id} завершився зі статусом {state["status"]}')
+            if waited >= self.timeout:
+                raise HubSpotExportError(f'Експорт {task_id} не готовий за {self.timeout:.0f} с (статус {state["status"]})')
+            self.sleep(self.poll_interval)
+
+    def iter_rows(self, url):
+        """Рядки файлу експорту (dict за заголовком CSV); zip з кількома CSV читається по черзі"""
+        with tempfile.TemporaryFile() as spool:
+            with self.download_session.get(url, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    spool.write(chunk)
+            spool.seek(0)
+            if zipfile.is_zipfile(spool):
+                spool.seek(0)
+                with zipfile.ZipFile(spool) as archive:
+                    for member in sorted(archive.namelist()):
+                        if member.lower().endswith('.csv'):
+                            with archive.open(member) as member_file:
+                                yield from _csv_rows(member_file)
+            else:
+                spool.seek(0)
+                yield from _csv_rows(spool)
+
+    def export(self, object_type, properties, associated_object_type=None, on_poll=None):
+        """start + wait + iter_rows: генератор рядків готового експорту"""
+        task_id = self.start(object_type, properties, associated_object_type=associated_object_type)
+        url = self.wait(task_id, on_poll=on_poll)
+        yield from self.iter_rows(url)
+
+
+def _csv_rows(binary_file):
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        text.detach()
@@ -0,0 +1,44 @@
+"""
+Відбитки (hash) властивостей HubSpot, застосованих до ліда
+
+Синхронізація і імпорти записують у лід одні й ті самі значення на кожному проході,
+а кожен UPDATE зсуває lead.updated_at. Лід зберігає відбиток останнього застосованого
+набору властивостей окремо для кожного джерела (імпорт deals, імпорт контактів,
+синхронізація ліда); якщо новий відбиток збігається зі збереженим, запис пропускається.
+
+Використання:
+    fingerprint = property_fingerprint(contact.properties, deal.properties)
+    if fingerprint_matches(lead.hubspot_fingerprints, 'sync', fingerprint):
+        return
+    ... записуємо поля ...
+    lead.hubspot_fingerprints = with_fingerprint(lead.hubspot_fingerprints, 'sync', fingerprint)
+"""
+import hashlib
+import json
+
+# Системні властивості, які HubSpot змінює при будь-якій зміні об'єкта (і тих полів, які ми не читаємо)
+VOLATILE_PROPERTIES = frozenset({'createdate', 'lastmodifieddate', 'hs_lastmodifieddate'})
+
+
+def property_fingerprint(*property_sets):
+    """Відбиток наборів властивостей: 32 hex символи, не залежить від порядку ключів
+
+    None замість набору (наприклад, ліду без deal) теж враховується.
+    """
+    canonical = [
+        {name: value for name, value in property_set.items() if name not in VOLATILE_PROPERTIES}
+        if property_set is not None else None
+        for property_set in property_sets
+    ]
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def fingerprint_matches(fingerprints, source, fingerprint):
+    """Чи вже застосовано набір з цим відбитком з джерела source"""
+    return bool(fingerprints) and fingerprints.get(source) == fingerprint
+
+
+def with_fingerprint(fingerprints, source, fingerprint):
+    """Новий словник відбитків (новий об'єкт - щоб SQLAlchemy помітив зміну JSON колонки)"""
+    return dict(fingerprints or {}, **{source: fingerprint})
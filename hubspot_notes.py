@@ -0,0 +1,88 @@
+"""
+Пакетне створення нотаток HubSpot з асоціацією з deal в тому ж запиті
+
+Замість двох запитів на нотатку (POST нотатки, потім PUT асоціації note -> deal):
+    POST /crm/v3/objects/notes/batch/create  - до 100 нотаток, асоціації в inputs
+
+Кожна нотатка передається з ключем (ID коментаря) як objectWriteTraceId, за ним
+результати зіставляються з коментарями - порядок results HubSpot не гарантує.
+Пакет, який HubSpot відхилив через одну нотатку (400, наприклад видалений deal),
+повторюється поодинці, щоб решта нотаток пакета все одно створилась.
+"""
+from hubspot_batch import BATCH_LIMIT, chunked
+
+NOTES_BATCH_CREATE_URL = 'https://api.hubapi.com/crm/v3/objects/notes/batch/create'
+
+
+class HubSpotNotes:
+    """Створення нотаток, асоційованих з deals, пакетами через v3 batch API"""
+
+    def __init__(self, session, headers, deal_association_type, batch_limit=BATCH_LIMIT):
+        """
+        Args:
+            session: Сесія requests (GuardedSession з квотою і breaker)
+            headers: Заголовки з Authorization
+            deal_association_type: HubSpot-defined ID типу асоціації note -> deal
+            batch_limit: Нотаток в одному запиті
+        """
+        self.session = session
+        self.headers = headers
+        self.deal_association_type = deal_association_type
+        self.batch_limit = batch_limit
+
+    def _input(self, key, body, timestamp, deal_id):
+        return {
+            'objectWriteTraceId': str(key),
+            'properties': {'hs_note_body': body, 'hs_timestamp': timestamp},
+            'associations': [{
+                'to': {'id': str(deal_id)},
+                'types': [{'associationCategory': 'HUBSPOT_DEFINED', 'associationTypeId': self.deal_association_type}]
+            }]
+        }
+
+    def _create_batch(self, inputs):
+        response = self.session.post(NOTES_BATCH_CREATE_URL, headers=self.headers, json={'inputs': inputs})
+        if response.status_code == 400 and len(inputs) > 1:
+            # Один некоректний input (наприклад, видалений deal) відхиляє весь пакет -
+            # створюємо нотатки пакета поодинці, щоб решта не чекала
+            created, errors = {}, {}
+            for note_input in inputs:
+                note_created, note_errors = self._create_batch([note_input])
+                created.update(note_created)
+                errors.update(note_errors)
+            return created, errors
+        if response.status_code == 400:
+            return {}, {inputs[0]['objectWriteTraceId']: f'400: {response.text[:200]}'}
+        response.raise_for_status()
+
+        data = response.json()
+        by_properties = {
+            (note_input['properties']['hs_note_body'], note_input['properties']['hs_timestamp']): note_input['objectWriteTraceId']
+            for note_input in inputs
+        }
+        created = {}
+        for result in data.get('results') or []:
+            key = result.get('objectWriteTraceId')
+            if key is None:
+                # Відповідь без objectWriteTraceId - зіставляємо за текстом і часом нотатки
+                properties = result.get('properties') or {}
+                key = by_properties.get((properties.get('hs_note_body'), properties.get('hs_timestamp')))
+            if key is not None:
+                created[key] = str(result['id'])
+        # 207: частина нотаток не створена
+        message = '; '.join(error.get('message', '') for error in data.get('errors') or []) or 'нотатку не створено'
+        errors = {note_input['objectWriteTraceId']: message
+                  for note_input in inputs if note_input['objectWriteTraceId'] not in created}
+        return created, errors
+
+    def create(self, notes):
+        """Створює нотатки для (key, body, timestamp, deal_id); повертає ({key: note_id}, {key: помилка})
+
+        Ключі в результатах - рядки. Помилка HTTP (крім 400 окремої нотатки) не ковтається.
+        """
+        created, errors = {}, {}
+        for chunk in chunked(notes, self.batch_limit):
+            chunk_created, chunk_errors = self._create_batch([self._input(*note) for note in chunk])
+            created.update(chunk_created)
+            errors.update(chunk_errors)
+        return created, errors
@@ -0,0 +1,219 @@
+"""
+Бюджет запитів до HubSpot API з пріоритетними смугами (lanes)
+
+Всі виклики HubSpot ділять одну квоту: ~100 запитів за 10 секунд і денний ліміт.
+Щоб повний імпорт не "з'їдав" квоту інтерактивних дій користувача, кожен запит
+належить до смуги:
+- interactive - дії користувача (створення ліда, коментарі, зміна агента)
+- polling - періодична синхронізація (нотатки, статуси, планувальник)
+- bulk - повні імпорти та експорти
+
+Нижчі смуги можуть використати лише частку 10-секундного вікна, мають резерв денного
+ліміту, який вони не чіпають, і чекають, поки є запити вищих смуг в очікуванні.
+Значення з заголовків X-HubSpot-RateLimit-* (спільні для всіх workers) мають пріоритет
+над локальним підрахунком.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date
+
+LANES = ('interactive', 'polling', 'bulk')
+
+# Частка 10-секундного вікна, доступна смузі
+DEFAULT_BURST_SHARE = {'interactive': 1.0, 'polling': 0.7, 'bulk': 0.5}
+# Частка денного ліміту, яка має залишитись, щоб смуга могла робити запити
+DEFAULT_DAILY_RESERVE = {'interactive': 0.0, 'polling': 0.05, 'bulk': 0.15}
+# Скільки смуга чекає на вільне місце у вікні (None - без обмеження)
+DEFAULT_WAIT_TIMEOUT = {'interactive': 10.0, 'polling': None, 'bulk': None}
+
+
+class HubSpotQuotaExceeded(Exception):
+    """Квоту для смуги вичерпано - запит до HubSpot не виконується"""
+
+
+def _header(headers, name):
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def response_headers(obj):
+    """Заголовки відповіді SDK (RESTResponse / ApiException) або requests.Response"""
+    headers = getattr(obj, 'headers', None)
+    if headers is None and hasattr(obj, 'urllib3_response'):
+        headers = obj.urllib3_response.headers
+    return headers
+
+
+def response_status(obj):
+    return getattr(obj, 'status', None) or getattr(obj, 'status_code', None)
+
+
+class HubSpotQuota:
+    """Менеджер квоти HubSpot API (потокобезпечний, в межах процесу)"""
+
+    def __init__(self, burst_limit=100, burst_window=10.0, daily_limit=250000,
+                 burst_share=None, daily_reserve=None, wait_timeout=None, default_lane=None):
+        self.burst_limit = burst_limit
+        self.burst_window = burst_window
+        self.daily_limit = daily_limit
+        self.burst_share = dict(DEFAULT_BURST_SHARE, **(burst_share or {}))
+        self.daily_reserve = dict(DEFAULT_DAILY_RESERVE, **(daily_reserve or {}))
+        self.wait_timeout = dict(DEFAULT_WAIT_TIMEOUT, **(wait_timeout or {}))
+        self._default_lane = default_lane or (lambda: 'polling')
+        self._local = threading.local()
+        self._condition = threading.Condition()
+        self._calls = deque()
+        self._day = date.today()
+        self._daily_used = 0
+        self._reported_daily_remaining = None
+        self._reported_remaining = None
+        self._reported_until = 0
+        self._blocked_until = 0
+        self._waiting = {lane: 0 for lane in LANES}
+        self._stats = {lane: {'calls': 0, 'waits': 0, 'rejected': 0} for lane in LANES}
+
+    @contextmanager
+    def lane(self, name):
+        """Всі запити до HubSpot всередині блоку йдуть через смугу name"""
+        if name not in LANES:
+            raise ValueError(f'Невідома смуга: {name}')
+        previous = getattr(self._local, 'lane', None)
+        self._local.lane = name
+        try:
+            yield
+        finally:
+            self._local.lane = previous
+
+    def current_lane(self):
+        return getattr(self._local, 'lane', None) or self._default_lane()
+
+    def acquire(self, lane=None):
+        """Резервує один запит; чекає на місце у вікні або кидає HubSpotQuotaExceeded"""
+        lane = lane or self.current_lane()
+        timeout = self.wait_timeout.get(lane)
+        deadline = None if timeout is None else time.time() + timeout
+        waited = False
+
+        with self._condition:
+            self._waiting[lane] += 1
+            try:
+                while True:
+                    now = time.time()
+                    self._roll(now)
+                    if self._daily_remaining() <= self.daily_limit * self.daily_reserve[lane]:
+                        self._stats[lane]['rejected'] += 1
+                        raise HubSpotQuotaExceeded(f'Денний ліміт HubSpot для смуги {lane} вичерпано')
+
+                    wait_for = self._wait_time(lane, now)
+                    if wait_for <= 0:
+                        self._calls.append(now)
+                        self._daily_used += 1
+                        self._stats[lane]['calls'] += 1
+                        return
+
+                    if deadline is not None:
+                        if now >= deadline:
+                            self._stats[lane]['rejected'] += 1
+                            raise HubSpotQuotaExceeded(f'Немає вільної квоти HubSpot для смуги {lane}')
+                        wait_for = min(wait_for, deadline - now)
+                    if not waited:
+                        waited = True
+                        self._stats[lane]['waits'] += 1
+                    self._condition.wait(wait_for)
+            finally:
+                self._waiting[lane] -= 1
+                self._condition.notify_all()
+
+    def _roll(self, now):
+        while self._calls and self._calls[0] <= now - self.burst_window:
+            self._calls.popleft()
+        if date.today() != self._day:
+            self._day = date.today()
+            self._daily_used = 0
+            self._reported_daily_remaining = None
+
+    def _daily_remaining(self):
+        local_remaining = self.daily_limit - self._daily_used
+        if self._reported_daily_remaining is None:
+            return local_remaining
+        return min(local_remaining, self._reported_daily_remaining)
+
+    def _wait_time(self, lane, now):
+        """Скільки секунд смузі чекати перед наступним запитом (0 - можна зараз)"""
+        poll = min(0.25, self.burst_window)
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        # Вищі смуги в черзі мають перевагу
+        for higher in LANES[:LANES.index(lane)]:
+            if self._waiting[higher]:
+                return poll
+
+        allowed = self.burst_limit * self.burst_share[lane]
+        used = len(self._calls)
+        if self._reported_remaining is not None and now < self._reported_until:
+            # HubSpot бачить запити всіх workers - беремо більше з двох значень
+            used = max(used, self.burst_limit - self._reported_remaining)
+        if used < allowed:
+            return 0
+        if self._calls and len(self._calls) >= allowed:
+            return max(self._calls[0] + self.burst_window - now, 0.01)
+        return max(min(self._reported_until - now, self.burst_window), 0.01)
+
+    def observe(self, obj):
+        """Оновлює стан з відповіді HubSpot (заголовки X-HubSpot-RateLimit-*, 429)"""
+        headers = response_headers(obj)
+        remaining = _header(headers, 'X-HubSpot-RateLimit-Remaining')
+        interval_ms = _header(headers, 'X-HubSpot-RateLimit-Interval-Milliseconds')
+        daily_remaining = _header(headers, 'X-HubSpot-RateLimit-Daily-Remaining')
+        retry_after = _header(headers, 'Retry-After')
+
+        with self._condition:
+            now = time.time()
+            if remaining is not None:
+                self._reported_remaining = remaining
+                self._reported_until = now + (interval_ms / 1000.0 if interval_ms else self.burst_window)
+            if daily_remaining is not None:
+                self._reported_daily_remaining = daily_remaining
+            if response_status(obj) == 429:
+                self._blocked_until = max(self._blocked_until, now + (retry_after or self.burst_window))
+            self._condition.notify_all()
+
+    def guard(self, call):
+        """Виконує call() (HTTP запит до HubSpot) в межах квоти поточної смуги"""
+        self.acquire()
+        try:
+            response = call()
+        except Exception as e:
+            if response_headers(e) is not None or response_status(e):
+                self.observe(e)
+            raise
+        self.observe(response)
+        return response
+
+    def stats(self):
+        """Стан квоти для /api/diagnostic"""
+        with self._condition:
+            now = time.time()
+            self._roll(now)
+            return {
+                'daily_limit': self.daily_limit,
+                'daily_used_by_worker': self._daily_used,
+                'daily_remaining': self._daily_remaining(),
+                'daily_remaining_source': 'hubspot' if self._reported_daily_remaining is not None else 'local',
+                'burst_limit': self.burst_limit,
+                'burst_window_seconds': self.burst_window,
+                'burst_used': len(self._calls),
+                'blocked_for_seconds': round(max(self._blocked_until - now, 0), 1),
+                'lanes': {
+                    lane: dict(self._stats[lane], waiting=self._waiting[lane]) for lane in LANES
+                },
+            }
@@ -0,0 +1,90 @@
+"""
+Транспортний шар HubSpot: спільні обгортки (guards) для всіх HTTP запитів до HubSpot
+
+guard - функція guard(call), яка виконує call() (сам HTTP запит) і може чекати,
+відмовляти або спостерігати за відповіддю (квота, circuit breaker).
+
+- guarded_api_factory - api_factory для HubSpot(...), обгортає ApiClient.request кожного API SDK
+- GuardedSession - requests.Session для прямих запитів до api.hubapi.com
+- кеш відповідей (hubspot_cache) підключається параметром cache і стоїть перед guards
+- is_hubspot_failure / is_hubspot_failed_response - що вважати недоступністю HubSpot (для circuit breaker)
+"""
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from hubspot.discovery.discovery_base import DiscoveryBase
+
+
+def is_hubspot_failure(error):
+    """Помилка означає, що HubSpot недоступний: мережа, timeout або 5xx (але не 4xx/429)"""
+    status = getattr(error, 'status', None)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, (OSError, urllib3.exceptions.HTTPError, requests.RequestException))
+
+
+def is_hubspot_failed_response(response):
+    """requests.Response з 5xx (GuardedSession не кидає винятків на HTTP помилки)"""
+    status = getattr(response, 'status_code', None)
+    return status is not None and status >= 500
+
+
+def chain_guards(guards):
+    """Об'єднує guards в один: перший у списку - зовнішній"""
+    def guarded(call):
+        for guard in reversed(guards):
+            call = (lambda inner, g: lambda: g(inner))(call, guard)
+        return call()
+    return guarded
+
+
+def guarded_api_factory(*guards, request_timeout=None, cache=None):
+    """api_factory, що пропускає кожен HTTP запит SDK через guards
+
+    request_timeout - timeout HTTP запиту SDK за замовчуванням (у SDK його немає)
+    cache - HubSpotResponseCache; стоїть перед guards, тому відповідь з кешу
+    не витрачає квоту і не проходить через circuit breaker
+    """
+    guard = chain_guards(list(guards))
+
+    def api_factory(api_client_package, api_name, config):
+        api = DiscoveryBase._default_api_factory(api_client_package, api_name, config)
+        api_client = api.api_client
+        request = api_client.request
+
+        def guarded_request(method, url, *args, **kwargs):
+            if request_timeout and kwargs.get('_request_timeout') is None:
+                kwargs['_request_timeout'] = request_timeout
+            perform = lambda: guard(lambda: request(method, url, *args, **kwargs))
+            if cache is None or args or not kwargs.get('_preload_content', True):
+                return perform()
+            kwargs['headers'] = dict(kwargs.get('headers') or {})
+            return cache.fetch(method, url, kwargs.get('query_params'), kwargs['headers'], perform)
+
+        api_client.request = guarded_request
+        return api
+
+    return api_factory
+
+
+class GuardedSession(requests.Session):
+    """requests.Session, кожен запит якої проходить через guards
+
+    cache - HubSpotResponseCache: успішні записи через сесію інвалідовують
+    закешовані відповіді SDK про змінені об'єкти
+    """
+
+    def __init__(self, *guards, timeout=30, cache=None):
+        super().__init__()
+        self._guard = chain_guards(list(guards))
+        self._timeout = timeout
+        self._cache = cache
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self._timeout)
+        parent = super().request
+        response = self._guard(lambda: parent(method, url, **kwargs))
+        if self._cache is not None and method.upper() != 'GET' and response.ok:
+            self._cache.invalidate_path(urlsplit(url).path)
+        return response
@@ -0,0 +1,137 @@
+"""
+Контроль пам'яті імпортів і експортів
+
+ImportMemoryMonitor відстежує пам'ять одного запуску: приріст RSS процесу від початку
+запуску і його пік, стелю (ceiling_mb) і, якщо увімкнено трасування, найбільші місця
+виділення пам'яті в кінці.
+
+Стеля перевіряється за RSS процесу: це пам'ять worker разом з іншими потоками
+(запити, інші фонові задачі), тобто саме те, що обмежує сервер. tracemalloc -
+лише для звіту: він спільний для всього процесу, тому запуски, що перекриваються,
+рахуються (start/stop тільки першим і останнім запуском).
+"""
+import os
+import sys
+import threading
+import tracemalloc
+
+MB = 1024 * 1024
+
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_started = False
+
+
+class MemoryCeilingExceeded(Exception):
+    """Пам'ять запуску перевищила стелю навіть після звільнення сесії"""
+
+
+def process_rss():
+    """Поточний RSS процесу в байтах
+
+    /proc/self/statm (Linux); інакше - пік RSS з getrusage (не зменшується після звільнення).
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux - кілобайти, macOS - байти
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _start_tracing():
+    global _trace_users, _trace_started
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _trace_started = True
+        _trace_users += 1
+
+
+def _stop_tracing():
+    global _trace_users, _trace_started
+    with _trace_lock:
+        _trace_users -= 1
+        # Трасування, запущене не моніторами (наприклад, PYTHONTRACEMALLOC), не зупиняємо
+        if _trace_users == 0 and _trace_started:
+            tracemalloc.stop()
+            _trace_started = False
+
+
+class ImportMemoryMonitor:
+    """Пам'ять одного запуску імпорту/експорту"""
+
+    def __init__(self, name, ceiling_mb=None, trace=False, top=5, rss=process_rss):
+        """
+        Args:
+            name: Назва запуску (для звіту)
+            ceiling_mb: Стеля приросту RSS процесу за запуск в МБ (None - без обмеження)
+            trace: Трасувати виділення (tracemalloc) для звіту - помітно сповільнює процес
+            top: Скільки найбільших місць виділення пам'яті включити у звіт
+            rss: Функція поточного RSS процесу в байтах
+        """
+        self.name = name
+        self.ceiling_mb = ceiling_mb
+        self.trace = trace
+        self.top = top
+        self.rss = rss
+        self.batches = 0
+        self.releases_over_ceiling = 0
+        self._tracing = False
+        self._baseline = 0
+        self._peak = 0
+        self._report = None
+
+    def __enter__(self):
+        self._baseline = self.rss()
+        if self.trace:
+            _start_tracing()
+            self._tracing = True
+        return self
+
+    def __exit__(self, *exc_info):
+        self._report = self._build_report()
+        if self._tracing:
+            _stop_tracing()
+            self._tracing = False
+
+    def current_mb(self):
+        """Приріст RSS процесу з початку запуску (МБ)"""
+        used = max(self.rss() - self._baseline, 0)
+        self._peak = max(self._peak, used)
+        return used / MB
+
+    def over_ceiling(self):
+        return bool(self.ceiling_mb) and self.current_mb() > self.ceiling_mb
+
+    def batch_released(self):
+        """Позначає звільнений пакет; кидає MemoryCeilingExceeded, якщо пам'ять не повернулась під стелю"""
+        self.batches += 1
+        if self.over_ceiling():
+            self.releases_over_ceiling += 1
+            raise MemoryCeilingExceeded(
+                f'{self.name}: {self.current_mb():.0f} МБ після звільнення пакета (стеля {self.ceiling_mb:.0f} МБ)'
+            )
+
+    def _build_report(self):
+        report = {
+            'name': self.name,
+            'traced': self._tracing,
+            'current_mb': round(self.current_mb(), 1),
+            'peak_mb': round(self._peak / MB, 1),
+            'ceiling_mb': self.ceiling_mb,
+            'batches': self.batches,
+        }
+        if self._tracing and self.top:
+            statistics = tracemalloc.take_snapshot().statistics('lineno')[:self.top]
+            report['top_allocations'] = [
+                f'{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size / MB:.1f} МБ'
+                for stat in statistics
+            ]
+        return report
+
+    def report(self):
+        """Звіт запуску (після виходу з with - зафіксований при виході)"""
+        return self._report or self._build_report()
@@ -0,0 +1,137 @@
+"""
+Журнал подій фонових задач для Server-Sent Events (text/event-stream)
+
+Кожна задача пише події (progress, backoff, done) у файл <events_dir>/<job_id>.jsonl.
+Глядачі читають файл з потрібного байтового зсуву, тому:
+- БД не опитується - прогрес бачать всі gunicorn workers через спільний файл
+- id події = зсув кінця рядка, тому перепідключення з Last-Event-ID - це один seek
+- глядачі в тому ж процесі прокидаються одразу через threading.Condition,
+  зміни від інших процесів підхоплюються перевіркою розміру файлу раз на poll_interval
+"""
+import json
+import os
+import threading
+import time
+
+# Подія, після якої задача більше нічого не пише
+DONE_EVENT = 'done'
+
+
+class JobEventLog:
+    """Файловий журнал подій фонових задач"""
+
+    def __init__(self, events_dir, poll_interval=0.5):
+        self.events_dir = events_dir
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+
+    def _path(self, job_id):
+        return os.path.join(self.events_dir, f'{int(job_id)}.jsonl')
+
+    def exists(self, job_id):
+        return os.path.exists(self._path(job_id))
+
+    def publish(self, job_id, event, data=None):
+        """Додає подію в журнал задачі"""
+        line = json.dumps({'event': event, 'data': data, 'ts': time.time()}, default=str, ensure_ascii=False)
+        os.makedirs(self.events_dir, exist_ok=True)
+        with self._condition:
+            # Один write() рядка в режимі append - рядки від різних процесів не перемішуються
+            with open(self._path(job_id), 'a', encoding='utf-8') as events_file:
+                events_file.write(line + '\n')
+            self._condition.notify_all()
+
+    def clear(self, job_id):
+        """Видаляє журнал задачі (перед повторним запуском)"""
+        with self._condition:
+            try:
+                os.remove(self._path(job_id))
+            except FileNotFoundError:
+                pass
+
+    def read(self, job_id, offset=0):
+        """Події після байтового зсуву offset: [(id, event, data)]"""
+        events = []
+        try:
+            with open(self._path(job_id), 'rb') as events_file:
+                events_file.seek(offset)
+                for raw in events_file:
+                    if not raw.endswith(b'\n'):
+                        # Рядок ще дописується - прочитаємо наступного разу
+                        break
+                    offset += len(raw)
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        continue
+                    events.append((offset, record.get('event'), record.get('data')))
+        except FileNotFoundError:
+            pass
+        return events
+
+    def _size(self, job_id):
+        try:
+            return os.path.getsize(self._path(job_id))
+        except OSError:
+            return 0
+
+    def stream(self, job_id, last_event_id=0, max_duration=25, keepalive=10):
+        """Генератор SSE повідомлень для задачі
+
+        Потік закривається після події done або через max_duration секунд
+        (менше за timeout gunicorn) - браузер перепідключається з Last-Event-ID.
+        """
+        offset = int(last_event_id or 0)
+        deadline = time.time() + max_duration
+        last_sent = time.time()
+        yield f'retry: {int(self.poll_interval * 2000)}\n\n'
+
+        while True:
+            if offset > self._size(job_id):
+                # Журнал очищено (задачу перезапущено) - читаємо з початку
+                offset = 0
+            for event_id, event, data in self.read(job_id, offset):
+                offset = event_id
+                last_sent = time.time()
+                yield format_sse(event, data, event_id)
+                if event == DONE_EVENT:
+                    return
+
+            now = time.time()
+            if now >= deadline:
+                return
+            if now - last_sent >= keepalive:
+                last_sent = now
+                yield ': keepalive\n\n'
+
+            with self._condition:
+                if self._size(job_id) <= offset:
+                    self._condition.wait(min(self.poll_interval, max(deadline - now, 0)))
+
+    def prune(self, max_age=86400):
+        """Видаляє журнали задач, старші за max_age секунд"""
+        removed = 0
+        try:
+            names = os.listdir(self.events_dir)
+        except FileNotFoundError:
+            return 0
+        cutoff = time.time() - max_age
+        for name in names:
+            path = os.path.join(self.events_dir, name)
+            try:
+                if name.endswith('.jsonl') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+def format_sse(event, data, event_id=None):
+    """Одне повідомлення у форматі text/event-stream"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=str, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,108 @@
+"""
+Пакетний пошук дублікатів лідів
+
+Один потоковий прохід по таблиці: для кожного ліда рахуються 64-бітні хеші
+нормалізованого телефону, другого телефону та email (lowercase). Ліди з однаковим
+хешем об'єднуються через union-find, тому час - O(n), без попарних запитів.
+
+Пам'ять обмежена: якщо ключів більше ніж max_keys_in_memory, хеші розбиваються
+на партиції і таблиця читається кілька разів (кожен прохід тримає тільки свою партицію).
+"""
+import hashlib
+import math
+
+MIN_PHONE_DIGITS = 7
+PLACEHOLDER_EMAIL_SUFFIXES = ('@hubspot.local',)
+
+
+def key_hash(kind, value):
+    """64-бітний хеш ключа (kind - 'phone' або 'email')"""
+    digest = hashlib.blake2b(f'{kind}:{value}'.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def lead_keys(phone_digits, second_phone_digits, email):
+    """Повертає список (kind, hash) для ліда
+
+    Обидва телефони в одному просторі 'phone', тому phone одного ліда
+    збігається з second_phone іншого.
+    """
+    keys = []
+    for digits in (phone_digits, second_phone_digits):
+        if digits and len(digits) >= MIN_PHONE_DIGITS:
+            keys.append(('phone', key_hash('phone', digits)))
+    if email:
+        email = email.strip().lower()
+        if email and '@' in email and not email.endswith(PLACEHOLDER_EMAIL_SUFFIXES):
+            keys.append(('email', key_hash('email', email)))
+    return keys
+
+
+class UnionFind:
+    """Union-find тільки для id, що мають збіги (решта лідів не займає пам'ять)"""
+
+    def __init__(self):
+        self.parent = {}
+        self.reasons = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent == item:
+            return item
+        # Стиснення шляху
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b, reason):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            if root_a > root_b:
+                root_a, root_b = root_b, root_a
+            self.parent[root_b] = root_a
+            self.reasons.setdefault(root_a, set()).update(self.reasons.pop(root_b, ()))
+        self.reasons.setdefault(root_a, set()).add(reason)
+
+    def clusters(self):
+        """Повертає список (sorted_member_ids, sorted_reasons)"""
+        groups = {}
+        for item in list(self.parent):
+            groups.setdefault(self.find(item), []).append(item)
+        return [
+            (sorted(members), sorted(self.reasons.get(root, ())))
+            for root, members in groups.items()
+            if len(members) > 1
+        ]
+
+
+def find_duplicate_clusters(read_rows, total_rows=None, max_keys_in_memory=500000):
+    """Знаходить кластери дублікатів
+
+    read_rows() - повертає ітератор (id, phone_digits, second_phone_digits, email); викликається
+    один раз на партицію. total_rows - оцінка кількості лідів для вибору кількості партицій.
+    """
+    partitions = 1
+    if total_rows:
+        partitions = max(1, math.ceil(total_rows * 3 / max_keys_in_memory))
+
+    uf = UnionFind()
+    for partition in range(partitions):
+        first_seen = {}
+        for lead_id, phone_digits, second_phone_digits, email in read_rows():
+            for kind, value in lead_keys(phone_digits, second_phone_digits, email):
+                if value % partitions != partition:
+                    continue
+                owner = first_seen.setdefault(value, lead_id)
+                if owner != lead_id:
+                    uf.union(owner, lead_id, kind)
+        first_seen = None
+
+    return uf.clusters(), partitions
+
+
+def cluster_fingerprint(member_ids):
+    """Стабільний ідентифікатор кластера за складом учасників"""
+    return hashlib.sha1(','.join(str(i) for i in member_ids).encode('utf-8')).hexdigest()
@@ -0,0 +1,194 @@
+"""
+Спільний виконавець сервісних команд (flask maintenance ...)
+
+Команда дає відсортований список ключів (id лідів, коментарів, deals) і обробник
+пакета; виконавець:
+- ділить ключі на пакети по batch_size і виконує до concurrency пакетів одночасно
+- кожен пакет - у worker_context (контекст застосунку, смуга квоти, commit)
+- після кожного пакета зберігає курсор (останній ключ неперервно завершеного
+  префікса) у state_dir/<name>.json; перерваний запуск (або запуск з пакетом,
+  що впав) продовжується з курсора
+- повертає результат як dict (для --json) з лічильниками результатів обробника
+
+Обробник пакета: handler(keys, dry_run) -> {результат: кількість} (або BatchResult
+з повідомленнями про помилки); виняток рахує весь пакет як errors. each_item()
+робить обробник пакета з функції для одного ключа.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime
+
+ERRORS_KEPT = 20
+
+
+class BatchResult(Counter):
+    """Лічильники результатів пакета і повідомлення про помилки окремих ключів"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.errors = []
+
+    def error(self, key, error):
+        self['errors'] += 1
+        self.errors.append(f'{key}: {error}')
+
+
+def each_item(fn):
+    """Обробник пакета з fn(key, dry_run) -> результат; помилка одного ключа не зупиняє пакет"""
+    def handle(keys, dry_run):
+        result = BatchResult()
+        for key in keys:
+            try:
+                result[fn(key, dry_run) or 'skipped'] += 1
+            except Exception as e:
+                result.error(key, e)
+        return result
+    return handle
+
+
+class MaintenanceRunner:
+    """Пакетне паралельне виконання команди з продовженням після переривання"""
+
+    def __init__(self, name, handler, batch_size=100, concurrency=4, dry_run=False,
+                 state_dir=None, worker_context=None, on_batch=None):
+        """
+        Args:
+            name: Назва команди (і файлу стану)
+            handler: handler(keys, dry_run) -> {результат: кількість}
+            batch_size: Ключів у пакеті
+            concurrency: Скільки пакетів виконується одночасно
+            dry_run: Передається обробнику; стан не зберігається
+            state_dir: Каталог файлів стану (None - без продовження)
+            worker_context: Фабрика context manager для кожного пакета (None - без контексту)
+            on_batch: on_batch(result) після кожного пакета - для виводу прогресу
+        """
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError('batch_size і concurrency мають бути >= 1')
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.dry_run = dry_run
+        self.state_dir = state_dir
+        self.worker_context = worker_context or nullcontext
+        self.on_batch = on_batch
+        self._lock = threading.Lock()
+
+    @property
+    def state_path(self):
+        if not self.state_dir or self.dry_run:
+            return None
+        return os.path.join(self.state_dir, f'{self.name}.json')
+
+    def load_state(self):
+        """Збережений стан перерваного запуску або None"""
+        path = self.state_path
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def reset(self):
+        """Видаляє збережений стан (наступний запуск - з початку)"""
+        path = self.state_path
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def _save_state(self, state):
+        path = self.state_path
+        if not path:
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        state = dict(state, updated_at=datetime.utcnow().isoformat())
+        # Атомарний запис: перерваний запис не має зіпсувати курсор
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _run_batch(self, keys):
+        with self.worker_context():
+            return self.handler(keys, self.dry_run)
+
+    def run(self, keys, resume=True):
+        """Обробляє відсортовані ключі; повертає результат запуску (dict)
+
+        counts/processed - тільки цього запуску; resumed - стан попередніх запусків (або None).
+        """
+        state = self.load_state() if resume else None
+        if not resume:
+            self.reset()
+        cursor = state['cursor'] if state else None
+        if cursor is not None:
+            keys = [key for key in keys if key > cursor]
+        # Стан - тільки завершений префікс: курсор, скільки ключів до нього і їхні результати
+        if state:
+            saved = dict(state, counts=dict(state['counts']))
+        else:
+            saved = {'cursor': None, 'processed': 0, 'counts': {}, 'started_at': datetime.utcnow().isoformat()}
+
+        batches = [keys[start:start + self.batch_size] for start in range(0, len(keys), self.batch_size)]
+        result = {
+            'command': self.name,
+            'dry_run': self.dry_run,
+            'resumed': state,
+            'total': len(keys),
+            'processed': 0,
+            'counts': {},
+            'errors': [],
+            'batches': len(batches),
+            'batch_size': self.batch_size,
+            'concurrency': self.concurrency,
+            'cursor': cursor,
+            'complete': False,
+        }
+        started = time.monotonic()
+        finished = {}
+        next_batch = 0
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f'maintenance-{self.name}')
+        try:
+            futures = {executor.submit(self._run_batch, batch): index for index, batch in enumerate(batches)}
+            for future in as_completed(futures):
+                index = futures[future]
+                batch = batches[index]
+                try:
+                    counts = future.result()
+                    errors = getattr(counts, 'errors', [])
+                    # Пакет, що впав, зупиняє курсор - наступний запуск почне з нього
+                    finished[index] = dict(counts)
+                except Exception as e:
+                    counts = {'errors': len(batch)}
+                    errors = [f'{batch[0]}..{batch[-1]}: {e}']
+                with self._lock:
+                    for outcome, count in dict(counts).items():
+                        result['counts'][outcome] = result['counts'].get(outcome, 0) + count
+                    result['errors'].extend(errors[:ERRORS_KEPT - len(result['errors'])])
+                    result['processed'] += len(batch)
+                    # Курсор рухається тільки по неперервному префіксу завершених пакетів
+                    while next_batch in finished:
+                        saved['cursor'] = result['cursor'] = batches[next_batch][-1]
+                        saved['processed'] += len(batches[next_batch])
+                        for outcome, count in finished.pop(next_batch).items():
+                            saved['counts'][outcome] = saved['counts'].get(outcome, 0) + count
+                        next_batch += 1
+                    result['elapsed_seconds'] = round(time.monotonic() - started, 2)
+                    self._save_state(saved)
+                if self.on_batch:
+                    self.on_batch(result)
+        except BaseException:
+            # Ctrl+C: пакети, що не почались, скасовуються; стан вже збережено по курсору
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+
+        result['elapsed_seconds'] = round(time.monotonic() - started, 2)
+        result['complete'] = next_batch == len(batches)
+        if result['complete']:
+            self.reset()
+        return result
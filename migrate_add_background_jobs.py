@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Міграція для додавання таблиці фонових задач (background_job)
+"""
+import os
+import sys
+from dotenv import load_dotenv
+
+# Завантажуємо змінні середовища
+load_dotenv()
+
+# Додаємо поточну директорію до шляху
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+
+# Колонки прогресу, додані після першої версії таблиці
+PROGRESS_COLUMNS = [
+    ('total_rows', 'INTEGER DEFAULT 0'),
+    ('created_count', 'INTEGER DEFAULT 0'),
+    ('updated_count', 'INTEGER DEFAULT 0'),
+    ('errors_count', 'INTEGER DEFAULT 0'),
+    ('stage', 'VARCHAR(255)'),
+    ('result', 'TEXT'),
+    ('started_ts', 'FLOAT'),
+]
+
+def add_progress_columns(inspector):
+    """Додає колонки прогресу до існуючої таблиці background_job"""
+    from sqlalchemy import text
+    existing_columns = {column['name'] for column in inspector.get_columns('background_job')}
+    missing = [(name, ddl) for name, ddl in PROGRESS_COLUMNS if name not in existing_columns]
+    if not missing:
+        print("✅ Колонки прогресу вже існують")
+        return
+    with db.engine.begin() as conn:
+        for name, ddl in missing:
+            conn.execute(text(f'ALTER TABLE background_job ADD COLUMN {name} {ddl}'))
+            print(f"✅ Колонка '{name}' додана")
+
+def migrate():
+    """Створює таблицю background_job"""
+    with app.app_context():
+        try:
+            # Перевіряємо, чи існують таблиці
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            existing_tables = inspector.get_table_names()
+            tables = ['background_job']
+            
+            if all(table in existing_tables for table in tables):
+                print("✅ Таблиця фонових задач вже існує")
+                add_progress_columns(inspector)
+                return
+            
+            # Створюємо таблиці
+            print("🔄 Створення таблиці фонових задач...")
+            db.create_all()
+            
+            inspector = inspect(db.engine)
+            existing_tables = inspector.get_table_names()
+            for table in tables:
+                if table in existing_tables:
+                    print(f"✅ Таблиця '{table}' успішно створена")
+                else:
+                    print(f"⚠️ Таблиця '{table}' не створена")
+        except Exception as e:
+            print(f"❌ Помилка міграції: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+if __name__ == '__main__':
+    migrate()
+
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Міграція для додавання таблиць кластерів дублікатів лідів
+"""
+import os
+import sys
+from dotenv import load_dotenv
+
+# Завантажуємо змінні середовища
+load_dotenv()
+
+# Додаємо поточну директорію до шляху
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+
+def migrate():
+    """Створює таблиці duplicate_cluster та duplicate_cluster_member"""
+    with app.app_context():
+        try:
+            # Перевіряємо, чи існують таблиці
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            existing_tables = inspector.get_table_names()
+            tables = ['duplicate_cluster', 'duplicate_cluster_member']
+            
+            if all(table in existing_tables for table in tables):
+                print("✅ Таблиці кластерів дублікатів вже існують")
+                return
+            
+            # Створюємо таблиці
+            print("🔄 Створення таблиць кластерів дублікатів...")
+            db.create_all()
+            
+            inspector = inspect(db.engine)
+            existing_tables = inspector.get_table_names()
+            for table in tables:
+                if table in existing_tables:
+                    print(f"✅ Таблиця '{table}' успішно створена")
+                else:
+                    print(f"⚠️ Таблиця '{table}' не створена")
+        except Exception as e:
+            print(f"❌ Помилка міграції: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+if __name__ == '__main__':
+    migrate()
+
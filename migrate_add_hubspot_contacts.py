@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Міграція для додавання таблиці дзеркала контактів HubSpot (hubspot_contact)
+"""
+import os
+import sys
+from dotenv import load_dotenv
+
+# Завантажуємо змінні середовища
+load_dotenv()
+
+# Додаємо поточну директорію до шляху
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+
+def migrate():
+    """Створює таблицю hubspot_contact"""
+    with app.app_context():
+        try:
+            # Перевіряємо, чи існують таблиці
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            existing_tables = inspector.get_table_names()
+            tables = ['hubspot_contact']
+            
+            if all(table in existing_tables for table in tables):
+                print("✅ Таблиця hubspot_contact вже існує")
+                return
+            
+            # Створюємо таблиці
+            print("🔄 Створення таблиці hubspot_contact...")
+            db.create_all()
+            
+            inspector = inspect(db.engine)
+            existing_tables = inspector.get_table_names()
+            for table in tables:
+                if table in existing_tables:
+                    print(f"✅ Таблиця '{table}' успішно створена")
+                else:
+                    print(f"⚠️ Таблиця '{table}' не створена")
+        except Exception as e:
+            print(f"❌ Помилка міграції: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+if __name__ == '__main__':
+    migrate()
+
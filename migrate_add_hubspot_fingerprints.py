@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Міграція: Відбитки застосованих властивостей HubSpot (lead.hubspot_fingerprints)
+NULL означає "відбитка ще немає" - перша синхронізація/імпорт запише лід і відбиток
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from app import app, db
+
+
+def migrate():
+    """Додає колонку, якщо її ще немає"""
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect, text
+            inspector = inspect(db.engine)
+
+            if 'lead' not in inspector.get_table_names():
+                print("⚠️ Таблиця 'lead' не існує, створюємо всі таблиці...")
+                db.create_all()
+                print("✅ Таблиці створено")
+                return
+
+            existing_columns = {col['name'] for col in inspector.get_columns('lead')}
+            if 'hubspot_fingerprints' in existing_columns:
+                print("✅ Колонка 'hubspot_fingerprints' вже існує")
+                return
+
+            print("🔄 Додавання колонки 'hubspot_fingerprints'...")
+            db.session.execute(text('ALTER TABLE "lead" ADD COLUMN hubspot_fingerprints JSON'))
+            db.session.commit()
+            print("✅ Міграція завершена")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Помилка міграції: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 60)
+    print("🔄 МІГРАЦІЯ: Відбитки властивостей HubSpot для лідів")
+    print("=" * 60 + "\n")
+    migrate()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Міграція: Час останньої активності ліда (lead.activity_at) для гарячої черги планувальника
+Колонка не заповнюється: гаряча черга наповнюється з першими змінами та коментарями після міграції
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from app import app, db
+
+COLUMNS = (
+    ('activity_at', 'TIMESTAMP'),
+)
+
+
+def migrate():
+    """Додає колонку та індекс, якщо їх ще немає"""
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect, text
+            inspector = inspect(db.engine)
+
+            if 'lead' not in inspector.get_table_names():
+                print("⚠️ Таблиця 'lead' не існує, створюємо всі таблиці...")
+                db.create_all()
+                print("✅ Таблиці створено")
+                return
+
+            existing_columns = {col['name'] for col in inspector.get_columns('lead')}
+            for column, column_type in COLUMNS:
+                if column in existing_columns:
+                    print(f"✅ Колонка '{column}' вже існує")
+                    continue
+                print(f"🔄 Додавання колонки '{column}'...")
+                db.session.execute(text(f'ALTER TABLE "lead" ADD COLUMN {column} {column_type}'))
+
+            db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_lead_activity_at ON "lead" (activity_at)'))
+            db.session.commit()
+            print("✅ Міграція завершена")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Помилка міграції: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 60)
+    print("🔄 МІГРАЦІЯ: Час останньої активності лідів")
+    print("=" * 60 + "\n")
+    migrate()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Міграція: Адаптивний інтервал опитування ліда (lead.poll_interval, lead.next_poll_at)
+NULL в next_poll_at означає "опитати в найближчому циклі", тому заповнювати колонки не потрібно
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from app import app, db
+
+COLUMNS = (
+    ('poll_interval', 'INTEGER'),
+    ('next_poll_at', 'TIMESTAMP'),
+)
+
+
+def migrate():
+    """Додає колонки та індекс, якщо їх ще немає"""
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect, text
+            inspector = inspect(db.engine)
+
+            if 'lead' not in inspector.get_table_names():
+                print("⚠️ Таблиця 'lead' не існує, створюємо всі таблиці...")
+                db.create_all()
+                print("✅ Таблиці створено")
+                return
+
+            existing_columns = {col['name'] for col in inspector.get_columns('lead')}
+            for column, column_type in COLUMNS:
+                if column in existing_columns:
+                    print(f"✅ Колонка '{column}' вже існує")
+                    continue
+                print(f"🔄 Додавання колонки '{column}'...")
+                db.session.execute(text(f'ALTER TABLE "lead" ADD COLUMN {column} {column_type}'))
+
+            db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_lead_next_poll_at ON "lead" (next_poll_at)'))
+            db.session.commit()
+            print("✅ Міграція завершена")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Помилка міграції: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 60)
+    print("🔄 МІГРАЦІЯ: Адаптивний інтервал опитування лідів")
+    print("=" * 60 + "\n")
+    migrate()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Міграція: Додавання нормалізованих колонок phone_digits / second_phone_digits до Lead
+Заповнює колонки для існуючих лідів та створює індекси для пошуку дублікатів
+(на PostgreSQL - trigram індекси pg_trgm для LIKE '%цифри%')
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from app import app, db
+from phone_utils import phone_digits
+
+BATCH_SIZE = 1000
+
+
+def add_columns(inspector):
+    """Додає колонки, якщо їх ще немає"""
+    from sqlalchemy import text
+
+    existing_columns = {col['name'] for col in inspector.get_columns('lead')}
+    for column in ('phone_digits', 'second_phone_digits'):
+        if column in existing_columns:
+            print(f"✅ Колонка '{column}' вже існує")
+            continue
+        print(f"🔄 Додавання колонки '{column}'...")
+        db.session.execute(text(f'ALTER TABLE "lead" ADD COLUMN {column} VARCHAR(20)'))
+    db.session.commit()
+
+
+def backfill():
+    """Заповнює колонки цифрами з phone / second_phone батчами"""
+    from sqlalchemy import text
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            text('SELECT id, phone, second_phone FROM "lead" WHERE id > :last_id ORDER BY id LIMIT :limit'),
+            {'last_id': last_id, 'limit': BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+
+        db.session.execute(
+            text('UPDATE "lead" SET phone_digits = :phone_digits, second_phone_digits = :second_phone_digits WHERE id = :id'),
+            [
+                {
+                    'id': row.id,
+                    'phone_digits': phone_digits(row.phone) or None,
+                    'second_phone_digits': phone_digits(row.second_phone) or None,
+                }
+                for row in rows
+            ]
+        )
+        db.session.commit()
+
+        updated += len(rows)
+        last_id = rows[-1].id
+        print(f"   📦 Оброблено {updated} лідів...")
+
+    print(f"✅ Заповнено колонки для {updated} лідів")
+
+
+def create_indexes():
+    """Створює індекси для пошуку по цифрах телефону"""
+    from sqlalchemy import text
+
+    database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    for column in ('phone_digits', 'second_phone_digits'):
+        db.session.execute(text(f'CREATE INDEX IF NOT EXISTS ix_lead_{column} ON "lead" ({column})'))
+
+    if database_uri.startswith('postgresql'):
+        # Trigram індекси дозволяють використовувати індекс для LIKE '%...%'
+        print("🔄 Створення trigram індексів (pg_trgm)...")
+        db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        for column in ('phone_digits', 'second_phone_digits'):
+            db.session.execute(text(
+                f'CREATE INDEX IF NOT EXISTS ix_lead_{column}_trgm ON "lead" USING gin ({column} gin_trgm_ops)'
+            ))
+    db.session.commit()
+    print("✅ Індекси створено")
+
+
+def migrate():
+    """Додає, заповнює та індексує колонки phone_digits / second_phone_digits"""
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+
+            if 'lead' not in inspector.get_table_names():
+                print("⚠️ Таблиця 'lead' не існує, створюємо всі таблиці...")
+                db.create_all()
+                inspector = inspect(db.engine)
+
+            add_columns(inspector)
+            backfill()
+            create_indexes()
+
+            print("\n📊 Завершено!")
+            print("=" * 60)
+            print("Пошук дублікатів (/api/check-phone) тепер використовує індекси")
+            print("=" * 60)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Помилка міграції: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 60)
+    print("🔄 МІГРАЦІЯ: Нормалізовані колонки телефонів для ліда")
+    print("=" * 60 + "\n")
+    migrate()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Міграція: Індекси lead.last_sync_at / lead.updated_at для планувальника синхронізації
+(вибірка найбільш застарілих та нещодавно змінених лідів без повного сканування таблиці)
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from app import app, db
+
+INDEXED_COLUMNS = ('last_sync_at', 'updated_at')
+
+
+def migrate():
+    """Створює індекси, якщо їх ще немає"""
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect, text
+            inspector = inspect(db.engine)
+
+            if 'lead' not in inspector.get_table_names():
+                print("⚠️ Таблиця 'lead' не існує, створюємо всі таблиці...")
+                db.create_all()
+                print("✅ Таблиці створено разом з індексами")
+                return
+
+            for column in INDEXED_COLUMNS:
+                print(f"🔄 Індекс ix_lead_{column}...")
+                db.session.execute(text(f'CREATE INDEX IF NOT EXISTS ix_lead_{column} ON "lead" ({column})'))
+            db.session.commit()
+            print("✅ Індекси створено")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Помилка міграції: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 60)
+    print("🔄 МІГРАЦІЯ: Індекси для планувальника синхронізації")
+    print("=" * 60 + "\n")
+    migrate()
@@ -0,0 +1,196 @@
+"""
+In-memory n-gram індекс телефонів лідів для швидкої перевірки дублікатів
+
+Кожен gunicorn worker тримає власну копію індексу:
+- n-грами цифр (4 символи) -> array('I') з id лідів (компактно, ~4 байти на запис)
+- id ліда -> рядок цифр телефонів (для перевірки кандидатів)
+
+Індекс будується у фоновому потоці; поки він "холодний", search() повертає None
+і викликач має використовувати SQL запит.
+"""
+import threading
+import time
+from array import array
+
+NGRAM_SIZE = 4
+PHONE_SEPARATOR = '|'
+
+
+class PhoneNgramIndex:
+    """Компактний n-gram індекс по цифрах телефонів"""
+
+    def __init__(self, ngram_size=NGRAM_SIZE, refresh_interval=60, rebuild_interval=900):
+        self.ngram_size = ngram_size
+        self.refresh_interval = refresh_interval  # Інкрементальне підтягування змін інших workers
+        self.rebuild_interval = rebuild_interval  # Повна перебудова (враховує видалені ліди)
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._phones = {}
+        self._replay = {}
+        self._loader = None
+        self._building = False
+        self.ready = False
+        self.built_at = None
+        self.refreshed_at = None
+        self.watermark = None
+
+    def _grams(self, digits):
+        n = self.ngram_size
+        return {digits[i:i + n] for i in range(len(digits) - n + 1)}
+
+    def _put(self, lead_id, digits):
+        """Додає/оновлює лід в індексі (без блокування)"""
+        old = self._phones.get(lead_id, '')
+        if not digits:
+            self._phones.pop(lead_id, None)
+            return
+        self._phones[lead_id] = digits
+        old_grams = set()
+        for part in old.split(PHONE_SEPARATOR):
+            old_grams |= self._grams(part)
+        new_grams = set()
+        for part in digits.split(PHONE_SEPARATOR):
+            new_grams |= self._grams(part)
+        # Застарілі записи в postings не видаляємо - вони відкидаються при перевірці кандидатів
+        for gram in new_grams - old_grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('I')
+            posting.append(lead_id)
+
+    def apply(self, changes):
+        """Застосовує зміни {lead_id: digits або None (видалено)}"""
+        if not changes:
+            return
+        with self._lock:
+            if self._building:
+                # Зміни, що прийшли під час повної перебудови, повторимо після підміни індексу
+                self._replay.update(changes)
+            for lead_id, digits in changes.items():
+                self._put(lead_id, digits)
+
+    def load(self, rows):
+        """Будує новий індекс з рядків (id, phone_digits, second_phone_digits, updated_at)
+        і атомарно підміняє старий. Повертає максимальний updated_at."""
+        fresh = PhoneNgramIndex(self.ngram_size)
+        watermark = None
+        for lead_id, phone, second_phone, updated_at in rows:
+            fresh._put(lead_id, join_phone_digits(phone, second_phone))
+            if updated_at is not None and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+        with self._lock:
+            self._postings = fresh._postings
+            self._phones = fresh._phones
+            for lead_id, digits in self._replay.items():
+                self._put(lead_id, digits)
+            self._replay = {}
+            self.ready = True
+        return watermark
+
+    def refresh(self, rows):
+        """Застосовує рядки, змінені після останнього завантаження. Повертає максимальний updated_at."""
+        changes = {}
+        watermark = None
+        for lead_id, phone, second_phone, updated_at in rows:
+            changes[lead_id] = join_phone_digits(phone, second_phone)
+            if updated_at is not None and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+        self.apply(changes)
+        return watermark
+
+    def search(self, query, limit=10):
+        """Повертає id лідів, телефони яких містять query, або None якщо індекс не готовий"""
+        if not self.ready:
+            return None
+        if len(query) < self.ngram_size:
+            return None
+
+        with self._lock:
+            # Беремо найкоротший список кандидатів серед n-грам запиту
+            candidates = None
+            for gram in self._grams(query):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    return []
+                if candidates is None or len(posting) < len(candidates):
+                    candidates = posting
+
+            result = []
+            seen = set()
+            for lead_id in candidates:
+                if lead_id in seen:
+                    continue
+                seen.add(lead_id)
+                if query in self._phones.get(lead_id, ''):
+                    result.append(lead_id)
+                    if len(result) >= limit:
+                        break
+            return result
+
+    def stats(self):
+        """Статистика індексу для діагностики"""
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'leads': len(self._phones),
+                'ngrams': len(self._postings),
+                'postings': sum(len(p) for p in self._postings.values()),
+                'built_at': self.built_at,
+                'refreshed_at': self.refreshed_at,
+            }
+
+    # ---- Фонове завантаження ----
+
+    @property
+    def started(self):
+        return self._loader is not None
+
+    def start(self, loader):
+        """Запускає побудову індексу у фоновому потоці
+
+        loader(since) повертає ітерабельне (id, phone_digits, second_phone_digits, updated_at);
+        since=None означає повне завантаження, інакше - тільки ліди, змінені після since.
+        """
+        self._loader = loader
+        self._spawn(full=True)
+
+    def maybe_refresh(self):
+        """Запускає фонове оновлення, якщо індекс застарів"""
+        if self._loader is None or self._building:
+            return
+        now = time.time()
+        if self.built_at is None or now - self.built_at >= self.rebuild_interval:
+            self._spawn(full=True)
+        elif self.refreshed_at is None or now - self.refreshed_at >= self.refresh_interval:
+            self._spawn(full=False)
+
+    def _spawn(self, full):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        thread = threading.Thread(target=self._run_loader, args=(full,), daemon=True)
+        thread.start()
+
+    def _run_loader(self, full):
+        try:
+            started = time.time()
+            if full:
+                watermark = self.load(self._loader(None))
+                self.built_at = started
+            else:
+                watermark = self.refresh(self._loader(self.watermark))
+            self.refreshed_at = started
+            if watermark is not None and (self.watermark is None or watermark > self.watermark):
+                self.watermark = watermark
+        except Exception as e:
+            print(f"❌ Помилка побудови індексу телефонів: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+                self._replay = {}
+
+
+def join_phone_digits(phone_digits, second_phone_digits):
+    """Об'єднує цифри обох телефонів в один рядок для зберігання в індексі"""
+    return PHONE_SEPARATOR.join(p for p in (phone_digits, second_phone_digits) if p)
@@ -0,0 +1,66 @@
+"""
+Нормалізація телефонних номерів з LRU кешем
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Максимальна кількість номерів в кеші (один запис ~ 0.5 KB)
+PHONE_CACHE_SIZE = 50000
+
+NormalizedPhone = namedtuple('NormalizedPhone', ['raw', 'e164', 'international', 'digits', 'is_valid'])
+
+_NON_DIGITS = re.compile(r'\D')
+_phonenumbers = None
+
+
+def _lib():
+    """Лінивий імпорт phonenumbers - метадані завантажуються тільки при першому парсингу"""
+    global _phonenumbers
+    if _phonenumbers is None:
+        import phonenumbers
+        _phonenumbers = phonenumbers
+    return _phonenumbers
+
+
+def phone_digits(value):
+    """Повертає тільки цифри номера (ключ для пошуку дублікатів)"""
+    if not value:
+        return ''
+    return _NON_DIGITS.sub('', value)
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def _normalize_cached(raw, region):
+    phonenumbers = _lib()
+    try:
+        parsed = phonenumbers.parse(raw, region)
+    except phonenumbers.NumberParseException:
+        return NormalizedPhone(raw, None, raw, phone_digits(raw), False)
+
+    e164 = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+    international = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
+    return NormalizedPhone(raw, e164, international, phone_digits(e164), phonenumbers.is_valid_number(parsed))
+
+
+def normalize_phone(value, region=None):
+    """Парсить номер і повертає NormalizedPhone (e164, international, digits, is_valid)
+
+    Якщо номер не вдалося розпарсити, e164 = None, а international = оригінальне значення,
+    тому результат можна використовувати як fallback без додаткових перевірок.
+    Повторні номери віддаються з кешу без повторного парсингу.
+    """
+    if not value:
+        return None
+    return _normalize_cached(value.strip(), region)
+
+
+def format_phone(value, region=None):
+    """Повертає номер в міжнародному форматі (або оригінал, якщо не вдалося розпарсити)"""
+    normalized = normalize_phone(value, region)
+    return normalized.international if normalized else value
+
+
+def phone_cache_info():
+    """Статистика кешу (hits, misses, currsize) для діагностики"""
+    return _normalize_cached.cache_info()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Повторна обробка архіву синхронізації з HubSpot (instance/sync_archive) без запитів до API
+
+Застосовує поточний маппінг deal/контакт/нотатка -> лід до сирих даних попередніх запусків,
+наприклад після зміни правил призначення агентів або маппінгу стадій.
+
+Приклади:
+    python reprocess_sync_archive.py --list
+    python reprocess_sync_archive.py deals --since 20250101 --dry-run
+    python reprocess_sync_archive.py deals --run 20250301T020000-1234-5678
+"""
+
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from app import app, sync_archive, replay_sync_archive
+from sync_archive import SOURCES
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Повторна обробка архіву синхронізації HubSpot')
+    parser.add_argument('source', nargs='?', choices=SOURCES, help='Джерело: deals, contacts або notes')
+    parser.add_argument('--run', action='append', dest='runs', help='Конкретний запуск (можна кілька разів)')
+    parser.add_argument('--since', help='Запуски, починаючи з дати YYYYMMDD')
+    parser.add_argument('--dry-run', action='store_true', help='Порахувати зміни без збереження в БД')
+    parser.add_argument('--list', action='store_true', help='Показати запуски в архіві')
+    args = parser.parse_args()
+
+    if args.list:
+        for source, info in sync_archive.stats().items():
+            print(f"📦 {source}: запусків {info['runs']}, {info['bytes'] / 1024 / 1024:.1f} МБ, останній: {info['last_run']}")
+        return 0
+
+    if not args.source:
+        parser.error('Вкажіть джерело (deals, contacts, notes) або --list')
+
+    with app.app_context():
+        result = replay_sync_archive(args.source, run_ids=args.runs, since=args.since, dry_run=args.dry_run)
+
+    if args.dry_run:
+        print("ℹ️ Режим --dry-run: зміни не збережено")
+    return 1 if result['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Single-flight для дорогих операцій (обхід HubSpot API)
+
+Якщо операція з тим самим ключем вже виконується, нові виклики не запускають
+її повторно, а чекають і отримують той самий результат:
+- між потоками одного процесу - через threading.Event
+- між gunicorn workers - через lock-файл (fcntl.flock) і файл з результатом (JSON)
+
+Результат операції має серіалізуватися в JSON.
+
+Очікування обмежене wait_timeout (типово - wait_timeout координатора). Для операцій,
+які виконуються годинами (імпорт усіх deals), передавайте wait_timeout=None: очікувач
+чекає, поки лідер тримає lock, скільки б це не тривало.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows - тільки координація між потоками
+    fcntl = None
+
+_DEFAULT = object()
+
+
+class SingleFlightTimeout(Exception):
+    """Не дочекалися завершення операції, яку виконує інший процес/потік"""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Координатор single-flight викликів"""
+
+    def __init__(self, lock_dir, poll_interval=0.2, wait_timeout=600):
+        self.lock_dir = lock_dir
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    @staticmethod
+    def make_key(name, *args, **kwargs):
+        """Ключ операції з назви та аргументів"""
+        return json.dumps([name, args, kwargs], sort_keys=True, default=str)
+
+    def do(self, key, fn, *args, wait_timeout=_DEFAULT, **kwargs):
+        """Виконує fn(*args, **kwargs) або чекає на результат вже запущеного виклику з тим самим key
+
+        wait_timeout: Скільки чекати на чужий виклик (секунди, None - без обмеження)
+        """
+        if wait_timeout is _DEFAULT:
+            wait_timeout = self.wait_timeout
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if not flight.done.wait(wait_timeout):
+                raise SingleFlightTimeout(key)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._run_across_processes(key, fn, args, kwargs, wait_timeout)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _paths(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return (
+            os.path.join(self.lock_dir, f'{digest}.lock'),
+            os.path.join(self.lock_dir, f'{digest}.result')
+        )
+
+    def _run_across_processes(self, key, fn, args, kwargs, wait_timeout):
+        if fcntl is None:
+            return fn(*args, **kwargs)
+
+        os.makedirs(self.lock_dir, exist_ok=True)
+        lock_path, result_path = self._paths(key)
+        waited_since = None
+
+        with open(lock_path, 'a') as lock_file:
+            deadline = None if wait_timeout is None else time.time() + wait_timeout
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    # Операцію виконує інший worker - чекаємо, поки він відпустить lock
+                    if waited_since is None:
+                        waited_since = time.time()
+                    if deadline is not None and time.time() > deadline:
+                        raise SingleFlightTimeout(key)
+                    time.sleep(self.poll_interval)
+
+            try:
+                if waited_since is not None:
+                    shared = self._read_result(result_path, waited_since)
+                    if shared is not None:
+                        if 'error' in shared:
+                            raise RuntimeError(shared['error'])
+                        return shared['result']
+
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    self._write_result(result_path, {'error': str(e), 'finished_at': time.time()})
+                    raise
+                self._write_result(result_path, {'result': result, 'finished_at': time.time()})
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_result(result_path, not_before):
+        """Результат, який інший worker записав після того, як ми почали чекати"""
+        try:
+            with open(result_path) as result_file:
+                shared = json.load(result_file)
+        except (OSError, ValueError):
+            return None
+        if shared.get('finished_at', 0) < not_before:
+            return None
+        return shared
+
+    @staticmethod
+    def _write_result(result_path, payload):
+        tmp_path = f'{result_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as result_file:
+                json.dump(payload, result_file, default=str)
+            os.replace(tmp_path, result_path)
+        except (OSError, TypeError, ValueError):
+            # Результат не серіалізується - інші workers просто виконають операцію самі
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
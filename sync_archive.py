@@ -0,0 +1,142 @@
+"""
+Архів сирих даних синхронізації з HubSpot (gzip JSONL, тільки додавання)
+
+Кожен запуск синхронізації (повний імпорт deals/контактів, цикл опитування нотаток)
+пише отримані з HubSpot об'єкти у власний файл:
+    <archive_dir>/<source>/<run_id>.jsonl.gz
+
+Запис - один JSON рядок. Маппінг deal -> лід можна повторно застосувати до архіву
+без запитів до API (replay_sync_archive в app.py, скрипт reprocess_sync_archive.py).
+Файл відкривається лише при першому записі, тому порожні запуски файлів не створюють.
+Обірваний запис в кінці (процес зупинено під час запису) при читанні пропускається.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+
+SOURCES = ('deals', 'contacts', 'notes')
+SUFFIX = '.jsonl.gz'
+
+
+class ArchiveRun:
+    """Файл архіву одного запуску синхронізації (потокобезпечний)"""
+
+    def __init__(self, path, compresslevel=6):
+        self.path = path
+        self.run_id = os.path.basename(path)[:-len(SUFFIX)]
+        self.records = 0
+        self._compresslevel = compresslevel
+        self._lock = threading.Lock()
+        self._file = None
+
+    def append(self, record):
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = gzip.open(self.path, 'at', encoding='utf-8', compresslevel=self._compresslevel)
+            self._file.write(line + '\n')
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SyncArchive:
+    """Каталог архіву, розбитий за джерелом і запуском"""
+
+    def __init__(self, archive_dir, retention_days=180, compresslevel=6):
+        """
+        Args:
+            archive_dir: Кореневий каталог архіву
+            retention_days: Запуски, старші за цю кількість днів, видаляються (None - зберігати все)
+            compresslevel: Рівень стиснення gzip (1-9)
+        """
+        self.archive_dir = archive_dir
+        self.retention_days = retention_days
+        self.compresslevel = compresslevel
+
+    def _source_dir(self, source):
+        if source not in SOURCES:
+            raise ValueError(f'Невідоме джерело архіву: {source}')
+        return os.path.join(self.archive_dir, source)
+
+    def open_run(self, source, run_id=None):
+        """Новий запуск: ArchiveRun, в який синхронізація додає сирі об'єкти"""
+        run_id = run_id or time.strftime('%Y%m%dT%H%M%S') + f'-{os.getpid()}-{threading.get_ident() % 10000}'
+        self.prune(source)
+        return ArchiveRun(os.path.join(self._source_dir(source), run_id + SUFFIX), self.compresslevel)
+
+    def runs(self, source, since=None):
+        """Ідентифікатори запусків від старішого до новішого (since - 'YYYYMMDD' або префікс run_id)"""
+        try:
+            names = os.listdir(self._source_dir(source))
+        except FileNotFoundError:
+            return []
+        run_ids = sorted(name[:-len(SUFFIX)] for name in names if name.endswith(SUFFIX))
+        if since:
+            run_ids = [run_id for run_id in run_ids if run_id >= since]
+        return run_ids
+
+    def read(self, source, run_id):
+        """Генератор записів одного запуску"""
+        path = os.path.join(self._source_dir(source), run_id + SUFFIX)
+        with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+            try:
+                for line in archive_file:
+                    if not line.endswith('\n'):
+                        break
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+            except (EOFError, zlib.error, gzip.BadGzipFile):
+                # Запуск обірвано під час запису - все, що прочитано до цього місця, коректне
+                return
+
+    def prune(self, source):
+        """Видаляє запуски, старші за retention_days"""
+        if not self.retention_days:
+            return 0
+        source_dir = self._source_dir(source)
+        try:
+            names = os.listdir(source_dir)
+        except FileNotFoundError:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+        removed = 0
+        for name in names:
+            path = os.path.join(source_dir, name)
+            try:
+                if name.endswith(SUFFIX) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self):
+        """Кількість запусків і розмір архіву за джерелами"""
+        result = {}
+        for source in SOURCES:
+            run_ids = self.runs(source)
+            size = 0
+            for run_id in run_ids:
+                try:
+                    size += os.path.getsize(os.path.join(self._source_dir(source), run_id + SUFFIX))
+                except OSError:
+                    pass
+            result[source] = {'runs': len(run_ids), 'bytes': size, 'last_run': run_ids[-1] if run_ids else None}
+        return result
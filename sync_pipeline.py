@@ -0,0 +1,212 @@
+"""
+Конвеєр імпорту: fetch -> transform -> write, з'єднані обмеженими чергами
+
+- fetch - кілька потоків, кожен бере задачу (напр. pipeline/stage) і видає сторінки
+- transform - кілька потоків, перетворюють сторінку на пакет записів
+  (можуть робити власні запити, напр. асоціації контакту)
+- write - потік, що викликав run() (у ньому живе сесія БД), застосовує пакети по черзі
+
+Черги мають обмежений розмір: коли write не встигає, transform і fetch чекають на
+put() (backpressure) замість накопичувати сторінки в пам'яті. Кожна стадія рахує
+оброблені елементи, час роботи і час очікування (stats()): fetch/transform чекають
+на місце у вихідній черзі, write - на дані від transform.
+"""
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class StageStats:
+    """Лічильники однієї стадії конвеєра (потокобезпечні)"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.waiting_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items, busy, waiting=0.0):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += busy
+            self.waiting_seconds += waiting
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self, elapsed):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'items': self.items,
+                'errors': self.errors,
+                'items_per_second': round(self.items / elapsed, 2) if elapsed > 0 else 0,
+                # Частка часу, коли потоки стадії працювали (1.0 - стадія є вузьким місцем)
+                'utilization': round(self.busy_seconds / (elapsed * self.workers), 2) if elapsed > 0 else 0,
+                'waiting_seconds': round(self.waiting_seconds, 1),
+            }
+
+
+class SyncPipeline:
+    """Конвеєр fetch -> transform -> write"""
+
+    def __init__(self, fetch, transform, write, fetchers=2, transformers=4, queue_size=4,
+                 worker_context=None, on_error=None):
+        """
+        Args:
+            fetch: fetch(task) - генератор сторінок для задачі
+            transform: transform(page) - пакет записів для write
+            write: write(batch) - застосовує пакет (виконується в потоці, що викликав run)
+            fetchers: Кількість потоків fetch
+            transformers: Кількість потоків transform
+            queue_size: Місткість кожної черги між стадіями (у сторінках/пакетах)
+            worker_context: Фабрика context manager для робочих потоків (напр. смуга квоти)
+            on_error: on_error(stage, exception) - помилка fetch/transform (конвеєр продовжує роботу)
+        """
+        self.fetch = fetch
+        self.transform = transform
+        self.write = write
+        self.worker_context = worker_context
+        self.on_error = on_error
+        self.queue_size = queue_size
+        self.stages = {
+            'fetch': StageStats('fetch', fetchers),
+            'transform': StageStats('transform', transformers),
+            'write': StageStats('write', 1),
+        }
+        self._started = None
+        self._finished = None
+        self._cancelled = threading.Event()
+
+    def _put(self, target, item, stats):
+        """put() з очікуванням; повертає False, якщо конвеєр зупинено"""
+        started = time.time()
+        while not self._cancelled.is_set():
+            try:
+                target.put(item, timeout=0.2)
+                stats.record(0, 0, time.time() - started)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _failed(self, stage, exception):
+        self.stages[stage].error()
+        if self.on_error:
+            self.on_error(stage, exception)
+
+    def _run_worker(self, body):
+        if self.worker_context is None:
+            return body()
+        with self.worker_context():
+            return body()
+
+    def _fetch_worker(self, tasks, pages):
+        def body():
+            stats = self.stages['fetch']
+            while not self._cancelled.is_set():
+                try:
+                    task = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    iterator = iter(self.fetch(task))
+                    while True:
+                        started = time.time()
+                        page = next(iterator, _STOP)
+                        if page is _STOP:
+                            break
+                        stats.record(1, time.time() - started)
+                        if not self._put(pages, page, stats):
+                            return
+                except Exception as e:
+                    self._failed('fetch', e)
+        self._run_worker(body)
+
+    def _transform_worker(self, pages, batches):
+        def body():
+            stats = self.stages['transform']
+            while True:
+                page = pages.get()
+                if page is _STOP:
+                    return
+                if self._cancelled.is_set():
+                    continue
+                started = time.time()
+                try:
+                    batch = self.transform(page)
+                except Exception as e:
+                    self._failed('transform', e)
+                    continue
+                stats.record(1, time.time() - started)
+                self._put(batches, batch, stats)
+        self._run_worker(body)
+
+    def run(self, tasks):
+        """Виконує всі задачі; повертає stats(). Виняток у write зупиняє конвеєр і прокидається далі"""
+        self._started = time.time()
+        task_queue = queue.Queue()
+        for task in tasks:
+            task_queue.put(task)
+        pages = queue.Queue(maxsize=self.queue_size)
+        batches = queue.Queue(maxsize=self.queue_size)
+
+        fetchers = [
+            threading.Thread(target=self._fetch_worker, args=(task_queue, pages), daemon=True)
+            for _ in range(self.stages['fetch'].workers)
+        ]
+        transformers = [
+            threading.Thread(target=self._transform_worker, args=(pages, batches), daemon=True)
+            for _ in range(self.stages['transform'].workers)
+        ]
+        for thread in fetchers + transformers:
+            thread.start()
+
+        def close_stages():
+            for thread in fetchers:
+                thread.join()
+            for _ in transformers:
+                pages.put(_STOP)
+            for thread in transformers:
+                thread.join()
+            batches.put(_STOP)
+
+        closer = threading.Thread(target=close_stages, daemon=True)
+        closer.start()
+
+        write_stats = self.stages['write']
+        try:
+            while True:
+                waited = time.time()
+                batch = batches.get()
+                if batch is _STOP:
+                    break
+                started = time.time()
+                self.write(batch)
+                write_stats.record(1, time.time() - started, started - waited)
+        except BaseException:
+            self._cancelled.set()
+            # Звільняємо місце в чергах, щоб потоки fetch/transform завершились
+            while closer.is_alive():
+                try:
+                    batches.get(timeout=0.2)
+                except queue.Empty:
+                    pass
+            raise
+        finally:
+            self._finished = time.time()
+        closer.join()
+        return self.stats()
+
+    def stats(self):
+        """Пропускна здатність кожної стадії"""
+        elapsed = ((self._finished or time.time()) - self._started) if self._started else 0
+        result = {name: stage.snapshot(elapsed) for name, stage in self.stages.items()}
+        result['elapsed_seconds'] = round(elapsed, 1)
+        return result
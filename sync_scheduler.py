@@ -0,0 +1,112 @@
+"""
+Планувальник періодичної синхронізації лідів з HubSpot
+
+Замість повної синхронізації всіх лідів кожен цикл витрачає фіксований бюджет
+викликів API:
+- частина бюджету (hot_share) - на нещодавно активні ліди, які давно не синхронізувались
+- решта - на найбільш застарілі ліди (спочатку ті, що ще жодного разу не синхронізувались)
+
+Загальна кількість викликів за цикл не залежить від кількості лідів у базі.
+
+PollPolicy визначає, як часто опитувати кожен лід: активні - часто,
+неактивні - все рідше (експоненційно).
+"""
+import os
+
+
+class SyncBudget:
+    """Бюджет одного циклу синхронізації"""
+
+    def __init__(self, api_calls=1000, calls_per_lead=10, hot_share=0.3, hot_window_hours=72, hot_resync_minutes=60):
+        """
+        Args:
+            api_calls: Викликів HubSpot API за цикл
+            calls_per_lead: Оцінка викликів на синхронізацію одного ліда
+            hot_share: Частка бюджету для активних лідів
+            hot_window_hours: Лід активний, якщо змінювався за цей час
+            hot_resync_minutes: Активний лід не синхронізується частіше
+        """
+        self.api_calls = api_calls
+        self.calls_per_lead = calls_per_lead
+        self.hot_share = hot_share
+        self.hot_window_hours = hot_window_hours
+        self.hot_resync_minutes = hot_resync_minutes
+
+    @classmethod
+    def from_env(cls):
+        """Бюджет зі змінних середовища SYNC_*"""
+        return cls(
+            api_calls=int(os.getenv('SYNC_API_BUDGET_PER_CYCLE', '1000')),
+            calls_per_lead=int(os.getenv('SYNC_API_CALLS_PER_LEAD', '10')),
+            hot_share=float(os.getenv('SYNC_HOT_SHARE', '0.3')),
+            hot_window_hours=int(os.getenv('SYNC_HOT_WINDOW_HOURS', '72')),
+            hot_resync_minutes=int(os.getenv('SYNC_HOT_RESYNC_MINUTES', '60')),
+        )
+
+    @property
+    def leads(self):
+        """Скільки лідів можна синхронізувати за цикл"""
+        return max(self.api_calls // max(self.calls_per_lead, 1), 0)
+
+    @property
+    def hot_leads(self):
+        """Скільки з них зарезервовано для активних лідів"""
+        return int(self.leads * min(max(self.hot_share, 0.0), 1.0))
+
+
+def plan_sync_batch(hot_ids, stale_ids, budget_leads, hot_slots):
+    """Порядок синхронізації на цикл
+
+    hot_ids - активні ліди (вже в порядку пріоритету), stale_ids - найбільш застарілі.
+    Спочатку до hot_slots активних, далі застарілі, а якщо застарілих не вистачило -
+    решта активних. Кожен лід входить у план один раз.
+    """
+    plan = []
+    seen = set()
+
+    def take(ids, limit):
+        for lead_id in ids:
+            if len(plan) >= limit:
+                return
+            if lead_id not in seen:
+                seen.add(lead_id)
+                plan.append(lead_id)
+
+    take(hot_ids, min(hot_slots, budget_leads))
+    take(stale_ids, budget_leads)
+    take(hot_ids, budget_leads)
+    return plan
+
+
+class PollPolicy:
+    """Адаптивний інтервал опитування ліда
+
+    Активність (новий коментар, зміна статусу, зміни з HubSpot) скидає інтервал до мінімального,
+    кожне опитування без змін збільшує його в factor разів до max_interval.
+    """
+
+    def __init__(self, min_interval=900, max_interval=7 * 24 * 3600, factor=2.0):
+        """
+        Args:
+            min_interval: Інтервал для активного ліда (секунди)
+            max_interval: Максимальний інтервал для неактивного ліда (секунди)
+            factor: Множник інтервалу після опитування без змін
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+
+    @classmethod
+    def from_env(cls):
+        """Політика зі змінних середовища LEAD_POLL_*"""
+        return cls(
+            min_interval=int(os.getenv('LEAD_POLL_MIN_SECONDS', '900')),
+            max_interval=int(os.getenv('LEAD_POLL_MAX_SECONDS', str(7 * 24 * 3600))),
+            factor=float(os.getenv('LEAD_POLL_BACKOFF_FACTOR', '2')),
+        )
+
+    def next_interval(self, current, active=False):
+        """Наступний інтервал опитування в секундах"""
+        if active or not current:
+            return self.min_interval
+        return int(min(max(current * self.factor, self.min_interval), self.max_interval))
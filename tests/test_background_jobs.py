@@ -0,0 +1,67 @@
+"""
+Тести для фонових задач (run_background_job)
+"""
+import pytest
+import os
+import sys
+import json
+from flask import Flask
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import db, BackgroundJob
+from job_events import JobEventLog
+
+
+@pytest.fixture
+def jobs_app(tmp_path, monkeypatch):
+    """Окремий Flask застосунок з моделями app.py на тимчасовій SQLite (задачі виконуються в ньому)"""
+    test_app = Flask(__name__)
+    test_app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'jobs.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        TESTING=True,
+    )
+    db.init_app(test_app)
+    monkeypatch.setattr(app_module, 'app', test_app)
+    monkeypatch.setattr(app_module, 'job_event_log', JobEventLog(str(tmp_path / 'job_events')))
+    with test_app.app_context():
+        db.create_all()
+        yield test_app
+        db.session.remove()
+        db.drop_all()
+
+
+def run_job(job_type, target, **kwargs):
+    job = BackgroundJob(job_type=job_type, status='running')
+    db.session.add(job)
+    db.session.commit()
+    app_module.run_background_job(job.id, target, kwargs)
+    db.session.expire_all()
+    return db.session.get(BackgroundJob, job.id)
+
+
+class TestRunBackgroundJob:
+    """Тести для run_background_job"""
+
+    def test_sync_with_nothing_to_sync_completes(self, jobs_app, monkeypatch):
+        """Тест що синхронізація без лідів для оновлення завершується як completed, а не failed"""
+        monkeypatch.setattr(app_module, 'hubspot_client', object())
+        job = run_job('sync_all_leads', app_module.sync_all_leads_from_hubspot)
+        assert job.status == 'completed'
+        assert json.loads(job.result) == {'total': 0, 'synced': 0}
+
+    def test_empty_result_completes(self, jobs_app):
+        """Тест що порожній або нульовий результат target - не помилка"""
+        assert run_job('empty', lambda progress: 0).status == 'completed'
+
+    def test_error_marks_job_failed(self, jobs_app):
+        """Тест що виняток target записується як failed з текстом помилки"""
+        def failing(progress):
+            raise RuntimeError('HubSpot API не налаштований')
+
+        job = run_job('failing', failing)
+        assert job.status == 'failed'
+        assert job.error == 'HubSpot API не налаштований'
@@ -0,0 +1,113 @@
+"""
+Тести для circuit breaker
+"""
+import pytest
+import os
+import sys
+import time
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from hubspot_transport import is_hubspot_failure
+
+
+class HubSpotError(Exception):
+    def __init__(self, status):
+        super().__init__(f'HTTP {status}')
+        self.status = status
+
+
+def fail(error):
+    def call():
+        raise error
+    return call
+
+
+class TestCircuitBreaker:
+    """Тести для CircuitBreaker"""
+
+    def test_opens_after_consecutive_failures(self):
+        """Тест що breaker відкривається після невдач поспіль і відмовляє одразу"""
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                breaker.guard(fail(ConnectionError('down')))
+        assert breaker.state == CircuitBreaker.OPEN
+
+        calls = []
+        with pytest.raises(CircuitOpenError):
+            breaker.guard(lambda: calls.append(1))
+        assert calls == []
+
+    def test_half_open_probe_closes_on_success(self):
+        """Тест що успішний пробний запит закриває breaker"""
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+        with pytest.raises(ConnectionError):
+            breaker.guard(fail(ConnectionError('down')))
+        time.sleep(0.06)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.guard(lambda: 'ok') == 'ok'
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_probe_failure_reopens(self):
+        """Тест що невдалий пробний запит знову відкриває breaker"""
+        breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=0.05)
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                breaker.guard(fail(ConnectionError('down')))
+        time.sleep(0.06)
+        with pytest.raises(ConnectionError):
+            breaker.guard(fail(ConnectionError('still down')))
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_slow_calls_count_as_failures(self):
+        """Тест що повільні відповіді відкривають breaker"""
+        breaker = CircuitBreaker('test', failure_threshold=1, slow_call_seconds=0.01)
+        breaker.guard(lambda: time.sleep(0.02))
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_client_errors_do_not_open(self):
+        """Тест що 4xx від HubSpot не вважаються недоступністю"""
+        breaker = CircuitBreaker('test', failure_threshold=1, is_failure=is_hubspot_failure)
+        with pytest.raises(HubSpotError):
+            breaker.guard(fail(HubSpotError(404)))
+        assert breaker.state == CircuitBreaker.CLOSED
+        with pytest.raises(HubSpotError):
+            breaker.guard(fail(HubSpotError(503)))
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_async_guard_counts_server_errors(self):
+        """Тест що guard_async рахує 5xx асинхронного клієнта і відкриває breaker"""
+        import asyncio
+
+        async def failing():
+            raise HubSpotError(503)
+
+        breaker = CircuitBreaker('test', failure_threshold=1, is_failure=is_hubspot_failure)
+        with pytest.raises(HubSpotError):
+            asyncio.run(breaker.guard_async(failing))
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(breaker.guard_async(failing))
+
+    def test_open_breaker_rejects_before_quota(self):
+        """Тест що fail_fast перед квотою: відхилений запит не займає місце у квоті"""
+        from hubspot_transport import chain_guards
+
+        taken = []
+
+        def quota_guard(call):
+            taken.append(1)
+            return call()
+
+        breaker = CircuitBreaker('test', failure_threshold=1)
+        guarded = chain_guards([breaker.fail_fast, quota_guard, breaker.guard])
+        with pytest.raises(ConnectionError):
+            guarded(fail(ConnectionError('down')))
+        assert breaker.state == CircuitBreaker.OPEN
+        for _ in range(3):
+            with pytest.raises(CircuitOpenError):
+                guarded(lambda: 'ok')
+        assert len(taken) == 1
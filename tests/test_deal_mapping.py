@@ -0,0 +1,100 @@
+"""
+Тести для маппінгу HubSpot deal -> лід
+"""
+import pytest
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deal_mapping import AgentDirectory, DealMapper, LeadRecord, deal_budget, deal_status
+
+USERS = [
+    (1, 'admin', 'admin@propart.com', 'admin'),
+    (2, 'Олена Коваль', 'olena@propart.com', 'agent'),
+    (3, 'ivan', 'ivan@propart.com', 'agent'),
+]
+
+
+def deal(properties, contact=None, owner_email=None):
+    return {
+        'id': '100',
+        'properties': dict({'phone_number': '+380501234567'}, **properties),
+        'contact': contact,
+        'owner': {'id': '9', 'email': owner_email} if owner_email else None,
+    }
+
+
+@pytest.fixture
+def mapper():
+    return DealMapper(AgentDirectory(USERS))
+
+
+class TestDealMapper:
+    """Тести для DealMapper"""
+
+    def test_owner_has_priority(self, mapper):
+        """Тест що owner (за email) має перевагу над responisble_agent"""
+        record = mapper.map(deal({'responisble_agent': 'ivan'}, owner_email='Olena@propart.com'))
+        assert (record.agent_id, record.agent_source) == (2, 'hubspot_owner_id')
+
+    def test_responsible_agent_by_name_part(self, mapper):
+        """Тест пошуку агента за частиною імені"""
+        record = mapper.map(deal({'responisble_agent': 'олена Петренко'}))
+        assert record.agent_id == 2
+
+    def test_portal_name_and_default_agent(self, mapper):
+        """Тест from_agent_portal__name_ і агента за замовчуванням"""
+        assert mapper.map(deal({'from_agent_portal__name_': ' ivan '})).agent_id == 3
+        record = mapper.map(deal({'from_agent_portal__name_': 'unknown'}))
+        assert (record.agent_id, record.agent_source) == (1, 'default')
+
+    def test_contact_fills_name_and_email(self, mapper):
+        """Тест що контакт заповнює ім'я та email, якщо в deal їх немає"""
+        contact = {'id': '55', 'properties': {'email': 'client@mail.com', 'firstname': 'Ivan', 'lastname': None}}
+        record = mapper.map(deal({}, contact=contact))
+        assert (record.deal_name, record.email, record.contact_id) == ('Ivan', 'client@mail.com', '55')
+        record = mapper.map(deal({}))
+        assert (record.deal_name, record.email) == ('Deal 100', 'no-email-100@hubspot.local')
+
+    def test_skipped_records(self, mapper):
+        """Тест що deal без телефону і без агентів в системі пропускається"""
+        assert mapper.map({'id': '1', 'properties': {}}) is None
+        assert DealMapper(AgentDirectory([])).map(deal({})) is None
+        records, skipped = mapper.map_batch([deal({}), {'id': '2', 'properties': {}}])
+        assert (len(records), skipped) == (1, 1)
+
+    def test_record_is_compact(self, mapper):
+        """Тест що LeadRecord не має __dict__"""
+        record = mapper.map(deal({}))
+        assert isinstance(record, LeadRecord)
+        assert not hasattr(record, '__dict__')
+
+    def test_fingerprint_follows_mapped_fields(self, mapper):
+        """Тест що відбиток LeadRecord змінюється тільки зі значеннями, які записуються в лід"""
+        record = mapper.map(deal({'dealstage': '3204738258'}))
+        assert record.fingerprint() == mapper.map(deal({'dealstage': '3204738258', 'closedate': '2024-01-01'})).fingerprint()
+        assert record.fingerprint() != mapper.map(deal({'dealstage': '3204738259'})).fingerprint()
+
+
+class TestDealFields:
+    """Тести для статусу та бюджету"""
+
+    @pytest.mark.parametrize('stage,expected', [
+        ('3204738259', ('contacted', 'Отправлены варианты/Передан на партнеров')),
+        ('closedwon', ('closed', None)),
+        ('appointmentscheduled', ('new', None)),
+        (None, ('new', None)),
+    ])
+    def test_deal_status(self, stage, expected):
+        """Тест визначення статусу з dealstage"""
+        assert deal_status(stage) == expected
+
+    @pytest.mark.parametrize('amount,expected', [
+        ('150000', 'до 200к'), ('200000', '200к–500к'), ('999999.5', '500к–1млн'),
+        ('2000000', '1млн+'), ('abc', None), (None, None),
+    ])
+    def test_deal_budget(self, amount, expected):
+        """Тест категорії бюджету з amount"""
+        assert deal_budget(amount) == expected
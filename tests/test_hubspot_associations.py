@@ -0,0 +1,98 @@
+"""
+Тести для пакетних запитів v4 associations API
+"""
+import pytest
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hubspot_associations import HubSpotAssociations, ASSOCIATIONS_URL
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class FakeSession:
+    """Асоціації deal -> контакти; сторінка читання - page_size контактів"""
+
+    def __init__(self, contacts_by_deal, page_size=500, status_code=200):
+        self.contacts_by_deal = contacts_by_deal
+        self.page_size = page_size
+        self.status_code = status_code
+        self.posted = []
+
+    def post(self, url, headers=None, json=None):
+        self.posted.append((url, json))
+        if url.endswith('/batch/archive'):
+            return FakeResponse(204)
+        if url.endswith('/batch/associate/default'):
+            return FakeResponse(self.status_code, {'results': []})
+        results = []
+        for item in json['inputs']:
+            contacts = self.contacts_by_deal.get(item['id'])
+            if not contacts:
+                continue
+            start = int(item.get('after') or 0)
+            result = {'from': {'id': item['id']},
+                      'to': [{'toObjectId': int(contact), 'associationTypes': []}
+                             for contact in contacts[start:start + self.page_size]]}
+            if start + self.page_size < len(contacts):
+                result['paging'] = {'next': {'after': str(start + self.page_size)}}
+            results.append(result)
+        return FakeResponse(self.status_code, {'results': results})
+
+
+class TestHubSpotAssociations:
+    """Тести для HubSpotAssociations"""
+
+    def test_read_in_batches(self):
+        """Тест що читання йде пакетами по batch_limit, а deals без контактів відсутні"""
+        session = FakeSession({str(deal): [str(deal + 1000)] for deal in range(0, 250, 2)}, status_code=207)
+        associations = HubSpotAssociations(session, {}).read('deals', 'contacts', range(250))
+        assert len(session.posted) == 3
+        assert session.posted[0][0] == f'{ASSOCIATIONS_URL}/deals/contacts/batch/read'
+        assert len(associations) == 125
+        assert associations['10'] == ['1010']
+
+    def test_read_follows_paging(self):
+        """Тест що асоціації понад одну сторінку дочитуються за after"""
+        session = FakeSession({'1': ['11', '12', '13']}, page_size=2)
+        assert HubSpotAssociations(session, {}).read('deals', 'contacts', ['1']) == {'1': ['11', '12', '13']}
+        assert session.posted[1][1] == {'inputs': [{'id': '1', 'after': '2'}]}
+
+    def test_archive_chunks_pairs(self):
+        """Тест що видалення йде по batch_limit пар, пари одного deal - одним input"""
+        session = FakeSession({})
+        pairs = [('1', '11'), ('1', '12'), ('2', '21')]
+        assert HubSpotAssociations(session, {}, batch_limit=2).archive('deals', 'contacts', pairs) == 3
+        assert [body['inputs'] for _, body in session.posted] == [
+            [{'from': {'id': '1'}, 'to': [{'id': '11'}, {'id': '12'}]}],
+            [{'from': {'id': '2'}, 'to': [{'id': '21'}]}],
+        ]
+
+    def test_associate_chunks_pairs(self):
+        """Тест що асоціації за замовчуванням створюються по batch_limit пар"""
+        session = FakeSession({})
+        pairs = [(1, 11), (2, 21), (3, 31)]
+        assert HubSpotAssociations(session, {}, batch_limit=2).associate('deals', 'contacts', pairs) == 3
+        assert session.posted[0][0] == f'{ASSOCIATIONS_URL}/deals/contacts/batch/associate/default'
+        assert [len(body['inputs']) for _, body in session.posted] == [2, 1]
+        assert session.posted[1][1]['inputs'] == [{'from': {'id': '3'}, 'to': {'id': '31'}}]
+
+    def test_http_error_raises(self):
+        """Тест що помилка HTTP не ковтається"""
+        session = FakeSession({'1': ['11']}, status_code=500)
+        with pytest.raises(RuntimeError):
+            HubSpotAssociations(session, {}).read('deals', 'contacts', ['1'])
@@ -0,0 +1,114 @@
+"""
+Тести для асинхронного клієнта HubSpot
+"""
+import pytest
+import asyncio
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from hubspot_async import HubSpotAsyncClient, HubSpotAsyncError, retry_delay
+from hubspot_quota import HubSpotQuota
+
+
+def run_with_server(routes, scenario, **client_kwargs):
+    """Запускає локальний HTTP сервер з routes і scenario(client) з клієнтом на нього"""
+    async def main():
+        app = web.Application()
+        app.add_routes(routes)
+        async with TestServer(app) as server:
+            base_url = str(server.make_url('')).rstrip('/')
+            async with HubSpotAsyncClient('token', base_url=base_url, backoff=0.01, **client_kwargs) as client:
+                return await scenario(client), client.stats()
+    return asyncio.run(main())
+
+
+class TestHubSpotAsyncClient:
+    """Тести для HubSpotAsyncClient"""
+
+    def test_paginate_follows_after_cursor(self):
+        """Тест що paginate проходить всі сторінки за paging.next.after"""
+        async def deals(request):
+            after = int(request.query.get('after', 0))
+            page = {'results': [{'id': str(after + i)} for i in range(2)]}
+            if after < 4:
+                page['paging'] = {'next': {'after': str(after + 2)}}
+            return web.json_response(page)
+
+        async def scenario(client):
+            return [deal['id'] async for deal in client.paginate('/crm/v3/objects/deals')]
+
+        ids, _ = run_with_server([web.get('/crm/v3/objects/deals', deals)], scenario)
+        assert ids == ['0', '1', '2', '3', '4', '5']
+
+    def test_retries_429_with_retry_after(self):
+        """Тест що 429 повторюється, а Retry-After використовується як пауза"""
+        calls = []
+
+        async def owners(request):
+            calls.append(1)
+            if len(calls) == 1:
+                return web.json_response({'message': 'rate limit'}, status=429, headers={'Retry-After': '0'})
+            return web.json_response({'results': []})
+
+        result, stats = run_with_server([web.get('/crm/v3/owners/', owners)], lambda client: client.get('/crm/v3/owners/'))
+        assert result == {'results': []}
+        assert stats['retries'] == 1
+
+    def test_client_error_not_retried(self):
+        """Тест що 4xx (крім 429) не повторюється"""
+        async def missing(request):
+            return web.json_response({'message': 'not found'}, status=404)
+
+        async def scenario(client):
+            with pytest.raises(HubSpotAsyncError) as error:
+                await client.get('/crm/v3/objects/deals/1')
+            return error.value.status
+
+        status, stats = run_with_server([web.get('/crm/v3/objects/deals/1', missing)], scenario)
+        assert status == 404
+        assert stats['retries'] == 0
+
+    def test_batch_read_chunks_run_concurrently(self):
+        """Тест що batch_read ділить id на пакети по 100 і виконує їх одночасно"""
+        in_flight = {'now': 0, 'max': 0}
+
+        async def batch_read(request):
+            body = await request.json()
+            in_flight['now'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['now'])
+            await asyncio.sleep(0.05)
+            in_flight['now'] -= 1
+            return web.json_response({'results': [{'id': item['id']} for item in body['inputs']]})
+
+        async def scenario(client):
+            return await client.batch_read('deals', range(250), properties=['dealstage'])
+
+        objects, stats = run_with_server([web.post('/crm/v3/objects/deals/batch/read', batch_read)], scenario)
+        assert len(objects) == 250
+        assert stats['requests'] == 3
+        assert in_flight['max'] == 3
+
+    def test_requests_counted_in_shared_quota(self):
+        """Тест що запити клієнта рахуються в спільній HubSpotQuota в смузі клієнта"""
+        async def owners(request):
+            return web.json_response({'results': []}, headers={'X-HubSpot-RateLimit-Daily-Remaining': '1000'})
+
+        quota = HubSpotQuota(burst_limit=100, daily_limit=250000)
+        run_with_server([web.get('/crm/v3/owners/', owners)], lambda client: client.get('/crm/v3/owners/'),
+                        quota=quota, lane='bulk')
+        stats = quota.stats()
+        assert stats['lanes']['bulk']['calls'] == 1
+        assert stats['daily_remaining'] == 1000
+
+    def test_retry_delay(self):
+        """Тест паузи: Retry-After має пріоритет над експоненційною"""
+        assert retry_delay({'Retry-After': '7'}, attempt=3) == 7.0
+        assert retry_delay({}, attempt=2, backoff=0.5) == 2.0
+        assert retry_delay(None, attempt=20) == 60.0
@@ -0,0 +1,23 @@
+"""
+Тести для спільних помічників пакетних API HubSpot
+"""
+import pytest
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hubspot_batch import chunked
+
+
+class TestChunked:
+    """Тести для chunked"""
+
+    def test_splits_into_chunks(self):
+        """Тест що остання частина коротша, а генератор приймається як вхід"""
+        assert chunked((number for number in range(5)), 2) == [[0, 1], [2, 3], [4]]
+
+    def test_empty(self):
+        """Тест що порожній вхід дає порожній список"""
+        assert chunked([], 100) == []
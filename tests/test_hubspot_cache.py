@@ -0,0 +1,114 @@
+"""
+Тести для кешу відповідей HubSpot API
+"""
+import pytest
+import os
+import sys
+import time
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hubspot_cache import HubSpotResponseCache, object_refs
+from hubspot_transport import guarded_api_factory
+
+CONTACT_URL = 'https://api.hubapi.com/crm/v3/objects/contacts/101'
+
+
+class FakeResponse:
+    def __init__(self, status=200, data=b'{}', headers=None):
+        self.status = status
+        self.reason = 'OK'
+        self.data = data
+        self.headers = headers or {}
+
+
+class NotModified(Exception):
+    status = 304
+
+
+class TestHubSpotResponseCache:
+    """Тести для HubSpotResponseCache"""
+
+    def test_repeated_read_served_from_cache(self):
+        """Тест що повторне читання з тими самими параметрами не йде в HubSpot"""
+        cache = HubSpotResponseCache()
+        calls = []
+
+        def perform():
+            calls.append(1)
+            return FakeResponse(data=b'{"id": "101"}')
+
+        query = [('properties', 'phone'), ('archived', 'false')]
+        first = cache.fetch('GET', CONTACT_URL, query, {}, perform)
+        second = cache.fetch('GET', CONTACT_URL, list(reversed(query)), {}, perform)
+        assert len(calls) == 1
+        assert second.data == first.data
+        assert cache.stats()['hits'] == 1
+
+    def test_endpoint_without_rule_not_cached(self):
+        """Тест що endpoint без правила TTL (пошук, нотатки) не кешується"""
+        cache = HubSpotResponseCache()
+        calls = []
+        url = 'https://api.hubapi.com/crm/v4/objects/deals/5/associations/notes'
+        for _ in range(2):
+            cache.fetch('GET', url, None, {}, lambda: calls.append(1) or FakeResponse())
+        assert len(calls) == 2
+
+    def test_write_invalidates_object(self):
+        """Тест що запис (PATCH) інвалідовує закешований об'єкт"""
+        cache = HubSpotResponseCache()
+        calls = []
+        perform = lambda: calls.append(1) or FakeResponse()
+        cache.fetch('GET', CONTACT_URL, None, {}, perform)
+        cache.fetch('PATCH', CONTACT_URL, None, {}, perform)
+        cache.fetch('GET', CONTACT_URL, None, {}, perform)
+        assert len(calls) == 3
+
+    def test_explicit_invalidation(self):
+        """Тест явної інвалідації (типи v3/v4 - contacts/contact)"""
+        cache = HubSpotResponseCache()
+        cache.fetch('GET', CONTACT_URL, None, {}, FakeResponse)
+        assert cache.invalidate_object('contact', 101) == 1
+        assert cache.stats()['entries'] == 0
+
+    def test_expired_entry_revalidated_with_etag(self):
+        """Тест що прострочений запис з ETag перевіряється умовним запитом (304)"""
+        cache = HubSpotResponseCache(ttl_rules=[(r'/contacts/', 0.05)])
+        cache.fetch('GET', CONTACT_URL, None, {}, lambda: FakeResponse(data=b'v1', headers={'ETag': '"abc"'}))
+        time.sleep(0.1)
+        headers = {}
+
+        def not_modified():
+            raise NotModified()
+
+        assert cache.fetch('GET', CONTACT_URL, None, headers, not_modified).data == b'v1'
+        assert headers['If-None-Match'] == '"abc"'
+        assert cache.stats()['revalidated'] == 1
+
+    def test_lru_limit(self):
+        """Тест що кеш не перевищує max_entries"""
+        cache = HubSpotResponseCache(max_entries=2)
+        for contact_id in range(3):
+            cache.fetch('GET', f'https://api.hubapi.com/crm/v3/objects/contacts/{contact_id}', None, {}, FakeResponse)
+        assert cache.stats()['entries'] == 2
+
+    def test_object_refs_from_association_path(self):
+        """Тест що шлях асоціації стосується обох об'єктів"""
+        assert object_refs('/crm/v3/objects/notes/7/associations/deal/9/214') == {('note', '7'), ('deal', '9')}
+
+
+class TestCachedTransport:
+    """Тести для кешу в api_factory"""
+
+    def test_cache_hit_skips_guards(self):
+        """Тест що відповідь з кешу не проходить через guards (не витрачає квоту)"""
+        from hubspot import HubSpot
+
+        seen = []
+        guard = lambda call: seen.append(1) or FakeResponse()
+        client = HubSpot(access_token='test', api_factory=guarded_api_factory(guard, cache=HubSpotResponseCache()))
+        api_client = client.crm.contacts.basic_api.api_client
+        api_client.request('GET', CONTACT_URL, query_params=[('archived', 'false')])
+        api_client.request('GET', CONTACT_URL, query_params=[('archived', 'false')])
+        assert seen == [1]
@@ -0,0 +1,174 @@
+"""
+Тести для експорту контактів HubSpot в CSV (потоковий ендпоінт і фонова задача)
+"""
+import pytest
+import csv
+import io
+import os
+import sys
+from types import SimpleNamespace
+from flask import Flask
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import db, User, BackgroundJob, login_manager
+from job_events import JobEventLog
+
+
+def contact(contact_id, *phones):
+    properties = {'firstname': f'Клієнт {contact_id}', 'email': f'{contact_id}@example.com'}
+    properties.update(zip(app_module.HUBSPOT_CONTACT_PHONE_FIELDS, phones))
+    return SimpleNamespace(id=contact_id, properties=properties)
+
+
+class FakeContactsApi:
+    """basic_api.get_page: сторінки за курсором after; fail_after - курсор, на якому HubSpot падає"""
+
+    def __init__(self, pages, fail_after=None):
+        self.pages = pages
+        self.fail_after = fail_after
+        self.requested = []
+
+    def get_page(self, limit, properties, after=None):
+        self.requested.append(after)
+        if after is not None and after == self.fail_after:
+            raise RuntimeError('HubSpot 503')
+        index = int(after or 0)
+        next_page = None
+        if index + 1 < len(self.pages):
+            next_page = SimpleNamespace(next=SimpleNamespace(after=str(index + 1)))
+        return SimpleNamespace(results=self.pages[index], paging=next_page)
+
+
+PAGES = [
+    [contact('1', '+380501111111', '+380671111111'), contact('2')],
+    [contact('3', '+380503333333')],
+    [contact('4', '+380504444444')],
+]
+
+
+@pytest.fixture
+def export_app(tmp_path, monkeypatch):
+    """Окремий Flask застосунок з маршрутом експорту на тимчасовій SQLite і адміністратор"""
+    test_app = Flask(__name__)
+    test_app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'export.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SECRET_KEY='test',
+        TESTING=True,
+    )
+    db.init_app(test_app)
+    login_manager.init_app(test_app)
+    test_app.add_url_rule('/admin/hubspot-contacts/export-csv', view_func=app_module.admin_hubspot_contacts_export_csv)
+    monkeypatch.setattr(app_module, 'app', test_app)
+    monkeypatch.setattr(app_module, 'EXPORTS_DIR', str(tmp_path / 'exports'))
+    monkeypatch.setattr(app_module, 'job_event_log', JobEventLog(str(tmp_path / 'job_events')))
+    monkeypatch.setattr(app_module.time, 'sleep', lambda seconds: None)
+    with test_app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@example.com', role='admin')
+        admin.set_password('password123')
+        db.session.add(admin)
+        db.session.commit()
+        yield test_app, admin
+        db.session.remove()
+        db.drop_all()
+
+
+def use_contacts(monkeypatch, contacts_api):
+    monkeypatch.setattr(app_module, 'hubspot_client', SimpleNamespace(
+        crm=SimpleNamespace(contacts=SimpleNamespace(basic_api=contacts_api))))
+
+
+def admin_client(test_app, admin):
+    client = test_app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin.id)
+    return client
+
+
+def run_export_job():
+    job = BackgroundJob(job_type='hubspot_contacts_export', status='running')
+    db.session.add(job)
+    db.session.commit()
+    app_module.run_hubspot_contacts_export_job(job.id)
+    db.session.expire_all()
+    return db.session.get(BackgroundJob, job.id)
+
+
+class TestStreamingExport:
+    """Тести для /admin/hubspot-contacts/export-csv"""
+
+    def test_streams_header_and_phone_rows(self, export_app, monkeypatch):
+        """Тест що CSV має заголовок, рядок на кожен номер і заголовки завантаження"""
+        use_contacts(monkeypatch, FakeContactsApi(PAGES))
+        response = admin_client(*export_app).get('/admin/hubspot-contacts/export-csv')
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'text/csv; charset=utf-8'
+        assert response.headers['Content-Disposition'].startswith('attachment; filename="hubspot_contacts_')
+        assert response.headers['X-Accel-Buffering'] == 'no'
+
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        assert rows[0] == app_module.HUBSPOT_CONTACTS_CSV_HEADER
+        assert len(rows) - 1 == 4
+        assert [row[0] for row in rows[1:]] == ['1', '1', '3', '4']
+
+    def test_client_disconnect_stops_paging(self, export_app, monkeypatch):
+        """Тест що після закриття відповіді (клієнт перервав завантаження) сторінки більше не читаються"""
+        contacts_api = FakeContactsApi(PAGES)
+        use_contacts(monkeypatch, contacts_api)
+        response = admin_client(*export_app).get('/admin/hubspot-contacts/export-csv', buffered=False)
+        chunks = iter(response.response)
+        next(chunks)  # заголовок
+        next(chunks)  # перша сторінка
+        response.close()
+        assert contacts_api.requested == [None]
+
+
+class TestExportJob:
+    """Тести для run_hubspot_contacts_export_job"""
+
+    def test_completes_with_all_rows(self, export_app, monkeypatch):
+        """Тест що задача завершується тільки після останньої сторінки, файл містить усі номери"""
+        use_contacts(monkeypatch, FakeContactsApi(PAGES))
+        job = run_export_job()
+        assert job.status == 'completed'
+        assert job.cursor is None
+        assert (job.pages_processed, job.rows_processed) == (3, 4)
+        with open(job.file_path, encoding='utf-8') as export_file:
+            assert len(list(csv.reader(export_file))) == 5
+
+    def test_fails_when_cursor_left(self, export_app, monkeypatch):
+        """Тест що обхід, який зупинився з курсором, дає failed, а не completed з неповним файлом"""
+        def stop_early(after=None, max_pages=1000, properties=None, on_backoff=None):
+            yield PAGES[0], '1'
+
+        monkeypatch.setattr(app_module, 'iter_hubspot_contact_pages', stop_early)
+        job = run_export_job()
+        assert job.status == 'failed'
+        assert job.cursor == '1'
+        assert 'курсор 1' in job.error
+
+    def test_interrupted_job_resumes_from_cursor(self, export_app, monkeypatch):
+        """Тест що перерваний на сторінці експорт продовжується з курсора без дублікатів рядків"""
+        use_contacts(monkeypatch, FakeContactsApi(PAGES, fail_after='2'))
+        job = run_export_job()
+        assert job.status == 'failed'
+        assert (job.cursor, job.pages_processed) == ('2', 2)
+        # Частково записана сторінка після підтвердженого зсуву відкидається при відновленні
+        with open(job.file_path, 'ab') as export_file:
+            export_file.write(b'partial,row\r\n')
+
+        contacts_api = FakeContactsApi(PAGES)
+        use_contacts(monkeypatch, contacts_api)
+        app_module.run_hubspot_contacts_export_job(job.id)
+        db.session.expire_all()
+        job = db.session.get(BackgroundJob, job.id)
+        assert job.status == 'completed'
+        assert contacts_api.requested == ['2']
+        with open(job.file_path, encoding='utf-8') as export_file:
+            rows = list(csv.reader(export_file))
+        assert rows[0] == app_module.HUBSPOT_CONTACTS_CSV_HEADER
+        assert [row[0] for row in rows[1:]] == ['1', '1', '3', '4']
@@ -0,0 +1,167 @@
+"""
+Тести для дзеркала контактів HubSpot (refresh_hubspot_contacts_mirror)
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from flask import Flask
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import db, HubSpotContact
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def contact(contact_id, modified):
+    return SimpleNamespace(id=contact_id, updated_at=modified,
+                           properties={'firstname': f'Клієнт {contact_id}', 'phone': '+380501234567'})
+
+
+class FakeSearchApi:
+    """search_api.do_search з фільтром lastmodifieddate і лімітом результатів на запит, як у HubSpot"""
+
+    def __init__(self, contacts, result_limit, page_size=2):
+        self.contacts = contacts
+        self.result_limit = result_limit
+        self.page_size = page_size
+        self.requests = 0
+
+    def do_search(self, public_object_search_request):
+        self.requests += 1
+        bounds = {item.operator: int(item.value) for item in public_object_search_request.filter_groups[0].filters}
+        matched = sorted(
+            (item for item in self.contacts
+             if bounds['GTE'] <= int(item.updated_at.timestamp() * 1000) < bounds['LT']),
+            key=lambda item: item.updated_at
+        )
+        offset = int(public_object_search_request.after or 0)
+        if offset >= self.result_limit:
+            raise RuntimeError('400: search API віддає не більше result_limit результатів')
+        end = min(offset + self.page_size, self.result_limit, len(matched))
+        paging = SimpleNamespace(next=SimpleNamespace(after=str(end))) if end < len(matched) else None
+        return SimpleNamespace(results=matched[offset:end], paging=paging, total=len(matched))
+
+
+class FakeContactsApi:
+    """basic_api.get_page (повний обхід) по сторінках; fail_at - номер сторінки, на якій HubSpot падає"""
+
+    def __init__(self, pages, fail_at=None):
+        self.pages = pages
+        self.fail_at = fail_at
+
+    def get_page(self, limit, properties, after=None):
+        index = int(after or 0)
+        if index == self.fail_at:
+            raise RuntimeError('HubSpot 503')
+        next_page = SimpleNamespace(next=SimpleNamespace(after=str(index + 1))) if index + 1 < len(self.pages) else None
+        return SimpleNamespace(results=self.pages[index], paging=next_page)
+
+
+@pytest.fixture
+def mirror_app(tmp_path, monkeypatch):
+    """Окремий Flask застосунок з моделями app.py на тимчасовій SQLite (без робочої БД)"""
+    test_app = Flask(__name__)
+    test_app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'mirror.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        TESTING=True,
+    )
+    db.init_app(test_app)
+    monkeypatch.setattr(app_module.time, 'sleep', lambda seconds: None)
+    with test_app.app_context():
+        db.create_all()
+        yield test_app
+        db.session.remove()
+        db.drop_all()
+
+
+def use_hubspot(monkeypatch, search_api=None, basic_api=None):
+    monkeypatch.setattr(app_module, 'hubspot_client', SimpleNamespace(
+        crm=SimpleNamespace(contacts=SimpleNamespace(search_api=search_api, basic_api=basic_api))))
+
+
+def add_mirror(hubspot_id, modified=None):
+    db.session.add(HubSpotContact(hubspot_id=hubspot_id, hubspot_updated_at=modified,
+                                  synced_at=datetime(2023, 1, 1)))
+    db.session.commit()
+
+
+def mirror_ids():
+    db.session.expire_all()
+    return sorted(hubspot_id for hubspot_id, in db.session.query(HubSpotContact.hubspot_id))
+
+
+class TestModifiedSinceSearch:
+    """Тести для iter_hubspot_contacts_modified_since"""
+
+    def test_windows_stay_under_search_limit(self, mirror_app, monkeypatch):
+        """Тест що понад ліміт пошуку контакти читаються вікнами lastmodifieddate, кожен один раз"""
+        contacts = [contact(str(number), BASE + timedelta(minutes=number)) for number in range(12)]
+        search_api = FakeSearchApi(contacts, result_limit=5)
+        use_hubspot(monkeypatch, search_api=search_api)
+
+        pages = list(app_module.iter_hubspot_contacts_modified_since(BASE.replace(tzinfo=None), result_limit=5))
+        read = [item.id for page in pages for item in page]
+        assert read == [str(number) for number in range(12)]
+        assert all(len(page) <= 2 for page in pages)
+
+    def test_single_window_under_limit(self, mirror_app, monkeypatch):
+        """Тест що без перевищення ліміту вікно не ділиться і читається сторінками"""
+        contacts = [contact(str(number), BASE + timedelta(minutes=number)) for number in range(3)]
+        search_api = FakeSearchApi(contacts, result_limit=5)
+        use_hubspot(monkeypatch, search_api=search_api)
+
+        pages = list(app_module.iter_hubspot_contacts_modified_since(BASE.replace(tzinfo=None), result_limit=5))
+        assert [[item.id for item in page] for page in pages] == [['0', '1'], ['2']]
+        assert search_api.requests == 2
+
+
+class TestRefreshMirror:
+    """Тести для refresh_hubspot_contacts_mirror"""
+
+    def test_incremental_refresh_pages_past_search_limit(self, mirror_app, monkeypatch):
+        """Тест що інкрементальне оновлення отримує всі змінені контакти, навіть понад ліміт пошуку"""
+        add_mirror('old', modified=BASE.replace(tzinfo=None))
+        contacts = [contact(str(number), BASE + timedelta(minutes=number + 1)) for number in range(8)]
+        use_hubspot(monkeypatch, search_api=FakeSearchApi(contacts, result_limit=3))
+        monkeypatch.setattr(app_module, 'HUBSPOT_SEARCH_RESULT_LIMIT', 3)
+
+        result = app_module.refresh_hubspot_contacts_mirror()
+        assert (result['created'], result['deleted'], result['full']) == (8, 0, False)
+        assert mirror_ids() == sorted(['old'] + [str(number) for number in range(8)])
+
+    def test_full_pass_deletes_missing_contacts(self, mirror_app, monkeypatch):
+        """Тест що повне оновлення після обходу до кінця видаляє контакти, яких немає в HubSpot"""
+        add_mirror('gone')
+        use_hubspot(monkeypatch, basic_api=FakeContactsApi([[contact('1', BASE)], [contact('2', BASE)]]))
+
+        result = app_module.refresh_hubspot_contacts_mirror(full=True)
+        assert (result['created'], result['deleted']) == (2, 1)
+        assert mirror_ids() == ['1', '2']
+
+    def test_failed_full_pass_deletes_nothing(self, mirror_app, monkeypatch):
+        """Тест що обхід, який впав посередині, не видаляє контакти, до яких не дійшов"""
+        add_mirror('gone')
+        use_hubspot(monkeypatch, basic_api=FakeContactsApi([[contact('1', BASE)], [contact('2', BASE)]], fail_at=1))
+
+        with pytest.raises(RuntimeError):
+            app_module.refresh_hubspot_contacts_mirror(full=True)
+        assert mirror_ids() == ['1', 'gone']
+
+    def test_unfinished_full_pass_deletes_nothing(self, mirror_app, monkeypatch):
+        """Тест що обхід, який зупинився з курсором, пропускає видалення"""
+        add_mirror('gone')
+        use_hubspot(monkeypatch, basic_api=FakeContactsApi([]))
+
+        def stop_early(after=None, max_pages=1000, properties=None, on_backoff=None):
+            yield [contact('1', BASE)], '1'
+
+        monkeypatch.setattr(app_module, 'iter_hubspot_contact_pages', stop_early)
+        result = app_module.refresh_hubspot_contacts_mirror(full=True)
+        assert result['deleted'] == 0
+        assert mirror_ids() == ['1', 'gone']
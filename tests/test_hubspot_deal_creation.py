@@ -0,0 +1,100 @@
+"""
+Тести для створення контакту і угоди HubSpot для нового ліда
+"""
+import pytest
+import os
+import sys
+from types import SimpleNamespace
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+
+
+class FakeResponse:
+    def __init__(self, data=None, status_code=200):
+        self._data = data or {}
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise RuntimeError(self.status_code)
+
+
+class FakeHubSpotHttp:
+    """upsert контакту (new - чи створено), PATCH контакту і створення угоди"""
+
+    def __init__(self, contact_is_new):
+        self.contact_is_new = contact_is_new
+        self.requests = []
+
+    def post(self, url, headers=None, json=None):
+        self.requests.append(('POST', url, json))
+        if url.endswith('/contacts/batch/upsert'):
+            return FakeResponse({'results': [{'id': '501', 'new': self.contact_is_new}]})
+        return FakeResponse({'id': '901', 'properties': {'dealstage': json['properties']['dealstage']}}, 201)
+
+    def patch(self, url, headers=None, json=None):
+        self.requests.append(('PATCH', url, json))
+        return FakeResponse({'id': '501'})
+
+
+@pytest.fixture
+def lead_and_agent(monkeypatch):
+    monkeypatch.setattr(app_module, 'find_hubspot_owner_id', lambda email: None)
+    lead = SimpleNamespace(id=1, email='client@example.com', deal_name='Новий клієнт', phone='+380501234567', budget=None)
+    agent = SimpleNamespace(username='agent', email='agent@example.com')
+    return lead, agent
+
+
+class TestCreateHubSpotDealForLead:
+    """Тести для create_hubspot_deal_for_lead"""
+
+    def test_existing_contact_is_not_modified(self, monkeypatch, lead_and_agent):
+        """Тест що upsert несе тільки email і не перезаписує ім'я/телефон існуючого контакту"""
+        http = FakeHubSpotHttp(contact_is_new=False)
+        monkeypatch.setattr(app_module, 'hubspot_http', http)
+        contact_id, deal_id = app_module.create_hubspot_deal_for_lead(*lead_and_agent)
+        assert (contact_id, deal_id) == ('501', '901')
+        assert http.requests[0][2]['inputs'][0]['properties'] == {'email': 'client@example.com'}
+        assert [method for method, _, _ in http.requests] == ['POST', 'POST']
+        assert http.requests[1][2]['associations'][0]['to'] == {'id': '501'}
+
+    def test_new_contact_gets_name_and_phone(self, monkeypatch, lead_and_agent):
+        """Тест що ім'я і телефон пишуться тільки в щойно створений контакт"""
+        http = FakeHubSpotHttp(contact_is_new=True)
+        monkeypatch.setattr(app_module, 'hubspot_http', http)
+        app_module.create_hubspot_deal_for_lead(*lead_and_agent)
+        method, url, body = http.requests[1]
+        assert method == 'PATCH' and url.endswith('/contacts/501')
+        assert body == {'properties': {'firstname': 'Новий клієнт', 'phone': '+380501234567'}}
+
+    def test_new_lead_takes_deal_stage_status(self, monkeypatch, lead_and_agent):
+        """Тест що новий лід отримує статус за стадією створеної угоди"""
+        monkeypatch.setattr(app_module, 'hubspot_http', FakeHubSpotHttp(contact_is_new=False))
+        lead, agent = lead_and_agent
+        lead.status = 'qualified'
+        app_module.create_hubspot_deal_for_lead(lead, agent, pipeline=app_module.LEAD_DEAL_PIPELINE,
+                                                stage=app_module.STATUS_STAGES['new'])
+        assert lead.status == 'new'
+        assert lead.hubspot_stage_label == 'Новая заявка'
+
+    def test_backfill_keeps_lead_status(self, monkeypatch, lead_and_agent):
+        """Тест що угода для існуючого ліда (keep_status) не змінює його статус і стадію"""
+        http = FakeHubSpotHttp(contact_is_new=False)
+        monkeypatch.setattr(app_module, 'hubspot_http', http)
+        lead, agent = lead_and_agent
+        lead.status = 'qualified'
+        lead.hubspot_stage_label = 'Переговоры'
+        app_module.create_hubspot_deal_for_lead(lead, agent, hubspot_contact_id='501',
+                                                pipeline=app_module.LEAD_DEAL_PIPELINE,
+                                                stage=app_module.STATUS_STAGES[lead.status], keep_status=True)
+        assert (lead.status, lead.hubspot_stage_label) == ('qualified', 'Переговоры')
+        assert lead.hubspot_deal_id == '901'
+        assert [method for method, _, _ in http.requests] == ['POST']
+        assert http.requests[0][2]['properties']['dealstage'] == '3204738261'
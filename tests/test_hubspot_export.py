@@ -0,0 +1,124 @@
+"""
+Тести для початкового завантаження через CRM export API
+"""
+import pytest
+import io
+import os
+import sys
+import zipfile
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hubspot_export import HubSpotCrmExport, HubSpotExportError, exported_objects, EXPORT_URL
+
+CSV_DATA = (
+    '\ufeffhs_object_id,dealname,dealstage,pipeline,Associated Contact IDs\r\n'
+    '101,Тест,3204738258,2341107958,55;56\r\n'
+    '102,,3204738259,2341107958,\r\n'
+).encode('utf-8')
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None, content=b''):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self._data = data or {}
+        self._content = content
+        self.text = ''
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise RuntimeError(self.status_code)
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self._content), chunk_size):
+            yield self._content[start:start + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class FakeSession:
+    """Відповіді API експорту: створення задачі, статуси по черзі, файл"""
+
+    def __init__(self, statuses, content=CSV_DATA):
+        self.statuses = list(statuses)
+        self.content = content
+        self.posted = []
+
+    def post(self, url, headers=None, json=None):
+        self.posted.append(json)
+        return FakeResponse(data={'id': 77})
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        if url.startswith(EXPORT_URL):
+            return FakeResponse(data=self.statuses.pop(0))
+        return FakeResponse(content=self.content)
+
+
+def make_export(session, **kwargs):
+    return HubSpotCrmExport(session, {'Authorization': 'Bearer x'}, poll_interval=0, download_session=session,
+                            chunk_size=16, sleep=lambda seconds: None, **kwargs)
+
+
+class TestHubSpotCrmExport:
+    """Тести для HubSpotCrmExport"""
+
+    def test_export_waits_and_streams_rows(self):
+        """Тест що експорт чекає COMPLETE і віддає рядки CSV"""
+        session = FakeSession([{'status': 'PROCESSING'}, {'status': 'COMPLETE', 'result': 'https://files/x.csv'}])
+        polls = []
+        rows = list(make_export(session).export(
+            'DEAL', ['dealname'], associated_object_type='CONTACT', on_poll=lambda status, waited: polls.append(status)
+        ))
+        assert polls == ['PROCESSING', 'COMPLETE']
+        assert session.posted[0]['objectType'] == 'DEAL'
+        assert session.posted[0]['associatedObjectType'] == ['CONTACT']
+        assert [row['hs_object_id'] for row in rows] == ['101', '102']
+
+    def test_zip_export(self):
+        """Тест що zip з CSV читається так само, як CSV"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('deals.csv', CSV_DATA)
+        session = FakeSession([{'status': 'COMPLETE', 'result': 'https://files/x.zip'}], content=buffer.getvalue())
+        rows = list(make_export(session).export('DEAL', ['dealname']))
+        assert len(rows) == 2
+
+    def test_canceled_export_raises(self):
+        """Тест що скасований експорт кидає HubSpotExportError"""
+        session = FakeSession([{'status': 'CANCELED'}])
+        with pytest.raises(HubSpotExportError):
+            list(make_export(session).export('CONTACT', ['email']))
+
+    def test_timeout_raises(self):
+        """Тест що експорт, не готовий за timeout, кидає HubSpotExportError"""
+        session = FakeSession([{'status': 'PROCESSING'}])
+        with pytest.raises(HubSpotExportError):
+            make_export(session, timeout=0).wait('77')
+
+
+class TestExportedObjects:
+    """Тести для exported_objects"""
+
+    def test_rows_become_sdk_like_objects(self):
+        """Тест що рядок стає об'єктом з id, properties і associations"""
+        rows = [
+            {'hs_object_id': '101', 'dealname': 'Тест', 'Associated Contact IDs': '55;56', 'lastmodifieddate': '1700000000000'},
+            {'hs_object_id': '102', 'dealname': '', 'Associated Contact IDs': '', 'lastmodifieddate': ''},
+            {'hs_object_id': '', 'dealname': 'Без id', 'Associated Contact IDs': '', 'lastmodifieddate': ''},
+        ]
+        objects = list(exported_objects(rows))
+        assert [obj.id for obj in objects] == ['101', '102']
+        assert objects[0].associations == ['55', '56']
+        assert objects[0].updated_at.year == 2023
+        assert 'Associated Contact IDs' not in objects[0].properties
+        assert objects[1].properties['dealname'] is None
+        assert objects[1].associations == []
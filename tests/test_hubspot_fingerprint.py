@@ -0,0 +1,47 @@
+"""
+Тести для відбитків властивостей HubSpot
+"""
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hubspot_fingerprint import property_fingerprint, fingerprint_matches, with_fingerprint
+
+
+class TestPropertyFingerprint:
+    """Тести для property_fingerprint"""
+
+    def test_key_order_does_not_matter(self):
+        """Тест що відбиток не залежить від порядку ключів"""
+        assert property_fingerprint({'a': '1', 'b': '2'}) == property_fingerprint({'b': '2', 'a': '1'})
+
+    def test_volatile_properties_ignored(self):
+        """Тест що lastmodifieddate і подібні не змінюють відбиток, а значення - змінюють"""
+        base = {'email': 'a@b.c', 'lastmodifieddate': '2024-01-01T00:00:00Z'}
+        assert property_fingerprint(base) == property_fingerprint(dict(base, lastmodifieddate='2024-02-01T00:00:00Z'))
+        assert property_fingerprint(base) != property_fingerprint(dict(base, email='x@b.c'))
+
+    def test_missing_set_differs_from_empty(self):
+        """Тест що відсутній набір (лід без deal) відрізняється від порожнього"""
+        assert property_fingerprint({'a': '1'}, None) != property_fingerprint({'a': '1'}, {})
+
+
+class TestFingerprintsBySource:
+    """Тести для fingerprint_matches і with_fingerprint"""
+
+    def test_sources_are_independent(self):
+        """Тест що відбитки різних джерел зберігаються окремо"""
+        fingerprints = with_fingerprint(None, 'deal', 'd1')
+        fingerprints = with_fingerprint(fingerprints, 'sync', 's1')
+        assert fingerprint_matches(fingerprints, 'deal', 'd1')
+        assert not fingerprint_matches(fingerprints, 'contact', 'd1')
+        assert not fingerprint_matches(None, 'deal', 'd1')
+
+    def test_returns_new_dict(self):
+        """Тест що with_fingerprint не змінює словник на місці (інакше SQLAlchemy не побачить зміну)"""
+        fingerprints = {'deal': 'd1'}
+        updated = with_fingerprint(fingerprints, 'deal', 'd2')
+        assert fingerprints == {'deal': 'd1'}
+        assert updated == {'deal': 'd2'}
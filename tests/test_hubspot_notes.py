@@ -0,0 +1,86 @@
+"""
+Тести для пакетного створення нотаток HubSpot
+"""
+import pytest
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hubspot_notes import HubSpotNotes, NOTES_BATCH_CREATE_URL
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+        self.text = str(self._data)
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class FakeSession:
+    """batch/create: нотатки до видалених deals відхиляють весь пакет (400)"""
+
+    def __init__(self, deleted_deals=(), trace_ids=True, status_code=201):
+        self.deleted_deals = set(deleted_deals)
+        self.trace_ids = trace_ids
+        self.status_code = status_code
+        self.posted = []
+
+    def post(self, url, headers=None, json=None):
+        self.posted.append(json['inputs'])
+        inputs = json['inputs']
+        if any(note['associations'][0]['to']['id'] in self.deleted_deals for note in inputs):
+            return FakeResponse(400, {'message': 'deal не знайдено'})
+        results = []
+        # HubSpot не гарантує порядок results
+        for note in reversed(inputs):
+            result = {'id': f"note-{note['objectWriteTraceId']}", 'properties': dict(note['properties'])}
+            if self.trace_ids:
+                result['objectWriteTraceId'] = note['objectWriteTraceId']
+            results.append(result)
+        return FakeResponse(self.status_code, {'results': results})
+
+
+def notes(count):
+    return [(key, f'коментар {key}', f'2024-01-01T00:00:{key % 60:02d}Z', f'deal-{key}') for key in range(count)]
+
+
+class TestHubSpotNotes:
+    """Тести для HubSpotNotes"""
+
+    def test_create_in_batches_with_inline_association(self):
+        """Тест що нотатки створюються пакетами по batch_limit з асоціацією з deal в input"""
+        session = FakeSession()
+        created, errors = HubSpotNotes(session, {}, 214).create(notes(150))
+        assert [len(inputs) for inputs in session.posted] == [100, 50]
+        assert session.posted[0][0]['associations'] == [
+            {'to': {'id': 'deal-0'}, 'types': [{'associationCategory': 'HUBSPOT_DEFINED', 'associationTypeId': 214}]}
+        ]
+        assert len(created) == 150 and not errors
+        assert created['7'] == 'note-7'
+
+    def test_results_matched_by_properties_without_trace_id(self):
+        """Тест що без objectWriteTraceId результати зіставляються за текстом і часом"""
+        created, errors = HubSpotNotes(FakeSession(trace_ids=False), {}, 214).create(notes(3))
+        assert created == {'0': 'note-0', '1': 'note-1', '2': 'note-2'}
+
+    def test_rejected_batch_retried_one_by_one(self):
+        """Тест що нотатка до видаленого deal не блокує решту пакета"""
+        session = FakeSession(deleted_deals={'deal-1'})
+        created, errors = HubSpotNotes(session, {}, 214).create(notes(3))
+        assert set(created) == {'0', '2'}
+        assert list(errors) == ['1']
+        assert len(session.posted) == 4
+
+    def test_http_error_raises(self):
+        """Тест що помилка HTTP (не 400) не ковтається"""
+        with pytest.raises(RuntimeError):
+            HubSpotNotes(FakeSession(status_code=503), {}, 214).create(notes(1))
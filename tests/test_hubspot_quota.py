@@ -0,0 +1,104 @@
+"""
+Тести для квоти HubSpot API та транспортного шару
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hubspot_quota import HubSpotQuota, HubSpotQuotaExceeded
+from hubspot_transport import guarded_api_factory, chain_guards
+
+
+class FakeResponse:
+    def __init__(self, status=200, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+
+class TestHubSpotQuota:
+    """Тести для HubSpotQuota"""
+
+    def test_bulk_lane_uses_only_its_share(self):
+        """Тест що смуга bulk не займає все 10-секундне вікно"""
+        quota = HubSpotQuota(burst_limit=10, burst_window=60, wait_timeout={'bulk': 0.05})
+        for _ in range(5):
+            quota.acquire('bulk')
+        with pytest.raises(HubSpotQuotaExceeded):
+            quota.acquire('bulk')
+        # Інтерактивні запити все ще проходять
+        quota.acquire('interactive')
+
+    def test_daily_reserve_blocks_background_lanes(self):
+        """Тест що резерв денного ліміту доступний тільки інтерактивній смузі"""
+        quota = HubSpotQuota(daily_limit=1000)
+        quota.observe(FakeResponse(headers={'X-HubSpot-RateLimit-Daily-Remaining': '100'}))
+        with pytest.raises(HubSpotQuotaExceeded):
+            quota.acquire('bulk')
+        quota.acquire('interactive')
+        assert quota.stats()['daily_remaining_source'] == 'hubspot'
+
+    def test_interactive_preempts_waiting_bulk(self):
+        """Тест що інтерактивний запит отримує місце раніше за фоновий"""
+        quota = HubSpotQuota(burst_limit=2, burst_window=0.3, burst_share={'bulk': 1.0})
+        quota.acquire('bulk')
+        quota.acquire('bulk')
+        order = []
+
+        def run(lane):
+            quota.acquire(lane)
+            order.append(lane)
+
+        bulk = threading.Thread(target=run, args=('bulk',))
+        bulk.start()
+        time.sleep(0.05)
+        interactive = threading.Thread(target=run, args=('interactive',))
+        interactive.start()
+        bulk.join(2)
+        interactive.join(2)
+        assert order[0] == 'interactive'
+
+    def test_lane_context(self):
+        """Тест що смуга задається контекстом для поточного потоку"""
+        quota = HubSpotQuota(default_lane=lambda: 'interactive')
+        with quota.lane('bulk'):
+            assert quota.current_lane() == 'bulk'
+        assert quota.current_lane() == 'interactive'
+
+    def test_guard_observes_429(self):
+        """Тест що 429 від HubSpot блокує запити на Retry-After"""
+        quota = HubSpotQuota(wait_timeout={'interactive': 0.05})
+        quota.guard(lambda: FakeResponse(429, {'Retry-After': '5'}))
+        with pytest.raises(HubSpotQuotaExceeded):
+            quota.acquire('interactive')
+
+
+class TestHubSpotTransport:
+    """Тести для транспортного шару"""
+
+    def test_chain_order(self):
+        """Тест що guards виконуються від першого до останнього"""
+        calls = []
+
+        def guard(name):
+            def wrapped(call):
+                calls.append(name)
+                return call()
+            return wrapped
+
+        assert chain_guards([guard('outer'), guard('inner')])(lambda: 'ok') == 'ok'
+        assert calls == ['outer', 'inner']
+
+    def test_sdk_requests_pass_through_guard(self):
+        """Тест що api_factory обгортає HTTP запити SDK"""
+        from hubspot import HubSpot
+
+        seen = []
+        client = HubSpot(access_token='test', api_factory=guarded_api_factory(lambda call: seen.append(1) or 'response'))
+        api_client = client.crm.contacts.basic_api.api_client
+        assert api_client.request('GET', 'https://api.hubapi.com/test') == 'response'
+        assert seen == [1]
@@ -0,0 +1,77 @@
+"""
+Тести для контролю пам'яті імпортів
+"""
+import pytest
+import os
+import sys
+import tracemalloc
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from import_memory import ImportMemoryMonitor, MemoryCeilingExceeded, process_rss, MB
+
+
+class FakeRss:
+    """RSS процесу, який задає тест"""
+
+    def __init__(self, mb=100):
+        self.mb = mb
+
+    def __call__(self):
+        return int(self.mb * MB)
+
+
+class TestImportMemoryMonitor:
+    """Тести для ImportMemoryMonitor"""
+
+    def test_report_contains_run_summary(self):
+        """Тест що звіт містить приріст RSS, пік, кількість пакетів і найбільші виділення"""
+        rss = FakeRss()
+        with ImportMemoryMonitor('deals', ceiling_mb=512, trace=True, rss=rss) as memory:
+            rss.mb = 300
+            memory.batch_released()
+            rss.mb = 150
+        report = memory.report()
+        assert report['name'] == 'deals'
+        assert report['batches'] == 1
+        assert report['ceiling_mb'] == 512
+        assert report['current_mb'] == 50
+        assert report['peak_mb'] == 200
+        assert report['top_allocations']
+        assert not tracemalloc.is_tracing()
+
+    def test_ceiling_exceeded_after_release(self):
+        """Тест що пакет, після якого RSS лишився над стелею, зупиняє запуск"""
+        rss = FakeRss()
+        with ImportMemoryMonitor('contacts', ceiling_mb=64, rss=rss) as memory:
+            rss.mb = 200
+            with pytest.raises(MemoryCeilingExceeded):
+                memory.batch_released()
+            assert memory.over_ceiling()
+            rss.mb = 120
+            assert not memory.over_ceiling()
+
+    def test_overlapping_runs_keep_tracing(self):
+        """Тест що запуск, який почав трасування і завершився першим, не вимикає його іншому"""
+        first = ImportMemoryMonitor('import', trace=True).__enter__()
+        second = ImportMemoryMonitor('export', trace=True).__enter__()
+        first.__exit__(None, None, None)
+        assert tracemalloc.is_tracing()
+        second.__exit__(None, None, None)
+        assert second.report()['top_allocations']
+        assert not tracemalloc.is_tracing()
+
+    def test_ceiling_checked_without_trace(self):
+        """Тест що стеля перевіряється і без tracemalloc, а трасування не запускається"""
+        rss = FakeRss()
+        with ImportMemoryMonitor('replay', ceiling_mb=10, rss=rss) as memory:
+            assert not tracemalloc.is_tracing()
+            rss.mb = 111
+            assert memory.over_ceiling()
+        assert memory.report()['traced'] is False
+        assert 'top_allocations' not in memory.report()
+
+    def test_process_rss(self):
+        """Тест що RSS процесу читається"""
+        assert process_rss() > MB
@@ -0,0 +1,66 @@
+"""
+Тести для журналу подій фонових задач (SSE)
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_events import JobEventLog, DONE_EVENT, format_sse
+
+
+class TestJobEventLog:
+    """Тести для JobEventLog"""
+
+    def test_read_from_offset(self, tmp_path):
+        """Тест що читання з id події повертає тільки наступні події"""
+        log = JobEventLog(str(tmp_path))
+        log.publish(1, 'progress', {'rows_processed': 1})
+        log.publish(1, 'progress', {'rows_processed': 2})
+
+        events = log.read(1)
+        assert [data['rows_processed'] for _, _, data in events] == [1, 2]
+        assert log.read(1, events[0][0]) == events[1:]
+
+    def test_stream_stops_after_done(self, tmp_path):
+        """Тест що потік закривається після події done"""
+        log = JobEventLog(str(tmp_path), poll_interval=0.05)
+        log.publish(1, 'progress', {'rows_processed': 1})
+
+        def finish():
+            time.sleep(0.1)
+            log.publish(1, DONE_EVENT, {'status': 'completed'})
+
+        threading.Thread(target=finish).start()
+        messages = list(log.stream(1, max_duration=5))
+
+        assert messages[0].startswith('retry:')
+        assert 'event: progress' in messages[1]
+        assert 'event: done' in messages[-1]
+
+    def test_stream_resumes_from_last_event_id(self, tmp_path):
+        """Тест перепідключення з Last-Event-ID"""
+        log = JobEventLog(str(tmp_path), poll_interval=0.05)
+        log.publish(1, 'progress', {'rows_processed': 1})
+        first_id = log.read(1)[0][0]
+        log.publish(1, DONE_EVENT, {'status': 'completed'})
+
+        messages = list(log.stream(1, last_event_id=first_id, max_duration=5))
+        assert len(messages) == 2
+        assert 'event: done' in messages[1]
+
+    def test_stream_closes_on_deadline(self, tmp_path):
+        """Тест що потік без подій закривається через max_duration"""
+        log = JobEventLog(str(tmp_path), poll_interval=0.05)
+        started = time.time()
+        messages = list(log.stream(1, max_duration=0.2))
+        assert time.time() - started < 2
+        assert len(messages) == 1
+
+    def test_format_sse(self):
+        """Тест формату повідомлення text/event-stream"""
+        assert format_sse('done', {'status': 'completed'}, 10) == 'id: 10\nevent: done\ndata: {"status": "completed"}\n\n'
@@ -0,0 +1,56 @@
+"""
+Тести для пакетного пошуку дублікатів лідів
+"""
+import pytest
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lead_dedupe import find_duplicate_clusters, lead_keys, cluster_fingerprint
+
+
+ROWS = [
+    (1, '380501234567', None, 'a@b.com'),
+    (2, '380501234567', None, 'c@d.com'),
+    (3, None, '380501234567', None),
+    (4, '12125550000', None, ' C@D.com'),
+    (5, '447700900000', None, 'no-email-5@hubspot.local'),
+    (6, '447700900001', None, 'no-email-5@hubspot.local'),
+    (7, '123', None, None),
+    (8, '123', None, None),
+]
+
+
+class TestLeadKeys:
+    """Тести для ключів ліда"""
+
+    def test_phone_and_second_phone_share_namespace(self):
+        """Тест що телефон і другий телефон мають однаковий хеш"""
+        assert lead_keys('380501234567', None, None) == lead_keys(None, '380501234567', None)
+
+    def test_skips_short_phones_and_placeholder_emails(self):
+        """Тест пропуску коротких номерів та технічних email"""
+        assert lead_keys('123', None, 'no-email-1@hubspot.local') == []
+
+
+class TestFindDuplicateClusters:
+    """Тести для find_duplicate_clusters"""
+
+    def test_groups_transitive_matches(self):
+        """Тест об'єднання лідів через спільний телефон та email"""
+        clusters, partitions = find_duplicate_clusters(lambda: iter(ROWS))
+        assert partitions == 1
+        assert clusters == [([1, 2, 3, 4], ['email', 'phone'])]
+
+    def test_partitioned_pass_gives_same_result(self):
+        """Тест що розбиття на партиції не змінює результат"""
+        clusters, partitions = find_duplicate_clusters(lambda: iter(ROWS), total_rows=len(ROWS), max_keys_in_memory=4)
+        assert partitions > 1
+        assert clusters == [([1, 2, 3, 4], ['email', 'phone'])]
+
+    def test_fingerprint_is_stable(self):
+        """Тест стабільності відбитка кластера"""
+        assert cluster_fingerprint([1, 2, 3]) == cluster_fingerprint([1, 2, 3])
+        assert cluster_fingerprint([1, 2, 3]) != cluster_fingerprint([1, 2, 4])
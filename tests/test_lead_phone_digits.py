@@ -0,0 +1,92 @@
+"""
+Тести для нормалізованих цифр телефонів ліда і пошуку дублікатів /api/check-phone
+"""
+import pytest
+import os
+import sys
+from flask import Flask
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import db, User, Lead
+
+
+@pytest.fixture
+def phone_app(tmp_path):
+    """Окремий Flask застосунок з моделями app.py на тимчасовій SQLite (без робочої БД)"""
+    test_app = Flask(__name__)
+    test_app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'phones.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        LOGIN_DISABLED=True,
+        TESTING=True,
+    )
+    db.init_app(test_app)
+    test_app.add_url_rule('/api/check-phone', view_func=app_module.check_phone_number, methods=['POST'])
+    with test_app.app_context():
+        db.create_all()
+        agent = User(username='agent', email='agent@example.com', role='agent')
+        agent.set_password('password123')
+        db.session.add(agent)
+        db.session.commit()
+        yield test_app, agent
+        db.session.remove()
+        db.drop_all()
+
+
+def add_lead(agent, phone, second_phone=None):
+    lead = Lead(agent_id=agent.id, deal_name='Тест', email='lead@example.com',
+                phone=phone, second_phone=second_phone)
+    db.session.add(lead)
+    db.session.commit()
+    return lead
+
+
+class TestLeadPhoneDigits:
+    """Тести для sync_lead_phone_digits"""
+
+    def test_digits_filled_on_insert(self, phone_app):
+        """Тест що *_digits заповнюються при створенні ліда"""
+        _, agent = phone_app
+        lead = add_lead(agent, '+380 (50) 123-45-67', '+44 7700 900123')
+        assert lead.phone_digits == '380501234567'
+        assert lead.second_phone_digits == '447700900123'
+
+    def test_digits_follow_update(self, phone_app):
+        """Тест що *_digits оновлюються разом з телефонами, а порожній номер дає None"""
+        _, agent = phone_app
+        lead = add_lead(agent, '+380501234567', '+447700900123')
+        lead.phone = '+1 (212) 555-0000'
+        lead.second_phone = ''
+        db.session.commit()
+        assert lead.phone_digits == '12125550000'
+        assert lead.second_phone_digits is None
+
+
+class TestCheckPhone:
+    """Тести для /api/check-phone по нормалізованих колонках"""
+
+    def test_finds_lead_by_formatted_number(self, phone_app):
+        """Тест що відформатований номер знаходить лід, збережений в іншому форматі"""
+        test_app, agent = phone_app
+        lead = add_lead(agent, '+380501234567')
+        response = test_app.test_client().post('/api/check-phone', json={'phone': '+38 (050) 123 45 67'})
+        data = response.get_json()
+        assert data['success'] and data['count'] == 1
+        assert data['matches'][0]['id'] == lead.id
+
+    def test_finds_lead_by_partial_second_phone(self, phone_app):
+        """Тест що частина номера знаходить лід за другим телефоном"""
+        test_app, agent = phone_app
+        lead = add_lead(agent, '+380501234567', '+44 7700 900123')
+        data = test_app.test_client().post('/api/check-phone', json={'phone': '900-123'}).get_json()
+        assert [match['id'] for match in data['matches']] == [lead.id]
+
+    def test_too_short_number(self, phone_app):
+        """Тест що менше 4 цифр не шукається"""
+        test_app, agent = phone_app
+        add_lead(agent, '+380501234567')
+        data = test_app.test_client().post('/api/check-phone', json={'phone': '+38'}).get_json()
+        assert not data['success'] and data['count'] == 0
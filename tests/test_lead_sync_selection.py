@@ -0,0 +1,66 @@
+"""
+Тести для вибору лідів циклу синхронізації (select_leads_for_sync)
+"""
+import pytest
+import os
+import sys
+from datetime import timedelta
+from flask import Flask
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import db, User, Lead
+from sync_scheduler import SyncBudget
+
+
+@pytest.fixture
+def sync_app(tmp_path):
+    """Окремий Flask застосунок з моделями app.py на тимчасовій SQLite (без робочої БД)"""
+    test_app = Flask(__name__)
+    test_app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'sync.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        TESTING=True,
+    )
+    db.init_app(test_app)
+    with test_app.app_context():
+        db.create_all()
+        agent = User(username='agent', email='agent@example.com', role='agent')
+        agent.set_password('password123')
+        db.session.add(agent)
+        db.session.commit()
+        yield agent
+        db.session.remove()
+        db.drop_all()
+
+
+def add_lead(agent, contact_id, last_sync_at=None):
+    now = app_module.lead_poll_now()
+    lead = Lead(agent_id=agent.id, deal_name=f'Лід {contact_id}', email='lead@example.com',
+                phone='+380501234567', hubspot_contact_id=contact_id,
+                activity_at=now - timedelta(hours=1), last_sync_at=last_sync_at)
+    db.session.add(lead)
+    db.session.commit()
+    return lead
+
+
+class TestSelectLeadsForSync:
+    """Тести для select_leads_for_sync"""
+
+    def test_fresh_sync_and_old_sync_use_one_clock(self, sync_app):
+        """Тест що щойно синхронізований лід йде після давно синхронізованого і не є активним"""
+        old = add_lead(sync_app, 'old', last_sync_at=app_module.lead_poll_now() - timedelta(days=3))
+        fresh = add_lead(sync_app, 'fresh')
+        app_module.mark_lead_synced(fresh)
+        # Порівняння в Python (без перечитування з БД) - той самий naive годинник
+        assert fresh.last_sync_at > old.last_sync_at
+        fresh.next_poll_at = None
+        db.session.commit()
+
+        budget = SyncBudget(api_calls=20, calls_per_lead=10, hot_share=0.5, hot_resync_minutes=60)
+        assert app_module.select_leads_for_sync(budget) == [old.id, fresh.id]
+
+        budget.api_calls = 10
+        assert app_module.select_leads_for_sync(budget) == [old.id]
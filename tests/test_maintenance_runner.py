@@ -0,0 +1,101 @@
+"""
+Тести для виконавця сервісних команд
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maintenance_runner import MaintenanceRunner, BatchResult, each_item
+
+
+def counting_handler(keys, dry_run):
+    return {'updated': len(keys)}
+
+
+class TestMaintenanceRunner:
+    """Тести для MaintenanceRunner"""
+
+    def test_batches_run_concurrently(self, tmp_path):
+        """Тест що ключі діляться на пакети, а пакети виконуються одночасно"""
+        in_flight = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def handler(keys, dry_run):
+            with lock:
+                in_flight['now'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['now'])
+            time.sleep(0.05)
+            with lock:
+                in_flight['now'] -= 1
+            return {'updated': len(keys)}
+
+        runner = MaintenanceRunner('test', handler, batch_size=10, concurrency=3, state_dir=str(tmp_path))
+        result = runner.run(list(range(30)))
+        assert result['batches'] == 3
+        assert result['counts'] == {'updated': 30}
+        assert in_flight['max'] == 3
+        assert result['complete']
+        assert not os.listdir(tmp_path)
+
+    def test_failed_batch_stops_cursor_and_run_resumes(self, tmp_path):
+        """Тест що пакет, який впав, зупиняє курсор, а наступний запуск починає з нього"""
+        def flaky(keys, dry_run):
+            if 5 in keys:
+                raise RuntimeError('HubSpot недоступний')
+            return {'updated': len(keys)}
+
+        runner = MaintenanceRunner('test', flaky, batch_size=2, concurrency=1, state_dir=str(tmp_path))
+        result = runner.run(list(range(8)))
+        assert not result['complete']
+        assert result['cursor'] == 3
+        assert result['counts']['errors'] == 2
+        assert runner.load_state()['cursor'] == 3
+
+        seen = []
+
+        def handler(keys, dry_run):
+            seen.extend(keys)
+            return {'updated': len(keys)}
+
+        result = MaintenanceRunner('test', handler, batch_size=2, concurrency=1, state_dir=str(tmp_path)).run(list(range(8)))
+        assert seen == [4, 5, 6, 7]
+        assert result['resumed']['cursor'] == 3
+        assert result['resumed']['counts'] == {'updated': 4}
+        assert result['counts'] == {'updated': 4}
+        assert result['complete']
+
+    def test_restart_ignores_saved_state(self, tmp_path):
+        """Тест що resume=False обробляє всі ключі з початку"""
+        MaintenanceRunner('test', lambda keys, dry_run: 1 / 0, batch_size=2, state_dir=str(tmp_path)).run([1, 2])
+        result = MaintenanceRunner('test', counting_handler, batch_size=2, state_dir=str(tmp_path)).run([1, 2], resume=False)
+        assert result['counts'] == {'updated': 2}
+
+    def test_dry_run_saves_no_state(self, tmp_path):
+        """Тест що dry-run передається обробнику і не залишає стану"""
+        flags = []
+        runner = MaintenanceRunner('test', lambda keys, dry_run: flags.append(dry_run) or {'errors': 1},
+                                   batch_size=5, dry_run=True, state_dir=str(tmp_path))
+        runner.run([1, 2])
+        assert flags == [True]
+        assert not os.listdir(tmp_path)
+
+
+class TestEachItem:
+    """Тести для each_item"""
+
+    def test_item_errors_do_not_stop_batch(self):
+        """Тест що помилка одного ключа рахується, а решта пакета обробляється"""
+        def handle(key, dry_run):
+            if key == 2:
+                raise ValueError('немає email')
+            return 'created' if key % 2 else None
+
+        result = each_item(handle)([1, 2, 3, 4], False)
+        assert isinstance(result, BatchResult)
+        assert dict(result) == {'created': 2, 'errors': 1, 'skipped': 1}
+        assert result.errors == ['2: немає email']
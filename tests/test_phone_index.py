@@ -0,0 +1,55 @@
+"""
+Тести для in-memory n-gram індексу телефонів
+"""
+import pytest
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phone_index import PhoneNgramIndex, join_phone_digits
+
+
+@pytest.fixture
+def index():
+    """Індекс з кількома лідами"""
+    index = PhoneNgramIndex()
+    index.load([
+        (1, '380501234567', None, None),
+        (2, '380671112233', '12125550000', None),
+        (3, None, None, None),
+    ])
+    return index
+
+
+class TestPhoneNgramIndex:
+    """Тести для PhoneNgramIndex"""
+
+    def test_cold_index_returns_none(self):
+        """Тест що холодний індекс повертає None (fallback на SQL)"""
+        assert PhoneNgramIndex().search('1234') is None
+
+    def test_substring_search(self, index):
+        """Тест пошуку по частині номера"""
+        assert index.search('1234') == [1]
+        assert index.search('3806') == [2]
+        assert index.search('380') is None
+        assert index.search('5550000') == [2]
+        assert index.search('999999') == []
+
+    def test_apply_update_and_delete(self, index):
+        """Тест оновлення та видалення лідів"""
+        index.apply({1: '380509999999', 4: join_phone_digits('447700900123', None)})
+        assert index.search('1234') == []
+        assert index.search('9999') == [1]
+        assert index.search('7700900') == [4]
+
+        index.apply({4: None})
+        assert index.search('7700900') == []
+
+    def test_limit(self):
+        """Тест обмеження кількості результатів"""
+        index = PhoneNgramIndex()
+        index.load([(i, f'38050000{i:04d}', None, None) for i in range(1, 30)])
+        assert len(index.search('0500', limit=10)) == 10
@@ -0,0 +1,58 @@
+"""
+Тести для нормалізації телефонних номерів
+"""
+import pytest
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phone_utils import normalize_phone, format_phone, phone_digits, phone_cache_info
+
+
+class TestNormalizePhone:
+    """Тести для normalize_phone"""
+
+    def test_valid_number(self):
+        """Тест нормалізації валідного номера"""
+        normalized = normalize_phone('+380 50 123 4567')
+        assert normalized.e164 == '+380501234567'
+        assert normalized.international == '+380 50 123 4567'
+        assert normalized.digits == '380501234567'
+        assert normalized.is_valid
+
+    def test_unparseable_number(self):
+        """Тест номера, який неможливо розпарсити"""
+        normalized = normalize_phone('abc-123')
+        assert normalized.e164 is None
+        assert normalized.international == 'abc-123'
+        assert normalized.digits == '123'
+        assert not normalized.is_valid
+
+    def test_empty_value(self):
+        """Тест порожнього значення"""
+        assert normalize_phone('') is None
+        assert normalize_phone(None) is None
+
+    def test_repeated_number_uses_cache(self):
+        """Тест що повторний номер береться з кешу"""
+        normalize_phone('+971 50 555 1234')
+        hits_before = phone_cache_info().hits
+        normalize_phone('  +971 50 555 1234  ')
+        assert phone_cache_info().hits == hits_before + 1
+
+
+class TestPhoneHelpers:
+    """Тести для допоміжних функцій"""
+
+    def test_format_phone_fallback(self):
+        """Тест fallback на оригінальне значення"""
+        assert format_phone('+380501234567') == '+380 50 123 4567'
+        assert format_phone('not a phone') == 'not a phone'
+        assert format_phone(None) is None
+
+    def test_phone_digits(self):
+        """Тест витягування цифр"""
+        assert phone_digits('+380 (50) 123-45-67') == '380501234567'
+        assert phone_digits(None) == ''
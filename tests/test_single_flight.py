@@ -0,0 +1,133 @@
+"""
+Тести для single-flight координатора
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+import multiprocessing
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from single_flight import SingleFlight, SingleFlightTimeout, fcntl
+
+
+def _slow_operation(counter_path):
+    """Повільна операція, яка рахує свої запуски у файлі"""
+    with open(counter_path, 'a') as counter:
+        counter.write('x')
+    time.sleep(0.5)
+    return {'value': 42}
+
+
+def _run_in_process(lock_dir, counter_path, queue):
+    flight = SingleFlight(lock_dir, poll_interval=0.05)
+    queue.put(flight.do('operation', _slow_operation, counter_path))
+
+
+def _wait_in_process(lock_dir, counter_path, queue):
+    flight = SingleFlight(lock_dir, poll_interval=0.05, wait_timeout=0.1)
+    queue.put(flight.do('operation', _slow_operation, counter_path, wait_timeout=None))
+
+
+class TestSingleFlight:
+    """Тести для SingleFlight"""
+
+    def test_concurrent_threads_share_result(self, tmp_path):
+        """Тест що одночасні потоки виконують операцію один раз"""
+        flight = SingleFlight(str(tmp_path / 'locks'))
+        counter_path = str(tmp_path / 'counter')
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do('operation', _slow_operation, counter_path)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [{'value': 42}] * 5
+        assert open(counter_path).read() == 'x'
+
+    def test_sequential_calls_run_again(self, tmp_path):
+        """Тест що після завершення операція запускається заново"""
+        flight = SingleFlight(str(tmp_path / 'locks'))
+        counter_path = str(tmp_path / 'counter')
+
+        flight.do('operation', _slow_operation, counter_path)
+        flight.do('operation', _slow_operation, counter_path)
+        assert open(counter_path).read() == 'xx'
+
+    def test_error_is_shared(self, tmp_path):
+        """Тест що помилка передається всім очікуючим"""
+        flight = SingleFlight(str(tmp_path / 'locks'))
+
+        def failing():
+            raise ValueError('boom')
+
+        with pytest.raises(ValueError):
+            flight.do('failing', failing)
+
+    @pytest.mark.skipif(fcntl is None, reason="fcntl недоступний")
+    def test_concurrent_processes_share_result(self, tmp_path):
+        """Тест що одночасні процеси (workers) виконують операцію один раз"""
+        lock_dir = str(tmp_path / 'locks')
+        counter_path = str(tmp_path / 'counter')
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+
+        processes = [context.Process(target=_run_in_process, args=(lock_dir, counter_path, queue)) for _ in range(3)]
+        for process in processes:
+            process.start()
+        results = [queue.get(timeout=10) for _ in processes]
+        for process in processes:
+            process.join()
+
+        assert results == [{'value': 42}] * 3
+        assert open(counter_path).read() == 'x'
+
+    def test_waiter_times_out_by_default(self, tmp_path):
+        """Тест що без явного wait_timeout очікувач здається після типового тайм-ауту"""
+        flight = SingleFlight(str(tmp_path / 'locks'), wait_timeout=0.1)
+        counter_path = str(tmp_path / 'counter')
+        leader = threading.Thread(target=flight.do, args=('operation', _slow_operation, counter_path))
+        leader.start()
+        time.sleep(0.1)
+        with pytest.raises(SingleFlightTimeout):
+            flight.do('operation', _slow_operation, counter_path)
+        leader.join()
+
+    def test_waiter_without_timeout_outlives_default(self, tmp_path):
+        """Тест що wait_timeout=None чекає на лідера довше за типовий тайм-аут"""
+        flight = SingleFlight(str(tmp_path / 'locks'), wait_timeout=0.1)
+        counter_path = str(tmp_path / 'counter')
+        leader = threading.Thread(target=flight.do, args=('operation', _slow_operation, counter_path))
+        leader.start()
+        time.sleep(0.1)
+        assert flight.do('operation', _slow_operation, counter_path, wait_timeout=None) == {'value': 42}
+        leader.join()
+        assert open(counter_path).read() == 'x'
+
+    @pytest.mark.skipif(fcntl is None, reason="fcntl недоступний")
+    def test_process_waiter_without_timeout_outlives_default(self, tmp_path):
+        """Тест що worker з wait_timeout=None чекає на lock іншого worker довше за типовий тайм-аут"""
+        lock_dir = str(tmp_path / 'locks')
+        counter_path = str(tmp_path / 'counter')
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+
+        leader = context.Process(target=_run_in_process, args=(lock_dir, counter_path, queue))
+        leader.start()
+        time.sleep(0.1)
+        waiter = context.Process(target=_wait_in_process, args=(lock_dir, counter_path, queue))
+        waiter.start()
+        results = [queue.get(timeout=10) for _ in range(2)]
+        leader.join()
+        waiter.join()
+
+        assert results == [{'value': 42}] * 2
+        assert open(counter_path).read() == 'x'
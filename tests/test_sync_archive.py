@@ -0,0 +1,57 @@
+"""
+Тести для архіву сирих даних синхронізації
+"""
+import pytest
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sync_archive import SyncArchive
+
+
+class TestSyncArchive:
+    """Тести для SyncArchive"""
+
+    def test_run_roundtrip(self, tmp_path):
+        """Тест що записи запуску читаються в тому ж порядку"""
+        archive = SyncArchive(str(tmp_path))
+        with archive.open_run('deals', run_id='20250101T000000') as run:
+            run.append({'id': '1', 'properties': {'dealname': 'Тест'}})
+            run.append({'id': '2', 'properties': {}})
+        assert run.records == 2
+        assert [r['id'] for r in archive.read('deals', '20250101T000000')] == ['1', '2']
+
+    def test_empty_run_creates_no_file(self, tmp_path):
+        """Тест що запуск без записів не створює файл"""
+        archive = SyncArchive(str(tmp_path))
+        archive.open_run('notes').close()
+        assert archive.runs('notes') == []
+
+    def test_runs_sorted_and_filtered(self, tmp_path):
+        """Тест що запуски повертаються від старішого до новішого з фільтром since"""
+        archive = SyncArchive(str(tmp_path))
+        for run_id in ('20250301T000000', '20250101T000000', '20250201T000000'):
+            with archive.open_run('contacts', run_id=run_id) as run:
+                run.append({'id': run_id})
+        assert archive.runs('contacts') == ['20250101T000000', '20250201T000000', '20250301T000000']
+        assert archive.runs('contacts', since='20250201') == ['20250201T000000', '20250301T000000']
+
+    def test_truncated_run_is_readable(self, tmp_path):
+        """Тест що обірваний запис в кінці файлу не ламає читання"""
+        archive = SyncArchive(str(tmp_path))
+        with archive.open_run('deals', run_id='run') as run:
+            for i in range(50):
+                run.append({'id': str(i)})
+        with open(run.path, 'rb') as archive_file:
+            data = archive_file.read()
+        with open(run.path, 'wb') as archive_file:
+            archive_file.write(data[:-10])
+        records = list(archive.read('deals', 'run'))
+        assert all(r['id'] == str(i) for i, r in enumerate(records))
+
+    def test_unknown_source(self, tmp_path):
+        """Тест що невідоме джерело відхиляється"""
+        with pytest.raises(ValueError):
+            SyncArchive(str(tmp_path)).open_run('owners')
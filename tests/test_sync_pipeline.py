@@ -0,0 +1,83 @@
+"""
+Тести для конвеєра імпорту fetch -> transform -> write
+"""
+import pytest
+import os
+import sys
+import threading
+import time
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sync_pipeline import SyncPipeline
+
+
+def fetch_pages(task):
+    for page in range(3):
+        yield [f'{task}-{page}-{i}' for i in range(5)]
+
+
+class TestSyncPipeline:
+    """Тести для SyncPipeline"""
+
+    def test_all_items_written_in_caller_thread(self):
+        """Тест що всі записи доходять до write, і write виконується в потоці run()"""
+        written = []
+        writer_threads = set()
+
+        def write(batch):
+            writer_threads.add(threading.get_ident())
+            written.extend(batch)
+
+        pipeline = SyncPipeline(fetch_pages, lambda page: [item.upper() for item in page], write)
+        stats = pipeline.run(['a', 'b', 'c'])
+        assert len(written) == 45
+        assert writer_threads == {threading.get_ident()}
+        assert stats['fetch']['items'] == 9
+        assert stats['write']['items'] == 9
+
+    def test_fetch_error_stops_only_its_task(self):
+        """Тест що помилка fetch завершує тільки свою задачу"""
+        def fetch(task):
+            if task == 'bad':
+                raise RuntimeError('boom')
+            yield from fetch_pages(task)
+
+        errors = []
+        written = []
+        pipeline = SyncPipeline(fetch, list, written.extend, on_error=lambda stage, e: errors.append(stage))
+        stats = pipeline.run(['bad', 'good'])
+        assert errors == ['fetch']
+        assert stats['fetch']['errors'] == 1
+        assert len(written) == 15
+
+    def test_backpressure_bounds_fetched_pages(self):
+        """Тест що повільний write не дає fetch читати наперед більше за місткість черг"""
+        fetched = []
+
+        def fetch(task):
+            for page in range(20):
+                fetched.append(page)
+                yield [page]
+
+        def write(batch):
+            time.sleep(0.05)
+
+        pipeline = SyncPipeline(fetch, list, write, fetchers=1, transformers=1, queue_size=2)
+        thread = threading.Thread(target=pipeline.run, args=(['only'],))
+        thread.start()
+        time.sleep(0.2)
+        # записано ~4 сторінки; в чергах і потоках - не більше queue_size * 2 + 3
+        assert len(fetched) <= 4 + 2 * 2 + 3
+        thread.join(5)
+        assert len(fetched) == 20
+
+    def test_write_error_cancels_pipeline(self):
+        """Тест що виняток у write зупиняє конвеєр і прокидається з run()"""
+        def write(batch):
+            raise ValueError('db error')
+
+        pipeline = SyncPipeline(fetch_pages, list, write)
+        with pytest.raises(ValueError):
+            pipeline.run(['a', 'b'])
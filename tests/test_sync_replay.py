@@ -0,0 +1,111 @@
+"""
+Тести для запису deals в БД: повторна обробка архіву (replay_sync_archive) і живий імпорт
+"""
+import pytest
+import os
+import sys
+from types import SimpleNamespace
+from flask import Flask
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import db, User, Lead
+from sync_archive import SyncArchive
+
+
+@pytest.fixture
+def replay_app(tmp_path, monkeypatch):
+    """Окремий Flask застосунок з моделями app.py на тимчасовій SQLite і архів у tmp_path"""
+    test_app = Flask(__name__)
+    test_app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'replay.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        TESTING=True,
+    )
+    db.init_app(test_app)
+    archive = SyncArchive(str(tmp_path / 'archive'))
+    monkeypatch.setattr(app_module, 'sync_archive', archive)
+    with test_app.app_context():
+        db.create_all()
+        agent = User(username='agent', email='agent@example.com', role='agent')
+        agent.set_password('password123')
+        db.session.add(agent)
+        db.session.commit()
+        yield archive, agent.id
+        db.session.remove()
+        db.drop_all()
+
+
+def archive_deals(archive, deal_ids):
+    with archive.open_run('deals', run_id='20240101T000000') as run:
+        for deal_id in deal_ids:
+            run.append({'id': deal_id, 'properties': {}})
+
+
+class TestReplaySyncArchive:
+    """Тести для replay_sync_archive"""
+
+    def test_failed_record_keeps_rest_of_batch(self, replay_app, monkeypatch):
+        """Тест що помилка flush одного запису не відкочує вже пораховані записи пакета"""
+        archive, agent_id = replay_app
+        archive_deals(archive, ['1', '2', 'bad', '4'])
+
+        def apply_lead_record(lead_record):
+            # agent_id=None порушує NOT NULL - IntegrityError при flush
+            db.session.add(Lead(agent_id=None if lead_record.deal_id == 'bad' else agent_id,
+                                deal_name=f'Deal {lead_record.deal_id}', email='lead@example.com',
+                                phone='+380501234567', hubspot_deal_id=lead_record.deal_id))
+            db.session.flush()
+            return 'created'
+
+        monkeypatch.setattr(app_module, 'build_deal_mapper', lambda: SimpleNamespace(
+            map=lambda record: SimpleNamespace(deal_id=record['id'])))
+        monkeypatch.setattr(app_module, 'apply_lead_record', apply_lead_record)
+
+        result = app_module.replay_sync_archive('deals', commit_every=10)
+        assert (result['created'], result['errors']) == (3, 1)
+        assert sorted(deal_id for deal_id, in db.session.query(Lead.hubspot_deal_id)) == ['1', '2', '4']
+
+
+class FakeDealsSearch:
+    """Пошук deals: одна сторінка для стадії appointmentscheduled, інші стадії порожні"""
+
+    def __init__(self, deal_ids):
+        self.deal_ids = deal_ids
+
+    def do_search(self, public_object_search_request):
+        stage = public_object_search_request.filter_groups[0].filters[1].value
+        deal_ids = self.deal_ids if stage == 'appointmentscheduled' else []
+        return SimpleNamespace(results=[SimpleNamespace(id=deal_id) for deal_id in deal_ids],
+                               paging=None, total=len(deal_ids))
+
+
+class TestFetchAllDealsWrite:
+    """Тести для запису сторінок імпорту deals (fetch_all_deals_from_hubspot)"""
+
+    def test_failed_deal_does_not_abort_import(self, replay_app, monkeypatch):
+        """Тест що помилка flush одного deal не зупиняє запис решти сторінки і commit"""
+        _, agent_id = replay_app
+
+        def apply_lead_record(lead_record):
+            db.session.add(Lead(agent_id=None if lead_record.deal_id == 'bad' else agent_id,
+                                deal_name=f'Deal {lead_record.deal_id}', email='lead@example.com',
+                                phone='+380501234567', hubspot_deal_id=lead_record.deal_id))
+            db.session.flush()
+            return 'created'
+
+        search = FakeDealsSearch(['1', 'bad', '3'])
+        monkeypatch.setattr(app_module, 'hubspot_client', SimpleNamespace(
+            crm=SimpleNamespace(deals=SimpleNamespace(search_api=search))))
+        monkeypatch.setattr(app_module, 'SYNC_ARCHIVE_ENABLED', False)
+        monkeypatch.setattr(app_module, 'fetch_hubspot_deal_record', lambda deal: {'id': deal.id})
+        monkeypatch.setattr(app_module, 'build_deal_mapper', lambda: SimpleNamespace(
+            map=lambda record: SimpleNamespace(deal_id=record['id'])))
+        monkeypatch.setattr(app_module, 'apply_lead_record', apply_lead_record)
+
+        result = app_module.fetch_all_deals_from_hubspot()
+        assert (result['created'], result['errors']) == (2, 1)
+        db.session.remove()
+        assert sorted(deal_id for deal_id, in db.session.query(Lead.hubspot_deal_id)) == ['1', '3']
@@ -0,0 +1,63 @@
+"""
+Тести для планувальника синхронізації лідів
+"""
+import pytest
+import os
+import sys
+
+# Додаємо батьківську директорію до шляху Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sync_scheduler import SyncBudget, PollPolicy, plan_sync_batch
+
+
+class TestSyncBudget:
+    """Тести для SyncBudget"""
+
+    def test_leads_per_cycle(self):
+        """Тест перерахунку бюджету викликів у кількість лідів"""
+        budget = SyncBudget(api_calls=1000, calls_per_lead=10, hot_share=0.3)
+        assert budget.leads == 100
+        assert budget.hot_leads == 30
+
+    def test_from_env(self, monkeypatch):
+        """Тест налаштування бюджету зі змінних середовища"""
+        monkeypatch.setenv('SYNC_API_BUDGET_PER_CYCLE', '200')
+        monkeypatch.setenv('SYNC_API_CALLS_PER_LEAD', '4')
+        assert SyncBudget.from_env().leads == 50
+
+
+class TestPlanSyncBatch:
+    """Тести для plan_sync_batch"""
+
+    def test_hot_share_then_stale(self):
+        """Тест що активні займають тільки свою частку, решта - застарілі"""
+        plan = plan_sync_batch([1, 2, 3], [10, 11, 12, 13], budget_leads=4, hot_slots=2)
+        assert plan == [1, 2, 10, 11]
+
+    def test_no_duplicates(self):
+        """Тест що лід, який і активний, і застарілий, входить у план один раз"""
+        plan = plan_sync_batch([1, 2], [2, 3], budget_leads=5, hot_slots=2)
+        assert plan == [1, 2, 3]
+
+    def test_unused_stale_budget_goes_to_hot(self):
+        """Тест що невикористаний бюджет застарілих віддається активним"""
+        plan = plan_sync_batch([1, 2, 3, 4], [10], budget_leads=4, hot_slots=1)
+        assert plan == [1, 10, 2, 3]
+
+
+class TestPollPolicy:
+    """Тести для PollPolicy"""
+
+    def test_quiet_lead_backs_off_exponentially(self):
+        """Тест що інтервал неактивного ліда подвоюється до максимуму"""
+        policy = PollPolicy(min_interval=900, max_interval=3600)
+        intervals = [None]
+        for _ in range(4):
+            intervals.append(policy.next_interval(intervals[-1]))
+        assert intervals[1:] == [900, 1800, 3600, 3600]
+
+    def test_activity_resets_interval(self):
+        """Тест що активність скидає інтервал до мінімального"""
+        policy = PollPolicy(min_interval=900, max_interval=3600)
+        assert policy.next_interval(3600, active=True) == 900